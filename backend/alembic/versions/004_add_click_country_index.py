@@ -0,0 +1,28 @@
+"""Add per-link country index on referral_clicks for geo rollups
+
+Revision ID: 004
+Revises: 003
+Create Date: 2026-10-19 09:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '004'
+down_revision = '003'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # Country rollups group clicks of one link by the resolved country code
+    op.create_index(
+        'idx_referral_clicks_link_country',
+        'referral_clicks',
+        ['referral_link_id', sa.text("(geo_location ->> 'country')")],
+    )
+
+
+def downgrade() -> None:
+    op.drop_index('idx_referral_clicks_link_country', table_name='referral_clicks')
@@ -0,0 +1,33 @@
+"""Add idempotency key to conversions for retry-safe ingestion
+
+Revision ID: 005
+Revises: 004
+Create Date: 2026-10-19 10:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '005'
+down_revision = '004'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column('conversions', sa.Column('idempotency_key', sa.String(255), nullable=True))
+
+    # Keys are scoped per program; conversions without a key are never deduped
+    op.create_index(
+        'uq_conversions_program_idempotency_key',
+        'conversions',
+        ['program_id', 'idempotency_key'],
+        unique=True,
+        postgresql_where=sa.text('idempotency_key IS NOT NULL'),
+    )
+
+
+def downgrade() -> None:
+    op.drop_index('uq_conversions_program_idempotency_key', table_name='conversions')
+    op.drop_column('conversions', 'idempotency_key')
@@ -0,0 +1,29 @@
+"""Add covering index for last-click attribution on referral_clicks
+
+Revision ID: 006
+Revises: 005
+Create Date: 2026-10-19 11:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '006'
+down_revision = '005'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # Session -> most recent click resolves with an index-only scan
+    op.create_index(
+        'idx_referral_clicks_session_clicked_at',
+        'referral_clicks',
+        ['visitor_session_id', sa.text('clicked_at DESC')],
+        postgresql_include=['referral_link_id'],
+    )
+
+
+def downgrade() -> None:
+    op.drop_index('idx_referral_clicks_session_clicked_at', table_name='referral_clicks')
@@ -0,0 +1,47 @@
+"""Add attribution_credits table for multi-touch attribution
+
+Revision ID: 007
+Revises: 006
+Create Date: 2026-10-19 12:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+# revision identifiers, used by Alembic.
+revision = '007'
+down_revision = '006'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'attribution_credits',
+        sa.Column('id', postgresql.UUID(as_uuid=True), primary_key=True),
+        sa.Column('conversion_id', postgresql.UUID(as_uuid=True), nullable=False),
+        sa.Column('referral_link_id', postgresql.UUID(as_uuid=True), nullable=False),
+        sa.Column('affiliate_id', postgresql.UUID(as_uuid=True), nullable=False),
+        sa.Column('program_id', postgresql.UUID(as_uuid=True), nullable=False),
+        sa.Column('model', sa.String(50), nullable=False),
+        sa.Column('credit', sa.Numeric(7, 6), nullable=False),
+        sa.Column('touchpoints', sa.Integer(), nullable=False, server_default='1'),
+        sa.Column('last_touch_at', sa.DateTime(timezone=True), nullable=False),
+        sa.Column('created_at', sa.DateTime(timezone=True), nullable=False, server_default=sa.text('CURRENT_TIMESTAMP')),
+        sa.ForeignKeyConstraint(['conversion_id'], ['conversions.id'], ondelete='CASCADE'),
+        sa.ForeignKeyConstraint(['referral_link_id'], ['referral_links.id'], ondelete='CASCADE'),
+        sa.ForeignKeyConstraint(['affiliate_id'], ['affiliate_profiles.id'], ondelete='CASCADE'),
+        sa.ForeignKeyConstraint(['program_id'], ['affiliate_programs.id'], ondelete='CASCADE'),
+        sa.UniqueConstraint('conversion_id', 'model', 'referral_link_id', name='uq_attribution_credit'),
+    )
+    op.create_index('ix_attribution_credits_id', 'attribution_credits', ['id'])
+    op.create_index('ix_attribution_credits_conversion_id', 'attribution_credits', ['conversion_id'])
+    op.create_index('ix_attribution_credits_affiliate_id', 'attribution_credits', ['affiliate_id'])
+
+
+def downgrade() -> None:
+    op.drop_index('ix_attribution_credits_affiliate_id', table_name='attribution_credits')
+    op.drop_index('ix_attribution_credits_conversion_id', table_name='attribution_credits')
+    op.drop_index('ix_attribution_credits_id', table_name='attribution_credits')
+    op.drop_table('attribution_credits')
@@ -0,0 +1,52 @@
+"""Add affiliate_tier_history table for automatic tier changes
+
+Revision ID: 008
+Revises: 007
+Create Date: 2026-10-19 13:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+# revision identifiers, used by Alembic.
+revision = '008'
+down_revision = '007'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'affiliate_tier_history',
+        sa.Column('id', postgresql.UUID(as_uuid=True), primary_key=True),
+        sa.Column('affiliate_id', postgresql.UUID(as_uuid=True), nullable=False),
+        sa.Column('from_tier_id', postgresql.UUID(as_uuid=True), nullable=True),
+        sa.Column('to_tier_id', postgresql.UUID(as_uuid=True), nullable=True),
+        sa.Column('reason', sa.String(50), nullable=False),
+        sa.Column('period_start', sa.DateTime(timezone=True), nullable=False),
+        sa.Column('period_end', sa.DateTime(timezone=True), nullable=False),
+        sa.Column('monthly_conversions', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('monthly_revenue', sa.Numeric(12, 2), nullable=False, server_default='0'),
+        sa.Column('changed_at', sa.DateTime(timezone=True), nullable=False, server_default=sa.text('CURRENT_TIMESTAMP')),
+        sa.ForeignKeyConstraint(['affiliate_id'], ['affiliate_profiles.id'], ondelete='CASCADE'),
+        sa.ForeignKeyConstraint(['from_tier_id'], ['affiliate_tiers.id']),
+        sa.ForeignKeyConstraint(['to_tier_id'], ['affiliate_tiers.id']),
+    )
+    op.create_index('ix_affiliate_tier_history_id', 'affiliate_tier_history', ['id'])
+    op.create_index('ix_affiliate_tier_history_affiliate_id', 'affiliate_tier_history', ['affiliate_id'])
+
+    # The monthly aggregate scans validated conversions per affiliate and period
+    op.create_index(
+        'idx_conversions_affiliate_status_converted_at',
+        'conversions',
+        ['affiliate_id', 'status', 'converted_at'],
+        postgresql_include=['conversion_value'],
+    )
+
+
+def downgrade() -> None:
+    op.drop_index('idx_conversions_affiliate_status_converted_at', table_name='conversions')
+    op.drop_index('ix_affiliate_tier_history_affiliate_id', table_name='affiliate_tier_history')
+    op.drop_index('ix_affiliate_tier_history_id', table_name='affiliate_tier_history')
+    op.drop_table('affiliate_tier_history')
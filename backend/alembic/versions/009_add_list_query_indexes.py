@@ -0,0 +1,58 @@
+"""Add composite and partial indexes for list and payout queries
+
+Revision ID: 009
+Revises: 008
+Create Date: 2026-10-19 15:00:00.000000
+
+Indexes are built CONCURRENTLY so the tables stay writable during the
+migration. CREATE INDEX CONCURRENTLY cannot run inside a transaction, so each
+statement runs in an autocommit block. A failed build leaves an INVALID
+index behind, so each index is dropped first and a rerun starts clean.
+"""
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = '009'
+down_revision = '008'
+branch_labels = None
+depends_on = None
+
+
+INDEXES = [
+    # List endpoints: WHERE affiliate_id = ? [AND status = ?] ORDER BY created_at DESC
+    (
+        'idx_commissions_affiliate_status_created_at',
+        'commissions (affiliate_id, status, created_at DESC)',
+    ),
+    (
+        'idx_conversions_affiliate_status_created_at',
+        'conversions (affiliate_id, status, created_at DESC)',
+    ),
+    (
+        'idx_payouts_affiliate_status_created_at',
+        'payouts (affiliate_id, status, created_at DESC)',
+    ),
+    (
+        'idx_referral_links_affiliate_status',
+        'referral_links (affiliate_id, status)',
+    ),
+    # Payout generation only ever looks at approved commissions not yet in a payout
+    (
+        'idx_commissions_unpaid_approved',
+        "commissions (affiliate_id, created_at) INCLUDE (final_amount, currency) "
+        "WHERE status = 'APPROVED' AND payout_id IS NULL",
+    ),
+]
+
+
+def upgrade() -> None:
+    with op.get_context().autocommit_block():
+        for name, definition in INDEXES:
+            op.execute(f'DROP INDEX CONCURRENTLY IF EXISTS {name}')
+            op.execute(f'CREATE INDEX CONCURRENTLY {name} ON {definition}')
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        for name, _ in reversed(INDEXES):
+            op.execute(f'DROP INDEX CONCURRENTLY IF EXISTS {name}')
@@ -0,0 +1,26 @@
+"""Add sequences for referral link and affiliate codes
+
+Revision ID: 010
+Revises: 009
+Create Date: 2026-10-19 16:00:00.000000
+
+Codes are derived from these sequences by app.services.code_service; the
+maximum values match the 40-bit (link) and 50-bit (affiliate) code spaces.
+"""
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = '010'
+down_revision = '009'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.execute('CREATE SEQUENCE referral_link_code_seq MAXVALUE 1099511627775')
+    op.execute('CREATE SEQUENCE affiliate_code_seq MAXVALUE 1125899906842623')
+
+
+def downgrade() -> None:
+    op.execute('DROP SEQUENCE affiliate_code_seq')
+    op.execute('DROP SEQUENCE referral_link_code_seq')
@@ -0,0 +1,45 @@
+"""Add partial indexes over active referral links
+
+Revision ID: 011
+Revises: 010
+Create Date: 2026-10-19 17:00:00.000000
+
+The expiry sweeper keeps ACTIVE meaning "not expired", so both indexes cover
+only links that can still redirect. Links already past their expiry are
+deactivated by the sweeper's first runs, not here. Built CONCURRENTLY in an
+autocommit block, as in 009.
+"""
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = '011'
+down_revision = '010'
+branch_labels = None
+depends_on = None
+
+
+INDEXES = [
+    # Expiry sweeper: WHERE status = 'ACTIVE' AND expires_at <= now()
+    (
+        'idx_referral_links_active_expiry',
+        "referral_links (expires_at) WHERE status = 'ACTIVE' AND expires_at IS NOT NULL",
+    ),
+    # Link snapshot build: WHERE status = 'ACTIVE' ORDER BY link_code COLLATE "C"
+    (
+        'idx_referral_links_active_code',
+        "referral_links ((link_code COLLATE \"C\")) WHERE status = 'ACTIVE'",
+    ),
+]
+
+
+def upgrade() -> None:
+    with op.get_context().autocommit_block():
+        for name, definition in INDEXES:
+            op.execute(f'DROP INDEX CONCURRENTLY IF EXISTS {name}')
+            op.execute(f'CREATE INDEX CONCURRENTLY {name} ON {definition}')
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        for name, _ in reversed(INDEXES):
+            op.execute(f'DROP INDEX CONCURRENTLY IF EXISTS {name}')
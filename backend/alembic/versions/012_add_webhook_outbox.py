@@ -0,0 +1,102 @@
+"""Add outbox_events, webhook_endpoints and webhook_deliveries tables
+
+Revision ID: 012
+Revises: 011
+Create Date: 2026-10-19 18:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+# revision identifiers, used by Alembic.
+revision = '012'
+down_revision = '011'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'outbox_events',
+        sa.Column('id', postgresql.UUID(as_uuid=True), primary_key=True),
+        sa.Column('event_type', sa.String(100), nullable=False),
+        sa.Column('payload', postgresql.JSONB(astext_type=sa.Text()), nullable=False),
+        sa.Column('affiliate_id', postgresql.UUID(as_uuid=True), nullable=True),
+        sa.Column('program_id', postgresql.UUID(as_uuid=True), nullable=True),
+        sa.Column('created_at', sa.DateTime(), nullable=False, server_default=sa.text('CURRENT_TIMESTAMP')),
+        sa.Column('dispatched_at', sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint(['affiliate_id'], ['affiliate_profiles.id'], ondelete='CASCADE'),
+        sa.ForeignKeyConstraint(['program_id'], ['affiliate_programs.id'], ondelete='CASCADE'),
+    )
+    op.create_index('ix_outbox_events_id', 'outbox_events', ['id'])
+    op.create_index(
+        'idx_outbox_events_undispatched', 'outbox_events', ['created_at'],
+        postgresql_where=sa.text('dispatched_at IS NULL'),
+    )
+
+    op.create_table(
+        'webhook_endpoints',
+        sa.Column('id', postgresql.UUID(as_uuid=True), primary_key=True),
+        sa.Column('affiliate_id', postgresql.UUID(as_uuid=True), nullable=True),
+        sa.Column('program_id', postgresql.UUID(as_uuid=True), nullable=True),
+        sa.Column('url', sa.String(1000), nullable=False),
+        sa.Column('secret', sa.String(100), nullable=False),
+        sa.Column('event_types', postgresql.JSONB(astext_type=sa.Text()), nullable=False),
+        sa.Column('max_concurrency', sa.Integer(), nullable=False, server_default='4'),
+        sa.Column('is_active', sa.Boolean(), nullable=False, server_default=sa.text('true')),
+        sa.Column('created_by', postgresql.UUID(as_uuid=True), nullable=False),
+        sa.Column('created_at', sa.DateTime(), nullable=False, server_default=sa.text('CURRENT_TIMESTAMP')),
+        sa.Column('updated_at', sa.DateTime(), nullable=False, server_default=sa.text('CURRENT_TIMESTAMP')),
+        sa.ForeignKeyConstraint(['affiliate_id'], ['affiliate_profiles.id'], ondelete='CASCADE'),
+        sa.ForeignKeyConstraint(['program_id'], ['affiliate_programs.id'], ondelete='CASCADE'),
+        sa.ForeignKeyConstraint(['created_by'], ['users.id']),
+        sa.CheckConstraint('(affiliate_id IS NULL) <> (program_id IS NULL)', name='ck_webhook_endpoint_owner'),
+    )
+    op.create_index('ix_webhook_endpoints_id', 'webhook_endpoints', ['id'])
+    op.create_index('ix_webhook_endpoints_affiliate_id', 'webhook_endpoints', ['affiliate_id'])
+    op.create_index('ix_webhook_endpoints_program_id', 'webhook_endpoints', ['program_id'])
+
+    op.create_table(
+        'webhook_deliveries',
+        sa.Column('id', postgresql.UUID(as_uuid=True), primary_key=True),
+        sa.Column('event_id', postgresql.UUID(as_uuid=True), nullable=False),
+        sa.Column('endpoint_id', postgresql.UUID(as_uuid=True), nullable=False),
+        sa.Column('status', sa.Enum('PENDING', 'DELIVERED', 'DEAD', name='webhookdeliverystatus'), nullable=False, server_default='PENDING'),
+        sa.Column('attempts', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('next_attempt_at', sa.DateTime(), nullable=False, server_default=sa.text('CURRENT_TIMESTAMP')),
+        sa.Column('last_status_code', sa.Integer(), nullable=True),
+        sa.Column('last_error', sa.Text(), nullable=True),
+        sa.Column('delivered_at', sa.DateTime(), nullable=True),
+        sa.Column('created_at', sa.DateTime(), nullable=False, server_default=sa.text('CURRENT_TIMESTAMP')),
+        sa.ForeignKeyConstraint(['event_id'], ['outbox_events.id'], ondelete='CASCADE'),
+        sa.ForeignKeyConstraint(['endpoint_id'], ['webhook_endpoints.id'], ondelete='CASCADE'),
+    )
+    op.create_index('ix_webhook_deliveries_id', 'webhook_deliveries', ['id'])
+    op.create_index('ix_webhook_deliveries_event_id', 'webhook_deliveries', ['event_id'])
+    op.create_index(
+        'idx_webhook_deliveries_due', 'webhook_deliveries', ['next_attempt_at'],
+        postgresql_where=sa.text("status = 'PENDING'"),
+    )
+    op.create_index(
+        'idx_webhook_deliveries_endpoint_status', 'webhook_deliveries',
+        ['endpoint_id', 'status', 'created_at'],
+    )
+
+
+def downgrade() -> None:
+    op.drop_index('idx_webhook_deliveries_endpoint_status', table_name='webhook_deliveries')
+    op.drop_index('idx_webhook_deliveries_due', table_name='webhook_deliveries')
+    op.drop_index('ix_webhook_deliveries_event_id', table_name='webhook_deliveries')
+    op.drop_index('ix_webhook_deliveries_id', table_name='webhook_deliveries')
+    op.drop_table('webhook_deliveries')
+    sa.Enum(name='webhookdeliverystatus').drop(op.get_bind(), checkfirst=True)
+
+    op.drop_index('ix_webhook_endpoints_program_id', table_name='webhook_endpoints')
+    op.drop_index('ix_webhook_endpoints_affiliate_id', table_name='webhook_endpoints')
+    op.drop_index('ix_webhook_endpoints_id', table_name='webhook_endpoints')
+    op.drop_table('webhook_endpoints')
+
+    op.drop_index('idx_outbox_events_undispatched', table_name='outbox_events')
+    op.drop_index('ix_outbox_events_id', table_name='outbox_events')
+    op.drop_table('outbox_events')
@@ -0,0 +1,26 @@
+"""Add postback secret and template to affiliate_programs
+
+Revision ID: 013
+Revises: 012
+Create Date: 2026-10-19 19:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+# revision identifiers, used by Alembic.
+revision = '013'
+down_revision = '012'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column('affiliate_programs', sa.Column('postback_secret', sa.String(100), nullable=True))
+    op.add_column('affiliate_programs', sa.Column('postback_template', postgresql.JSONB(astext_type=sa.Text()), nullable=True))
+
+
+def downgrade() -> None:
+    op.drop_column('affiliate_programs', 'postback_template')
+    op.drop_column('affiliate_programs', 'postback_secret')
@@ -0,0 +1,81 @@
+"""Add program_overview_stats materialized view and refresh bookkeeping
+
+Revision ID: 014
+Revises: 013
+Create Date: 2026-10-19 20:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '014'
+down_revision = '013'
+branch_labels = None
+depends_on = None
+
+
+# Keep in step with program_overview_select() in app/services/overview_service.py
+PROGRAM_OVERVIEW_SQL = """
+SELECT
+    p.id AS program_id,
+    p.name AS program_name,
+    COALESCE(e.active_affiliates, 0) AS active_affiliates,
+    COALESCE(l.links, 0) AS links,
+    COALESCE(l.clicks, 0) AS clicks,
+    COALESCE(c.conversions, 0) AS conversions,
+    COALESCE(c.revenue, 0) AS revenue,
+    COALESCE(m.commission_liability, 0) AS commission_liability,
+    COALESCE(m.unpaid_balance, 0) AS unpaid_balance,
+    COALESCE(m.paid_commission, 0) AS paid_commission
+FROM affiliate_programs p
+LEFT JOIN (
+    SELECT program_id, count(*) AS active_affiliates
+    FROM program_enrollments
+    WHERE status = 'ACTIVE'
+    GROUP BY program_id
+) e ON e.program_id = p.id
+LEFT JOIN (
+    SELECT program_id, count(*) AS links, sum(clicks_count) AS clicks
+    FROM referral_links
+    GROUP BY program_id
+) l ON l.program_id = p.id
+LEFT JOIN (
+    SELECT program_id, count(*) AS conversions, sum(conversion_value) AS revenue
+    FROM conversions
+    WHERE status = 'VALIDATED'
+    GROUP BY program_id
+) c ON c.program_id = p.id
+LEFT JOIN (
+    SELECT
+        program_id,
+        sum(final_amount) FILTER (WHERE status IN ('PENDING', 'APPROVED')) AS commission_liability,
+        sum(final_amount) FILTER (WHERE status = 'APPROVED') AS unpaid_balance,
+        sum(final_amount) FILTER (WHERE status = 'PAID') AS paid_commission
+    FROM commissions
+    GROUP BY program_id
+) m ON m.program_id = p.id
+"""
+
+
+def upgrade() -> None:
+    op.create_table(
+        'materialized_view_refreshes',
+        sa.Column('view_name', sa.String(100), primary_key=True),
+        sa.Column('refreshed_at', sa.DateTime(), nullable=False),
+        sa.Column('duration_ms', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('updated_at', sa.DateTime(), nullable=False, server_default=sa.text('CURRENT_TIMESTAMP')),
+    )
+
+    op.execute(f"CREATE MATERIALIZED VIEW program_overview_stats AS {PROGRAM_OVERVIEW_SQL} WITH DATA")
+    # REFRESH ... CONCURRENTLY requires a unique index on plain columns
+    op.execute("CREATE UNIQUE INDEX ux_program_overview_stats_program_id ON program_overview_stats (program_id)")
+    op.execute(
+        "INSERT INTO materialized_view_refreshes (view_name, refreshed_at, duration_ms) "
+        "VALUES ('program_overview_stats', now() AT TIME ZONE 'utc', 0)"
+    )
+
+
+def downgrade() -> None:
+    op.execute("DROP MATERIALIZED VIEW IF EXISTS program_overview_stats")
+    op.drop_table('materialized_view_refreshes')
@@ -1,27 +1,42 @@
 """
 Affiliate Management Endpoints
 """
+from datetime import datetime
+from decimal import Decimal
 from typing import List, Optional
 from uuid import UUID
-from fastapi import APIRouter, Depends, Query
+from fastapi import APIRouter, Depends, Query, Response
+from sqlalchemy import case, func, select
 from sqlalchemy.orm import Session
 
-from app.database import get_db
+from app.database import get_db, get_read_db
 from app.api.deps import get_current_active_user, get_admin_user, get_affiliate_user
+from app.core.config import settings
 from app.core.exceptions import NotFoundError, ConflictError, BadRequestError, AuthorizationError
+from app.core.serialization import dumps, schema_columns
 from app.models.user import User, UserRole
 from app.models.affiliate import AffiliateProfile, ApprovalStatus
+from app.models.conversion import Commission, CommissionStatus, Payout, PayoutStatus
+from app.models.program import ProgramEnrollment
+from app.models.referral import ReferralLink, ReferralLinkStatus
 from app.schemas.affiliate import (
+    AffiliateDashboard,
     AffiliateProfile as AffiliateProfileSchema,
     AffiliateProfileCreate,
     AffiliateProfileUpdate,
     AffiliateApprovalRequest,
+    AffiliateTierHistory,
 )
+from app.schemas.conversion import Commission as CommissionSchema
+from app.schemas.enrollment import ProgramEnrollment as ProgramEnrollmentSchema
+from app.schemas.referral import ReferralLink as ReferralLinkSchema
 from app.services.affiliate_service import (
     create_affiliate_profile,
     approve_affiliate,
     reject_affiliate,
 )
+from app.services.dashboard_service import cache_dashboard, get_cached_dashboard, invalidate_dashboards
+from app.services.tier_service import get_tier_history
 
 router = APIRouter()
 
@@ -66,7 +81,7 @@ def list_affiliates(
     limit: int = Query(100, ge=1, le=100),
     status: Optional[ApprovalStatus] = Query(None),
     current_user: User = Depends(get_admin_user),
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_read_db),
 ):
     """
     List all affiliates (admin only)
@@ -98,6 +113,100 @@ def get_my_affiliate_profile(
     return profile
 
 
+def _status_totals(db: Session, model, amount, affiliate_id: UUID, names: dict) -> dict:
+    """
+    Counts and amounts per status in one GROUP BY, keyed like the /stats endpoints
+    """
+    totals = {}
+    for name in names.values():
+        totals[f"total_{name}"] = Decimal("0.00")
+        totals[f"count_{name}"] = 0
+
+    rows = db.execute(
+        select(model.status, func.count(model.id), func.coalesce(func.sum(amount), 0))
+        .where(model.affiliate_id == affiliate_id, model.status.in_(list(names)))
+        .group_by(model.status)
+    )
+    for status, count, total in rows:
+        totals[f"total_{names[status]}"] = total
+        totals[f"count_{names[status]}"] = count
+    return totals
+
+
+@router.get("/me/dashboard", response_model=AffiliateDashboard)
+def get_my_dashboard(
+    current_user: User = Depends(get_current_active_user),
+    db: Session = Depends(get_db),
+):
+    """
+    Get everything the affiliate dashboard shows in one response
+    Replaces the profile, enrollment, link, commission and payout calls made
+    on load. Cached per affiliate for DASHBOARD_CACHE_TTL seconds; click
+    counts may lag by that much. Read from the primary, not the replica: the
+    cache is invalidated right after primary commits, and a refill from a
+    lagging replica would pin stale totals for the whole TTL.
+    """
+    profile = db.execute(
+        select(*schema_columns(AffiliateProfile, AffiliateProfileSchema))
+        .where(AffiliateProfile.user_id == current_user.id)
+    ).first()
+
+    if not profile:
+        raise NotFoundError("Affiliate profile not found")
+
+    affiliate_id = profile.id
+    cached = get_cached_dashboard(affiliate_id)
+    if cached is not None:
+        return Response(content=cached, media_type="application/json")
+
+    links = db.execute(
+        select(
+            func.count(ReferralLink.id).label("total_links"),
+            func.coalesce(func.sum(case((ReferralLink.status == ReferralLinkStatus.ACTIVE, 1), else_=0)), 0).label("active_links"),
+            func.coalesce(func.sum(ReferralLink.clicks_count), 0).label("clicks"),
+            func.coalesce(func.sum(ReferralLink.conversions_count), 0).label("conversions"),
+        ).where(ReferralLink.affiliate_id == affiliate_id)
+    ).one()
+
+    top_links = db.execute(
+        select(*schema_columns(ReferralLink, ReferralLinkSchema))
+        .where(ReferralLink.affiliate_id == affiliate_id)
+        .order_by(ReferralLink.clicks_count.desc())
+        .limit(settings.DASHBOARD_TOP_LINKS)
+    )
+    enrollments = db.execute(
+        select(*schema_columns(ProgramEnrollment, ProgramEnrollmentSchema))
+        .where(ProgramEnrollment.affiliate_id == affiliate_id)
+    )
+    recent_commissions = db.execute(
+        select(*schema_columns(Commission, CommissionSchema))
+        .where(Commission.affiliate_id == affiliate_id)
+        .order_by(Commission.created_at.desc())
+        .limit(settings.DASHBOARD_RECENT_COMMISSIONS)
+    )
+
+    content = dumps({
+        "profile": profile._asdict(),
+        "links": links._asdict(),
+        "top_links": [row._asdict() for row in top_links],
+        "enrollments": [row._asdict() for row in enrollments],
+        "commissions": _status_totals(db, Commission, Commission.final_amount, affiliate_id, {
+            CommissionStatus.PENDING: "pending",
+            CommissionStatus.APPROVED: "approved",
+            CommissionStatus.PAID: "paid",
+        }),
+        "recent_commissions": [row._asdict() for row in recent_commissions],
+        "payouts": _status_totals(db, Payout, Payout.total_amount, affiliate_id, {
+            PayoutStatus.PENDING: "pending",
+            PayoutStatus.PROCESSING: "processing",
+            PayoutStatus.COMPLETED: "paid",
+        }),
+        "generated_at": datetime.utcnow(),
+    })
+    cache_dashboard(affiliate_id, content)
+    return Response(content=content, media_type="application/json")
+
+
 @router.get("/{affiliate_id}", response_model=AffiliateProfileSchema)
 def get_affiliate(
     affiliate_id: UUID,
@@ -122,6 +231,31 @@ def get_affiliate(
     return profile
 
 
+@router.get("/{affiliate_id}/tier-history", response_model=List[AffiliateTierHistory])
+def get_affiliate_tier_history(
+    affiliate_id: UUID,
+    limit: int = Query(50, ge=1, le=200),
+    current_user: User = Depends(get_current_active_user),
+    db: Session = Depends(get_read_db),
+):
+    """
+    Get an affiliate's tier promotions and demotions
+    Affiliates can only view their own history, admins can view any
+    """
+    profile = db.query(AffiliateProfile).filter(
+        AffiliateProfile.id == affiliate_id
+    ).first()
+
+    if not profile:
+        raise NotFoundError("Affiliate profile not found")
+
+    # Check authorization
+    if current_user.role != UserRole.ADMIN and profile.user_id != current_user.id:
+        raise AuthorizationError("You can only view your own tier history")
+
+    return get_tier_history(db, affiliate_id, limit)
+
+
 @router.patch("/me", response_model=AffiliateProfileSchema)
 def update_my_affiliate_profile(
     profile_update: AffiliateProfileUpdate,
@@ -148,6 +282,7 @@ def update_my_affiliate_profile(
 
     db.commit()
     db.refresh(profile)
+    invalidate_dashboards([profile.id])
 
     return profile
 
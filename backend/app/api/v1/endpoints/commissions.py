@@ -5,16 +5,20 @@ from typing import List, Optional
 from uuid import UUID
 from fastapi import APIRouter, Depends, Query
 from sqlalchemy.orm import Session
-from sqlalchemy import func
+from sqlalchemy import func, select
 from decimal import Decimal
 
-from app.database import get_db
+from app.database import get_db, get_read_db
 from app.api.deps import get_current_active_user, get_admin_user
 from app.core.exceptions import NotFoundError, BadRequestError, AuthorizationError
+from app.core.serialization import rows_response, schema_columns
 from app.models.user import User, UserRole
-from app.models.conversion import Commission as CommissionModel, CommissionStatus
+from app.models.conversion import Commission as CommissionModel, CommissionStatus, Conversion as ConversionModel
 from app.models.affiliate import AffiliateProfile
-from app.schemas.conversion import Commission, CommissionUpdate
+from app.models.program import AffiliateProgram
+from app.schemas.conversion import Commission, CommissionUpdate, CommissionWithDetails
+from app.services.commission_service import approve_commission as approve_commission_service
+from app.services.dashboard_service import invalidate_dashboards
 
 router = APIRouter()
 
@@ -25,14 +29,14 @@ def list_commissions(
     limit: int = Query(100, ge=1, le=100),
     status: Optional[CommissionStatus] = Query(None),
     current_user: User = Depends(get_current_active_user),
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_read_db),
 ):
     """
     List commissions
     - Admins see all commissions
     - Affiliates see only their own commissions
     """
-    query = db.query(CommissionModel)
+    query = select(*schema_columns(CommissionModel, Commission))
 
     if current_user.role != UserRole.ADMIN:
         # Get affiliate ID for current user
@@ -43,19 +47,62 @@ def list_commissions(
         if not affiliate:
             return []
 
-        query = query.filter(CommissionModel.affiliate_id == affiliate.id)
+        query = query.where(CommissionModel.affiliate_id == affiliate.id)
+
+    if status:
+        query = query.where(CommissionModel.status == status)
+
+    rows = db.execute(query.order_by(CommissionModel.created_at.desc()).offset(skip).limit(limit))
+    return rows_response(rows, Commission)
+
+
+@router.get("/details", response_model=List[CommissionWithDetails])
+def list_commission_details(
+    skip: int = Query(0, ge=0),
+    limit: int = Query(100, ge=1, le=100),
+    status: Optional[CommissionStatus] = Query(None),
+    current_user: User = Depends(get_current_active_user),
+    db: Session = Depends(get_read_db),
+):
+    """
+    List commissions with their conversion and program details
+    One joined query per page instead of fetching conversions and programs separately
+    - Admins see all commissions
+    - Affiliates see only their own commissions
+    """
+    query = select(
+        *schema_columns(CommissionModel, Commission),
+        ConversionModel.conversion_value,
+        ConversionModel.conversion_type,
+        AffiliateProgram.name.label("program_name"),
+    ).join(
+        ConversionModel, ConversionModel.id == CommissionModel.conversion_id
+    ).join(
+        AffiliateProgram, AffiliateProgram.id == CommissionModel.program_id
+    )
+
+    if current_user.role != UserRole.ADMIN:
+        # Get affiliate ID for current user
+        affiliate = db.query(AffiliateProfile).filter(
+            AffiliateProfile.user_id == current_user.id
+        ).first()
+
+        if not affiliate:
+            return []
+
+        query = query.where(CommissionModel.affiliate_id == affiliate.id)
 
     if status:
-        query = query.filter(CommissionModel.status == status)
+        query = query.where(CommissionModel.status == status)
 
-    commissions = query.order_by(CommissionModel.created_at.desc()).offset(skip).limit(limit).all()
-    return commissions
+    rows = db.execute(query.order_by(CommissionModel.created_at.desc()).offset(skip).limit(limit))
+    return rows_response(rows, CommissionWithDetails)
 
 
 @router.get("/stats")
 def get_commission_stats(
     current_user: User = Depends(get_current_active_user),
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_read_db),
 ):
     """
     Get commission statistics
@@ -153,11 +200,7 @@ def approve_commission(
     if commission.status != CommissionStatus.PENDING:
         raise BadRequestError("Commission is not pending")
 
-    commission.status = CommissionStatus.APPROVED
-    db.commit()
-    db.refresh(commission)
-
-    return commission
+    return approve_commission_service(db, commission, current_user.id)
 
 
 @router.post("/{commission_id}/reject", response_model=Commission)
@@ -182,5 +225,6 @@ def reject_commission(
     commission.status = CommissionStatus.REJECTED
     db.commit()
     db.refresh(commission)
+    invalidate_dashboards([commission.affiliate_id])
 
     return commission
@@ -3,12 +3,18 @@ Conversion Management Endpoints
 """
 from typing import List, Optional
 from uuid import UUID
-from fastapi import APIRouter, Depends, Query, Header
+import redis
+from fastapi import APIRouter, Depends, Query, Header, Request
+from fastapi.exceptions import RequestValidationError
+from pydantic import ValidationError
 from sqlalchemy.orm import Session
+from sqlalchemy import select
 
-from app.database import get_db
+from app.database import get_db, get_read_db, get_returning_db
 from app.api.deps import get_current_active_user, get_admin_user, get_affiliate_user
-from app.core.exceptions import NotFoundError, BadRequestError, AuthorizationError
+from app.core.exceptions import AuthenticationError, NotFoundError, BadRequestError, AuthorizationError
+from app.core.metrics import POSTBACKS
+from app.core.serialization import rows_response, schema_columns
 from app.models.user import User, UserRole
 from app.models.conversion import Conversion as ConversionModel, ConversionType, ConversionStatus
 from app.models.referral import ReferralLink, ReferralLinkStatus
@@ -17,12 +23,28 @@ from app.schemas.conversion import (
     ConversionCreate,
     ConversionUpdate,
     SDKConversionCreate,
+    AttributionShare,
+)
+from app.services.attribution_service import resolve_last_click_link
+from app.services.multitouch_attribution_service import (
+    ATTRIBUTION_MODELS,
+    calculate_credit_commissions,
 )
 from app.services.conversion_service import (
     create_conversion as create_conversion_service,
+    resolve_idempotency_key,
     validate_conversion as validate_conversion_service,
     reject_conversion as reject_conversion_service,
 )
+from app.services.postback_service import (
+    enqueue_postback,
+    get_postback_config,
+    map_postback_params,
+    postback_event,
+    record_postbacks,
+    verify_postback_secret,
+)
+from app.services.referral_service import is_link_expired
 
 router = APIRouter()
 
@@ -30,14 +52,19 @@ router = APIRouter()
 @router.post("/track", response_model=Conversion)
 def track_conversion_sdk(
     conversion_data: SDKConversionCreate,
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_returning_db),
     x_api_key: Optional[str] = Header(None),
+    idempotency_key: Optional[str] = Header(None, max_length=255),
 ):
     """
     Public endpoint for SDK conversion tracking
     No authentication required - designed for embedded SDK usage
 
-    Validates referral link exists and is active before creating conversion
+    Validates referral link exists and is active before creating conversion.
+    The conversion is credited to the visitor session's last click on the
+    program within the attribution window, if there is one.
+    Retries carrying the same Idempotency-Key header (or idempotency_key field,
+    or conversion_metadata.order_id) return the original conversion.
     """
     # Find referral link by code
     link = db.query(ReferralLink).filter(
@@ -49,10 +76,16 @@ def track_conversion_sdk(
         raise NotFoundError("Referral link not found or inactive")
 
     # Check if link is expired
-    if link.expires_at:
-        from datetime import datetime, timezone
-        if link.expires_at < datetime.now(timezone.utc):
-            raise BadRequestError("Referral link has expired")
+    if is_link_expired(link.expires_at):
+        raise BadRequestError("Referral link has expired")
+
+    # Credit the session's most recent qualifying click (last-click attribution);
+    # the asserted code only decides the program and is the fallback
+    attributed_link = resolve_last_click_link(
+        db, conversion_data.visitor_session_id, link.program_id
+    )
+    if attributed_link:
+        link = attributed_link
 
     # Create conversion (auto-validate if conversion_value is provided)
     auto_validate = conversion_data.conversion_value is not None and conversion_data.conversion_value > 0
@@ -66,20 +99,66 @@ def track_conversion_sdk(
         customer_id=str(conversion_data.customer_id) if conversion_data.customer_id else None,
         conversion_metadata=conversion_data.conversion_metadata,
         auto_validate=auto_validate,
+        idempotency_key=resolve_idempotency_key(
+            idempotency_key or conversion_data.idempotency_key,
+            conversion_data.conversion_metadata,
+        ),
     )
 
     return conversion
 
 
+@router.get("/postback/{program_id}")
+def track_conversion_postback(
+    program_id: UUID,
+    request: Request,
+    secret: Optional[str] = Query(None),
+    x_postback_secret: Optional[str] = Header(None),
+    db: Session = Depends(get_returning_db),
+):
+    """
+    Public endpoint for server-to-server conversion postbacks
+    Authenticated by the program's postback secret (``secret`` parameter or
+    X-Postback-Secret header); the other query parameters are mapped onto the
+    SDK conversion fields by the program's postback template.
+
+    The conversion is queued and written by the worker, so a valid postback is
+    acknowledged before its link is checked: unknown or expired links are
+    dropped at ingestion (counted in ``postbacks_total{outcome="unmatched"}``).
+    """
+    config = get_postback_config(db, program_id)
+    if not verify_postback_secret(config, secret or x_postback_secret):
+        POSTBACKS.labels("invalid").inc()
+        raise AuthenticationError("Invalid postback secret")
+
+    try:
+        conversion_data = SDKConversionCreate(**map_postback_params(config.template, request.query_params))
+    except ValidationError as exc:
+        POSTBACKS.labels("invalid").inc()
+        raise RequestValidationError(exc.errors(include_url=False))
+
+    event = postback_event(program_id, conversion_data.model_dump(mode="json"))
+    try:
+        enqueue_postback(event)
+    except redis.RedisError:
+        # Queue unavailable: write it now rather than lose it
+        record_postbacks(db, [event])
+        POSTBACKS.labels("stored").inc()
+
+    return {"status": "accepted"}
+
+
 @router.post("/", response_model=Conversion)
 def create_conversion(
     conversion_data: ConversionCreate,
     current_user: User = Depends(get_current_active_user),
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_returning_db),
+    idempotency_key: Optional[str] = Header(None, max_length=255),
 ):
     """
     Create a new conversion (admin or API)
     In production, this would typically be called via webhook or API integration
+    Webhook retries are deduped the same way as /track
     """
     # Find referral link by code
     link = db.query(ReferralLink).filter(
@@ -99,6 +178,10 @@ def create_conversion(
         customer_id=str(conversion_data.customer_id) if conversion_data.customer_id else None,
         conversion_metadata=conversion_data.conversion_metadata,
         auto_validate=(current_user.role == UserRole.ADMIN),  # Auto-validate for admin
+        idempotency_key=resolve_idempotency_key(
+            idempotency_key or conversion_data.idempotency_key,
+            conversion_data.conversion_metadata,
+        ),
     )
 
     return conversion
@@ -110,14 +193,14 @@ def list_conversions(
     limit: int = Query(100, ge=1, le=100),
     status: Optional[ConversionStatus] = Query(None),
     current_user: User = Depends(get_current_active_user),
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_read_db),
 ):
     """
     List conversions
     - Admins see all conversions
     - Affiliates see only their own conversions
     """
-    query = db.query(ConversionModel)
+    query = select(*schema_columns(ConversionModel, Conversion))
 
     if current_user.role != UserRole.ADMIN:
         # Get affiliate ID for current user
@@ -129,13 +212,13 @@ def list_conversions(
         if not affiliate:
             return []
 
-        query = query.filter(ConversionModel.affiliate_id == affiliate.id)
+        query = query.where(ConversionModel.affiliate_id == affiliate.id)
 
     if status:
-        query = query.filter(ConversionModel.status == status)
+        query = query.where(ConversionModel.status == status)
 
-    conversions = query.order_by(ConversionModel.created_at.desc()).offset(skip).limit(limit).all()
-    return conversions
+    rows = db.execute(query.order_by(ConversionModel.created_at.desc()).offset(skip).limit(limit))
+    return rows_response(rows, Conversion)
 
 
 @router.get("/{conversion_id}", response_model=Conversion)
@@ -167,11 +250,35 @@ def get_conversion(
     return conversion
 
 
+@router.get("/{conversion_id}/attribution", response_model=List[AttributionShare])
+def get_conversion_attribution(
+    conversion_id: UUID,
+    model: str = Query("linear", description="Attribution model, e.g. linear, time_decay, position_based"),
+    current_user: User = Depends(get_admin_user),
+    db: Session = Depends(get_read_db),
+):
+    """
+    Get multi-touch credit shares and the commission split they imply (admin only)
+    Shares are written by the multi-touch attribution batch job
+    """
+    if model not in ATTRIBUTION_MODELS:
+        raise BadRequestError(f"Unknown attribution model '{model}'")
+
+    conversion = db.query(ConversionModel).filter(
+        ConversionModel.id == conversion_id
+    ).first()
+
+    if not conversion:
+        raise NotFoundError("Conversion not found")
+
+    return calculate_credit_commissions(db, conversion, model)
+
+
 @router.post("/{conversion_id}/validate", response_model=Conversion)
 def validate_conversion(
     conversion_id: UUID,
     current_user: User = Depends(get_admin_user),
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_returning_db),
 ):
     """
     Validate a pending conversion and create commission (admin only)
@@ -194,7 +301,7 @@ def validate_conversion(
 def reject_conversion(
     conversion_id: UUID,
     current_user: User = Depends(get_admin_user),
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_returning_db),
 ):
     """
     Reject a conversion (admin only)
@@ -0,0 +1,58 @@
+"""
+Live Event Stream Endpoints
+"""
+from uuid import UUID
+from fastapi import APIRouter, Depends, Request
+from fastapi.responses import StreamingResponse
+from sqlalchemy.orm import Session
+
+from app.database import get_db
+from app.api.deps import get_current_active_user
+from app.core.exceptions import AuthorizationError, ServiceUnavailableError
+from app.models.user import User
+from app.models.affiliate import AffiliateProfile
+from app.services.live_events import get_live_event_bus, stream_live_events
+
+router = APIRouter()
+
+
+def get_streaming_affiliate_id(
+    current_user: User = Depends(get_current_active_user),
+    db: Session = Depends(get_db),
+) -> UUID:
+    """
+    The current user's affiliate ID, with the request's connection released
+    A stream stays open for hours and must not hold a pooled connection.
+    """
+    affiliate_id = db.query(AffiliateProfile.id).filter(
+        AffiliateProfile.user_id == current_user.id
+    ).scalar()
+    db.close()
+
+    if affiliate_id is None:
+        raise AuthorizationError("Live events require an affiliate profile")
+    return affiliate_id
+
+
+@router.get("/stream")
+async def stream_events(
+    request: Request,
+    affiliate_id: UUID = Depends(get_streaming_affiliate_id),
+):
+    """
+    Server-Sent Events stream of the affiliate's clicks, conversions and commissions
+
+    Messages are ``clicks``, ``conversion`` and ``commission`` events, sent at
+    most once per second; a busier second arrives as one ``summary`` message
+    with counts and amounts per currency. Replaces polling link stats and the
+    conversion list.
+    """
+    bus = get_live_event_bus()
+    if bus.full:
+        raise ServiceUnavailableError("Too many live event streams on this server")
+
+    return StreamingResponse(
+        stream_live_events(bus, affiliate_id, request.is_disconnected),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
@@ -0,0 +1,122 @@
+"""
+Leaderboard Endpoints
+
+Scores are read from time-bucketed sorted sets (see
+app.services.leaderboard_service); the database is only used to attach
+affiliate codes and names to the ranked IDs.
+"""
+from typing import Optional
+from uuid import UUID
+from fastapi import APIRouter, Depends, Query
+from sqlalchemy.orm import Session
+
+from app.database import get_read_db
+from app.api.deps import get_current_active_user, get_admin_user
+from app.core.config import settings
+from app.core.exceptions import AuthorizationError
+from app.models.user import User
+from app.models.affiliate import AffiliateProfile
+from app.schemas.leaderboard import AffiliateRank, Leaderboard, LeaderboardEntry
+from app.services.leaderboard_service import (
+    LeaderboardMetric,
+    LeaderboardPeriod,
+    affiliate_rank,
+    top_affiliates,
+)
+
+router = APIRouter()
+
+
+def _rank_response(affiliate_id, metric, period, window, program_id) -> AffiliateRank:
+    rank, score = affiliate_rank(affiliate_id, metric, period, program_id=program_id, window=window)
+    return AffiliateRank(
+        metric=metric.value,
+        period=period.value,
+        window=window,
+        program_id=program_id,
+        affiliate_id=affiliate_id,
+        rank=rank,
+        score=score,
+    )
+
+
+@router.get("/", response_model=Leaderboard)
+def get_leaderboard(
+    metric: LeaderboardMetric = LeaderboardMetric.REVENUE,
+    period: LeaderboardPeriod = LeaderboardPeriod.WEEK,
+    window: int = Query(1, ge=1, le=settings.LEADERBOARD_MAX_WINDOW, description="Trailing periods to merge"),
+    program_id: Optional[UUID] = None,
+    limit: int = Query(10, ge=1, le=100),
+    current_user: User = Depends(get_admin_user),
+    db: Session = Depends(get_read_db),
+):
+    """
+    Top affiliates by revenue, conversions or commission (admin only)
+
+    ``period`` is the current day, ISO week or month; ``window=N`` merges it
+    with the N-1 periods before it. Without ``program_id`` all programs count.
+    """
+    buckets, ranked = top_affiliates(metric, period, program_id=program_id, window=window, limit=limit)
+
+    profiles = {}
+    if ranked:
+        profiles = {
+            str(profile_id): (code, company_name)
+            for profile_id, code, company_name in db.query(
+                AffiliateProfile.id, AffiliateProfile.affiliate_code, AffiliateProfile.company_name
+            ).filter(AffiliateProfile.id.in_([UUID(affiliate_id) for _, affiliate_id, _ in ranked]))
+        }
+
+    return Leaderboard(
+        metric=metric.value,
+        period=period.value,
+        window=window,
+        buckets=buckets,
+        program_id=program_id,
+        entries=[
+            LeaderboardEntry(
+                rank=rank,
+                affiliate_id=affiliate_id,
+                affiliate_code=profiles.get(affiliate_id, (None, None))[0],
+                company_name=profiles.get(affiliate_id, (None, None))[1],
+                score=score,
+            )
+            for rank, affiliate_id, score in ranked
+        ],
+    )
+
+
+@router.get("/me", response_model=AffiliateRank)
+def get_my_rank(
+    metric: LeaderboardMetric = LeaderboardMetric.REVENUE,
+    period: LeaderboardPeriod = LeaderboardPeriod.WEEK,
+    window: int = Query(1, ge=1, le=settings.LEADERBOARD_MAX_WINDOW),
+    program_id: Optional[UUID] = None,
+    current_user: User = Depends(get_current_active_user),
+    db: Session = Depends(get_read_db),
+):
+    """
+    The current affiliate's rank and score
+    """
+    affiliate_id = db.query(AffiliateProfile.id).filter(
+        AffiliateProfile.user_id == current_user.id
+    ).scalar()
+    if affiliate_id is None:
+        raise AuthorizationError("Leaderboard ranks require an affiliate profile")
+
+    return _rank_response(affiliate_id, metric, period, window, program_id)
+
+
+@router.get("/affiliates/{affiliate_id}", response_model=AffiliateRank)
+def get_affiliate_rank(
+    affiliate_id: UUID,
+    metric: LeaderboardMetric = LeaderboardMetric.REVENUE,
+    period: LeaderboardPeriod = LeaderboardPeriod.WEEK,
+    window: int = Query(1, ge=1, le=settings.LEADERBOARD_MAX_WINDOW),
+    program_id: Optional[UUID] = None,
+    current_user: User = Depends(get_admin_user),
+):
+    """
+    An affiliate's rank and score (admin only)
+    """
+    return _rank_response(affiliate_id, metric, period, window, program_id)
@@ -0,0 +1,87 @@
+"""
+Admin Overview Endpoints
+
+KPIs come from the ``program_overview_stats`` materialized view, or from live
+queries while it is stale (see app.services.overview_service).
+"""
+from typing import Optional
+from uuid import UUID
+from arq import create_pool
+from arq.connections import RedisSettings
+from fastapi import APIRouter, Depends
+from redis import RedisError
+from sqlalchemy.orm import Session
+
+from app.database import get_read_db
+from app.api.deps import get_admin_user
+from app.core.config import settings
+from app.core.exceptions import NotFoundError, ServiceUnavailableError
+from app.models.user import User
+from app.schemas.overview import AdminOverview, OverviewTotals, ProgramOverview
+from app.services.overview_service import get_program_overview
+
+router = APIRouter()
+
+
+def _overview(db: Session, program_id: Optional[UUID] = None) -> AdminOverview:
+    rows, source, as_of, refreshed_at = get_program_overview(db, program_id)
+    totals = OverviewTotals()
+    for row in rows:
+        for field in OverviewTotals.model_fields:
+            setattr(totals, field, getattr(totals, field) + row[field])
+
+    return AdminOverview(
+        source=source,
+        as_of=as_of,
+        view_refreshed_at=refreshed_at,
+        totals=totals,
+        programs=[ProgramOverview(**row) for row in rows],
+    )
+
+
+@router.get("/", response_model=AdminOverview)
+def get_overview(
+    current_user: User = Depends(get_admin_user),
+    db: Session = Depends(get_read_db),
+):
+    """
+    Clicks, conversions, revenue and commission balances per program and in total (admin only)
+    ``source`` and ``as_of`` tell whether the figures come from the
+    materialized view, and how old they are.
+    """
+    return _overview(db)
+
+
+@router.get("/programs/{program_id}", response_model=AdminOverview)
+def get_program_overview_endpoint(
+    program_id: UUID,
+    current_user: User = Depends(get_admin_user),
+    db: Session = Depends(get_read_db),
+):
+    """
+    KPIs of one program (admin only)
+    """
+    overview = _overview(db, program_id)
+    if not overview.programs:
+        raise NotFoundError("Program not found")
+    return overview
+
+
+@router.post("/refresh", status_code=202)
+async def refresh_overview(
+    current_user: User = Depends(get_admin_user),
+):
+    """
+    Queue a concurrent refresh of the overview views on the worker (admin only)
+    A refresh already queued is not queued again.
+    """
+    try:
+        pool = await create_pool(RedisSettings.from_dsn(settings.REDIS_URL))
+    except (RedisError, OSError):
+        raise ServiceUnavailableError("The job queue is unavailable")
+    try:
+        job = await pool.enqueue_job("refresh_overview_views_job", _job_id="refresh_overview_views")
+    finally:
+        await pool.aclose()
+
+    return {"queued": job is not None}
@@ -6,18 +6,21 @@ from uuid import UUID
 from datetime import datetime, date
 from fastapi import APIRouter, Depends, Query
 from sqlalchemy.orm import Session
+from sqlalchemy import select
 from decimal import Decimal
 
-from app.database import get_db
+from app.database import get_db, get_read_db
 from app.api.deps import get_current_active_user, get_admin_user
 from app.core.exceptions import NotFoundError, BadRequestError, AuthorizationError
+from app.core.serialization import rows_response, schema_columns
 from app.models.user import User, UserRole
-from app.models.conversion import Payout as PayoutModel, PayoutStatus, Commission, CommissionStatus
+from app.models.conversion import Payout as PayoutModel, PayoutStatus
 from app.models.affiliate import AffiliateProfile
-from app.schemas.conversion import Payout, PayoutCreate, PayoutUpdate
+from app.schemas.conversion import Payout, PayoutCreate, PayoutUpdate, PayoutWithDetails
 from app.services.payout_service import (
+    cancel_payout as cancel_payout_service,
+    complete_payout as complete_payout_service,
     generate_payout as generate_payout_service,
-    process_payout as process_payout_service,
 )
 
 router = APIRouter()
@@ -42,14 +45,14 @@ def generate_payout(
         raise NotFoundError("Affiliate not found")
 
     # Generate payout
-    payout = generate_payout_service(
-        db=db,
-        affiliate=affiliate,
-        start_date=payout_data.start_date,
-        end_date=payout_data.end_date,
-    )
-
-    if not payout:
+    try:
+        payout = generate_payout_service(
+            db=db,
+            affiliate=affiliate,
+            start_date=payout_data.start_date,
+            end_date=payout_data.end_date,
+        )
+    except ValueError:
         raise BadRequestError("No approved commissions found for the specified period")
 
     return payout
@@ -61,14 +64,14 @@ def list_payouts(
     limit: int = Query(100, ge=1, le=100),
     status: Optional[PayoutStatus] = Query(None),
     current_user: User = Depends(get_current_active_user),
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_read_db),
 ):
     """
     List payouts
     - Admins see all payouts
     - Affiliates see only their own payouts
     """
-    query = db.query(PayoutModel)
+    query = select(*schema_columns(PayoutModel, Payout))
 
     if current_user.role != UserRole.ADMIN:
         # Get affiliate ID for current user
@@ -79,19 +82,59 @@ def list_payouts(
         if not affiliate:
             return []
 
-        query = query.filter(PayoutModel.affiliate_id == affiliate.id)
+        query = query.where(PayoutModel.affiliate_id == affiliate.id)
 
     if status:
-        query = query.filter(PayoutModel.status == status)
+        query = query.where(PayoutModel.status == status)
 
-    payouts = query.order_by(PayoutModel.created_at.desc()).offset(skip).limit(limit).all()
-    return payouts
+    rows = db.execute(query.order_by(PayoutModel.created_at.desc()).offset(skip).limit(limit))
+    return rows_response(rows, Payout)
+
+
+@router.get("/details", response_model=List[PayoutWithDetails])
+def list_payout_details(
+    skip: int = Query(0, ge=0),
+    limit: int = Query(100, ge=1, le=100),
+    status: Optional[PayoutStatus] = Query(None),
+    current_user: User = Depends(get_current_active_user),
+    db: Session = Depends(get_read_db),
+):
+    """
+    List payouts with their affiliate details
+    One joined query per page instead of fetching affiliates separately
+    - Admins see all payouts
+    - Affiliates see only their own payouts
+    """
+    query = select(
+        *schema_columns(PayoutModel, Payout),
+        AffiliateProfile.affiliate_code,
+        AffiliateProfile.company_name.label("affiliate_company"),
+    ).join(
+        AffiliateProfile, AffiliateProfile.id == PayoutModel.affiliate_id
+    )
+
+    if current_user.role != UserRole.ADMIN:
+        # Get affiliate ID for current user
+        affiliate = db.query(AffiliateProfile).filter(
+            AffiliateProfile.user_id == current_user.id
+        ).first()
+
+        if not affiliate:
+            return []
+
+        query = query.where(PayoutModel.affiliate_id == affiliate.id)
+
+    if status:
+        query = query.where(PayoutModel.status == status)
+
+    rows = db.execute(query.order_by(PayoutModel.created_at.desc()).offset(skip).limit(limit))
+    return rows_response(rows, PayoutWithDetails)
 
 
 @router.get("/stats")
 def get_payout_stats(
     current_user: User = Depends(get_current_active_user),
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_read_db),
 ):
     """
     Get payout statistics
@@ -179,7 +222,8 @@ def process_payout(
 ):
     """
     Mark a payout as paid (admin only)
-    Updates all associated commissions to 'paid' status
+    Records the payment reference, completes the payout and marks all of its
+    commissions PAID
     """
     payout = db.query(PayoutModel).filter(
         PayoutModel.id == payout_id
@@ -188,18 +232,23 @@ def process_payout(
     if not payout:
         raise NotFoundError("Payout not found")
 
-    if payout.status == PayoutStatus.PAID:
+    if payout.status == PayoutStatus.COMPLETED:
         raise BadRequestError("Payout is already paid")
 
-    if payout.status == PayoutStatus.CANCELLED:
-        raise BadRequestError("Payout is cancelled")
-
-    # Process payout
-    payout = process_payout_service(
-        db=db,
-        payout=payout,
-        payment_reference=payment_reference,
-    )
+    if payout.status == PayoutStatus.FAILED:
+        raise BadRequestError("Payout is cancelled or failed")
+
+    payment_method = payout.affiliate.payment_method
+    try:
+        payout = complete_payout_service(
+            db=db,
+            payout=payout,
+            admin_user_id=current_user.id,
+            payment_method=payment_method.value if payment_method else None,
+            payment_reference=payment_reference,
+        )
+    except ValueError as exc:
+        raise BadRequestError(str(exc))
 
     return payout
 
@@ -211,8 +260,8 @@ def cancel_payout(
     db: Session = Depends(get_db),
 ):
     """
-    Cancel a pending payout (admin only)
-    Returns associated commissions to 'approved' status
+    Cancel an unpaid payout (admin only)
+    The payout ends FAILED and its commissions become available to the next payout
     """
     payout = db.query(PayoutModel).filter(
         PayoutModel.id == payout_id
@@ -221,25 +270,15 @@ def cancel_payout(
     if not payout:
         raise NotFoundError("Payout not found")
 
-    if payout.status == PayoutStatus.PAID:
+    if payout.status == PayoutStatus.COMPLETED:
         raise BadRequestError("Cannot cancel a paid payout")
 
-    if payout.status == PayoutStatus.CANCELLED:
-        raise BadRequestError("Payout is already cancelled")
-
-    # Update payout status
-    payout.status = PayoutStatus.CANCELLED
-
-    # Return commissions to approved status
-    commissions = db.query(Commission).filter(
-        Commission.payout_id == payout.id
-    ).all()
-
-    for commission in commissions:
-        commission.status = CommissionStatus.APPROVED
-        commission.payout_id = None
+    if payout.status == PayoutStatus.FAILED:
+        raise BadRequestError("Payout is already cancelled or failed")
 
-    db.commit()
-    db.refresh(payout)
+    try:
+        payout = cancel_payout_service(db, payout, notes=f"Cancelled by {current_user.email}")
+    except ValueError as exc:
+        raise BadRequestError(str(exc))
 
     return payout
@@ -7,7 +7,8 @@ from fastapi import APIRouter, Depends, Query
 from sqlalchemy.orm import Session
 from slugify import slugify
 
-from app.database import get_db
+from app.core.config import settings
+from app.database import get_db, get_read_db
 from app.api.deps import get_current_active_user, get_admin_user, get_affiliate_user
 from app.core.exceptions import NotFoundError, ConflictError, BadRequestError, AuthorizationError
 from app.models.user import User, UserRole
@@ -17,12 +18,15 @@ from app.schemas.program import (
     AffiliateProgram as AffiliateProgramSchema,
     AffiliateProgramCreate,
     AffiliateProgramUpdate,
+    PostbackSecret,
 )
 from app.schemas.enrollment import (
     ProgramEnrollment as ProgramEnrollmentSchema,
     ProgramEnrollmentCreate,
     ProgramEnrollmentUpdate,
 )
+from app.services.dashboard_service import invalidate_dashboards
+from app.services.postback_service import generate_postback_secret, invalidate_postback_config
 
 router = APIRouter()
 
@@ -64,7 +68,7 @@ def list_programs(
     limit: int = Query(100, ge=1, le=100),
     status: Optional[ProgramStatus] = Query(None),
     current_user: User = Depends(get_current_active_user),
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_read_db),
 ):
     """
     List all programs
@@ -132,12 +136,17 @@ def update_program(
 
     # Update fields
     update_data = program_update.model_dump(exclude_unset=True)
+    if program_update.postback_template is not None:
+        update_data["postback_template"] = program_update.postback_template.model_dump(exclude_none=True)
     for field, value in update_data.items():
         setattr(program, field, value)
 
     db.commit()
     db.refresh(program)
 
+    if "postback_template" in update_data:
+        invalidate_postback_config(program.id)
+
     return program
 
 
@@ -164,6 +173,58 @@ def delete_program(
     return {"message": "Program archived successfully"}
 
 
+@router.post("/{program_id}/postback-secret", response_model=PostbackSecret)
+def rotate_postback_secret(
+    program_id: UUID,
+    current_user: User = Depends(get_admin_user),
+    db: Session = Depends(get_db),
+):
+    """
+    Generate a new postback secret for a program, enabling postbacks (admin only)
+    The secret is only returned here; the previous one stops working within
+    POSTBACK_CONFIG_TTL seconds.
+    """
+    program = db.query(AffiliateProgram).filter(
+        AffiliateProgram.id == program_id
+    ).first()
+
+    if not program:
+        raise NotFoundError("Program not found")
+
+    program.postback_secret = generate_postback_secret()
+    db.commit()
+    invalidate_postback_config(program.id)
+
+    return PostbackSecret(
+        program_id=program.id,
+        postback_secret=program.postback_secret,
+        postback_url=f"{settings.API_V1_STR}/conversions/postback/{program.id}",
+    )
+
+
+@router.delete("/{program_id}/postback-secret")
+def disable_postbacks(
+    program_id: UUID,
+    current_user: User = Depends(get_admin_user),
+    db: Session = Depends(get_db),
+):
+    """
+    Remove a program's postback secret, disabling postbacks (admin only)
+    """
+    program = db.query(AffiliateProgram).filter(
+        AffiliateProgram.id == program_id
+    ).first()
+
+    if not program:
+        raise NotFoundError("Program not found")
+
+    program.postback_secret = None
+    db.commit()
+    invalidate_postback_config(program.id)
+
+    return {"message": "Postbacks disabled successfully"}
+
+
 # ===== Program Enrollment =====
 
 @router.post("/{program_id}/enroll", response_model=ProgramEnrollmentSchema)
@@ -208,6 +269,7 @@ def enroll_in_program(
             existing.terminated_at = None
             db.commit()
             db.refresh(existing)
+            invalidate_dashboards([affiliate.id])
             return existing
         else:
             raise ConflictError("You are already enrolled in this program")
@@ -222,6 +284,7 @@ def enroll_in_program(
     db.add(enrollment)
     db.commit()
     db.refresh(enrollment)
+    invalidate_dashboards([affiliate.id])
 
     return enrollment
 
@@ -232,7 +295,7 @@ def list_program_enrollments(
     skip: int = Query(0, ge=0),
     limit: int = Query(100, ge=1, le=100),
     current_user: User = Depends(get_admin_user),
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_read_db),
 ):
     """
     List all enrollments for a program (admin only)
@@ -247,7 +310,7 @@ def list_program_enrollments(
 @router.get("/enrollments/me", response_model=List[ProgramEnrollmentSchema])
 def get_my_enrollments(
     current_user: User = Depends(get_affiliate_user),
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_read_db),
 ):
     """
     Get current affiliate's enrollments
@@ -297,5 +360,6 @@ def update_enrollment(
 
     db.commit()
     db.refresh(enrollment)
+    invalidate_dashboards([enrollment.affiliate_id])
 
     return enrollment
@@ -2,16 +2,18 @@
 Referral Link Management Endpoints
 """
 from typing import List, Optional
-from uuid import UUID
+from uuid import UUID, uuid4
 from fastapi import APIRouter, Depends, Query, Request
-from fastapi.responses import RedirectResponse
+from fastapi.responses import RedirectResponse, StreamingResponse
 from sqlalchemy.orm import Session
 from sqlalchemy import func
 from datetime import datetime
 
-from app.database import get_db
+from app.database import get_db, get_read_db, get_returning_db
 from app.api.deps import get_current_active_user, get_affiliate_user
 from app.core.config import settings
+from app.core.metrics import CLICKS_INGESTED
+from app.core.serialization import dumps
 from app.core.exceptions import NotFoundError, BadRequestError, AuthorizationError
 from app.models.user import User, UserRole
 from app.models.affiliate import AffiliateProfile, ApprovalStatus
@@ -20,32 +22,40 @@ from app.models.referral import ReferralLink, ReferralClick, ReferralLinkStatus
 from app.schemas.referral import (
     ReferralLink as ReferralLinkSchema,
     ReferralLinkCreate,
+    ReferralLinkBulkCreate,
+    ReferralLinkBulkResult,
     ReferralLinkUpdate,
     ReferralLinkWithUrl,
     ReferralLinkStats,
+    ReferralClickCountryStat,
 )
 from app.services.referral_service import (
     create_referral_link,
+    create_referral_links,
     build_tracking_url,
+    build_redirect_url,
     increment_click_count,
+    is_link_expired,
+    to_utc_naive,
+    get_click_country_breakdown,
 )
+from app.services.dashboard_service import invalidate_dashboards
+from app.services.geo_service import resolve_geo_location
+from app.services.link_snapshot import find_link_target, notify_link_changed
+from app.services.live_events import clicks_event, publish_live_events
 
 router = APIRouter()
 
+# Response lines sent per chunk when streaming bulk results
+BULK_STREAM_CHUNK = 500
 
-@router.post("/links", response_model=ReferralLinkWithUrl)
-def generate_referral_link(
-    link_data: ReferralLinkCreate,
-    request: Request,
-    current_user: User = Depends(get_affiliate_user),
-    db: Session = Depends(get_db),
-):
+
+def get_active_enrollment(db: Session, user: User, program_id: UUID) -> ProgramEnrollment:
     """
-    Generate a new referral link for a program
+    Get the approved affiliate's active enrollment in a program, for link creation
     """
-    # Get affiliate profile
     affiliate = db.query(AffiliateProfile).filter(
-        AffiliateProfile.user_id == current_user.id
+        AffiliateProfile.user_id == user.id
     ).first()
 
     if not affiliate:
@@ -57,13 +67,28 @@ def generate_referral_link(
     # Check if enrolled in the program
     enrollment = db.query(ProgramEnrollment).filter(
         ProgramEnrollment.affiliate_id == affiliate.id,
-        ProgramEnrollment.program_id == link_data.program_id,
+        ProgramEnrollment.program_id == program_id,
         ProgramEnrollment.status == EnrollmentStatus.ACTIVE,
     ).first()
 
     if not enrollment:
         raise BadRequestError("You must be enrolled in this program to create referral links")
 
+    return enrollment
+
+
+@router.post("/links", response_model=ReferralLinkWithUrl)
+def generate_referral_link(
+    link_data: ReferralLinkCreate,
+    request: Request,
+    current_user: User = Depends(get_affiliate_user),
+    db: Session = Depends(get_db),
+):
+    """
+    Generate a new referral link for a program
+    """
+    enrollment = get_active_enrollment(db, current_user, link_data.program_id)
+
     # Create referral link
     link = create_referral_link(
         db=db,
@@ -73,6 +98,7 @@ def generate_referral_link(
         link_metadata=link_data.link_metadata,
         expires_at=link_data.expires_at,
     )
+    invalidate_dashboards([link.affiliate_id])
 
     # Build full tracking URL
     # Use request host or configured base URL
@@ -88,13 +114,68 @@ def generate_referral_link(
     return ReferralLinkWithUrl(**link_dict)
 
 
+@router.post(
+    "/links/bulk",
+    response_model=List[ReferralLinkBulkResult],
+    responses={200: {"content": {"application/x-ndjson": {}}}},
+)
+def generate_referral_links_bulk(
+    bulk_data: ReferralLinkBulkCreate,
+    request: Request,
+    current_user: User = Depends(get_affiliate_user),
+    db: Session = Depends(get_returning_db),
+):
+    """
+    Generate many referral links for a program in one request
+    Takes explicit links and/or a template (every target URL with every UTM
+    set). Codes are allocated in bulk and the links inserted with multi-row
+    INSERTs; the response streams one JSON object per line (NDJSON), in no
+    particular order; ``link_metadata`` can carry a placement or creative ID to
+    match results to inputs.
+    """
+    # Checked before expanding: a small template can describe a huge cross product
+    link_count = bulk_data.link_count()
+    if not link_count:
+        raise BadRequestError("Provide links or a template")
+    if link_count > settings.REFERRAL_BULK_MAX_LINKS:
+        raise BadRequestError(f"At most {settings.REFERRAL_BULK_MAX_LINKS} links per request")
+    items = bulk_data.expand()
+
+    enrollment = get_active_enrollment(db, current_user, bulk_data.program_id)
+
+    links = create_referral_links(db, enrollment, [
+        {**item.model_dump(), "expires_at": bulk_data.expires_at} for item in items
+    ])
+    db.commit()
+    invalidate_dashboards([enrollment.affiliate_id])
+
+    base_url = f"{request.url.scheme}://{request.url.netloc}"
+    results = [
+        {
+            "id": link.id,
+            "link_code": link.link_code,
+            "target_url": link.target_url,
+            "utm_params": link.utm_params,
+            "link_metadata": link.link_metadata,
+            "full_url": build_tracking_url(base_url, link.link_code),
+        }
+        for link in links
+    ]
+
+    def stream_results():
+        for start in range(0, len(results), BULK_STREAM_CHUNK):
+            yield b"".join(dumps(row) + b"\n" for row in results[start:start + BULK_STREAM_CHUNK])
+
+    return StreamingResponse(stream_results(), media_type="application/x-ndjson")
+
+
 @router.get("/links", response_model=List[ReferralLinkSchema])
 def list_my_referral_links(
     skip: int = Query(0, ge=0),
     limit: int = Query(100, ge=1, le=100),
     status: Optional[ReferralLinkStatus] = Query(None),
     current_user: User = Depends(get_affiliate_user),
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_read_db),
 ):
     """
     List current affiliate's referral links
@@ -134,14 +215,13 @@ def get_referral_link(
         raise NotFoundError("Referral link not found")
 
     # Check authorization
-    if current_user.role != UserRole.ADMIN and link.affiliate_id != str(
-        db.query(AffiliateProfile).filter(
-            AffiliateProfile.user_id == current_user.id
-        ).first().id if db.query(AffiliateProfile).filter(
+    if current_user.role != UserRole.ADMIN:
+        affiliate_id = db.query(AffiliateProfile.id).filter(
             AffiliateProfile.user_id == current_user.id
-        ).first() else None
-    ):
-        raise AuthorizationError("You can only view your own referral links")
+        ).scalar()
+
+        if affiliate_id is None or link.affiliate_id != affiliate_id:
+            raise AuthorizationError("You can only view your own referral links")
 
     # Build full tracking URL
     base_url = f"{request.url.scheme}://{request.url.netloc}"
@@ -180,11 +260,15 @@ def update_referral_link(
 
     # Update fields
     update_data = link_update.model_dump(exclude_unset=True)
+    if "expires_at" in update_data:
+        update_data["expires_at"] = to_utc_naive(update_data["expires_at"])
     for field, value in update_data.items():
         setattr(link, field, value)
 
     db.commit()
     db.refresh(link)
+    notify_link_changed(link.link_code)
+    invalidate_dashboards([link.affiliate_id])
 
     return link
 
@@ -214,6 +298,8 @@ def delete_referral_link(
     # Soft delete by deactivating
     link.status = ReferralLinkStatus.INACTIVE
     db.commit()
+    notify_link_changed(link.link_code)
+    invalidate_dashboards([link.affiliate_id])
 
     return {"message": "Referral link deactivated successfully"}
 
@@ -222,7 +308,7 @@ def delete_referral_link(
 def get_referral_link_stats(
     link_id: UUID,
     current_user: User = Depends(get_affiliate_user),
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_read_db),
 ):
     """
     Get statistics for a referral link
@@ -263,6 +349,32 @@ def get_referral_link_stats(
     )
 
 
+@router.get("/links/{link_id}/countries", response_model=List[ReferralClickCountryStat])
+def get_referral_link_countries(
+    link_id: UUID,
+    current_user: User = Depends(get_affiliate_user),
+    db: Session = Depends(get_read_db),
+):
+    """
+    Get click counts per country for a referral link
+    """
+    link = db.query(ReferralLink).filter(ReferralLink.id == link_id).first()
+
+    if not link:
+        raise NotFoundError("Referral link not found")
+
+    # Check authorization
+    if current_user.role != UserRole.ADMIN:
+        affiliate = db.query(AffiliateProfile).filter(
+            AffiliateProfile.user_id == current_user.id
+        ).first()
+
+        if not affiliate or link.affiliate_id != affiliate.id:
+            raise AuthorizationError("You can only view stats for your own referral links")
+
+    return get_click_country_breakdown(db, link.id)
+
+
 # ===== Public Tracking Endpoint =====
 
 @router.get("/verify/{link_code}")
@@ -274,16 +386,13 @@ async def verify_referral_link(
     Public endpoint to verify if a referral link exists and is active
     No authentication required - used by SDK
     """
-    link = db.query(ReferralLink).filter(
-        ReferralLink.link_code == link_code,
-        ReferralLink.status == ReferralLinkStatus.ACTIVE,
-    ).first()
+    link = find_link_target(db, link_code)
 
     if not link:
         return {"valid": False, "message": "Referral link not found or inactive"}
 
     # Check if link is expired
-    if link.expires_at and link.expires_at < datetime.utcnow():
+    if is_link_expired(link.expires_at):
         return {"valid": False, "message": "Referral link has expired"}
 
     return {
@@ -294,68 +403,55 @@ async def verify_referral_link(
 
 
 @router.get("/track/{link_code}")
-async def track_referral_click(
+def track_referral_click(
     link_code: str,
     request: Request,
+    sid: Optional[UUID] = Query(None, description="Existing visitor session ID"),
     db: Session = Depends(get_db),
 ):
     """
     Public endpoint to track clicks and redirect to target URL
     No authentication required
+
+    The click's visitor session (``sid`` if given, otherwise a new one) is
+    passed on as ``aff_sid`` so conversions can be attributed to the click
     """
     # Find the referral link
-    link = db.query(ReferralLink).filter(
-        ReferralLink.link_code == link_code,
-        ReferralLink.status == ReferralLinkStatus.ACTIVE,
-    ).first()
+    link = find_link_target(db, link_code)
 
     if not link:
         # Return 404 or redirect to default page
         raise NotFoundError("Referral link not found or expired")
 
     # Check if link is expired
-    if link.expires_at and link.expires_at < datetime.utcnow():
+    if is_link_expired(link.expires_at):
         raise NotFoundError("Referral link has expired")
 
     # Create click record
+    ip_address = request.client.host if request.client else None
     click = ReferralClick(
         referral_link_id=link.id,
-        ip_address=request.client.host if request.client else None,
+        visitor_session_id=sid or uuid4(),
+        ip_address=ip_address,
         user_agent=request.headers.get("user-agent"),
         referrer_url=request.headers.get("referer"),
+        geo_location=resolve_geo_location(ip_address),
     )
 
     db.add(click)
 
     # Increment click count
     increment_click_count(db, link)
-
-    # Build target URL with UTM params
-    target_url = link.target_url
-
-    if link.utm_params:
-        from urllib.parse import urlparse, parse_qs, urlencode, urlunparse
-
-        parsed = urlparse(target_url)
-        query_params = parse_qs(parsed.query)
-
-        # Add UTM parameters
-        for key, value in link.utm_params.items():
-            query_params[key] = [value]
-
-        # Add tracking parameters
-        query_params['ref'] = [link_code]
-
-        # Rebuild URL
-        new_query = urlencode(query_params, doseq=True)
-        target_url = urlunparse((
-            parsed.scheme,
-            parsed.netloc,
-            parsed.path,
-            parsed.params,
-            new_query,
-            parsed.fragment,
-        ))
+    CLICKS_INGESTED.inc()
+    publish_live_events([clicks_event(link.affiliate_id, link.id)])
+
+    # Build target URL with UTM and tracking params
+    target_url = build_redirect_url(
+        link.target_url,
+        link_code,
+        utm_params=link.utm_params,
+        visitor_session_id=click.visitor_session_id,
+    )
 
     # Redirect to target URL
     return RedirectResponse(url=target_url, status_code=302)
@@ -6,7 +6,7 @@ from uuid import UUID
 from fastapi import APIRouter, Depends, Query
 from sqlalchemy.orm import Session
 
-from app.database import get_db
+from app.database import get_db, get_read_db
 from app.api.deps import get_current_active_user, get_admin_user
 from app.core.security import get_password_hash
 from app.core.exceptions import NotFoundError, ConflictError, AuthorizationError
@@ -68,7 +68,7 @@ def list_users(
     limit: int = Query(100, ge=1, le=100),
     role: UserRole = Query(None),
     current_user: User = Depends(get_admin_user),
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_read_db),
 ):
     """
     List all users (admin only)
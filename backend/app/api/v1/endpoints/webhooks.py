@@ -0,0 +1,203 @@
+"""
+Webhook Endpoint Management
+
+Affiliates register endpoints for their own events; admins register them per
+program. Events are delivered by the worker (see app.services.webhook_dispatcher).
+"""
+from typing import List, Optional
+from uuid import UUID
+from fastapi import APIRouter, Depends, Query
+from sqlalchemy.orm import Session
+
+from app.database import get_db, get_read_db
+from app.api.deps import get_current_active_user
+from app.core.exceptions import NotFoundError, BadRequestError, AuthorizationError
+from app.models.user import User, UserRole
+from app.models.affiliate import AffiliateProfile
+from app.models.program import AffiliateProgram
+from app.models.webhook import (
+    WebhookDelivery as WebhookDeliveryModel,
+    WebhookDeliveryStatus,
+    WebhookEndpoint as WebhookEndpointModel,
+)
+from app.schemas.webhook import (
+    WebhookDelivery,
+    WebhookEndpoint,
+    WebhookEndpointCreate,
+    WebhookEndpointUpdate,
+    WebhookEndpointWithSecret,
+)
+from app.services.webhook_service import check_webhook_url, generate_webhook_secret, redeliver
+
+router = APIRouter()
+
+
+def get_user_affiliate(db: Session, user: User) -> AffiliateProfile:
+    """The affiliate profile of a non-admin user"""
+    affiliate = db.query(AffiliateProfile).filter(AffiliateProfile.user_id == user.id).first()
+    if not affiliate:
+        raise AuthorizationError("Webhooks require an affiliate profile")
+    return affiliate
+
+
+def get_owned_endpoint(db: Session, user: User, endpoint_id: UUID) -> WebhookEndpointModel:
+    """An endpoint the user may manage: admins own program endpoints, affiliates their own"""
+    endpoint = db.query(WebhookEndpointModel).filter(WebhookEndpointModel.id == endpoint_id).first()
+    if not endpoint:
+        raise NotFoundError("Webhook endpoint not found")
+
+    if user.role == UserRole.ADMIN:
+        if endpoint.program_id is None:
+            raise AuthorizationError("You can only manage program webhook endpoints")
+    elif endpoint.affiliate_id != get_user_affiliate(db, user).id:
+        raise AuthorizationError("You can only manage your own webhook endpoints")
+
+    return endpoint
+
+
+@router.post("/endpoints", response_model=WebhookEndpointWithSecret)
+def create_webhook_endpoint(
+    endpoint_data: WebhookEndpointCreate,
+    current_user: User = Depends(get_current_active_user),
+    db: Session = Depends(get_db),
+):
+    """
+    Register a webhook endpoint
+    The signing secret is only returned here.
+    """
+    owner = {}
+    if current_user.role == UserRole.ADMIN:
+        if endpoint_data.program_id is None:
+            raise BadRequestError("program_id is required for program webhook endpoints")
+        if not db.query(AffiliateProgram.id).filter(AffiliateProgram.id == endpoint_data.program_id).first():
+            raise NotFoundError("Program not found")
+        owner["program_id"] = endpoint_data.program_id
+    else:
+        if endpoint_data.program_id is not None:
+            raise AuthorizationError("Only admins can register program webhook endpoints")
+        owner["affiliate_id"] = get_user_affiliate(db, current_user).id
+
+    try:
+        check_webhook_url(str(endpoint_data.url))
+    except ValueError as exc:
+        raise BadRequestError(str(exc))
+
+    endpoint = WebhookEndpointModel(
+        **owner,
+        url=str(endpoint_data.url),
+        event_types=[event_type.value for event_type in endpoint_data.event_types],
+        max_concurrency=endpoint_data.max_concurrency,
+        secret=generate_webhook_secret(),
+        created_by=current_user.id,
+    )
+    db.add(endpoint)
+    db.commit()
+    db.refresh(endpoint)
+
+    return endpoint
+
+
+@router.get("/endpoints", response_model=List[WebhookEndpoint])
+def list_webhook_endpoints(
+    program_id: Optional[UUID] = Query(None),
+    current_user: User = Depends(get_current_active_user),
+    db: Session = Depends(get_read_db),
+):
+    """
+    List the webhook endpoints the user manages
+    """
+    query = db.query(WebhookEndpointModel)
+    if current_user.role == UserRole.ADMIN:
+        query = query.filter(WebhookEndpointModel.program_id.isnot(None))
+        if program_id:
+            query = query.filter(WebhookEndpointModel.program_id == program_id)
+    else:
+        query = query.filter(WebhookEndpointModel.affiliate_id == get_user_affiliate(db, current_user).id)
+
+    return query.order_by(WebhookEndpointModel.created_at.desc()).all()
+
+
+@router.patch("/endpoints/{endpoint_id}", response_model=WebhookEndpoint)
+def update_webhook_endpoint(
+    endpoint_id: UUID,
+    endpoint_update: WebhookEndpointUpdate,
+    current_user: User = Depends(get_current_active_user),
+    db: Session = Depends(get_db),
+):
+    """
+    Update a webhook endpoint
+    Deactivated endpoints keep their pending deliveries until reactivated.
+    """
+    endpoint = get_owned_endpoint(db, current_user, endpoint_id)
+
+    update_data = endpoint_update.model_dump(exclude_unset=True, mode="json")
+    if update_data.get("url"):
+        try:
+            check_webhook_url(update_data["url"])
+        except ValueError as exc:
+            raise BadRequestError(str(exc))
+    for field, value in update_data.items():
+        setattr(endpoint, field, value)
+
+    db.commit()
+    db.refresh(endpoint)
+
+    return endpoint
+
+
+@router.delete("/endpoints/{endpoint_id}")
+def delete_webhook_endpoint(
+    endpoint_id: UUID,
+    current_user: User = Depends(get_current_active_user),
+    db: Session = Depends(get_db),
+):
+    """
+    Delete a webhook endpoint and its deliveries
+    """
+    endpoint = get_owned_endpoint(db, current_user, endpoint_id)
+    db.delete(endpoint)
+    db.commit()
+
+    return {"message": "Webhook endpoint deleted successfully"}
+
+
+@router.get("/endpoints/{endpoint_id}/deliveries", response_model=List[WebhookDelivery])
+def list_webhook_deliveries(
+    endpoint_id: UUID,
+    status: Optional[WebhookDeliveryStatus] = Query(None),
+    skip: int = Query(0, ge=0),
+    limit: int = Query(100, ge=1, le=100),
+    current_user: User = Depends(get_current_active_user),
+    db: Session = Depends(get_read_db),
+):
+    """
+    List an endpoint's deliveries, newest first (status=DEAD for the dead letters)
+    """
+    get_owned_endpoint(db, current_user, endpoint_id)
+
+    query = db.query(WebhookDeliveryModel).filter(WebhookDeliveryModel.endpoint_id == endpoint_id)
+    if status:
+        query = query.filter(WebhookDeliveryModel.status == status)
+
+    return query.order_by(WebhookDeliveryModel.created_at.desc()).offset(skip).limit(limit).all()
+
+
+@router.post("/deliveries/{delivery_id}/redeliver", response_model=WebhookDelivery)
+def redeliver_webhook(
+    delivery_id: UUID,
+    current_user: User = Depends(get_current_active_user),
+    db: Session = Depends(get_db),
+):
+    """
+    Queue a dead-lettered delivery again
+    """
+    delivery = db.query(WebhookDeliveryModel).filter(WebhookDeliveryModel.id == delivery_id).first()
+    if not delivery:
+        raise NotFoundError("Webhook delivery not found")
+
+    get_owned_endpoint(db, current_user, delivery.endpoint_id)
+
+    if delivery.status != WebhookDeliveryStatus.DEAD:
+        raise BadRequestError("Only dead-lettered deliveries can be redelivered")
+
+    return redeliver(db, delivery)
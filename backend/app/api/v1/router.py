@@ -3,7 +3,10 @@ API v1 Router
 """
 from fastapi import APIRouter
 
-from app.api.v1.endpoints import auth, users, affiliates, programs, referrals, conversions, commissions, payouts
+from app.api.v1.endpoints import (
+    auth, users, affiliates, programs, referrals, conversions, commissions, payouts, webhooks, events,
+    leaderboards, overview,
+)
 
 api_router = APIRouter()
 
@@ -16,3 +19,7 @@ api_router.include_router(referrals.router, prefix="/referrals", tags=["Referral
 api_router.include_router(conversions.router, prefix="/conversions", tags=["Conversions"])
 api_router.include_router(commissions.router, prefix="/commissions", tags=["Commissions"])
 api_router.include_router(payouts.router, prefix="/payouts", tags=["Payouts"])
+api_router.include_router(webhooks.router, prefix="/webhooks", tags=["Webhooks"])
+api_router.include_router(events.router, prefix="/events", tags=["Live Events"])
+api_router.include_router(leaderboards.router, prefix="/leaderboards", tags=["Leaderboards"])
+api_router.include_router(overview.router, prefix="/overview", tags=["Overview"])
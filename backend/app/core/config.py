@@ -20,6 +20,7 @@ class Settings(BaseSettings):
     PROJECT_NAME: str = "Affiliate Programs Management"
     VERSION: str = "0.1.0"
     API_V1_STR: str = "/api/v1"
+    DEBUG: bool = Field(default=False, description="Expose debug diagnostics such as per-request SQL stats headers")
 
     # Security
     SECRET_KEY: str = Field(
@@ -68,6 +69,22 @@ class Settings(BaseSettings):
             path=values.get("POSTGRES_DB"),
         ).unicode_string()
 
+    # Connection pool (per worker process: size the total against max_connections)
+    DB_POOL_SIZE: int = Field(default=5, description="Connections kept open per process")
+    DB_MAX_OVERFLOW: int = Field(default=10, description="Extra connections allowed under load, closed when returned")
+    DB_POOL_TIMEOUT: float = Field(default=10.0, description="Seconds to wait for a free connection before failing")
+    DB_POOL_RECYCLE: int = Field(default=1800, description="Replace connections older than this many seconds (-1 disables)")
+    DB_POOL_PRE_PING: bool = Field(
+        default=True,
+        description="Test connections on checkout so ones dropped by the server are replaced, not handed out",
+    )
+    DB_POOL_WARMUP: int = Field(default=2, description="Connections opened at startup (capped at DB_POOL_SIZE)")
+    DB_STATEMENT_TIMEOUT_MS: int = Field(default=30000, description="Postgres statement_timeout (0 disables)")
+    DB_PGBOUNCER: bool = Field(
+        default=False,
+        description="Behind PgBouncer in transaction mode: no app-side pool, per-transaction settings",
+    )
+
     # Redis
     REDIS_HOST: str = Field(default="localhost", description="Redis host")
     REDIS_PORT: int = Field(default=6379, description="Redis port")
@@ -83,6 +100,98 @@ class Settings(BaseSettings):
         values = info.data
         return f"redis://{values.get('REDIS_HOST')}:{values.get('REDIS_PORT')}/{values.get('REDIS_DB')}"
 
+    REDIS_SOCKET_TIMEOUT: float = Field(default=0.25, description="Redis socket timeout (seconds) for request-path calls")
+
+    # Read replica (reporting and list queries)
+    DATABASE_REPLICA_URL: Optional[str] = Field(default=None, description="Streaming replica; unset routes all reads to the primary")
+    REPLICA_MAX_LAG_SECONDS: float = Field(default=5.0, description="Fall back to the primary beyond this replication lag")
+    REPLICA_LAG_CHECK_INTERVAL: float = Field(default=5.0, description="Seconds between replica lag probes per process")
+    REPLICA_CONNECT_TIMEOUT: int = Field(default=2, description="Seconds to wait when connecting to the replica")
+    READ_YOUR_WRITES_SECONDS: int = Field(default=10, description="Route a user's reads to the primary this long after their writes")
+
+    # Click tracking (standalone redirect service and click queue)
+    CLICK_QUEUE_KEY: str = Field(default="clicks:queue", description="Redis list of clicks awaiting ingestion")
+    CLICK_INGEST_BATCH_SIZE: int = Field(default=5000, description="Clicks written per INSERT by the ingestion job")
+    CLICK_INGEST_MAX_ATTEMPTS: int = Field(default=5, description="Failed drains of a batch before it is moved to the dead-letter list")
+    CLICK_DRAIN_LOCK_SECONDS: int = Field(default=60, description="Lease of the click drain lock, renewed after every batch")
+    REDIRECT_CACHE_SIZE: int = Field(default=100000, description="Links cached per redirect process")
+    REDIRECT_CACHE_TTL: float = Field(default=30.0, description="Seconds a cached link is served before re-reading")
+    REDIRECT_NEGATIVE_CACHE_TTL: float = Field(default=5.0, description="Seconds an unknown code stays cached as missing")
+    LINK_SNAPSHOT_PATH: Optional[str] = Field(default=None, description="Memory-mapped active-link snapshot shared by the processes on a host; unset disables it")
+    LINK_SNAPSHOT_CHECK_INTERVAL: float = Field(default=1.0, description="Seconds between checks for a rebuilt link snapshot")
+    LINK_CHANGES_CHANNEL: str = Field(default="links:changed", description="Redis channel announcing edited or deactivated links")
+    LINK_EXPIRY_SWEEP_BATCH_SIZE: int = Field(default=1000, description="Expired links deactivated per UPDATE by the sweeper")
+
+    # Server-to-server postbacks (Redis stream queue)
+    POSTBACK_STREAM_KEY: str = Field(default="postbacks:stream", description="Redis stream of postbacks awaiting ingestion")
+    POSTBACK_CONSUMER_GROUP: str = Field(default="postback-ingest", description="Consumer group draining the postback stream")
+    POSTBACK_INGEST_BATCH_SIZE: int = Field(default=1000, description="Postbacks written per batch by the ingestion job")
+    POSTBACK_CLAIM_IDLE_SECONDS: int = Field(default=300, description="Seconds before postbacks read by a crashed drain are taken over")
+    POSTBACK_CONFIG_TTL: float = Field(default=30.0, description="Seconds a program's postback secret and template are cached per process")
+
+    # Live dashboard events (SSE)
+    LIVE_EVENTS_CHANNEL: str = Field(default="live:events", description="Redis channel fanning live events out to every API worker")
+    LIVE_EVENTS_MAX_CONNECTIONS: int = Field(default=1000, description="Open event streams allowed per API worker")
+    LIVE_EVENTS_FLUSH_INTERVAL: float = Field(default=1.0, description="Seconds between flushes of a stream's buffered events")
+    LIVE_EVENTS_BURST_LIMIT: int = Field(default=20, description="Events sent one by one per flush; more are coalesced into a summary")
+    LIVE_EVENTS_HEARTBEAT_SECONDS: float = Field(default=15.0, description="Seconds of quiet before a keepalive comment is sent")
+
+    # Affiliate dashboard summary cache
+    DASHBOARD_CACHE_PREFIX: str = Field(default="dashboard", description="Prefix of cached affiliate dashboard keys")
+    DASHBOARD_CACHE_TTL: int = Field(default=30, description="Seconds an affiliate's dashboard summary is cached")
+    DASHBOARD_TOP_LINKS: int = Field(default=5, description="Most-clicked links included in the dashboard summary")
+    DASHBOARD_RECENT_COMMISSIONS: int = Field(default=5, description="Latest commissions included in the dashboard summary")
+
+    # Admin overview (materialized views)
+    OVERVIEW_MAX_STALENESS_SECONDS: int = Field(default=900, description="Age past which overview reads fall back to live queries")
+    OVERVIEW_REFRESH_TIMEOUT_MS: int = Field(default=600000, description="Statement timeout for one concurrent view refresh")
+
+    # Leaderboards (time-bucketed Redis sorted sets)
+    LEADERBOARD_BACKEND: str = Field(default="redis", description="redis, or memory for a per-process store")
+    LEADERBOARD_KEY_PREFIX: str = Field(default="lb", description="Prefix of leaderboard sorted-set keys")
+    LEADERBOARD_RETENTION_DAYS: int = Field(default=400, description="Days a leaderboard bucket is kept after its last update")
+    LEADERBOARD_MERGE_TTL: int = Field(default=60, description="Seconds a merged multi-period leaderboard is cached")
+    LEADERBOARD_MAX_WINDOW: int = Field(default=12, description="Most trailing periods one leaderboard read may merge")
+
+    # Link and affiliate codes
+    CODE_POOL_SIZE: int = Field(default=200, description="Code sequence values reserved ahead per process")
+    REFERRAL_BULK_MAX_LINKS: int = Field(default=10000, description="Most links one bulk request may create")
+
+    # Outbound webhooks (outbox dispatcher)
+    WEBHOOK_TIMEOUT: float = Field(default=10.0, description="Seconds to wait for a webhook endpoint to answer")
+    WEBHOOK_MAX_ATTEMPTS: int = Field(default=10, description="Attempts before a delivery is dead-lettered")
+    WEBHOOK_RETRY_BASE_SECONDS: float = Field(default=30.0, description="First retry delay; doubles per attempt")
+    WEBHOOK_RETRY_MAX_SECONDS: float = Field(default=6 * 3600.0, description="Longest delay between retries")
+    WEBHOOK_BATCH_SIZE: int = Field(default=50, description="Events sent to one endpoint per request")
+    WEBHOOK_CLAIM_SIZE: int = Field(default=1000, description="Deliveries claimed per dispatch round")
+    WEBHOOK_MAX_CONNECTIONS: int = Field(default=100, description="Pooled HTTP connections of the dispatcher")
+    WEBHOOK_ALLOW_PRIVATE_TARGETS: bool = Field(
+        default=False,
+        description="Allow endpoints on private, loopback and link-local addresses (local development only)",
+    )
+
+    # Geo IP (offline IP-to-country database built with build_geo_db.py)
+    GEOIP_DATABASE_PATH: Optional[str] = Field(default=None, description="Path to the compiled geo database file")
+    GEOIP_CACHE_SIZE: int = Field(default=65536, description="Per-process LRU size for resolved IPs")
+
+    # Attribution
+    ATTRIBUTION_WINDOW_DAYS: int = Field(default=30, description="Cookie window for last-click attribution")
+    ATTRIBUTION_TIME_DECAY_HALF_LIFE_DAYS: float = Field(default=7.0, description="Half-life of the time-decay model")
+    ATTRIBUTION_PARTITIONS: int = Field(default=4, description="Process pool size for multi-touch attribution jobs")
+
+    # Metrics
+    METRICS_QUEUES: List[str] = Field(
+        default=["arq:queue", "clicks:queue", "postbacks:stream"], description="Redis queues whose size /metrics reports"
+    )
+
+    # Query instrumentation
+    QUERY_DUPLICATE_WARN_THRESHOLD: int = Field(
+        default=5, description="Log a possible N+1 when a request repeats this many statements"
+    )
+
+    # Tiers
+    TIER_ALLOW_DEMOTION: bool = Field(default=True, description="Let the monthly tier evaluation demote affiliates")
+
     # First superuser
     FIRST_SUPERUSER_EMAIL: str = Field(
         default="admin@example.com",
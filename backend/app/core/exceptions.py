@@ -53,3 +53,14 @@ class ConflictError(HTTPException):
             status_code=status.HTTP_409_CONFLICT,
             detail=detail,
         )
+
+
+class ServiceUnavailableError(HTTPException):
+    """Temporarily unable to serve the request"""
+
+    def __init__(self, detail: str = "Service temporarily unavailable", retry_after: int = 5):
+        super().__init__(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail=detail,
+            headers={"Retry-After": str(retry_after)},
+        )
@@ -0,0 +1,292 @@
+"""
+Prometheus Metrics
+
+Exposes request, database pool, ingestion and background queue metrics in the
+Prometheus text format at ``/metrics``.
+
+When running several uvicorn workers, set ``PROMETHEUS_MULTIPROC_DIR`` to an
+empty, writable directory before the workers start. Every worker then writes
+its samples there and ``/metrics`` aggregates all of them, whichever worker
+serves the scrape. Without the variable the per-process registry is used.
+"""
+import os
+import time
+from typing import Optional
+
+import redis
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    REGISTRY,
+    CollectorRegistry,
+    Counter,
+    Gauge,
+    Histogram,
+    generate_latest,
+    multiprocess,
+)
+from sqlalchemy import event
+from sqlalchemy.pool import NullPool, QueuePool
+
+from app.core.config import settings
+from app.core.redis import get_redis
+
+# ===== HTTP =====
+
+HTTP_REQUEST_DURATION = Histogram(
+    "http_request_duration_seconds",
+    "HTTP request latency by route template",
+    ["method", "route", "status"],
+    buckets=(0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0),
+)
+HTTP_REQUESTS_IN_PROGRESS = Gauge(
+    "http_requests_in_progress",
+    "HTTP requests currently being served",
+    ["method"],
+    multiprocess_mode="livesum",
+)
+
+# ===== Database pool =====
+# Labelled by engine: "primary", or "replica" for the read replica
+
+DB_POOL_CHECKED_OUT = Gauge(
+    "db_pool_checked_out_connections",
+    "Connections currently checked out of the pool",
+    ["engine"],
+    multiprocess_mode="livesum",
+)
+DB_POOL_OVERFLOW = Gauge(
+    "db_pool_overflow_connections",
+    "Connections open beyond pool_size",
+    ["engine"],
+    multiprocess_mode="livesum",
+)
+DB_POOL_CHECKOUT_WAIT = Histogram(
+    "db_pool_checkout_wait_seconds",
+    "Time spent waiting for a pooled connection (connecting, without a pool)",
+    ["engine"],
+    buckets=(0.0005, 0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 5.0, 30.0),
+)
+DB_POOL_CHECKOUTS = Counter(
+    "db_pool_checkouts",
+    "Connections checked out of the pool",
+    ["engine"],
+)
+DB_CONNECTIONS_OPENED = Counter(
+    "db_connections_opened",
+    "New database connections opened",
+    ["engine"],
+)
+
+# ===== Ingestion =====
+
+CLICKS_INGESTED = Counter(
+    "clicks_ingested_total",
+    "Referral clicks recorded",
+)
+CONVERSIONS_INGESTED = Counter(
+    "conversions_ingested_total",
+    "Conversions received, by whether they were new or idempotent replays",
+    ["result"],
+)
+POSTBACKS = Counter(
+    "postbacks_total",
+    "Server-to-server postbacks, by outcome (queued, stored, invalid, unmatched, dead)",
+    ["outcome"],
+)
+
+# ===== Live events =====
+
+LIVE_EVENT_STREAMS = Gauge(
+    "live_event_streams",
+    "Open live event (SSE) streams",
+    multiprocess_mode="livesum",
+)
+LIVE_EVENTS_SENT = Counter(
+    "live_events_sent_total",
+    "Messages written to live event streams, by kind (event, summary)",
+    ["kind"],
+)
+
+# ===== Webhooks =====
+
+WEBHOOK_DELIVERIES = Counter(
+    "webhook_deliveries_total",
+    "Webhook delivery attempts, by outcome (delivered, retry, dead)",
+    ["outcome"],
+)
+WEBHOOK_REQUEST_DURATION = Histogram(
+    "webhook_request_duration_seconds",
+    "Time for a webhook endpoint to answer one batch",
+    buckets=(0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0),
+)
+
+# ===== Reporting views =====
+
+OVERVIEW_READS = Counter(
+    "admin_overview_reads_total",
+    "Admin overview reads, by source (view, live when the view is stale)",
+    ["source"],
+)
+VIEW_REFRESH_DURATION = Histogram(
+    "materialized_view_refresh_seconds",
+    "Time to refresh a materialized view concurrently",
+    ["view"],
+    buckets=(0.1, 0.5, 1.0, 5.0, 15.0, 30.0, 60.0, 300.0, 900.0),
+)
+
+# ===== Background queues =====
+
+BACKGROUND_QUEUE_SIZE = Gauge(
+    "background_queue_size",
+    "Jobs waiting in a background queue",
+    ["queue"],
+    multiprocess_mode="max",
+)
+
+
+class _CheckoutTimingMixin:
+    """Records how long each checkout takes to produce a connection"""
+
+    # Set by instrument_pool
+    engine_label = "primary"
+
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            return super()._do_get()
+        finally:
+            DB_POOL_CHECKOUT_WAIT.labels(self.engine_label).observe(time.perf_counter() - started)
+
+    def recreate(self):
+        # engine.dispose() swaps in a new pool; keep reporting under the same engine
+        pool = super().recreate()
+        pool.engine_label = self.engine_label
+        return pool
+
+
+class InstrumentedQueuePool(_CheckoutTimingMixin, QueuePool):
+    """QueuePool that records how long checkouts wait for a connection"""
+
+
+class InstrumentedNullPool(_CheckoutTimingMixin, NullPool):
+    """NullPool (one connection per checkout, e.g. behind PgBouncer) with checkout timing"""
+
+
+def instrument_pool(engine, name: str = "primary") -> None:
+    """
+    Keep the pool gauges and counters in sync with an engine's pool
+    ``name`` is the ``engine`` label the engine's samples are reported under.
+    """
+    pool = engine.pool
+    pool.engine_label = name
+    checked_out_gauge = DB_POOL_CHECKED_OUT.labels(name)
+    overflow_gauge = DB_POOL_OVERFLOW.labels(name)
+    checkouts = DB_POOL_CHECKOUTS.labels(name)
+    opened = DB_CONNECTIONS_OPENED.labels(name)
+    event.listen(engine, "connect", lambda *args: opened.inc())
+
+    if not isinstance(pool, QueuePool):
+        # No pool state to report: count checkouts and track open connections
+        def on_unpooled_checkout(*args) -> None:
+            checkouts.inc()
+            checked_out_gauge.inc()
+
+        event.listen(engine, "checkout", on_unpooled_checkout)
+        event.listen(engine, "checkin", lambda *args: checked_out_gauge.dec())
+        return
+
+    # Read the pool through the engine: dispose() replaces it
+    def update_gauges(checked_out: int) -> None:
+        checked_out_gauge.set(checked_out)
+        overflow_gauge.set(max(checked_out - engine.pool.size(), 0))
+
+    def on_checkout(*args) -> None:
+        checkouts.inc()
+        update_gauges(engine.pool.checkedout())
+
+    def on_checkin(*args) -> None:
+        # Fires before the pool takes the connection back
+        update_gauges(max(engine.pool.checkedout() - 1, 0))
+
+    event.listen(engine, "checkout", on_checkout)
+    event.listen(engine, "checkin", on_checkin)
+
+
+class MetricsMiddleware:
+    """ASGI middleware recording request latency and in-flight requests"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        method = scope["method"]
+        status_code = 500
+
+        async def send_with_status(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        in_progress = HTTP_REQUESTS_IN_PROGRESS.labels(method)
+        in_progress.inc()
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            in_progress.dec()
+            route = getattr(scope.get("route"), "path", "unmatched")
+            HTTP_REQUEST_DURATION.labels(method, route, str(status_code)).observe(
+                time.perf_counter() - started
+            )
+
+
+_QUEUE_LENGTH_COMMANDS = {b"zset": "zcard", b"list": "llen", b"stream": "xlen"}
+
+
+def collect_queue_sizes() -> None:
+    """
+    Refresh the background queue gauges from Redis
+    Queues may be sorted sets (arq), lists or streams; missing keys count as
+    empty. A Redis outage leaves the last values in place.
+    """
+    try:
+        client = get_redis()
+        for queue in settings.METRICS_QUEUES:
+            command = _QUEUE_LENGTH_COMMANDS.get(client.type(queue))
+            size = getattr(client, command)(queue) if command else 0
+            BACKGROUND_QUEUE_SIZE.labels(queue).set(size)
+    except redis.RedisError:
+        pass
+
+
+def is_multiprocess() -> bool:
+    return bool(os.environ.get("PROMETHEUS_MULTIPROC_DIR"))
+
+
+def render_metrics() -> tuple:
+    """
+    Render all metrics in the Prometheus text format
+    Returns (body, content type).
+    """
+    collect_queue_sizes()
+
+    if is_multiprocess():
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        registry = REGISTRY
+
+    return generate_latest(registry), CONTENT_TYPE_LATEST
+
+
+def mark_process_dead(pid: Optional[int] = None) -> None:
+    """
+    Drop a stopped worker's live gauges from the multiprocess directory
+    """
+    if is_multiprocess():
+        multiprocess.mark_process_dead(pid or os.getpid())
@@ -0,0 +1,169 @@
+"""
+Per-request SQL statement statistics
+
+SQLAlchemy engine events record every statement executed while a
+``QueryStats`` collector is active in the current context. The ASGI middleware
+opens one collector per request, observes the totals as Prometheus histograms
+and, in DEBUG mode, returns them as response headers:
+
+    X-DB-Query-Count       statements executed
+    X-DB-Query-Time-Ms     total time spent in the database driver
+    X-DB-Duplicate-Queries statements repeated with the same SQL (N+1 suspects)
+
+Statements are compared by their SQL text, which carries bind placeholders
+rather than values, so ``SELECT ... WHERE id = ?`` run once per row of a list
+shows up as one duplicated pattern.
+"""
+import logging
+import time
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, Iterator, Optional, Tuple
+
+from prometheus_client import Histogram
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+DB_QUERIES_PER_REQUEST = Histogram(
+    "db_queries_per_request",
+    "SQL statements executed per HTTP request",
+    ["method", "route"],
+    buckets=(0, 1, 2, 3, 5, 8, 13, 21, 34, 55),
+)
+DB_TIME_PER_REQUEST = Histogram(
+    "db_time_per_request_seconds",
+    "Time spent executing SQL per HTTP request",
+    ["method", "route"],
+)
+DB_DUPLICATE_QUERIES_PER_REQUEST = Histogram(
+    "db_duplicate_queries_per_request",
+    "Repeated executions of identical SQL per HTTP request",
+    ["method", "route"],
+    buckets=(0, 1, 2, 5, 10, 25, 50, 100),
+)
+
+
+class QueryStats:
+    """Statement count, database time and repeated statements for one unit of work"""
+
+    __slots__ = ("count", "duration", "statements")
+
+    def __init__(self):
+        self.count = 0
+        self.duration = 0.0
+        self.statements: Counter = Counter()
+
+    def record(self, statement: str, duration: float) -> None:
+        self.count += 1
+        self.duration += duration
+        self.statements[statement] += 1
+
+    @property
+    def duplicates(self) -> Dict[str, int]:
+        """Statements executed more than once, with their execution counts"""
+        return {sql: n for sql, n in self.statements.items() if n > 1}
+
+    @property
+    def duplicate_count(self) -> int:
+        """Executions beyond the first of every repeated statement"""
+        return sum(n - 1 for n in self.statements.values() if n > 1)
+
+
+# Collectors active in the current context, outermost first
+_current_stats: ContextVar[Tuple[QueryStats, ...]] = ContextVar("query_stats", default=())
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("query_start_time", []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    duration = time.perf_counter() - conn.info["query_start_time"].pop()
+    for stats in _current_stats.get():
+        stats.record(statement, duration)
+
+
+def _handle_error(context):
+    # A failed statement never reaches after_cursor_execute
+    conn = context.connection
+    if conn is not None and conn.info.get("query_start_time"):
+        conn.info["query_start_time"].pop()
+
+
+def install_query_stats(engine: Engine) -> None:
+    """
+    Register the statement timing listeners on an engine (idempotent)
+    """
+    if not event.contains(engine, "before_cursor_execute", _before_cursor_execute):
+        event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+        event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+        event.listen(engine, "handle_error", _handle_error)
+
+
+@contextmanager
+def track_queries() -> Iterator[QueryStats]:
+    """
+    Collect statistics for statements executed in the current context
+
+    Collectors nest: a statement counts towards every enclosing collector.
+    """
+    stats = QueryStats()
+    token = _current_stats.set(_current_stats.get() + (stats,))
+    try:
+        yield stats
+    finally:
+        _current_stats.reset(token)
+
+
+class QueryStatsMiddleware:
+    """ASGI middleware collecting per-request SQL statistics"""
+
+    def __init__(self, app, expose_headers: Optional[bool] = None):
+        self.app = app
+        # None follows settings.DEBUG
+        self.expose_headers = expose_headers
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        expose_headers = settings.DEBUG if self.expose_headers is None else self.expose_headers
+
+        with track_queries() as stats:
+            async def send_with_stats(message):
+                if message["type"] == "http.response.start" and expose_headers:
+                    headers = list(message.get("headers", []))
+                    headers += [
+                        (b"x-db-query-count", str(stats.count).encode()),
+                        (b"x-db-query-time-ms", f"{stats.duration * 1000:.2f}".encode()),
+                        (b"x-db-duplicate-queries", str(stats.duplicate_count).encode()),
+                    ]
+                    message = {**message, "headers": headers}
+                await send(message)
+
+            try:
+                await self.app(scope, receive, send_with_stats)
+            finally:
+                self._observe(scope, stats)
+
+    @staticmethod
+    def _observe(scope, stats: QueryStats) -> None:
+        route = scope.get("route")
+        route_path = getattr(route, "path", "unmatched")
+        method = scope["method"]
+
+        DB_QUERIES_PER_REQUEST.labels(method, route_path).observe(stats.count)
+        DB_TIME_PER_REQUEST.labels(method, route_path).observe(stats.duration)
+        DB_DUPLICATE_QUERIES_PER_REQUEST.labels(method, route_path).observe(stats.duplicate_count)
+
+        if stats.duplicate_count >= settings.QUERY_DUPLICATE_WARN_THRESHOLD:
+            logger.warning(
+                "Possible N+1 on %s %s: %d statements, %d repeated",
+                method, route_path, stats.count, stats.duplicate_count,
+            )
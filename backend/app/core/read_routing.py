@@ -0,0 +1,145 @@
+"""
+Read Replica Routing
+
+List, stats and reporting endpoints read from a streaming replica when one is
+configured (``DATABASE_REPLICA_URL``), unless:
+
+- the replica lags the primary by more than ``REPLICA_MAX_LAG_SECONDS``
+  (probed at most every ``REPLICA_LAG_CHECK_INTERVAL`` seconds per process),
+  or the probe fails; or
+- the caller wrote something in the last ``READ_YOUR_WRITES_SECONDS``, so
+  they always see their own changes.
+
+Recent writers are tracked in Redis (``ryw:<user id>`` keys with a TTL) so the
+window holds across workers. If Redis is unreachable, reads go to the primary.
+"""
+import threading
+import time
+from typing import Optional
+
+import redis
+from sqlalchemy import text
+from sqlalchemy.engine import Engine
+
+from app.core.config import settings
+from app.core.redis import get_async_redis, get_redis
+from app.core.security import decode_token
+
+_UNSAFE_METHODS = {"POST", "PUT", "PATCH", "DELETE"}
+
+# Zero while the replica has replayed everything it received (idle primary),
+# otherwise the age of the last replayed transaction
+_LAG_QUERY = text(
+    "SELECT CASE WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0 "
+    "ELSE EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()) END"
+)
+
+_lag_lock = threading.Lock()
+_lag_checked_at = float("-inf")
+_replica_fresh = False
+
+
+def _read_your_writes_key(user_id: str) -> str:
+    return f"ryw:{user_id}"
+
+
+def probe_replica_lag(engine: Engine) -> Optional[float]:
+    """
+    Get the replica's replication lag in seconds, or None if it cannot be measured
+    """
+    try:
+        with engine.connect() as conn:
+            lag = conn.execute(_LAG_QUERY).scalar()
+    except Exception:
+        return None
+    return float(lag) if lag is not None else None
+
+
+def replica_is_fresh(engine: Engine) -> bool:
+    """
+    Whether the replica is within the lag budget, re-probed at most once per interval
+
+    One thread probes at a time; the others keep serving the previous verdict
+    instead of waiting on the probe.
+    """
+    global _lag_checked_at, _replica_fresh
+
+    now = time.monotonic()
+    if now - _lag_checked_at < settings.REPLICA_LAG_CHECK_INTERVAL:
+        return _replica_fresh
+
+    if not _lag_lock.acquire(blocking=False):
+        return _replica_fresh
+    try:
+        if now - _lag_checked_at >= settings.REPLICA_LAG_CHECK_INTERVAL:
+            lag = probe_replica_lag(engine)
+            _replica_fresh = lag is not None and lag <= settings.REPLICA_MAX_LAG_SECONDS
+            _lag_checked_at = now
+    finally:
+        _lag_lock.release()
+
+    return _replica_fresh
+
+
+def token_subject(authorization: Optional[str]) -> Optional[str]:
+    """
+    Get the user ID from a ``Bearer`` access token header, without a database lookup
+    """
+    if not authorization or not authorization.lower().startswith("bearer "):
+        return None
+    payload = decode_token(authorization[7:])
+    if not payload or payload.get("type") != "access":
+        return None
+    return payload.get("sub")
+
+
+def has_recent_write(user_id: Optional[str]) -> bool:
+    """
+    Whether the user wrote inside the read-your-writes window
+    Errs on the side of the primary when Redis is unavailable.
+    """
+    if user_id is None:
+        return False
+    try:
+        return bool(get_redis().exists(_read_your_writes_key(user_id)))
+    except redis.RedisError:
+        return True
+
+
+async def mark_recent_write(user_id: str) -> None:
+    """
+    Open the user's read-your-writes window
+    """
+    try:
+        await get_async_redis().set(
+            _read_your_writes_key(user_id), 1, ex=settings.READ_YOUR_WRITES_SECONDS
+        )
+    except redis.RedisError:
+        pass
+
+
+class ReadYourWritesMiddleware:
+    """ASGI middleware recording authenticated writes for read-your-writes routing"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if (
+            scope["type"] != "http"
+            or scope["method"] not in _UNSAFE_METHODS
+            or not settings.DATABASE_REPLICA_URL
+        ):
+            await self.app(scope, receive, send)
+            return
+
+        async def send_marking_writes(message):
+            # Mark before the response leaves, so the client's next read already sees it
+            if message["type"] == "http.response.start" and message["status"] < 400:
+                authorization = dict(scope.get("headers", [])).get(b"authorization")
+                user_id = token_subject(authorization.decode("latin-1") if authorization else None)
+                if user_id:
+                    await mark_recent_write(user_id)
+            await send(message)
+
+        await self.app(scope, receive, send_marking_writes)
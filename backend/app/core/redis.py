@@ -0,0 +1,40 @@
+"""
+Shared Redis clients
+
+One lazily created client per process (sync for threadpool code, asyncio for
+middleware and async endpoints), both using the configured socket timeout so
+a slow or missing Redis never stalls a request for long.
+"""
+from typing import Optional
+
+import redis
+import redis.asyncio
+
+from app.core.config import settings
+
+_client: Optional[redis.Redis] = None
+_async_client: Optional[redis.asyncio.Redis] = None
+
+
+def get_redis() -> redis.Redis:
+    """Get the process-wide synchronous Redis client"""
+    global _client
+    if _client is None:
+        _client = redis.Redis.from_url(
+            settings.REDIS_URL,
+            socket_timeout=settings.REDIS_SOCKET_TIMEOUT,
+            socket_connect_timeout=settings.REDIS_SOCKET_TIMEOUT,
+        )
+    return _client
+
+
+def get_async_redis() -> redis.asyncio.Redis:
+    """Get the process-wide asyncio Redis client"""
+    global _async_client
+    if _async_client is None:
+        _async_client = redis.asyncio.Redis.from_url(
+            settings.REDIS_URL,
+            socket_timeout=settings.REDIS_SOCKET_TIMEOUT,
+            socket_connect_timeout=settings.REDIS_SOCKET_TIMEOUT,
+        )
+    return _async_client
@@ -0,0 +1,54 @@
+"""
+Fast JSON serialization for list endpoints
+
+List endpoints select only the columns their response schema declares and
+serialize the row tuples straight to JSON bytes with orjson, skipping ORM
+object construction and per-row pydantic validation. Output matches what
+FastAPI would produce from the ``response_model`` (Decimals as strings,
+UUIDs and datetimes in ISO format), so the route keeps ``response_model``
+for the OpenAPI contract and returns a ``Response`` directly.
+"""
+from decimal import Decimal
+from typing import Any, Iterable, List, Sequence, Type
+
+import orjson
+from fastapi import Response
+from pydantic import BaseModel
+
+# OPT_UTC_Z writes UTC offsets as "Z", like pydantic
+_ORJSON_OPTIONS = orjson.OPT_NON_STR_KEYS | orjson.OPT_UTC_Z
+
+
+def _default(obj: Any) -> Any:
+    """Encode types orjson does not handle natively, the way pydantic does"""
+    if isinstance(obj, Decimal):
+        return str(obj)
+    raise TypeError(f"Type is not JSON serializable: {type(obj).__name__}")
+
+
+def dumps(content: Any) -> bytes:
+    """Serialize a value to JSON bytes"""
+    return orjson.dumps(content, default=_default, option=_ORJSON_OPTIONS)
+
+
+def schema_columns(model, schema: Type[BaseModel]) -> List:
+    """
+    Get the model columns backing each field of a response schema, in field order
+    """
+    return [getattr(model, name) for name in schema.model_fields]
+
+
+def rows_to_json(rows: Iterable[Sequence], fields: Sequence[str]) -> bytes:
+    """Serialize row tuples to a JSON array of objects keyed by ``fields``"""
+    return dumps([dict(zip(fields, row)) for row in rows])
+
+
+def rows_response(rows: Iterable[Sequence], schema: Type[BaseModel]) -> Response:
+    """
+    Build a JSON response from rows selected with ``schema_columns``
+    """
+    return Response(
+        content=rows_to_json(rows, list(schema.model_fields)),
+        media_type="application/json",
+    )
+
@@ -1,24 +1,120 @@
 """
 Database Connection and Session Management
 """
-from sqlalchemy import create_engine
+import logging
+from contextlib import ExitStack
+from typing import Optional
+
+from fastapi import Depends, Request
+from sqlalchemy import create_engine, event
+from sqlalchemy.dialects import postgresql, sqlite
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.orm import Session, sessionmaker
+from sqlalchemy.pool import QueuePool
 
 from app.core.config import settings
+from app.core.metrics import InstrumentedNullPool, InstrumentedQueuePool, instrument_pool
+from app.core.read_routing import has_recent_write, replica_is_fresh, token_subject
+
+logger = logging.getLogger(__name__)
+
+
+def engine_options() -> dict:
+    """
+    Build create_engine pool and connection options from settings
+
+    Behind PgBouncer in transaction mode PgBouncer does the pooling, so each
+    checkout opens a fresh client connection, and startup parameters are not
+    forwarded, so the statement timeout is set per transaction instead (see
+    ``install_statement_timeout``).
+    """
+    if settings.DB_PGBOUNCER:
+        return {"poolclass": InstrumentedNullPool}
+
+    options = {
+        "poolclass": InstrumentedQueuePool,
+        "pool_size": settings.DB_POOL_SIZE,
+        "max_overflow": settings.DB_MAX_OVERFLOW,
+        "pool_timeout": settings.DB_POOL_TIMEOUT,
+        "pool_recycle": settings.DB_POOL_RECYCLE,
+        "pool_pre_ping": settings.DB_POOL_PRE_PING,
+    }
+    if settings.DB_STATEMENT_TIMEOUT_MS:
+        options["connect_args"] = {"options": f"-c statement_timeout={settings.DB_STATEMENT_TIMEOUT_MS}"}
+    return options
+
+
+def _set_local_statement_timeout(conn) -> None:
+    # The begin event fires before the transaction exists on the Connection,
+    # so go through the DBAPI cursor; psycopg2 opens the transaction with it
+    cursor = conn.connection.cursor()
+    try:
+        cursor.execute(f"SET LOCAL statement_timeout = {int(settings.DB_STATEMENT_TIMEOUT_MS)}")
+    finally:
+        cursor.close()
+
+
+def install_statement_timeout(engine) -> None:
+    """
+    Apply the statement timeout at the start of every transaction (PgBouncer mode)
+    """
+    if settings.DB_PGBOUNCER and settings.DB_STATEMENT_TIMEOUT_MS:
+        event.listen(engine, "begin", _set_local_statement_timeout)
+
+
+def warm_up_pool(engine, connections: Optional[int] = None) -> int:
+    """
+    Open pooled connections eagerly so the first requests do not pay for connecting
+    Returns the number of connections opened; a database that is not reachable
+    yet is logged, not raised.
+    """
+    if not isinstance(engine.pool, QueuePool):
+        return 0
+
+    connections = settings.DB_POOL_WARMUP if connections is None else connections
+    connections = min(connections, engine.pool.size())
+    opened = 0
+    try:
+        # Hold them all at once, otherwise the pool hands back the same one
+        with ExitStack() as stack:
+            for _ in range(connections):
+                stack.enter_context(engine.connect())
+                opened += 1
+    except SQLAlchemyError as exc:
+        logger.warning("Connection pool warm-up stopped after %d connections: %s", opened, exc)
+    return opened
+
 
 # Create database engine
 engine = create_engine(
     settings.DATABASE_URL,
-    pool_pre_ping=True,
-    pool_size=10,
-    max_overflow=20,
     echo=False,  # Set to True for SQL query logging
+    **engine_options(),
 )
+instrument_pool(engine, "primary")
+install_statement_timeout(engine)
 
 # Create session factory
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# Optional streaming replica for list, stats and reporting reads
+replica_engine = None
+ReplicaSessionLocal = None
+if settings.DATABASE_REPLICA_URL:
+    replica_options = engine_options()
+    # Fail fast on an unreachable replica: reads fall back to the primary
+    replica_options["connect_args"] = {
+        **replica_options.get("connect_args", {}),
+        "connect_timeout": settings.REPLICA_CONNECT_TIMEOUT,
+    }
+    replica_engine = create_engine(settings.DATABASE_REPLICA_URL, **replica_options)
+    instrument_pool(replica_engine, "replica")
+    install_statement_timeout(replica_engine)
+    ReplicaSessionLocal = sessionmaker(
+        autocommit=False, autoflush=False, expire_on_commit=False, bind=replica_engine
+    )
+
 # Create base class for models
 Base = declarative_base()
 
@@ -33,3 +129,46 @@ def get_db():
         yield db
     finally:
         db.close()
+
+
+def get_returning_db(db: Session = Depends(get_db)):
+    """
+    Request session that keeps objects loaded after commit
+    For endpoints whose services write with RETURNING and hand the rows
+    straight back: expiring them on commit would cost a reload per object when
+    the response is serialized. Only for request-scoped sessions; a long-lived
+    one would keep serving rows as they were at an earlier commit.
+    """
+    db.expire_on_commit = False
+    return db
+
+
+def get_read_db(request: Request, db: Session = Depends(get_db)):
+    """
+    Read-only database session dependency for list, stats and reporting endpoints
+    Yields a replica session when the replica is fresh and the caller has no
+    recent writes, otherwise the primary session
+    """
+    if ReplicaSessionLocal is None or not replica_is_fresh(replica_engine):
+        yield db
+        return
+
+    if has_recent_write(token_subject(request.headers.get("authorization"))):
+        yield db
+        return
+
+    replica_db = ReplicaSessionLocal()
+    try:
+        yield replica_db
+    finally:
+        replica_db.close()
+
+
+def dialect_insert(db: Session, table):
+    """
+    Build an INSERT for the session's dialect
+    Both PostgreSQL and SQLite (used by the test suite) support ON CONFLICT ... RETURNING
+    """
+    if db.get_bind().dialect.name == "sqlite":
+        return sqlite.insert(table)
+    return postgresql.insert(table)
@@ -1,11 +1,19 @@
 """
 FastAPI Application Entry Point
 """
-from fastapi import FastAPI
+import asyncio
+
+from fastapi import FastAPI, Response
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import JSONResponse
 
 from app.core.config import settings
+from app.core.metrics import MetricsMiddleware, mark_process_dead, render_metrics
+from app.core.query_stats import QueryStatsMiddleware, install_query_stats
+from app.core.read_routing import ReadYourWritesMiddleware
+from app.database import engine, replica_engine, warm_up_pool
+from app.services.link_snapshot import get_link_source, listen_for_link_changes
+from app.services.live_events import get_live_event_bus, listen_for_live_events
 from app.api.v1.router import api_router
 
 app = FastAPI(
@@ -26,6 +34,18 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Keep a user's reads on the primary right after their own writes
+app.add_middleware(ReadYourWritesMiddleware)
+
+# Per-request SQL statement counts and N+1 detection
+install_query_stats(engine)
+if replica_engine is not None:
+    install_query_stats(replica_engine)
+app.add_middleware(QueryStatsMiddleware)
+
+# Route latency and in-flight requests (outermost, so it times the whole stack)
+app.add_middleware(MetricsMiddleware)
+
 # Include API router
 app.include_router(api_router, prefix=settings.API_V1_STR)
 
@@ -42,6 +62,55 @@ async def health_check():
     )
 
 
+@app.get("/metrics", include_in_schema=False)
+def metrics():
+    """Prometheus metrics endpoint"""
+    body, content_type = render_metrics()
+    return Response(content=body, media_type=content_type)
+
+
+@app.on_event("startup")
+def warm_up_database_pools():
+    """Open the minimum pooled connections before serving traffic"""
+    warm_up_pool(engine)
+    if replica_engine is not None:
+        warm_up_pool(replica_engine)
+
+
+@app.on_event("startup")
+async def follow_link_changes():
+    """Keep the shared link snapshot's stale codes current"""
+    source = get_link_source()
+    if source is not None:
+        app.state.link_listener = asyncio.create_task(listen_for_link_changes(source.invalidate))
+
+
+@app.on_event("shutdown")
+async def stop_following_link_changes():
+    listener = getattr(app.state, "link_listener", None)
+    if listener is not None:
+        listener.cancel()
+
+
+@app.on_event("startup")
+async def follow_live_events():
+    """Feed live events published by any process to this worker's streams"""
+    app.state.live_event_listener = asyncio.create_task(listen_for_live_events(get_live_event_bus()))
+
+
+@app.on_event("shutdown")
+async def stop_following_live_events():
+    listener = getattr(app.state, "live_event_listener", None)
+    if listener is not None:
+        listener.cancel()
+
+
+@app.on_event("shutdown")
+def release_worker_metrics():
+    """Drop this worker's live gauges from the multiprocess metrics directory"""
+    mark_process_dead()
+
+
 @app.get("/")
 async def root():
     """Root endpoint"""
@@ -2,15 +2,19 @@
 SQLAlchemy Models
 """
 from app.models.user import User
-from app.models.affiliate import AffiliateProfile, AffiliateTier
+from app.models.affiliate import AffiliateProfile, AffiliateTier, AffiliateTierHistory
 from app.models.program import AffiliateProgram, ProgramEnrollment
 from app.models.referral import ReferralLink, ReferralClick
 from app.models.conversion import Conversion, Commission, Payout
+from app.models.attribution import AttributionCredit
+from app.models.webhook import OutboxEvent, WebhookEndpoint, WebhookDelivery
+from app.models.reporting import MaterializedViewRefresh
 
 __all__ = [
     "User",
     "AffiliateProfile",
     "AffiliateTier",
+    "AffiliateTierHistory",
     "AffiliateProgram",
     "ProgramEnrollment",
     "ReferralLink",
@@ -18,4 +22,9 @@ __all__ = [
     "Conversion",
     "Commission",
     "Payout",
+    "AttributionCredit",
+    "OutboxEvent",
+    "WebhookEndpoint",
+    "WebhookDelivery",
+    "MaterializedViewRefresh",
 ]
@@ -3,7 +3,7 @@ Affiliate Models
 """
 import uuid
 from datetime import datetime
-from sqlalchemy import Column, String, DateTime, ForeignKey, Integer, Numeric, Text, Enum as SQLEnum
+from sqlalchemy import Column, String, DateTime, ForeignKey, Integer, Numeric, Sequence, Text, Enum as SQLEnum
 from sqlalchemy.dialects.postgresql import UUID, JSONB
 from sqlalchemy.orm import relationship
 import enum
@@ -46,6 +46,10 @@ class AffiliateTier(Base):
         return f"<AffiliateTier {self.name} (Level {self.level})>"
 
 
+# Source of affiliate codes (see app.services.code_service); max is the 50-bit code space
+affiliate_code_sequence = Sequence("affiliate_code_seq", maxvalue=2 ** 50 - 1, metadata=Base.metadata)
+
+
 class AffiliateProfile(Base):
     """Affiliate profile model"""
     __tablename__ = "affiliate_profiles"
@@ -82,3 +86,30 @@ class AffiliateProfile(Base):
 
     def __repr__(self):
         return f"<AffiliateProfile {self.affiliate_code}>"
+
+
+class AffiliateTierHistory(Base):
+    """Affiliate tier history model - one row per automatic or manual tier change"""
+    __tablename__ = "affiliate_tier_history"
+
+    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4, index=True)
+    affiliate_id = Column(UUID(as_uuid=True), ForeignKey("affiliate_profiles.id", ondelete="CASCADE"), nullable=False, index=True)
+    from_tier_id = Column(UUID(as_uuid=True), ForeignKey("affiliate_tiers.id"), nullable=True)
+    to_tier_id = Column(UUID(as_uuid=True), ForeignKey("affiliate_tiers.id"), nullable=True)
+    reason = Column(String(50), nullable=False)  # PROMOTION, DEMOTION
+
+    # Metrics the change was based on
+    period_start = Column(DateTime, nullable=False)
+    period_end = Column(DateTime, nullable=False)
+    monthly_conversions = Column(Integer, default=0, nullable=False)
+    monthly_revenue = Column(Numeric(12, 2), default=0.0, nullable=False)
+
+    changed_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+
+    # Relationships
+    affiliate = relationship("AffiliateProfile")
+    from_tier = relationship("AffiliateTier", foreign_keys=[from_tier_id])
+    to_tier = relationship("AffiliateTier", foreign_keys=[to_tier_id])
+
+    def __repr__(self):
+        return f"<AffiliateTierHistory {self.affiliate_id} {self.reason}>"
@@ -0,0 +1,40 @@
+"""
+Attribution Models
+"""
+import uuid
+from datetime import datetime
+from sqlalchemy import Column, String, DateTime, ForeignKey, Integer, Numeric, UniqueConstraint
+from sqlalchemy.dialects.postgresql import UUID
+from sqlalchemy.orm import relationship
+
+from app.database import Base
+
+
+class AttributionCredit(Base):
+    """Attribution credit model - fractional credit of a conversion per touchpoint link"""
+    __tablename__ = "attribution_credits"
+
+    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4, index=True)
+    conversion_id = Column(UUID(as_uuid=True), ForeignKey("conversions.id", ondelete="CASCADE"), nullable=False, index=True)
+    referral_link_id = Column(UUID(as_uuid=True), ForeignKey("referral_links.id", ondelete="CASCADE"), nullable=False)
+    affiliate_id = Column(UUID(as_uuid=True), ForeignKey("affiliate_profiles.id", ondelete="CASCADE"), nullable=False, index=True)
+    program_id = Column(UUID(as_uuid=True), ForeignKey("affiliate_programs.id", ondelete="CASCADE"), nullable=False)
+
+    model = Column(String(50), nullable=False)  # linear, time_decay, position_based, ...
+    credit = Column(Numeric(7, 6), nullable=False)  # Share of the conversion, sums to 1 per conversion
+    touchpoints = Column(Integer, default=1, nullable=False)  # Clicks on this link in the path
+    last_touch_at = Column(DateTime, nullable=False)
+
+    created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+
+    # Relationships
+    conversion = relationship("Conversion")
+    referral_link = relationship("ReferralLink")
+    affiliate = relationship("AffiliateProfile")
+
+    __table_args__ = (
+        UniqueConstraint("conversion_id", "model", "referral_link_id", name="uq_attribution_credit"),
+    )
+
+    def __repr__(self):
+        return f"<AttributionCredit {self.model} {self.conversion_id} {self.credit}>"
@@ -3,7 +3,7 @@ Conversion and Commission Models
 """
 import uuid
 from datetime import datetime
-from sqlalchemy import Column, String, DateTime, ForeignKey, Numeric, Enum as SQLEnum
+from sqlalchemy import Column, String, DateTime, ForeignKey, Numeric, Index, Enum as SQLEnum
 from sqlalchemy.dialects.postgresql import UUID, JSONB
 from sqlalchemy.orm import relationship
 import enum
@@ -47,6 +47,7 @@ class Conversion(Base):
     # Status and validation
     status = Column(SQLEnum(ConversionStatus), default=ConversionStatus.PENDING, nullable=False, index=True)
     conversion_metadata = Column(JSONB, default=dict)  # Order details, lead info, custom data
+    idempotency_key = Column(String(255), nullable=True)  # Dedupes SDK / webhook retries per program
 
     # Timestamps
     converted_at = Column(DateTime, default=datetime.utcnow, nullable=False, index=True)
@@ -61,6 +62,32 @@ class Conversion(Base):
     customer = relationship("User", foreign_keys=[customer_id])
     commission = relationship("Commission", back_populates="conversion", uselist=False, cascade="all, delete-orphan")
 
+    __table_args__ = (
+        Index(
+            "uq_conversions_program_idempotency_key",
+            "program_id",
+            "idempotency_key",
+            unique=True,
+            postgresql_where=idempotency_key.isnot(None),
+            sqlite_where=idempotency_key.isnot(None),
+        ),
+        # Monthly per-affiliate aggregates for tier evaluation
+        Index(
+            "idx_conversions_affiliate_status_converted_at",
+            "affiliate_id",
+            "status",
+            "converted_at",
+            postgresql_include=["conversion_value"],
+        ),
+        # Affiliate list filtered by status, newest first
+        Index(
+            "idx_conversions_affiliate_status_created_at",
+            "affiliate_id",
+            "status",
+            created_at.desc(),
+        ),
+    )
+
     def __repr__(self):
         return f"<Conversion {self.id} - {self.conversion_type}>"
 
@@ -109,6 +136,24 @@ class Commission(Base):
     approver = relationship("User", foreign_keys=[approved_by])
     payout = relationship("Payout", back_populates="commissions")
 
+    __table_args__ = (
+        # Affiliate list filtered by status, newest first
+        Index(
+            "idx_commissions_affiliate_status_created_at",
+            "affiliate_id",
+            "status",
+            created_at.desc(),
+        ),
+        # Approved commissions not yet in a payout, for payout generation
+        Index(
+            "idx_commissions_unpaid_approved",
+            "affiliate_id",
+            "created_at",
+            postgresql_include=["final_amount", "currency"],
+            postgresql_where=(status == CommissionStatus.APPROVED) & payout_id.is_(None),
+        ),
+    )
+
     def __repr__(self):
         return f"<Commission {self.id} - ${self.final_amount}>"
 
@@ -155,5 +200,15 @@ class Payout(Base):
     processor = relationship("User", foreign_keys=[processed_by])
     commissions = relationship("Commission", back_populates="payout")
 
+    __table_args__ = (
+        # Affiliate list filtered by status, newest first
+        Index(
+            "idx_payouts_affiliate_status_created_at",
+            "affiliate_id",
+            "status",
+            created_at.desc(),
+        ),
+    )
+
     def __repr__(self):
         return f"<Payout {self.id} - ${self.total_amount}>"
@@ -50,6 +50,10 @@ class AffiliateProgram(Base):
     terms_and_conditions = Column(Text, nullable=True)
     commission_config = Column(JSONB, default=dict, nullable=False)  # Flexible commission rules
 
+    # Server-to-server postbacks (see app.services.postback_service)
+    postback_secret = Column(String(100), nullable=True)  # Unset disables the postback endpoint
+    postback_template = Column(JSONB, nullable=True)  # Query parameter mapping; None uses the default
+
     created_by = Column(UUID(as_uuid=True), ForeignKey("users.id"), nullable=False)
     created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, nullable=False)
@@ -3,7 +3,7 @@ Referral and Tracking Models
 """
 import uuid
 from datetime import datetime
-from sqlalchemy import Column, String, DateTime, ForeignKey, Integer, Enum as SQLEnum, Text
+from sqlalchemy import Column, String, DateTime, ForeignKey, Integer, Index, Sequence, Enum as SQLEnum, Text
 from sqlalchemy.dialects.postgresql import UUID, JSONB
 from sqlalchemy.orm import relationship
 import enum
@@ -17,6 +17,10 @@ class ReferralLinkStatus(str, enum.Enum):
     INACTIVE = "INACTIVE"
 
 
+# Source of link codes (see app.services.code_service); max is the 40-bit code space
+link_code_sequence = Sequence("referral_link_code_seq", maxvalue=2 ** 40 - 1, metadata=Base.metadata)
+
+
 class ReferralLink(Base):
     """Referral link model"""
     __tablename__ = "referral_links"
@@ -47,6 +51,22 @@ class ReferralLink(Base):
     program = relationship("AffiliateProgram")
     clicks = relationship("ReferralClick", back_populates="referral_link", cascade="all, delete-orphan")
 
+    __table_args__ = (
+        Index("idx_referral_links_affiliate_status", "affiliate_id", "status"),
+        # Only links the expiry sweeper has yet to deactivate
+        Index(
+            "idx_referral_links_active_expiry",
+            "expires_at",
+            postgresql_where=(status == ReferralLinkStatus.ACTIVE) & expires_at.isnot(None),
+        ),
+        # The active set in bytewise code order, as the link snapshot scans it
+        Index(
+            "idx_referral_links_active_code",
+            link_code.collate("C"),
+            postgresql_where=status == ReferralLinkStatus.ACTIVE,
+        ).ddl_if(dialect="postgresql"),
+    )
+
     def __repr__(self):
         return f"<ReferralLink {self.link_code}>"
 
@@ -69,5 +89,15 @@ class ReferralClick(Base):
     # Relationships
     referral_link = relationship("ReferralLink", back_populates="clicks")
 
+    __table_args__ = (
+        # Covering index for last-click attribution lookups
+        Index(
+            "idx_referral_clicks_session_clicked_at",
+            "visitor_session_id",
+            clicked_at.desc(),
+            postgresql_include=["referral_link_id"],
+        ),
+    )
+
     def __repr__(self):
         return f"<ReferralClick {self.id}>"
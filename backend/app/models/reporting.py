@@ -0,0 +1,17 @@
+"""
+Reporting Models - Bookkeeping for materialized reporting views
+"""
+from datetime import datetime
+from sqlalchemy import Column, String, DateTime, Integer
+
+from app.database import Base
+
+
+class MaterializedViewRefresh(Base):
+    """When each materialized view was last refreshed (Postgres does not record it)"""
+    __tablename__ = "materialized_view_refreshes"
+
+    view_name = Column(String(100), primary_key=True)
+    refreshed_at = Column(DateTime, nullable=False)
+    duration_ms = Column(Integer, nullable=False, default=0)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, nullable=False)
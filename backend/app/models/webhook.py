@@ -0,0 +1,115 @@
+"""
+Webhook Models - Event outbox and outbound deliveries
+"""
+import uuid
+from datetime import datetime
+from sqlalchemy import Boolean, CheckConstraint, Column, String, DateTime, ForeignKey, Integer, Index, Text, Enum as SQLEnum
+from sqlalchemy.dialects.postgresql import UUID, JSONB
+from sqlalchemy.orm import relationship
+import enum
+
+from app.database import Base
+
+
+class WebhookEventType(str, enum.Enum):
+    """Events a webhook endpoint can subscribe to"""
+    CONVERSION_VALIDATED = "conversion.validated"
+    COMMISSION_APPROVED = "commission.approved"
+    PAYOUT_COMPLETED = "payout.completed"
+
+
+class WebhookDeliveryStatus(str, enum.Enum):
+    """Webhook delivery status enumeration"""
+    PENDING = "PENDING"
+    DELIVERED = "DELIVERED"
+    DEAD = "DEAD"  # Gave up after WEBHOOK_MAX_ATTEMPTS; can be redelivered by hand
+
+
+class OutboxEvent(Base):
+    """Outbox event model - written in the transaction of the change it describes"""
+    __tablename__ = "outbox_events"
+
+    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4, index=True)
+    event_type = Column(String(100), nullable=False)
+    payload = Column(JSONB, nullable=False)
+
+    # Who the event concerns; decides which endpoints receive it
+    affiliate_id = Column(UUID(as_uuid=True), ForeignKey("affiliate_profiles.id", ondelete="CASCADE"), nullable=True)
+    program_id = Column(UUID(as_uuid=True), ForeignKey("affiliate_programs.id", ondelete="CASCADE"), nullable=True)
+
+    created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+    dispatched_at = Column(DateTime, nullable=True)  # Set once deliveries are created
+
+    __table_args__ = (
+        # The dispatcher only ever scans events not yet fanned out
+        Index("idx_outbox_events_undispatched", "created_at", postgresql_where=dispatched_at.is_(None)),
+    )
+
+    def __repr__(self):
+        return f"<OutboxEvent {self.event_type} {self.id}>"
+
+
+class WebhookEndpoint(Base):
+    """Webhook endpoint model - an affiliate's or a program's receiving URL"""
+    __tablename__ = "webhook_endpoints"
+
+    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4, index=True)
+    affiliate_id = Column(UUID(as_uuid=True), ForeignKey("affiliate_profiles.id", ondelete="CASCADE"), nullable=True, index=True)
+    program_id = Column(UUID(as_uuid=True), ForeignKey("affiliate_programs.id", ondelete="CASCADE"), nullable=True, index=True)
+
+    url = Column(String(1000), nullable=False)
+    secret = Column(String(100), nullable=False)  # HMAC key for the signature header
+    event_types = Column(JSONB, nullable=False, default=list)  # WebhookEventType values
+    max_concurrency = Column(Integer, default=4, nullable=False)  # Requests in flight at once
+    is_active = Column(Boolean, default=True, nullable=False)
+
+    created_by = Column(UUID(as_uuid=True), ForeignKey("users.id"), nullable=False)
+    created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, nullable=False)
+
+    # Relationships
+    affiliate = relationship("AffiliateProfile")
+    program = relationship("AffiliateProgram")
+    deliveries = relationship("WebhookDelivery", back_populates="endpoint", cascade="all, delete-orphan")
+
+    __table_args__ = (
+        CheckConstraint("(affiliate_id IS NULL) <> (program_id IS NULL)", name="ck_webhook_endpoint_owner"),
+    )
+
+    def __repr__(self):
+        return f"<WebhookEndpoint {self.url}>"
+
+
+class WebhookDelivery(Base):
+    """Webhook delivery model - one event to one endpoint, with its retry state"""
+    __tablename__ = "webhook_deliveries"
+
+    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4, index=True)
+    event_id = Column(UUID(as_uuid=True), ForeignKey("outbox_events.id", ondelete="CASCADE"), nullable=False, index=True)
+    endpoint_id = Column(UUID(as_uuid=True), ForeignKey("webhook_endpoints.id", ondelete="CASCADE"), nullable=False)
+
+    status = Column(SQLEnum(WebhookDeliveryStatus), default=WebhookDeliveryStatus.PENDING, nullable=False)
+    attempts = Column(Integer, default=0, nullable=False)
+    next_attempt_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+    last_status_code = Column(Integer, nullable=True)
+    last_error = Column(Text, nullable=True)
+    delivered_at = Column(DateTime, nullable=True)
+
+    created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+
+    # Relationships
+    event = relationship("OutboxEvent")
+    endpoint = relationship("WebhookEndpoint", back_populates="deliveries")
+
+    __table_args__ = (
+        # Due deliveries, in the order the dispatcher claims them
+        Index(
+            "idx_webhook_deliveries_due",
+            "next_attempt_at",
+            postgresql_where=status == WebhookDeliveryStatus.PENDING,
+        ),
+        Index("idx_webhook_deliveries_endpoint_status", "endpoint_id", "status", "created_at"),
+    )
+
+    def __repr__(self):
+        return f"<WebhookDelivery {self.event_id} -> {self.endpoint_id} {self.status}>"
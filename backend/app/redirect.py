@@ -0,0 +1,256 @@
+"""
+Standalone Redirect Service
+
+A minimal ASGI app serving only the public tracking routes, for deployment
+apart from the API (it is the highest-traffic path):
+
+    GET /track/{link_code}    302 to the link's target, click queued for ingestion
+    GET /verify/{link_code}   link validity, as the API's verify endpoint
+    GET /health, /metrics
+
+The ``/api/v1/referrals`` prefix is also accepted, so a proxy can route the
+API's tracking URLs here unchanged. No framework, middleware or per-request
+session: links resolve from the shared link snapshot when one is configured
+(see ``app.services.link_snapshot``), then from a per-process TTL cache,
+falling back to one projected query on a miss; clicks go to the Redis click
+queue (written straight to the database if Redis is unavailable). Announced
+link changes evict the code from both.
+
+Run with:
+    uvicorn app.redirect:app --workers 4
+"""
+import asyncio
+import time
+from collections import OrderedDict
+from typing import Awaitable, Callable, Optional, Tuple
+from urllib.parse import parse_qs
+from uuid import UUID, uuid4
+
+import redis
+
+from app.core.config import settings
+from app.core.metrics import mark_process_dead, render_metrics
+from app.core.serialization import dumps
+from app.database import SessionLocal
+from app.services.click_queue import click_event, enqueue_click, record_clicks
+from app.services.link_snapshot import LinkSource, get_link_source, listen_for_link_changes
+from app.services.referral_service import (
+    LinkTarget,
+    build_redirect_url,
+    get_link_target,
+    is_link_expired,
+)
+
+_API_PREFIX = f"{settings.API_V1_STR}/referrals"
+
+
+class LinkCache:
+    """LRU cache of resolved links with a time to live, misses included"""
+
+    def __init__(self, size: int, ttl: float, negative_ttl: float):
+        self.size = size
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self._entries: "OrderedDict[str, Tuple[float, Optional[LinkTarget]]]" = OrderedDict()
+
+    def get(self, link_code: str) -> Tuple[bool, Optional[LinkTarget]]:
+        """Returns (hit, link); a hit may carry None for a known-missing code"""
+        entry = self._entries.get(link_code)
+        if entry is None:
+            return False, None
+        expires, link = entry
+        if expires < time.monotonic():
+            del self._entries[link_code]
+            return False, None
+        self._entries.move_to_end(link_code)
+        return True, link
+
+    def put(self, link_code: str, link: Optional[LinkTarget]) -> None:
+        ttl = self.ttl if link is not None else self.negative_ttl
+        self._entries[link_code] = (time.monotonic() + ttl, link)
+        self._entries.move_to_end(link_code)
+        if len(self._entries) > self.size:
+            self._entries.popitem(last=False)
+
+    def invalidate(self, link_code: Optional[str] = None) -> None:
+        if link_code is None:
+            self._entries.clear()
+        else:
+            self._entries.pop(link_code, None)
+
+
+def lookup_link(link_code: str) -> Optional[LinkTarget]:
+    """Resolve a link from the database with a short-lived session"""
+    db = SessionLocal()
+    try:
+        return get_link_target(db, link_code)
+    finally:
+        db.close()
+
+
+def store_click_directly(event: dict) -> None:
+    """Fallback when the click queue is unavailable"""
+    db = SessionLocal()
+    try:
+        record_clicks(db, [event])
+    finally:
+        db.close()
+
+
+async def queue_click(event: dict) -> None:
+    try:
+        await enqueue_click(event)
+    except redis.RedisError:
+        await asyncio.to_thread(store_click_directly, event)
+
+
+class RedirectApp:
+    """ASGI app for /track and /verify"""
+
+    def __init__(
+        self,
+        resolve: Callable[[str], Optional[LinkTarget]] = lookup_link,
+        record_click: Callable[[dict], Awaitable[None]] = queue_click,
+        cache: Optional[LinkCache] = None,
+        source: Optional[LinkSource] = None,
+    ):
+        self.resolve = resolve
+        self.record_click = record_click
+        self.cache = cache or LinkCache(
+            settings.REDIRECT_CACHE_SIZE, settings.REDIRECT_CACHE_TTL, settings.REDIRECT_NEGATIVE_CACHE_TTL
+        )
+        self.source = source
+        self._listener: Optional[asyncio.Task] = None
+
+    async def get_link(self, link_code: str) -> Optional[LinkTarget]:
+        if self.source is not None:
+            link = self.source.get(link_code)
+            if link is not None:
+                return link
+
+        hit, link = self.cache.get(link_code)
+        if not hit:
+            link = await asyncio.to_thread(self.resolve, link_code)
+            self.cache.put(link_code, link)
+        return link
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "lifespan":
+            await self._lifespan(receive, send)
+            return
+        if scope["type"] != "http":
+            return
+
+        if scope["method"] not in ("GET", "HEAD"):
+            await _send_json(send, 405, {"detail": "Method Not Allowed"})
+            return
+
+        path = scope["path"]
+        if path.startswith(_API_PREFIX):
+            path = path[len(_API_PREFIX):]
+
+        if path.startswith("/track/"):
+            await self.track(scope, send, path[len("/track/"):])
+        elif path.startswith("/verify/"):
+            await self.verify(send, path[len("/verify/"):])
+        elif path == "/health":
+            await _send_json(send, 200, {"status": "healthy", "service": "redirect"})
+        elif path == "/metrics":
+            body, content_type = await asyncio.to_thread(render_metrics)
+            await _send(send, 200, body, content_type.encode())
+        else:
+            await _send_json(send, 404, {"detail": "Not Found"})
+
+    async def track(self, scope, send, link_code: str) -> None:
+        link = await self.get_link(link_code)
+        if link is None:
+            await _send_json(send, 404, {"detail": "Referral link not found or expired"})
+            return
+        if is_link_expired(link.expires_at):
+            await _send_json(send, 404, {"detail": "Referral link has expired"})
+            return
+
+        visitor_session_id = _session_id(scope.get("query_string", b"")) or uuid4()
+        headers = dict(scope.get("headers", []))
+        client = scope.get("client")
+        await self.record_click(click_event(
+            referral_link_id=link.id,
+            visitor_session_id=visitor_session_id,
+            ip_address=client[0] if client else None,
+            user_agent=_header(headers, b"user-agent"),
+            referrer_url=_header(headers, b"referer"),
+        ))
+
+        location = build_redirect_url(
+            link.target_url,
+            link.link_code,
+            utm_params=link.utm_params,
+            visitor_session_id=visitor_session_id,
+        )
+        await send({
+            "type": "http.response.start",
+            "status": 302,
+            "headers": [(b"location", location.encode()), (b"content-length", b"0")],
+        })
+        await send({"type": "http.response.body", "body": b""})
+
+    async def verify(self, send, link_code: str) -> None:
+        link = await self.get_link(link_code)
+        if link is None:
+            body = {"valid": False, "message": "Referral link not found or inactive"}
+        elif is_link_expired(link.expires_at):
+            body = {"valid": False, "message": "Referral link has expired"}
+        else:
+            body = {"valid": True, "program_id": str(link.program_id), "affiliate_id": str(link.affiliate_id)}
+        await _send_json(send, 200, body)
+
+    def link_changed(self, link_code: Optional[str]) -> None:
+        """Forget a changed link (None: every link)"""
+        self.cache.invalidate(link_code)
+        if self.source is not None:
+            self.source.invalidate(link_code)
+
+    async def _lifespan(self, receive, send) -> None:
+        while True:
+            message = await receive()
+            if message["type"] == "lifespan.startup":
+                self._listener = asyncio.create_task(listen_for_link_changes(self.link_changed))
+                await send({"type": "lifespan.startup.complete"})
+            elif message["type"] == "lifespan.shutdown":
+                if self._listener is not None:
+                    self._listener.cancel()
+                mark_process_dead()
+                await send({"type": "lifespan.shutdown.complete"})
+                return
+
+
+def _session_id(query_string: bytes) -> Optional[UUID]:
+    """The ``sid`` query parameter, when it is a valid UUID"""
+    if not query_string:
+        return None
+    values = parse_qs(query_string.decode("latin-1")).get("sid")
+    try:
+        return UUID(values[0]) if values else None
+    except ValueError:
+        return None
+
+
+def _header(headers: dict, name: bytes) -> Optional[str]:
+    value = headers.get(name)
+    return value.decode("latin-1") if value is not None else None
+
+
+async def _send(send, status: int, body: bytes, content_type: bytes) -> None:
+    await send({
+        "type": "http.response.start",
+        "status": status,
+        "headers": [(b"content-type", content_type), (b"content-length", str(len(body)).encode())],
+    })
+    await send({"type": "http.response.body", "body": body})
+
+
+async def _send_json(send, status: int, content: dict) -> None:
+    await _send(send, status, dumps(content), b"application/json")
+
+
+app = RedirectApp(source=get_link_source())
@@ -2,11 +2,15 @@
 Affiliate Schemas
 """
 from datetime import datetime
-from typing import Optional, Dict
+from decimal import Decimal
+from typing import List, Optional, Dict
 from uuid import UUID
 from pydantic import BaseModel, Field, HttpUrl
 
 from app.models.affiliate import ApprovalStatus, PaymentMethod
+from app.schemas.conversion import Commission
+from app.schemas.enrollment import ProgramEnrollment
+from app.schemas.referral import ReferralLink
 
 
 class AffiliateProfileBase(BaseModel):
@@ -50,3 +54,62 @@ class AffiliateApprovalRequest(BaseModel):
     """Schema for approving/rejecting an affiliate"""
     tier_id: Optional[UUID] = None
     rejection_reason: Optional[str] = None
+
+
+class AffiliateTierHistory(BaseModel):
+    """Schema for an affiliate tier change"""
+    id: UUID
+    affiliate_id: UUID
+    from_tier_id: Optional[UUID] = None
+    to_tier_id: Optional[UUID] = None
+    reason: str
+    period_start: datetime
+    period_end: datetime
+    monthly_conversions: int
+    monthly_revenue: Decimal
+    changed_at: datetime
+
+    class Config:
+        from_attributes = True
+
+
+# ===== Dashboard Schemas =====
+
+class LinkTotals(BaseModel):
+    """Totals over all of an affiliate's referral links"""
+    total_links: int = 0
+    active_links: int = 0
+    clicks: int = 0
+    conversions: int = 0
+
+
+class CommissionTotals(BaseModel):
+    """Commission counts and amounts by status (same shape as /commissions/stats)"""
+    total_pending: Decimal = Decimal("0.00")
+    total_approved: Decimal = Decimal("0.00")
+    total_paid: Decimal = Decimal("0.00")
+    count_pending: int = 0
+    count_approved: int = 0
+    count_paid: int = 0
+
+
+class PayoutTotals(BaseModel):
+    """Payout counts and amounts by status (same shape as /payouts/stats)"""
+    total_pending: Decimal = Decimal("0.00")
+    total_processing: Decimal = Decimal("0.00")
+    total_paid: Decimal = Decimal("0.00")
+    count_pending: int = 0
+    count_processing: int = 0
+    count_paid: int = 0
+
+
+class AffiliateDashboard(BaseModel):
+    """Everything the affiliate portal's dashboard shows, in one response"""
+    profile: AffiliateProfile
+    links: LinkTotals
+    top_links: List[ReferralLink]
+    enrollments: List[ProgramEnrollment]
+    commissions: CommissionTotals
+    recent_commissions: List[Commission]
+    payouts: PayoutTotals
+    generated_at: datetime
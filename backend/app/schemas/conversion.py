@@ -29,6 +29,7 @@ class ConversionCreate(ConversionBase):
     referral_link_code: str  # Use link code instead of ID
     visitor_session_id: UUID
     customer_id: Optional[UUID] = None
+    idempotency_key: Optional[str] = Field(default=None, max_length=255)
 
 
 class SDKConversionCreate(BaseModel):
@@ -40,6 +41,7 @@ class SDKConversionCreate(BaseModel):
     currency: str = Field(default="USD", max_length=3)
     customer_id: Optional[UUID] = None
     conversion_metadata: Optional[Dict] = Field(default_factory=dict)
+    idempotency_key: Optional[str] = Field(default=None, max_length=255)
 
 
 class ConversionUpdate(BaseModel):
@@ -57,6 +59,7 @@ class Conversion(ConversionBase):
     program_id: UUID
     customer_id: Optional[UUID] = None
     visitor_session_id: UUID
+    idempotency_key: Optional[str] = None
     currency: str
     status: ConversionStatus
     converted_at: datetime
@@ -68,6 +71,19 @@ class Conversion(ConversionBase):
         from_attributes = True
 
 
+class AttributionShare(BaseModel):
+    """Schema for a multi-touch credit share and the commission it earns"""
+    affiliate_id: UUID
+    referral_link_id: UUID
+    model: str
+    credit: Decimal
+    touchpoints: int
+    base_amount: Decimal
+    tier_multiplier: Decimal
+    final_amount: Decimal
+    currency: str
+
+
 # ===== Commission Schemas =====
 
 class CommissionBase(BaseModel):
@@ -0,0 +1,37 @@
+"""
+Leaderboard Schemas
+"""
+from decimal import Decimal
+from typing import List, Optional
+from uuid import UUID
+from pydantic import BaseModel
+
+
+class LeaderboardEntry(BaseModel):
+    """One ranked affiliate"""
+    rank: int
+    affiliate_id: UUID
+    affiliate_code: Optional[str] = None
+    company_name: Optional[str] = None
+    score: Decimal
+
+
+class Leaderboard(BaseModel):
+    """Top affiliates of a period, or of the last ``window`` periods"""
+    metric: str
+    period: str
+    window: int
+    buckets: List[str]  # Newest first, e.g. ["2024-W18", "2024-W17"]
+    program_id: Optional[UUID] = None
+    entries: List[LeaderboardEntry]
+
+
+class AffiliateRank(BaseModel):
+    """An affiliate's position on a leaderboard"""
+    metric: str
+    period: str
+    window: int
+    program_id: Optional[UUID] = None
+    affiliate_id: UUID
+    rank: Optional[int] = None  # None when the affiliate has no score yet
+    score: Decimal
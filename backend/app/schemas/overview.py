@@ -0,0 +1,35 @@
+"""
+Admin Overview Schemas
+"""
+from datetime import datetime
+from decimal import Decimal
+from typing import List, Optional
+from uuid import UUID
+from pydantic import BaseModel
+
+
+class OverviewTotals(BaseModel):
+    """KPIs summed over programs"""
+    active_affiliates: int = 0
+    links: int = 0
+    clicks: int = 0
+    conversions: int = 0
+    revenue: Decimal = Decimal("0.00")
+    commission_liability: Decimal = Decimal("0.00")  # Pending + approved commissions
+    unpaid_balance: Decimal = Decimal("0.00")  # Approved commissions awaiting payout
+    paid_commission: Decimal = Decimal("0.00")
+
+
+class ProgramOverview(OverviewTotals):
+    """KPIs of one program"""
+    program_id: UUID
+    program_name: str
+
+
+class AdminOverview(BaseModel):
+    """Program KPIs with their freshness"""
+    source: str  # "view", or "live" when the view is older than OVERVIEW_MAX_STALENESS_SECONDS
+    as_of: datetime
+    view_refreshed_at: Optional[datetime] = None
+    totals: OverviewTotals
+    programs: List[ProgramOverview]
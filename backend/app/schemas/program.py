@@ -4,9 +4,31 @@ Program Schemas
 from datetime import datetime, date
 from typing import Optional, Dict
 from uuid import UUID
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, Field, field_validator
 
 from app.models.program import ProgramType, ProgramStatus
+from app.schemas.conversion import SDKConversionCreate
+
+# Conversion fields a postback template may fill
+POSTBACK_FIELDS = set(SDKConversionCreate.model_fields) - {"conversion_metadata"}
+
+
+class PostbackTemplate(BaseModel):
+    """
+    Mapping of postback query parameters onto conversion fields
+    Sections left unset keep the default template's.
+    """
+    params: Optional[Dict[str, str]] = None  # Conversion field -> query parameter
+    defaults: Optional[Dict[str, str]] = None  # Conversion field -> value when the parameter is missing
+    metadata: Optional[Dict[str, str]] = None  # conversion_metadata key -> query parameter
+
+    @field_validator("params", "defaults")
+    @classmethod
+    def check_fields(cls, value: Optional[Dict[str, str]]) -> Optional[Dict[str, str]]:
+        unknown = set(value or {}) - POSTBACK_FIELDS
+        if unknown:
+            raise ValueError(f"Unknown conversion fields: {', '.join(sorted(unknown))}")
+        return value
 
 
 class AffiliateProgramBase(BaseModel):
@@ -36,6 +58,7 @@ class AffiliateProgramUpdate(BaseModel):
     end_date: Optional[date] = None
     terms_and_conditions: Optional[str] = None
     commission_config: Optional[Dict] = None
+    postback_template: Optional[PostbackTemplate] = None
 
 
 class AffiliateProgram(AffiliateProgramBase):
@@ -44,9 +67,17 @@ class AffiliateProgram(AffiliateProgramBase):
     status: ProgramStatus
     start_date: Optional[date] = None
     end_date: Optional[date] = None
+    postback_template: Optional[Dict] = None
     created_by: UUID
     created_at: datetime
     updated_at: datetime
 
     class Config:
         from_attributes = True
+
+
+class PostbackSecret(BaseModel):
+    """Schema for a program's newly generated postback secret"""
+    program_id: UUID
+    postback_secret: str
+    postback_url: str
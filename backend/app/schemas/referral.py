@@ -2,7 +2,7 @@
 Referral Link Schemas
 """
 from datetime import datetime
-from typing import Optional, Dict
+from typing import List, Optional, Dict
 from uuid import UUID
 from pydantic import BaseModel, Field, HttpUrl
 
@@ -22,6 +22,56 @@ class ReferralLinkCreate(ReferralLinkBase):
     program_id: UUID
 
 
+class ReferralLinkBulkItem(BaseModel):
+    """One link of a bulk request"""
+    target_url: str = Field(..., max_length=1000)
+    utm_params: Optional[Dict[str, str]] = Field(default_factory=dict)
+    link_metadata: Optional[Dict] = Field(default_factory=dict)
+
+
+class ReferralLinkTemplate(BaseModel):
+    """Creates one link per (target URL, UTM set) pair"""
+    target_urls: List[str] = Field(..., min_length=1)
+    utm_sets: List[Dict[str, str]] = Field(default_factory=lambda: [{}], min_length=1)
+    link_metadata: Optional[Dict] = Field(default_factory=dict)
+
+    def link_count(self) -> int:
+        return len(self.target_urls) * len(self.utm_sets)
+
+    def expand(self) -> List[ReferralLinkBulkItem]:
+        return [
+            ReferralLinkBulkItem(target_url=url, utm_params=utm, link_metadata=self.link_metadata)
+            for url in self.target_urls
+            for utm in self.utm_sets
+        ]
+
+
+class ReferralLinkBulkCreate(BaseModel):
+    """Schema for creating many referral links for one program"""
+    program_id: UUID
+    links: List[ReferralLinkBulkItem] = Field(default_factory=list)
+    template: Optional[ReferralLinkTemplate] = None
+    expires_at: Optional[datetime] = None
+
+    def link_count(self) -> int:
+        """Number of links ``expand`` produces, without building them"""
+        return len(self.links) + (self.template.link_count() if self.template else 0)
+
+    def expand(self) -> List[ReferralLinkBulkItem]:
+        """Explicit links followed by the template's links"""
+        return self.links + (self.template.expand() if self.template else [])
+
+
+class ReferralLinkBulkResult(BaseModel):
+    """One line of the bulk creation response"""
+    id: UUID
+    link_code: str
+    target_url: str
+    utm_params: Optional[Dict[str, str]] = None
+    link_metadata: Optional[Dict] = None
+    full_url: str
+
+
 class ReferralLinkUpdate(BaseModel):
     """Schema for updating a referral link"""
     target_url: Optional[str] = Field(None, max_length=1000)
@@ -86,3 +136,9 @@ class ReferralLinkStats(BaseModel):
     conversions: int
     conversion_rate: float
     last_click_at: Optional[datetime] = None
+
+
+class ReferralClickCountryStat(BaseModel):
+    """Schema for per-country click counts"""
+    country: Optional[str] = None  # None for clicks that could not be resolved
+    clicks: int
@@ -0,0 +1,63 @@
+"""
+Webhook Schemas
+"""
+from datetime import datetime
+from typing import List, Optional
+from uuid import UUID
+from pydantic import BaseModel, Field, HttpUrl
+
+from app.models.webhook import WebhookDeliveryStatus, WebhookEventType
+
+
+class WebhookEndpointCreate(BaseModel):
+    """Schema for registering a webhook endpoint"""
+    url: HttpUrl
+    event_types: List[WebhookEventType] = Field(..., min_length=1)
+    program_id: Optional[UUID] = None  # Required for admins (program endpoints), unset for affiliates
+    max_concurrency: int = Field(default=4, ge=1, le=50)
+
+
+class WebhookEndpointUpdate(BaseModel):
+    """Schema for updating a webhook endpoint"""
+    url: Optional[HttpUrl] = None
+    event_types: Optional[List[WebhookEventType]] = Field(None, min_length=1)
+    max_concurrency: Optional[int] = Field(None, ge=1, le=50)
+    is_active: Optional[bool] = None
+
+
+class WebhookEndpoint(BaseModel):
+    """Schema for webhook endpoint response"""
+    id: UUID
+    affiliate_id: Optional[UUID] = None
+    program_id: Optional[UUID] = None
+    url: str
+    event_types: List[WebhookEventType]
+    max_concurrency: int
+    is_active: bool
+    created_at: datetime
+    updated_at: datetime
+
+    class Config:
+        from_attributes = True
+
+
+class WebhookEndpointWithSecret(WebhookEndpoint):
+    """Schema for a newly registered endpoint, the only response carrying its secret"""
+    secret: str
+
+
+class WebhookDelivery(BaseModel):
+    """Schema for webhook delivery response"""
+    id: UUID
+    event_id: UUID
+    endpoint_id: UUID
+    status: WebhookDeliveryStatus
+    attempts: int
+    next_attempt_at: datetime
+    last_status_code: Optional[int] = None
+    last_error: Optional[str] = None
+    delivered_at: Optional[datetime] = None
+    created_at: datetime
+
+    class Config:
+        from_attributes = True
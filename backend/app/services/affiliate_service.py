@@ -1,39 +1,12 @@
 """
 Affiliate Service - Business logic for affiliate operations
 """
-import secrets
-import string
 from typing import Optional
 from sqlalchemy.orm import Session
 
 from app.models.affiliate import AffiliateProfile, AffiliateTier
 from app.models.user import User
-
-
-def generate_affiliate_code(length: int = 10) -> str:
-    """
-    Generate a unique affiliate code
-    Format: AFF-XXXXXXXXXX
-    """
-    characters = string.ascii_uppercase + string.digits
-    code = ''.join(secrets.choice(characters) for _ in range(length))
-    return f"AFF-{code}"
-
-
-def ensure_unique_affiliate_code(db: Session, max_attempts: int = 10) -> str:
-    """
-    Generate a unique affiliate code that doesn't exist in the database
-    """
-    for _ in range(max_attempts):
-        code = generate_affiliate_code()
-        existing = db.query(AffiliateProfile).filter(
-            AffiliateProfile.affiliate_code == code
-        ).first()
-        if not existing:
-            return code
-
-    # Fallback to a longer code if all attempts failed
-    return generate_affiliate_code(length=15)
+from app.services.code_service import AFFILIATE_CODES, insert_with_codes
 
 
 def get_default_tier(db: Session) -> Optional[AffiliateTier]:
@@ -53,19 +26,13 @@ def create_affiliate_profile(
     """
     Create an affiliate profile for a user
     """
-    affiliate_code = ensure_unique_affiliate_code(db)
-
-    profile = AffiliateProfile(
-        user_id=user.id,
-        affiliate_code=affiliate_code,
-        company_name=company_name,
-        website_url=website_url,
-        social_media=social_media or {},
-    )
-
-    db.add(profile)
+    profile = insert_with_codes(db, AffiliateProfile, "affiliate_code", [{
+        "user_id": user.id,
+        "company_name": company_name,
+        "website_url": website_url,
+        "social_media": social_media or {},
+    }], AFFILIATE_CODES)[0]
     db.commit()
-    db.refresh(profile)
 
     return profile
 
@@ -0,0 +1,213 @@
+"""
+Attribution Service - Last-click attribution of conversions to referral clicks
+
+A conversion is credited to the most recent click from the same visitor
+session on a link of the same program, within the attribution (cookie) window.
+The lookup is backed by the covering index
+``referral_clicks (visitor_session_id, clicked_at DESC) INCLUDE (referral_link_id)``.
+"""
+from collections import Counter, defaultdict
+from datetime import datetime, timedelta
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
+from sqlalchemy import bindparam, or_, update
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.models.conversion import Conversion, ConversionStatus
+from app.models.referral import ReferralLink, ReferralClick, ReferralLinkStatus
+from app.services.referral_service import is_link_expired
+
+
+def get_attribution_window(window_days: Optional[int] = None) -> timedelta:
+    """
+    Get the attribution window, defaulting to ATTRIBUTION_WINDOW_DAYS
+    """
+    return timedelta(days=window_days if window_days is not None else settings.ATTRIBUTION_WINDOW_DAYS)
+
+
+def resolve_last_click_link(
+    db: Session,
+    visitor_session_id,
+    program_id,
+    converted_at: Optional[datetime] = None,
+    window_days: Optional[int] = None,
+) -> Optional[ReferralLink]:
+    """
+    Get the active referral link of the session's most recent qualifying click
+
+    Only clicks on links of the given program, no later than the conversion and
+    no older than the attribution window, qualify.
+    """
+    converted_at = converted_at or datetime.utcnow()
+    window_start = converted_at - get_attribution_window(window_days)
+
+    return db.query(ReferralLink).join(
+        ReferralClick, ReferralClick.referral_link_id == ReferralLink.id
+    ).filter(
+        ReferralClick.visitor_session_id == visitor_session_id,
+        ReferralClick.clicked_at <= converted_at,
+        ReferralClick.clicked_at >= window_start,
+        ReferralLink.program_id == program_id,
+        ReferralLink.status == ReferralLinkStatus.ACTIVE,
+        or_(ReferralLink.expires_at.is_(None), ReferralLink.expires_at > converted_at),
+    ).order_by(ReferralClick.clicked_at.desc()).limit(1).first()
+
+
+def resolve_last_click_links(
+    db: Session,
+    conversions: Sequence[Tuple],
+    window_days: Optional[int] = None,
+) -> List[Optional[ReferralLink]]:
+    """
+    Resolve ``resolve_last_click_link`` for many conversions with one query
+
+    Takes (visitor_session_id, program_id, converted_at) tuples and returns
+    the attributed link of each, in order (None where no click qualifies).
+    """
+    if not conversions:
+        return []
+
+    window = get_attribution_window(window_days)
+    rows = db.query(
+        ReferralLink, ReferralClick.visitor_session_id, ReferralClick.clicked_at
+    ).join(
+        ReferralClick, ReferralClick.referral_link_id == ReferralLink.id
+    ).filter(
+        ReferralClick.visitor_session_id.in_({session_id for session_id, _, _ in conversions}),
+        ReferralClick.clicked_at <= max(converted_at for _, _, converted_at in conversions),
+        ReferralClick.clicked_at >= min(converted_at for _, _, converted_at in conversions) - window,
+        ReferralLink.program_id.in_({program_id for _, program_id, _ in conversions}),
+        ReferralLink.status == ReferralLinkStatus.ACTIVE,
+    ).order_by(ReferralClick.clicked_at.desc()).all()
+
+    clicks = defaultdict(list)
+    for link, session_id, clicked_at in rows:
+        clicks[(session_id, link.program_id)].append((clicked_at, link))
+
+    return [
+        next(
+            (
+                link
+                for clicked_at, link in clicks.get((session_id, program_id), ())
+                if converted_at - window <= clicked_at <= converted_at
+                and not is_link_expired(link.expires_at, converted_at)
+            ),
+            None,
+        )
+        for session_id, program_id, converted_at in conversions
+    ]
+
+
+def load_session_click_map(
+    db: Session,
+    conversions: Sequence[Conversion],
+    window_days: Optional[int] = None,
+) -> Dict:
+    """
+    Resolve the last qualifying click for a chunk of conversions in one query
+
+    Applies the same rules as ``resolve_last_click_link`` (active, unexpired
+    links of the conversion's program within the window). Returns a map of
+    conversion ID -> (referral_link_id, affiliate_id) for the conversions
+    that have a qualifying click.
+    """
+    links = resolve_last_click_links(
+        db,
+        [(c.visitor_session_id, c.program_id, c.converted_at) for c in conversions],
+        window_days,
+    )
+    return {
+        conversion.id: (link.id, link.affiliate_id)
+        for conversion, link in zip(conversions, links)
+        if link is not None
+    }
+
+
+def iter_conversion_chunks(
+    db: Session,
+    since: datetime,
+    until: Optional[datetime] = None,
+    statuses: Sequence[ConversionStatus] = (ConversionStatus.PENDING,),
+    chunk_size: int = 1000,
+) -> Iterator[List[Conversion]]:
+    """
+    Stream conversions in a time range as keyset-paginated chunks
+    """
+    until = until or datetime.utcnow()
+    last_id = None
+
+    while True:
+        query = db.query(Conversion).filter(
+            Conversion.converted_at >= since,
+            Conversion.converted_at <= until,
+            Conversion.status.in_(statuses),
+        )
+        if last_id is not None:
+            query = query.filter(Conversion.id > last_id)
+
+        chunk = query.order_by(Conversion.id).limit(chunk_size).all()
+        if not chunk:
+            return
+
+        last_id = chunk[-1].id
+        yield chunk
+
+
+def reattribute_conversions(
+    db: Session,
+    since: datetime,
+    until: Optional[datetime] = None,
+    chunk_size: int = 1000,
+    window_days: Optional[int] = None,
+) -> Tuple[int, int]:
+    """
+    Re-run last-click attribution over pending conversions in a time range
+
+    Only PENDING conversions are touched, since they have no commission yet.
+    Each chunk is resolved with one query and updated with one bulk UPDATE.
+    Returns (conversions scanned, conversions re-attributed).
+    """
+    scanned = 0
+    changed = 0
+
+    for chunk in iter_conversion_chunks(db, since, until, chunk_size=chunk_size):
+        scanned += len(chunk)
+        click_map = load_session_click_map(db, chunk, window_days)
+
+        updates = []
+        count_deltas = Counter()
+        for conversion in chunk:
+            attributed = click_map.get(conversion.id)
+            if attributed and attributed[0] != conversion.referral_link_id:
+                updates.append({
+                    "id": conversion.id,
+                    "referral_link_id": attributed[0],
+                    "affiliate_id": attributed[1],
+                })
+                count_deltas[conversion.referral_link_id] -= 1
+                count_deltas[attributed[0]] += 1
+
+        if updates:
+            db.execute(update(Conversion), updates)
+            changed += len(updates)
+
+        # Move the cached conversion counts along with the conversions
+        count_updates = [
+            {"link_id": link_id, "delta": delta} for link_id, delta in count_deltas.items() if delta
+        ]
+        if count_updates:
+            links = ReferralLink.__table__
+            db.execute(
+                update(links).where(
+                    links.c.id == bindparam("link_id")
+                ).values(
+                    conversions_count=links.c.conversions_count + bindparam("delta")
+                ),
+                count_updates,
+            )
+
+        db.commit()
+        # Drop the chunk from the identity map before loading the next one
+        db.expunge_all()
+
+    return scanned, changed
@@ -0,0 +1,163 @@
+"""
+Click Queue - Deferred click ingestion
+
+The redirect service records a click by appending a small JSON event to a
+Redis list and answering straight away; the ``ingest_clicks_job`` worker job
+drains the list in batches, resolves geo data and writes the clicks with one
+multi-row INSERT plus one counter UPDATE per link.
+
+Draining reads a batch with LRANGE and only trims it after the database
+commit, so a worker crash re-delivers the batch rather than losing it
+(at-least-once; a crash between commit and trim can duplicate one batch).
+Two drains reading the same head would insert it twice and then trim clicks
+neither wrote, so a drain holds the ``<queue>:drain`` Redis lock; arq only
+dedupes a cron job per slot, so a slow drain can overlap the next one.
+
+Clicks on links deleted since the redirect are dropped. A batch that still
+fails ``CLICK_INGEST_MAX_ATTEMPTS`` drains in a row is moved to the
+``<queue>:dead`` list so it stops blocking the queue.
+"""
+import logging
+from collections import Counter
+from datetime import datetime
+from typing import Optional
+from uuid import UUID
+
+import orjson
+import redis
+from sqlalchemy import bindparam, insert, select, update
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.core.metrics import CLICKS_INGESTED
+from app.core.redis import get_async_redis, get_redis
+from app.core.serialization import dumps
+from app.models.referral import ReferralClick, ReferralLink
+from app.services.geo_service import resolve_geo_location
+from app.services.live_events import clicks_event, publish_live_events
+
+logger = logging.getLogger(__name__)
+
+
+def click_event(
+    referral_link_id: UUID,
+    visitor_session_id: UUID,
+    ip_address: Optional[str] = None,
+    user_agent: Optional[str] = None,
+    referrer_url: Optional[str] = None,
+    clicked_at: Optional[datetime] = None,
+) -> dict:
+    """
+    Build a queued click event
+    """
+    return {
+        "referral_link_id": str(referral_link_id),
+        "visitor_session_id": str(visitor_session_id),
+        "ip_address": ip_address,
+        "user_agent": user_agent,
+        "referrer_url": referrer_url,
+        "clicked_at": (clicked_at or datetime.utcnow()).isoformat(),
+    }
+
+
+async def enqueue_click(event: dict) -> None:
+    """
+    Append a click event to the ingestion queue
+    """
+    await get_async_redis().rpush(settings.CLICK_QUEUE_KEY, dumps(event))
+    CLICKS_INGESTED.inc()
+
+
+def record_clicks(db: Session, events: list) -> int:
+    """
+    Write click events with one INSERT and one counter UPDATE per link, then commit
+    Events for links that no longer exist are dropped. Publishes one live
+    event per link with its click count.
+    """
+    if not events:
+        return 0
+
+    links = ReferralLink.__table__
+    link_ids = {UUID(event["referral_link_id"]) for event in events}
+    owners = dict(db.execute(select(links.c.id, links.c.affiliate_id).where(links.c.id.in_(link_ids))).all())
+
+    rows = [
+        {
+            "referral_link_id": UUID(event["referral_link_id"]),
+            "visitor_session_id": UUID(event["visitor_session_id"]),
+            "ip_address": event.get("ip_address"),
+            "user_agent": event.get("user_agent"),
+            "referrer_url": event.get("referrer_url"),
+            "geo_location": resolve_geo_location(event.get("ip_address")),
+            "clicked_at": datetime.fromisoformat(event["clicked_at"]),
+        }
+        for event in events
+        if UUID(event["referral_link_id"]) in owners
+    ]
+    if not rows:
+        return 0
+    db.execute(insert(ReferralClick), rows)
+
+    per_link = Counter(row["referral_link_id"] for row in rows)
+    db.execute(
+        update(links).where(links.c.id == bindparam("link_id")).values(
+            clicks_count=links.c.clicks_count + bindparam("clicks")
+        ),
+        [{"link_id": link_id, "clicks": clicks} for link_id, clicks in per_link.items()],
+    )
+    db.commit()
+
+    publish_live_events([clicks_event(owners[link_id], link_id, clicks) for link_id, clicks in per_link.items()])
+    return len(rows)
+
+
+def drain_clicks(db: Session, batch_size: Optional[int] = None, max_batches: int = 100) -> int:
+    """
+    Move queued clicks into the database, a batch at a time
+    Returns the number of clicks written (0 while another drain holds the lock).
+    """
+    batch_size = batch_size or settings.CLICK_INGEST_BATCH_SIZE
+    key = settings.CLICK_QUEUE_KEY
+    failures_key = f"{key}:failures"
+    client = get_redis()
+    lock = client.lock(f"{key}:drain", timeout=settings.CLICK_DRAIN_LOCK_SECONDS)
+    if not lock.acquire(blocking=False):
+        return 0
+
+    written = 0
+    try:
+        for _ in range(max_batches):
+            raw = client.lrange(key, 0, batch_size - 1)
+            if not raw:
+                break
+
+            pipe = client.pipeline()
+            try:
+                written += record_clicks(db, [orjson.loads(item) for item in raw])
+            except Exception:
+                db.rollback()
+                attempts = client.incr(failures_key)
+                if attempts < settings.CLICK_INGEST_MAX_ATTEMPTS:
+                    raise
+                logger.exception("Moving %d clicks to %s:dead after %d failed drains", len(raw), key, attempts)
+                pipe.rpush(f"{key}:dead", *raw)
+            pipe.ltrim(key, len(raw), -1)
+            pipe.delete(failures_key)
+            pipe.execute()
+
+            if len(raw) < batch_size:
+                break
+            try:
+                # Renew the lease for the next batch
+                lock.reacquire()
+            except redis.exceptions.LockError:
+                # Lease ran out mid-batch: another drain may own the queue now
+                break
+    finally:
+        try:
+            lock.release()
+        except redis.exceptions.LockError:
+            # Expired mid-drain; the next drain re-reads anything not trimmed
+            pass
+
+    return written
@@ -0,0 +1,192 @@
+"""
+Code Service - Unique short codes for referral links and affiliates
+
+Codes are derived from Postgres sequences instead of drawn at random and
+probed: each sequence value is run through a keyed Feistel permutation (so
+codes are unique yet not guessable from their neighbours) and base36-encoded
+to a fixed length. A permutation of a unique value is unique, so no read
+probes are needed.
+
+Sequence values are fetched in batches (one ``nextval`` round trip for a
+whole batch) and kept in a per-process pool, so a single link costs no extra
+query most of the time and a bulk creation one query for all its codes.
+
+Codes issued before this scheme were random strings of the same alphabet, so
+a derived code can still, very rarely, equal an old one; inserts use
+``ON CONFLICT DO NOTHING`` on the code column and retry the rows that
+conflicted with fresh codes. On databases without sequences (the SQLite test
+suite) values are drawn at random and the same retry keeps them unique.
+"""
+import hashlib
+import secrets
+import string
+import threading
+from collections import deque
+from typing import Dict, List, NamedTuple
+
+from sqlalchemy import func, select
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.database import dialect_insert
+
+MAX_INSERT_ATTEMPTS = 5
+
+
+class CodeSpace(NamedTuple):
+    """Format of one kind of code and the sequence it is derived from"""
+    sequence: str
+    bits: int  # Even; alphabet ** length must be at least 2 ** bits
+    length: int
+    alphabet: str
+    prefix: str = ""
+
+
+LINK_CODES = CodeSpace(
+    sequence="referral_link_code_seq",
+    bits=40,
+    length=8,
+    alphabet=string.ascii_lowercase + string.digits,
+)
+AFFILIATE_CODES = CodeSpace(
+    sequence="affiliate_code_seq",
+    bits=50,
+    length=10,
+    alphabet=string.ascii_uppercase + string.digits,
+    prefix="AFF-",
+)
+
+_FEISTEL_ROUNDS = 4
+
+
+def _permutation_key(space: CodeSpace) -> bytes:
+    return hashlib.blake2b(
+        f"{space.sequence}:{settings.SECRET_KEY}".encode(), digest_size=32
+    ).digest()
+
+
+def permute(value: int, bits: int, key: bytes) -> int:
+    """
+    Map ``value`` to a unique pseudo-random value in [0, 2 ** bits)
+    A balanced Feistel network, which is a bijection whatever the round function.
+    """
+    half = bits // 2
+    mask = (1 << half) - 1
+    left, right = value >> half, value & mask
+    for round_number in range(_FEISTEL_ROUNDS):
+        digest = hashlib.blake2b(
+            right.to_bytes(8, "big"), key=key, salt=bytes([round_number]) * 16, digest_size=8
+        ).digest()
+        left, right = right, left ^ (int.from_bytes(digest, "big") & mask)
+    return (left << half) | right
+
+
+def encode(value: int, space: CodeSpace) -> str:
+    """
+    Encode a value as a fixed-length code in the space's alphabet
+    """
+    base = len(space.alphabet)
+    chars = []
+    for _ in range(space.length):
+        value, digit = divmod(value, base)
+        chars.append(space.alphabet[digit])
+    return space.prefix + "".join(reversed(chars))
+
+
+def code_for(value: int, space: CodeSpace) -> str:
+    """
+    Get the code for a sequence value
+    """
+    return encode(permute(value, space.bits, _permutation_key(space)), space)
+
+
+def _codes_for(values: List[int], space: CodeSpace) -> List[str]:
+    key = _permutation_key(space)
+    return [encode(permute(value, space.bits, key), space) for value in values]
+
+
+def _fetch_values(db: Session, space: CodeSpace, count: int) -> List[int]:
+    """Reserve ``count`` sequence values in one round trip"""
+    if db.get_bind().dialect.name != "postgresql":
+        return [secrets.randbelow(1 << space.bits) for _ in range(count)]
+    return list(db.scalars(
+        select(func.nextval(space.sequence)).select_from(func.generate_series(1, count))
+    ))
+
+
+class CodePool:
+    """Sequence values reserved ahead of time for one code space"""
+
+    def __init__(self, space: CodeSpace):
+        self.space = space
+        self._values = deque()
+        self._lock = threading.Lock()
+
+    def take(self, db: Session, count: int) -> List[int]:
+        """
+        Take ``count`` values, refilling from the database at most once
+        """
+        with self._lock:
+            taken = [self._values.popleft() for _ in range(min(count, len(self._values)))]
+
+        missing = count - len(taken)
+        if missing:
+            fetched = _fetch_values(db, self.space, missing + settings.CODE_POOL_SIZE)
+            taken.extend(fetched[:missing])
+            with self._lock:
+                self._values.extend(fetched[missing:])
+        return taken
+
+    def clear(self) -> None:
+        with self._lock:
+            self._values.clear()
+
+
+_pools: Dict[str, CodePool] = {}
+_pools_lock = threading.Lock()
+
+
+def _get_pool(space: CodeSpace) -> CodePool:
+    with _pools_lock:
+        if space.sequence not in _pools:
+            _pools[space.sequence] = CodePool(space)
+        return _pools[space.sequence]
+
+
+def allocate_codes(db: Session, space: CodeSpace, count: int) -> List[str]:
+    """
+    Allocate ``count`` new codes
+    """
+    return _codes_for(_get_pool(space).take(db, count), space)
+
+
+def insert_with_codes(db: Session, model, code_column: str, rows: List[dict], space: CodeSpace) -> list:
+    """
+    Insert rows with freshly allocated codes using multi-row INSERTs
+    Rows whose code already exists are retried with new codes. Returns the
+    inserted objects (in no particular order). Does not commit: the caller owns
+    the transaction.
+    """
+    inserted = []
+    pending = rows
+    for _ in range(MAX_INSERT_ATTEMPTS):
+        if not pending:
+            return inserted
+
+        values = [
+            {**row, code_column: code}
+            for row, code in zip(pending, allocate_codes(db, space, len(pending)))
+        ]
+        # ORM bulk insert: sent as multi-row INSERT ... RETURNING pages
+        stmt = dialect_insert(db, model).on_conflict_do_nothing(
+            index_elements=[code_column]
+        ).returning(model)
+        created = db.scalars(stmt, values).all()
+        inserted.extend(created)
+
+        created_codes = {getattr(obj, code_column) for obj in created}
+        pending = [row for row in values if row[code_column] not in created_codes]
+
+    if pending:
+        raise RuntimeError(f"Could not allocate unique {code_column} values for {len(pending)} rows")
+    return inserted
@@ -2,12 +2,18 @@
 Commission Service - Business logic for commission calculations
 """
 from decimal import Decimal
-from typing import Optional
+from typing import Dict, Iterable, List, NamedTuple, Optional, Sequence, Tuple
+from uuid import UUID
+from sqlalchemy import insert
 from sqlalchemy.orm import Session
 
 from app.models.conversion import Conversion, Commission, CommissionStatus
 from app.models.affiliate import AffiliateProfile, AffiliateTier
 from app.models.program import AffiliateProgram
+from app.models.webhook import WebhookEventType
+from app.services.dashboard_service import invalidate_dashboards
+from app.services.live_events import commission_event, publish_live_events
+from app.services.webhook_service import record_event
 
 
 def calculate_base_commission(
@@ -64,39 +70,92 @@ def get_tier_multiplier(tier: Optional[AffiliateTier]) -> Decimal:
     return Decimal("1.0")
 
 
-def create_commission_for_conversion(
+class CommissionContext(NamedTuple):
+    """Program rule and affiliate tier needed to price a commission"""
+    commission_config: dict
+    tier_id: Optional[UUID]
+    commission_multiplier: Optional[Decimal]
+
+
+def load_commission_context(
     db: Session,
-    conversion: Conversion,
-    affiliate: AffiliateProfile,
-    program: AffiliateProgram
-) -> Commission:
+    affiliate_id,
+    program_id,
+) -> Optional[CommissionContext]:
     """
-    Create a commission record for a validated conversion
-    Automatically calculates commission based on program rules and affiliate tier
+    Fetch the program's commission rule and the affiliate's tier in one joined query
+    """
+    row = db.query(
+        AffiliateProgram.commission_config,
+        AffiliateProfile.tier_id,
+        AffiliateTier.commission_multiplier,
+    ).select_from(AffiliateProfile).join(
+        AffiliateProgram, AffiliateProgram.id == program_id
+    ).outerjoin(
+        AffiliateTier, AffiliateTier.id == AffiliateProfile.tier_id
+    ).filter(
+        AffiliateProfile.id == affiliate_id
+    ).first()
+
+    return CommissionContext(*row) if row else None
+
+
+def load_commission_contexts(db: Session, pairs: Iterable[Tuple]) -> Dict[Tuple, CommissionContext]:
+    """
+    Fetch the pricing context of many (affiliate_id, program_id) pairs in one query
+    Pairs whose affiliate or program no longer exists are left out.
+    """
+    pairs = set(pairs)
+    if not pairs:
+        return {}
+
+    rows = db.query(
+        AffiliateProfile.id,
+        AffiliateProgram.id,
+        AffiliateProgram.commission_config,
+        AffiliateProfile.tier_id,
+        AffiliateTier.commission_multiplier,
+    ).select_from(AffiliateProfile).join(
+        AffiliateProgram, AffiliateProgram.id.in_({program_id for _, program_id in pairs})
+    ).outerjoin(
+        AffiliateTier, AffiliateTier.id == AffiliateProfile.tier_id
+    ).filter(
+        AffiliateProfile.id.in_({affiliate_id for affiliate_id, _ in pairs})
+    ).all()
+
+    return {
+        (affiliate_id, program_id): CommissionContext(*context)
+        for affiliate_id, program_id, *context in rows
+        if (affiliate_id, program_id) in pairs
+    }
+
+
+def commission_values(conversion: Conversion, context: CommissionContext) -> dict:
+    """
+    Price the commission of a validated conversion
+    Returns the column values of its (PENDING) commission row.
     """
-    # Get commission configuration
-    commission_config = program.commission_config
-
     # Calculate base commission
     base_amount = calculate_base_commission(
         conversion.conversion_value,
-        commission_config
+        context.commission_config
     )
 
     # Get tier multiplier
-    tier = affiliate.tier if affiliate.tier_id else None
-    tier_multiplier = get_tier_multiplier(tier)
+    if context.commission_multiplier is not None:
+        tier_multiplier = Decimal(str(context.commission_multiplier))
+    else:
+        tier_multiplier = get_tier_multiplier(None)
 
     # Calculate final amount
     final_amount = base_amount * tier_multiplier
 
-    # Create commission record
-    commission = Commission(
+    return dict(
         conversion_id=conversion.id,
-        affiliate_id=affiliate.id,
-        program_id=program.id,
-        tier_id=affiliate.tier_id,
-        commission_rule=commission_config,  # Snapshot of rule
+        affiliate_id=conversion.affiliate_id,
+        program_id=conversion.program_id,
+        tier_id=context.tier_id,
+        commission_rule=context.commission_config,  # Snapshot of rule
         base_amount=base_amount,
         tier_multiplier=tier_multiplier,
         final_amount=final_amount,
@@ -104,11 +163,43 @@ def create_commission_for_conversion(
         status=CommissionStatus.PENDING,
     )
 
-    db.add(commission)
-    db.commit()
-    db.refresh(commission)
 
-    return commission
+def create_commission_for_conversion(
+    db: Session,
+    conversion: Conversion,
+    context: Optional[CommissionContext] = None,
+) -> Optional[Commission]:
+    """
+    Create a commission record for a validated conversion
+    Automatically calculates commission based on program rules and affiliate tier
+
+    Does not commit: the caller owns the transaction. Returns None when the
+    affiliate or program no longer exists.
+    """
+    if context is None:
+        context = load_commission_context(db, conversion.affiliate_id, conversion.program_id)
+        if context is None:
+            return None
+
+    return db.scalars(
+        insert(Commission).values(**commission_values(conversion, context)).returning(Commission)
+    ).one()
+
+
+def create_commissions_for_conversions(db: Session, conversions: Sequence[Conversion]) -> List[Commission]:
+    """
+    Create the commissions of many validated conversions with one context query and one INSERT
+    Does not commit.
+    """
+    contexts = load_commission_contexts(db, {(c.affiliate_id, c.program_id) for c in conversions})
+    rows = [
+        commission_values(conversion, contexts[(conversion.affiliate_id, conversion.program_id)])
+        for conversion in conversions
+        if (conversion.affiliate_id, conversion.program_id) in contexts
+    ]
+    if not rows:
+        return []
+    return db.scalars(insert(Commission).returning(Commission), rows).all()
 
 
 def approve_commission(
@@ -124,9 +215,11 @@ def approve_commission(
     commission.status = CommissionStatus.APPROVED
     commission.approved_by = admin_user_id
     commission.approved_at = datetime.utcnow()
+    record_event(db, WebhookEventType.COMMISSION_APPROVED, commission)
 
     db.commit()
     db.refresh(commission)
+    publish_live_events([commission_event(commission)])
 
     return commission
 
@@ -147,6 +240,7 @@ def reject_commission(
 
     db.commit()
     db.refresh(commission)
+    invalidate_dashboards([commission.affiliate_id])
 
     return commission
 
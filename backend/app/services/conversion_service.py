@@ -1,17 +1,58 @@
 """
 Conversion Service - Business logic for conversion tracking
+
+Each business operation runs in one transaction: rows are written with
+INSERT/UPDATE ... RETURNING instead of commit-then-refresh, and the commission
+pricing context (program rule + affiliate tier) is fetched with one joined query.
 """
 from decimal import Decimal
 from typing import Optional
 from sqlalchemy.orm import Session
 from datetime import datetime
 
-from app.models.conversion import Conversion, ConversionType, ConversionStatus
+from app.core.metrics import CONVERSIONS_INGESTED
+from app.database import dialect_insert
+from app.models.conversion import Conversion, ConversionType, ConversionStatus, CommissionStatus
 from app.models.referral import ReferralLink
-from app.models.affiliate import AffiliateProfile
-from app.models.program import AffiliateProgram
+from app.models.webhook import WebhookEventType
 from app.services.commission_service import create_commission_for_conversion
+from app.services.dashboard_service import invalidate_dashboards
+from app.services.leaderboard_service import record_conversion_scores
+from app.services.live_events import commission_event, conversion_event, publish_live_events
 from app.services.referral_service import increment_conversion_count
+from app.services.webhook_service import record_event
+
+
+def resolve_idempotency_key(
+    idempotency_key: Optional[str],
+    conversion_metadata: Optional[dict] = None,
+) -> Optional[str]:
+    """
+    Pick the dedupe key for a conversion
+    An explicit key (header or field) wins, otherwise the merchant's order ID is used
+    """
+    if idempotency_key:
+        return idempotency_key
+
+    order_id = (conversion_metadata or {}).get("order_id")
+    if order_id not in (None, ""):
+        return f"order:{order_id}"
+
+    return None
+
+
+def get_conversion_by_idempotency_key(
+    db: Session,
+    program_id,
+    idempotency_key: str,
+) -> Optional[Conversion]:
+    """
+    Get the conversion already recorded for a program under an idempotency key
+    """
+    return db.query(Conversion).filter(
+        Conversion.program_id == program_id,
+        Conversion.idempotency_key == idempotency_key,
+    ).first()
 
 
 def create_conversion(
@@ -23,6 +64,7 @@ def create_conversion(
     customer_id: Optional[str] = None,
     conversion_metadata: Optional[dict] = None,
     auto_validate: bool = False,
+    idempotency_key: Optional[str] = None,
 ) -> Conversion:
     """
     Create a new conversion record
@@ -36,8 +78,10 @@ def create_conversion(
         customer_id: Optional customer/user ID
         conversion_metadata: Additional conversion data
         auto_validate: Automatically validate and create commission
+        idempotency_key: Dedupe key; a replay returns the original conversion
+            without counting it or creating a commission again
     """
-    conversion = Conversion(
+    insert_stmt = dialect_insert(db, Conversion).values(
         referral_link_id=referral_link.id,
         affiliate_id=referral_link.affiliate_id,
         program_id=referral_link.program_id,
@@ -46,28 +90,38 @@ def create_conversion(
         visitor_session_id=visitor_session_id,
         conversion_value=conversion_value,
         conversion_metadata=conversion_metadata or {},
+        idempotency_key=idempotency_key,
         status=ConversionStatus.VALIDATED if auto_validate else ConversionStatus.PENDING,
     )
 
-    db.add(conversion)
-    db.commit()
-    db.refresh(conversion)
+    if idempotency_key:
+        # Concurrent retries block on the unique index and then insert nothing
+        insert_stmt = insert_stmt.on_conflict_do_nothing(
+            index_elements=[Conversion.program_id, Conversion.idempotency_key],
+            index_where=Conversion.idempotency_key.isnot(None),
+        )
+
+    conversion = db.scalars(insert_stmt.returning(Conversion)).first()
+
+    if conversion is None:
+        # Replay: hand back the original without running the commission path
+        CONVERSIONS_INGESTED.labels("duplicate").inc()
+        return get_conversion_by_idempotency_key(db, referral_link.program_id, idempotency_key)
 
     # Increment conversion count on referral link
     increment_conversion_count(db, referral_link)
 
     # Auto-create commission if validated
+    commission = None
     if auto_validate:
-        affiliate = db.query(AffiliateProfile).filter(
-            AffiliateProfile.id == referral_link.affiliate_id
-        ).first()
-        program = db.query(AffiliateProgram).filter(
-            AffiliateProgram.id == referral_link.program_id
-        ).first()
-
-        if affiliate and program:
-            create_commission_for_conversion(db, conversion, affiliate, program)
+        commission = create_commission_for_conversion(db, conversion)
+        record_event(db, WebhookEventType.CONVERSION_VALIDATED, conversion)
 
+    db.commit()
+    CONVERSIONS_INGESTED.labels("created").inc()
+    publish_live_events([conversion_event(conversion)] + ([commission_event(commission)] if commission else []))
+    if auto_validate:
+        record_conversion_scores([conversion], [commission] if commission else [])
     return conversion
 
 
@@ -83,20 +137,13 @@ def validate_conversion(
 
     conversion.status = ConversionStatus.VALIDATED
     conversion.validated_at = datetime.utcnow()
-    db.commit()
-    db.refresh(conversion)
 
-    # Get affiliate and program
-    affiliate = db.query(AffiliateProfile).filter(
-        AffiliateProfile.id == conversion.affiliate_id
-    ).first()
-    program = db.query(AffiliateProgram).filter(
-        AffiliateProgram.id == conversion.program_id
-    ).first()
-
-    if affiliate and program:
-        create_commission_for_conversion(db, conversion, affiliate, program)
+    commission = create_commission_for_conversion(db, conversion)
+    record_event(db, WebhookEventType.CONVERSION_VALIDATED, conversion)
 
+    db.commit()
+    publish_live_events([conversion_event(conversion)] + ([commission_event(commission)] if commission else []))
+    record_conversion_scores([conversion], [commission] if commission else [])
     return conversion
 
 
@@ -109,7 +156,6 @@ def reject_conversion(
     """
     conversion.status = ConversionStatus.REJECTED
     db.commit()
-    db.refresh(conversion)
 
     return conversion
 
@@ -123,13 +169,11 @@ def reverse_conversion(
     This will also reject any associated commission
     """
     conversion.status = ConversionStatus.REVERSED
-    db.commit()
 
     # Reject associated commission if exists
     if conversion.commission:
-        from app.models.conversion import CommissionStatus
         conversion.commission.status = CommissionStatus.REJECTED
-        db.commit()
 
-    db.refresh(conversion)
+    db.commit()
+    invalidate_dashboards([conversion.affiliate_id])
     return conversion
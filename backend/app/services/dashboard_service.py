@@ -0,0 +1,58 @@
+"""
+Dashboard Service - Per-affiliate cache of the portal's dashboard summary
+
+``GET /affiliates/me/dashboard`` stores its serialized response under
+``<DASHBOARD_CACHE_PREFIX>:<affiliate id>`` for ``DASHBOARD_CACHE_TTL``
+seconds. Changes to conversions and commissions expire it through the live
+event hook (``publish_live_events``); profile, link, enrollment and payout
+changes call ``invalidate_dashboards`` after their commit. Click counts are
+left to the TTL: busy links would otherwise evict the cache on every click
+batch, and the live event stream already carries clicks in real time.
+
+The cache is best-effort: without Redis every request computes the summary.
+"""
+from typing import Iterable, Optional
+
+import redis
+
+from app.core.config import settings
+from app.core.redis import get_redis
+
+
+def dashboard_key(affiliate_id) -> str:
+    return f"{settings.DASHBOARD_CACHE_PREFIX}:{affiliate_id}"
+
+
+def get_cached_dashboard(affiliate_id) -> Optional[bytes]:
+    """
+    The cached dashboard JSON of an affiliate, or None
+    """
+    try:
+        return get_redis().get(dashboard_key(affiliate_id))
+    except redis.RedisError:
+        return None
+
+
+def cache_dashboard(affiliate_id, content: bytes) -> None:
+    try:
+        get_redis().set(dashboard_key(affiliate_id), content, ex=settings.DASHBOARD_CACHE_TTL)
+    except redis.RedisError:
+        pass
+
+
+def invalidate_dashboards(affiliate_ids: Iterable, client=None) -> None:
+    """
+    Expire the cached dashboards of affiliates
+    Call after the commit. Queues the DEL on ``client`` (e.g. a pipeline)
+    when given, otherwise never raises.
+    """
+    keys = [dashboard_key(affiliate_id) for affiliate_id in set(map(str, affiliate_ids))]
+    if not keys:
+        return
+    if client is not None:
+        client.delete(*keys)
+        return
+    try:
+        get_redis().delete(*keys)
+    except redis.RedisError:
+        pass
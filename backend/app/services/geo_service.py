@@ -0,0 +1,219 @@
+"""
+Geo Service - Offline IP-to-country resolution for click enrichment
+
+The geo database is a compact binary file compiled from a CSV of IP ranges
+(``start_ip,end_ip,country_code``, the DB-IP / IP2Location "lite" layout) by
+``build_geo_db.py``. At runtime the file is memory-mapped read-only, so every
+uvicorn worker on the host shares the same physical pages, and lookups are a
+binary search over sorted integer arrays - no network calls.
+
+File layout (native byte order, every section padded to 8 bytes):
+    header     magic, byte order, v4 count, v6 count, country count
+    v4 starts  uint32[v4 count]
+    v4 ends    uint32[v4 count]
+    v4 country uint16[v4 count]
+    v6 starts  uint64[v6 count] high halves, then uint64[v6 count] low halves
+    v6 ends    uint64[v6 count] high halves, then uint64[v6 count] low halves
+    v6 country uint16[v6 count]
+    countries  char[2][country count]
+"""
+import csv
+import ipaddress
+import mmap
+import struct
+import sys
+from array import array
+from bisect import bisect_right
+from functools import lru_cache
+from typing import Dict, List, Optional, Tuple
+
+from app.core.config import settings
+
+GEO_DB_MAGIC = b"AFFGEO01"
+_HEADER = struct.Struct("<8s1sxxxIII")
+_ALIGN = 8
+_U64 = (1 << 64) - 1
+
+
+def _padding(size: int) -> int:
+    return -size % _ALIGN
+
+
+def build_geo_database(source_csv: str, output_path: str) -> Tuple[int, int]:
+    """
+    Compile an IP-range CSV into the binary geo database format
+
+    Rows must be ``start_ip,end_ip,country_code``; IPv4 and IPv6 rows may be
+    mixed and unsorted. Returns the number of (IPv4, IPv6) ranges written.
+    """
+    v4_rows: List[Tuple[int, int, str]] = []
+    v6_rows: List[Tuple[int, int, str]] = []
+
+    with open(source_csv, newline="", encoding="utf-8") as f:
+        for row in csv.reader(f):
+            if len(row) < 3 or row[0].startswith("#"):
+                continue
+            try:
+                start = ipaddress.ip_address(row[0].strip())
+                end = ipaddress.ip_address(row[1].strip())
+            except ValueError:
+                # Header line or malformed row
+                continue
+            if start.version != end.version:
+                continue
+            country = row[2].strip().upper()[:2]
+            target = v4_rows if start.version == 4 else v6_rows
+            target.append((int(start), int(end), country))
+
+    v4_rows.sort()
+    v6_rows.sort()
+
+    countries = sorted({c for _, _, c in v4_rows} | {c for _, _, c in v6_rows})
+    country_index = {c: i for i, c in enumerate(countries)}
+
+    sections = [
+        array("I", (r[0] for r in v4_rows)),
+        array("I", (r[1] for r in v4_rows)),
+        array("H", (country_index[r[2]] for r in v4_rows)),
+        array("Q", (r[0] >> 64 for r in v6_rows)),
+        array("Q", (r[0] & _U64 for r in v6_rows)),
+        array("Q", (r[1] >> 64 for r in v6_rows)),
+        array("Q", (r[1] & _U64 for r in v6_rows)),
+        array("H", (country_index[r[2]] for r in v6_rows)),
+    ]
+
+    byteorder = b"<" if sys.byteorder == "little" else b">"
+    with open(output_path, "wb") as f:
+        f.write(_HEADER.pack(GEO_DB_MAGIC, byteorder, len(v4_rows), len(v6_rows), len(countries)))
+        f.write(b"\0" * _padding(_HEADER.size))
+        for section in sections:
+            data = section.tobytes()
+            f.write(data)
+            f.write(b"\0" * _padding(len(data)))
+        f.write("".join(c.ljust(2) for c in countries).encode("ascii"))
+
+    return len(v4_rows), len(v6_rows)
+
+
+class _UInt128Keys:
+    """Sequence view combining high/low uint64 arrays into 128-bit keys for bisect"""
+
+    __slots__ = ("_hi", "_lo")
+
+    def __init__(self, hi: memoryview, lo: memoryview):
+        self._hi = hi
+        self._lo = lo
+
+    def __len__(self) -> int:
+        return len(self._hi)
+
+    def __getitem__(self, i: int) -> int:
+        return (self._hi[i] << 64) | self._lo[i]
+
+
+class GeoResolver:
+    """
+    Memory-mapped IP-to-country resolver
+
+    Hot IPs are served from a per-process LRU in front of the binary search.
+    """
+
+    def __init__(self, path: str, cache_size: int = 65536):
+        self.path = path
+        with open(path, "rb") as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+        magic, byteorder, n4, n6, n_countries = _HEADER.unpack_from(self._mmap, 0)
+        if magic != GEO_DB_MAGIC:
+            raise ValueError(f"{path} is not a geo database file")
+        if byteorder != (b"<" if sys.byteorder == "little" else b">"):
+            raise ValueError(f"{path} was built on a host with a different byte order")
+
+        view = memoryview(self._mmap)
+        self._views = [view]
+        offset = _HEADER.size + _padding(_HEADER.size)
+
+        def take(fmt: str, count: int) -> memoryview:
+            nonlocal offset
+            size = count * struct.calcsize(fmt)
+            section = view[offset:offset + size].cast(fmt)
+            self._views.append(section)
+            offset += size + _padding(size)
+            return section
+
+        self._v4_starts = take("I", n4)
+        self._v4_ends = take("I", n4)
+        self._v4_country = take("H", n4)
+        self._v6_starts = _UInt128Keys(take("Q", n6), take("Q", n6))
+        self._v6_ends = _UInt128Keys(take("Q", n6), take("Q", n6))
+        self._v6_country = take("H", n6)
+
+        raw_countries = bytes(view[offset:offset + 2 * n_countries]).decode("ascii")
+        self._countries = [raw_countries[i:i + 2].strip() for i in range(0, len(raw_countries), 2)]
+
+        self.country_for = lru_cache(maxsize=cache_size)(self._lookup)
+
+    def _lookup(self, ip: str) -> Optional[str]:
+        try:
+            addr = ipaddress.ip_address(ip)
+        except ValueError:
+            return None
+
+        if addr.version == 6 and addr.ipv4_mapped:
+            addr = addr.ipv4_mapped
+
+        value = int(addr)
+        if addr.version == 4:
+            starts, ends, country = self._v4_starts, self._v4_ends, self._v4_country
+        else:
+            starts, ends, country = self._v6_starts, self._v6_ends, self._v6_country
+
+        idx = bisect_right(starts, value) - 1
+        if idx >= 0 and value <= ends[idx]:
+            return self._countries[country[idx]]
+        return None
+
+    def close(self) -> None:
+        """Release the memory map"""
+        self.country_for.cache_clear()
+        for view in reversed(self._views):
+            view.release()
+        self._views = []
+        self._mmap.close()
+
+
+_resolver: Optional[GeoResolver] = None
+_resolver_loaded = False
+
+
+def get_geo_resolver() -> Optional[GeoResolver]:
+    """
+    Get the process-wide geo resolver
+    Returns None when no geo database is configured or it cannot be opened
+    """
+    global _resolver, _resolver_loaded
+
+    if not _resolver_loaded:
+        _resolver_loaded = True
+        if settings.GEOIP_DATABASE_PATH:
+            try:
+                _resolver = GeoResolver(settings.GEOIP_DATABASE_PATH, settings.GEOIP_CACHE_SIZE)
+            except (OSError, ValueError):
+                _resolver = None
+
+    return _resolver
+
+
+def resolve_geo_location(ip_address: Optional[str]) -> Dict[str, str]:
+    """
+    Build the ``ReferralClick.geo_location`` payload for an IP address
+    """
+    if not ip_address:
+        return {}
+
+    resolver = get_geo_resolver()
+    if resolver is None:
+        return {}
+
+    country = resolver.country_for(ip_address)
+    return {"country": country} if country else {}
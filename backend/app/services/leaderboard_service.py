@@ -0,0 +1,382 @@
+"""
+Leaderboard Service - Top affiliates from time-bucketed sorted sets
+
+Every validated conversion adds to three scores of its affiliate: revenue
+(conversion value), conversions (count) and commission (final amount). It
+adds them with ZINCRBY to one sorted set per metric, program scope (the
+program and "all") and period bucket (its day, ISO week and month, by
+``converted_at``):
+
+    lb:<program id | all>:<metric>:<day | week | month>:<bucket>
+
+Reads are then a ZREVRANGE (top N) or ZREVRANK/ZSCORE (rank of an affiliate)
+over one key. Trailing windows ("last 7 days") are merged with ZUNIONSTORE
+into a key cached for ``LEADERBOARD_MERGE_TTL`` seconds.
+
+Increments happen after the commit and are best-effort: the hourly
+reconciliation job rebuilds the current and previous month's buckets from
+SQL, which also takes out rejected commissions and reversed conversions.
+When Redis is unavailable, or ``LEADERBOARD_BACKEND`` is "memory", the same
+commands run against a per-process in-memory store instead.
+"""
+import enum
+import threading
+from collections import defaultdict
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+import redis
+from sqlalchemy import and_, func
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.core.redis import get_redis
+from app.models.conversion import Commission, CommissionStatus, Conversion, ConversionStatus
+
+_ALL_PROGRAMS = "all"
+
+
+class LeaderboardMetric(str, enum.Enum):
+    """What affiliates are ranked by"""
+    REVENUE = "revenue"
+    CONVERSIONS = "conversions"
+    COMMISSION = "commission"
+
+
+class LeaderboardPeriod(str, enum.Enum):
+    """Bucket size of a leaderboard"""
+    DAY = "day"
+    WEEK = "week"
+    MONTH = "month"
+
+
+def period_bucket(period: LeaderboardPeriod, day: date) -> str:
+    """
+    Name of the bucket of a period containing a day
+    """
+    if period == LeaderboardPeriod.DAY:
+        return day.isoformat()
+    if period == LeaderboardPeriod.WEEK:
+        year, week, _ = day.isocalendar()
+        return f"{year}-W{week:02d}"
+    return f"{day.year}-{day.month:02d}"
+
+
+def trailing_buckets(period: LeaderboardPeriod, window: int, today: Optional[date] = None) -> List[str]:
+    """
+    The current bucket and the ``window - 1`` before it, newest first
+    """
+    today = today or datetime.utcnow().date()
+    if period == LeaderboardPeriod.DAY:
+        days = [today - timedelta(days=i) for i in range(window)]
+    elif period == LeaderboardPeriod.WEEK:
+        days = [today - timedelta(weeks=i) for i in range(window)]
+    else:
+        days = []
+        year, month = today.year, today.month
+        for _ in range(window):
+            days.append(date(year, month, 1))
+            year, month = (year, month - 1) if month > 1 else (year - 1, 12)
+    return [period_bucket(period, day) for day in days]
+
+
+def leaderboard_key(program_id, metric: LeaderboardMetric, period: LeaderboardPeriod, bucket: str) -> str:
+    scope = str(program_id) if program_id else _ALL_PROGRAMS
+    return f"{settings.LEADERBOARD_KEY_PREFIX}:{scope}:{metric.value}:{period.value}:{bucket}"
+
+
+class MemoryLeaderboardStore:
+    """
+    Per-process stand-in for the sorted-set commands the leaderboards use
+    """
+
+    def __init__(self):
+        self._sets: Dict[str, Dict[str, float]] = defaultdict(dict)
+        self._lock = threading.RLock()
+
+    def pipeline(self, transaction: bool = True) -> "_MemoryPipeline":
+        return _MemoryPipeline(self)
+
+    def zincrby(self, key: str, amount: float, member: str) -> float:
+        with self._lock:
+            scores = self._sets[key]
+            scores[member] = scores.get(member, 0.0) + float(amount)
+            return scores[member]
+
+    def zadd(self, key: str, mapping: Dict[str, float]) -> int:
+        with self._lock:
+            self._sets[key].update({member: float(score) for member, score in mapping.items()})
+            return len(mapping)
+
+    def expire(self, key: str, seconds: int) -> bool:
+        return True
+
+    def exists(self, key: str) -> int:
+        return int(bool(self._sets.get(key)))
+
+    def delete(self, *keys: str) -> int:
+        with self._lock:
+            return sum(self._sets.pop(key, None) is not None for key in keys)
+
+    def rename(self, source: str, destination: str) -> bool:
+        with self._lock:
+            self._sets[destination] = self._sets.pop(source, {})
+            return True
+
+    def zunionstore(self, destination: str, keys: Sequence[str]) -> int:
+        with self._lock:
+            merged: Dict[str, float] = defaultdict(float)
+            for key in keys:
+                for member, score in self._sets.get(key, {}).items():
+                    merged[member] += score
+            self._sets[destination] = dict(merged)
+            return len(merged)
+
+    def _ranked(self, key: str) -> List[Tuple[str, float]]:
+        with self._lock:
+            members = list(self._sets.get(key, {}).items())
+        return sorted(members, key=lambda item: (-item[1], item[0]))
+
+    def zrevrange(self, key: str, start: int, end: int, withscores: bool = False) -> List:
+        ranked = self._ranked(key)[start:end + 1 if end >= 0 else None]
+        return [(member.encode(), score) if withscores else member.encode() for member, score in ranked]
+
+    def zrevrank(self, key: str, member: str) -> Optional[int]:
+        members = [m for m, _ in self._ranked(key)]
+        return members.index(member) if member in members else None
+
+    def zscore(self, key: str, member: str) -> Optional[float]:
+        with self._lock:
+            return self._sets.get(key, {}).get(member)
+
+
+class _MemoryPipeline:
+    """Queues memory store commands and runs them together under its lock"""
+
+    def __init__(self, store: MemoryLeaderboardStore):
+        self._store = store
+        self._commands: List[Tuple[str, tuple, dict]] = []
+
+    def __getattr__(self, name: str):
+        def queue(*args, **kwargs):
+            self._commands.append((name, args, kwargs))
+            return self
+        return queue
+
+    def execute(self) -> List:
+        with self._store._lock:
+            results = [getattr(self._store, name)(*args, **kwargs) for name, args, kwargs in self._commands]
+        self._commands = []
+        return results
+
+
+_memory_store = MemoryLeaderboardStore()
+
+
+def _stores():
+    """The stores to try in order: Redis (unless disabled), then memory"""
+    if settings.LEADERBOARD_BACKEND == "memory":
+        return [_memory_store]
+    return [get_redis(), _memory_store]
+
+
+def _run(commands):
+    """
+    Run ``commands(store)`` against Redis, falling back to the memory store
+    """
+    for store in _stores():
+        try:
+            return commands(store)
+        except redis.RedisError:
+            continue
+
+
+def record_conversion_scores(conversions: Iterable[Conversion], commissions: Iterable[Commission] = ()) -> None:
+    """
+    Add validated conversions and their commissions to the leaderboards
+    Call after the commit. Never raises.
+    """
+    converted = {}
+    increments: Dict[Tuple, Decimal] = defaultdict(Decimal)
+
+    def add(program_id, affiliate_id, converted_at: datetime, metric: LeaderboardMetric, amount) -> None:
+        for scope in (program_id, None):
+            for period in LeaderboardPeriod:
+                key = leaderboard_key(scope, metric, period, period_bucket(period, converted_at.date()))
+                increments[(key, str(affiliate_id))] += Decimal(amount)
+
+    for conversion in conversions:
+        converted[conversion.id] = conversion.converted_at
+        add(conversion.program_id, conversion.affiliate_id, conversion.converted_at, LeaderboardMetric.REVENUE, conversion.conversion_value)
+        add(conversion.program_id, conversion.affiliate_id, conversion.converted_at, LeaderboardMetric.CONVERSIONS, 1)
+    for commission in commissions:
+        converted_at = converted.get(commission.conversion_id) or commission.created_at
+        add(commission.program_id, commission.affiliate_id, converted_at, LeaderboardMetric.COMMISSION, commission.final_amount)
+
+    if not increments:
+        return
+
+    retention = settings.LEADERBOARD_RETENTION_DAYS * 86400
+
+    def commands(store):
+        pipeline = store.pipeline(transaction=False)
+        for (key, member), amount in increments.items():
+            pipeline.zincrby(key, float(amount), member)
+        for key in {key for key, _ in increments}:
+            pipeline.expire(key, retention)
+        pipeline.execute()
+
+    _run(commands)
+
+
+def _window_key(program_id, metric: LeaderboardMetric, period: LeaderboardPeriod, window: int) -> Tuple[str, List[str]]:
+    """
+    The key to read a window from, merging its buckets when it spans several
+    """
+    buckets = trailing_buckets(period, window)
+    if window == 1:
+        return leaderboard_key(program_id, metric, period, buckets[0]), buckets
+    return leaderboard_key(program_id, metric, period, f"last{window}:{buckets[0]}"), buckets
+
+
+def _ensure_merged(store, key: str, program_id, metric, period, buckets: List[str]) -> None:
+    if len(buckets) > 1 and not store.exists(key):
+        pipeline = store.pipeline(transaction=False)
+        pipeline.zunionstore(key, [leaderboard_key(program_id, metric, period, bucket) for bucket in buckets])
+        pipeline.expire(key, settings.LEADERBOARD_MERGE_TTL)
+        pipeline.execute()
+
+
+def _score(metric: LeaderboardMetric, raw: Optional[float]) -> Decimal:
+    if metric == LeaderboardMetric.CONVERSIONS:
+        return Decimal(int(round(raw or 0)))
+    return Decimal(str(raw or 0)).quantize(Decimal("0.01"))
+
+
+def top_affiliates(
+    metric: LeaderboardMetric,
+    period: LeaderboardPeriod,
+    program_id=None,
+    window: int = 1,
+    limit: int = 10,
+) -> Tuple[List[str], List[Tuple[int, str, Decimal]]]:
+    """
+    The top affiliates of the current period, or of the last ``window`` periods
+
+    Returns the buckets read and (rank, affiliate ID, score) rows, rank 1 first.
+    """
+    key, buckets = _window_key(program_id, metric, period, window)
+
+    def commands(store):
+        _ensure_merged(store, key, program_id, metric, period, buckets)
+        return store.zrevrange(key, 0, limit - 1, withscores=True)
+
+    rows = _run(commands) or []
+    return buckets, [
+        (rank, member.decode(), _score(metric, score))
+        for rank, (member, score) in enumerate(rows, start=1)
+    ]
+
+
+def affiliate_rank(
+    affiliate_id,
+    metric: LeaderboardMetric,
+    period: LeaderboardPeriod,
+    program_id=None,
+    window: int = 1,
+) -> Tuple[Optional[int], Decimal]:
+    """
+    An affiliate's rank (1 = top, None when unranked) and score
+    """
+    key, buckets = _window_key(program_id, metric, period, window)
+
+    def commands(store):
+        _ensure_merged(store, key, program_id, metric, period, buckets)
+        pipeline = store.pipeline(transaction=False)
+        pipeline.zrevrank(key, str(affiliate_id))
+        pipeline.zscore(key, str(affiliate_id))
+        return pipeline.execute()
+
+    rank, score = _run(commands) or (None, None)
+    return (rank + 1 if rank is not None else None), _score(metric, score)
+
+
+def reconcile_leaderboards(db: Session, today: Optional[date] = None) -> int:
+    """
+    Rebuild the current and previous month's leaderboard buckets from SQL
+    Each bucket is written to a temporary key and renamed over the live one;
+    buckets in the range left without rows (say, their only conversion was
+    reversed) are deleted. Returns the number of keys written.
+    """
+    today = today or datetime.utcnow().date()
+    previous_month = trailing_buckets(LeaderboardPeriod.MONTH, 2, today)[-1]
+    month_start = date.fromisoformat(f"{previous_month}-01")
+    # Whole weeks, including the one the previous month starts in
+    start = month_start - timedelta(days=month_start.weekday())
+    since = datetime.combine(start, datetime.min.time())
+
+    day = func.date(Conversion.converted_at)
+    rows = db.query(
+        Conversion.program_id,
+        Conversion.affiliate_id,
+        day,
+        func.count(Conversion.id),
+        func.coalesce(func.sum(Conversion.conversion_value), 0),
+        func.coalesce(func.sum(Commission.final_amount), 0),
+    ).outerjoin(
+        Commission,
+        and_(Commission.conversion_id == Conversion.id, Commission.status != CommissionStatus.REJECTED),
+    ).filter(
+        Conversion.status == ConversionStatus.VALIDATED,
+        Conversion.converted_at >= since,
+    ).group_by(Conversion.program_id, Conversion.affiliate_id, day).all()
+
+    scores: Dict[str, Dict[str, float]] = defaultdict(lambda: defaultdict(float))
+    for program_id, affiliate_id, converted_on, conversions, revenue, commission in rows:
+        converted_on = date.fromisoformat(str(converted_on)[:10])
+        values = {
+            LeaderboardMetric.REVENUE: float(revenue),
+            LeaderboardMetric.CONVERSIONS: float(conversions),
+            LeaderboardMetric.COMMISSION: float(commission),
+        }
+        for scope in (program_id, None):
+            for period in LeaderboardPeriod:
+                if period == LeaderboardPeriod.MONTH and converted_on < month_start:
+                    continue
+                bucket = period_bucket(period, converted_on)
+                for metric, value in values.items():
+                    scores[leaderboard_key(scope, metric, period, bucket)][str(affiliate_id)] += value
+
+    # Any program with a conversion in the range may have incremented a bucket
+    program_ids = [
+        program_id for (program_id,) in
+        db.query(Conversion.program_id).filter(Conversion.converted_at >= since).distinct()
+    ]
+    days = [start + timedelta(days=offset) for offset in range((today - start).days + 1)]
+    stale = sorted({
+        leaderboard_key(scope, metric, period, period_bucket(period, converted_on))
+        for converted_on in days
+        for period in LeaderboardPeriod
+        if period != LeaderboardPeriod.MONTH or converted_on >= month_start
+        for scope in (*program_ids, None)
+        for metric in LeaderboardMetric
+    } - scores.keys())
+
+    retention = settings.LEADERBOARD_RETENTION_DAYS * 86400
+
+    def commands(store):
+        pipeline = store.pipeline(transaction=False)
+        for key, members in scores.items():
+            staging = f"{key}:rebuild"
+            pipeline.delete(staging)
+            pipeline.zadd(staging, members)
+            pipeline.rename(staging, key)
+            pipeline.expire(key, retention)
+        for offset in range(0, len(stale), 500):
+            pipeline.delete(*stale[offset:offset + 500])
+        pipeline.execute()
+
+    if scores or stale:
+        _run(commands)
+    return len(scores)
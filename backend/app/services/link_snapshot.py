@@ -0,0 +1,387 @@
+"""
+Link Snapshot - Shared memory-mapped redirect data for active links
+
+The ``build_link_snapshot_job`` worker job periodically writes every active
+referral link's redirect data to one binary file, sorted by code. Each API
+worker and redirect service process on the host memory-maps the file
+read-only, so all of them share the same physical pages instead of warming a
+cache each, and a code resolves by binary search without a query.
+
+File layout (native byte order, every section padded to 8 bytes):
+    header     magic, byte order, link count, built at (epoch microseconds), heap size
+    offsets    uint64[3 * count + 1], into the heap: link i's code, target URL
+               and UTM JSON are the three strings starting at offsets[3 * i]
+    ids        char[48][count], link, program and affiliate UUIDs
+    expires    int64[count], epoch microseconds (UTC), minimum int64 for none
+               (expires_at is timestamptz in PostgreSQL, so psycopg2 returns it
+               timezone-aware; it is normalised to naive UTC before encoding)
+    heap       UTF-8 strings, codes sorted bytewise
+
+A rebuild writes a new file next to the old one and renames it into place, so
+readers see either the old or the new snapshot whole; processes notice the new
+file within ``LINK_SNAPSHOT_CHECK_INTERVAL`` and map it, while lookups still
+running on the old mapping keep it alive until they finish.
+
+Between rebuilds, edits are announced on the ``LINK_CHANGES_CHANNEL`` Redis
+channel (``notify_link_changed``). Each process marks those codes stale and
+resolves them from the database until a snapshot built after the change is
+mapped. Codes missing from the snapshot (links created since) also fall back
+to the database. If a process loses the channel it distrusts its snapshot
+until the next rebuild; if Redis is down when a link changes, the change
+reaches the snapshot with the next rebuild.
+"""
+import asyncio
+import logging
+import mmap
+import os
+import struct
+import sys
+import tempfile
+import time
+from array import array
+from bisect import bisect_left
+from datetime import datetime, timedelta
+from typing import Callable, Dict, List, Optional, Tuple
+from uuid import UUID
+
+import orjson
+import redis
+import redis.asyncio
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.core.redis import get_redis
+from app.core.serialization import dumps
+from app.models.referral import ReferralLink, ReferralLinkStatus
+from app.services.referral_service import LinkTarget, get_link_target, to_utc_naive
+
+logger = logging.getLogger(__name__)
+
+LINK_SNAPSHOT_MAGIC = b"AFFLNK01"
+_HEADER = struct.Struct("<8s1sxxxIqQ")
+_ALIGN = 8
+_NO_EXPIRY = -(1 << 63)
+_EPOCH = datetime(1970, 1, 1)
+_BUILD_BATCH_SIZE = 10000
+_LISTEN_RETRY_SECONDS = 1.0
+
+
+def _padding(size: int) -> int:
+    return -size % _ALIGN
+
+
+def _to_micros(value: datetime) -> int:
+    return (to_utc_naive(value) - _EPOCH) // timedelta(microseconds=1)
+
+
+def _from_micros(value: int) -> datetime:
+    return _EPOCH + timedelta(microseconds=value)
+
+
+def active_links_query(db: Session):
+    """
+    Select the snapshot's rows: every active link, in bytewise code order
+    """
+    code_order = ReferralLink.link_code
+    if db.get_bind().dialect.name == "postgresql":
+        # Whatever the database collation; matches idx_referral_links_active_code
+        code_order = code_order.collate("C")
+
+    return select(
+        ReferralLink.link_code,
+        ReferralLink.target_url,
+        ReferralLink.utm_params,
+        ReferralLink.id,
+        ReferralLink.program_id,
+        ReferralLink.affiliate_id,
+        ReferralLink.expires_at,
+    ).where(ReferralLink.status == ReferralLinkStatus.ACTIVE).order_by(code_order)
+
+
+def build_link_snapshot(db: Session, path: str) -> int:
+    """
+    Write all active links to a snapshot file, atomically replacing any old one
+    Returns the number of links written.
+    """
+    built_at = datetime.utcnow()
+    offsets = array("Q", [0])
+    ids = bytearray()
+    expires = array("q")
+    heap = bytearray()
+    previous_code = b""
+
+    rows = db.execute(active_links_query(db).execution_options(yield_per=_BUILD_BATCH_SIZE))
+    for link_code, target_url, utm_params, link_id, program_id, affiliate_id, expires_at in rows:
+        code = link_code.encode()
+        if code <= previous_code:
+            raise ValueError(f"Link codes are not in bytewise order at {link_code!r}")
+        previous_code = code
+
+        for value in (code, target_url.encode(), dumps(utm_params) if utm_params is not None else b""):
+            heap += value
+            offsets.append(len(heap))
+        ids += link_id.bytes + program_id.bytes + affiliate_id.bytes
+        expires.append(_to_micros(expires_at) if expires_at is not None else _NO_EXPIRY)
+
+    count = len(expires)
+    byteorder = b"<" if sys.byteorder == "little" else b">"
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, temp_path = tempfile.mkstemp(prefix=".links-", dir=directory)
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(_HEADER.pack(LINK_SNAPSHOT_MAGIC, byteorder, count, _to_micros(built_at), len(heap)))
+            f.write(b"\0" * _padding(_HEADER.size))
+            for section in (offsets.tobytes(), bytes(ids), expires.tobytes(), bytes(heap)):
+                f.write(section)
+                f.write(b"\0" * _padding(len(section)))
+            f.flush()
+            os.fsync(f.fileno())
+        os.chmod(temp_path, 0o644)
+        os.replace(temp_path, path)
+    except BaseException:
+        if os.path.exists(temp_path):
+            os.unlink(temp_path)
+        raise
+
+    return count
+
+
+class _Codes:
+    """Sequence view of the snapshot's sorted codes for bisect"""
+
+    __slots__ = ("_heap", "_offsets", "_count")
+
+    def __init__(self, heap: memoryview, offsets: memoryview, count: int):
+        self._heap = heap
+        self._offsets = offsets
+        self._count = count
+
+    def __len__(self) -> int:
+        return self._count
+
+    def __getitem__(self, i: int) -> bytes:
+        return bytes(self._heap[self._offsets[3 * i]:self._offsets[3 * i + 1]])
+
+
+class LinkSnapshot:
+    """
+    One memory-mapped snapshot file
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        with open(path, "rb") as f:
+            self.identity = _file_identity(os.fstat(f.fileno()))
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+        magic, byteorder, count, built_at, heap_size = _HEADER.unpack_from(self._mmap, 0)
+        if magic != LINK_SNAPSHOT_MAGIC:
+            raise ValueError(f"{path} is not a link snapshot file")
+        if byteorder != (b"<" if sys.byteorder == "little" else b">"):
+            raise ValueError(f"{path} was built on a host with a different byte order")
+
+        self.count = count
+        self.built_at = _from_micros(built_at)
+
+        view = memoryview(self._mmap)
+        self._views = [view]
+        offset = _HEADER.size + _padding(_HEADER.size)
+
+        def take(size: int, fmt: Optional[str] = None) -> memoryview:
+            nonlocal offset
+            section = view[offset:offset + size]
+            if fmt:
+                section = section.cast(fmt)
+            self._views.append(section)
+            offset += size + _padding(size)
+            return section
+
+        self._offsets = take(8 * (3 * count + 1), "Q")
+        self._ids = take(48 * count)
+        self._expires = take(8 * count, "q")
+        self._heap = take(heap_size)
+        self._codes = _Codes(self._heap, self._offsets, count)
+
+    def lookup(self, link_code: str) -> Optional[LinkTarget]:
+        """
+        Get a link's redirect data, or None when the code is not in the snapshot
+        """
+        code = link_code.encode()
+        i = bisect_left(self._codes, code)
+        if i == self.count or self._codes[i] != code:
+            return None
+
+        url_start, utm_start, end = self._offsets[3 * i + 1:3 * i + 4]
+        utm = self._heap[utm_start:end]
+        ids = self._ids[48 * i:48 * i + 48]
+        expires = self._expires[i]
+        return LinkTarget(
+            id=UUID(bytes=bytes(ids[:16])),
+            link_code=link_code,
+            target_url=str(self._heap[url_start:utm_start], "utf-8"),
+            utm_params=orjson.loads(utm) if utm else None,
+            program_id=UUID(bytes=bytes(ids[16:32])),
+            affiliate_id=UUID(bytes=bytes(ids[32:48])),
+            expires_at=_from_micros(expires) if expires != _NO_EXPIRY else None,
+        )
+
+    def close(self) -> None:
+        """Release the memory map; only safe once no lookup can be running"""
+        for view in reversed(self._views):
+            view.release()
+        self._views = []
+        self._mmap.close()
+
+
+def _file_identity(stat: os.stat_result) -> Tuple[int, int, int]:
+    return stat.st_ino, stat.st_mtime_ns, stat.st_size
+
+
+class LinkSource:
+    """
+    A process's view of the snapshot: follows rebuilds and tracks stale codes
+    """
+
+    def __init__(self, path: str, check_interval: float = 1.0):
+        self.path = path
+        self.check_interval = check_interval
+        self.snapshot: Optional[LinkSnapshot] = None
+        self._checked_at = float("-inf")
+        self._stale: Dict[str, datetime] = {}
+        self._distrust_before: Optional[datetime] = None
+
+    def refresh(self) -> bool:
+        """
+        Map the snapshot file if it was (re)built since the last check
+        Returns whether a new snapshot was mapped.
+        """
+        self._checked_at = time.monotonic()
+        try:
+            identity = _file_identity(os.stat(self.path))
+        except OSError:
+            return False
+        if self.snapshot is not None and identity == self.snapshot.identity:
+            return False
+
+        try:
+            snapshot = LinkSnapshot(self.path)
+        except (OSError, ValueError):
+            logger.warning("Could not map link snapshot %s", self.path, exc_info=True)
+            return False
+
+        # The previous mapping is left to the garbage collector, as a lookup may still hold it
+        self.snapshot = snapshot
+        self._stale = {code: at for code, at in self._stale.items() if at >= snapshot.built_at}
+        if self._distrust_before is not None and self._distrust_before < snapshot.built_at:
+            self._distrust_before = None
+        return True
+
+    def get(self, link_code: str) -> Optional[LinkTarget]:
+        """
+        Get a link from the snapshot
+        None means the database must be asked: the code is missing, stale, or
+        there is no usable snapshot.
+        """
+        if time.monotonic() - self._checked_at >= self.check_interval:
+            self.refresh()
+
+        snapshot = self.snapshot
+        if snapshot is None or self._distrust_before is not None or link_code in self._stale:
+            return None
+        return snapshot.lookup(link_code)
+
+    def invalidate(self, link_code: Optional[str] = None) -> None:
+        """
+        Stop serving a code (or, with None, the whole snapshot) until a newer rebuild
+        """
+        now = datetime.utcnow()
+        if link_code is None:
+            self._distrust_before = now
+        else:
+            self._stale[link_code] = now
+
+
+_source: Optional[LinkSource] = None
+_source_loaded = False
+
+
+def get_link_source() -> Optional[LinkSource]:
+    """
+    Get the process-wide link snapshot source
+    Returns None when no snapshot path is configured.
+    """
+    global _source, _source_loaded
+
+    if not _source_loaded:
+        _source_loaded = True
+        if settings.LINK_SNAPSHOT_PATH:
+            _source = LinkSource(settings.LINK_SNAPSHOT_PATH, settings.LINK_SNAPSHOT_CHECK_INTERVAL)
+
+    return _source
+
+
+def find_link_target(db: Session, link_code: str) -> Optional[LinkTarget]:
+    """
+    Resolve an active link from the snapshot, falling back to the database
+    """
+    source = get_link_source()
+    if source is not None:
+        link = source.get(link_code)
+        if link is not None:
+            return link
+    return get_link_target(db, link_code)
+
+
+def notify_link_changed(link_code: str) -> None:
+    """
+    Announce that a link was edited or deactivated, after the change is committed
+    """
+    notify_links_changed([link_code])
+
+
+def notify_links_changed(link_codes: List[str]) -> None:
+    """
+    Announce changes to several links in one round trip
+    """
+    source = get_link_source()
+    if source is not None:
+        for link_code in link_codes:
+            source.invalidate(link_code)
+    try:
+        pipeline = get_redis().pipeline(transaction=False)
+        for link_code in link_codes:
+            pipeline.publish(settings.LINK_CHANGES_CHANNEL, link_code)
+        pipeline.execute()
+    except redis.RedisError:
+        logger.warning("Could not announce changes to %d links", len(link_codes))
+
+
+async def listen_for_link_changes(*handlers: Callable[[Optional[str]], None]) -> None:
+    """
+    Pass each announced link code to the handlers, until cancelled
+    After a lost subscription the handlers get None, as changes may have been missed.
+    """
+    # A dedicated client: the shared ones time out idle reads
+    client = redis.asyncio.Redis.from_url(
+        settings.REDIS_URL, socket_connect_timeout=settings.REDIS_SOCKET_TIMEOUT
+    )
+    subscribed_before = False
+    try:
+        while True:
+            try:
+                async with client.pubsub() as pubsub:
+                    await pubsub.subscribe(settings.LINK_CHANGES_CHANNEL)
+                    if subscribed_before:
+                        for handler in handlers:
+                            handler(None)
+                    subscribed_before = True
+                    async for message in pubsub.listen():
+                        if message["type"] == "message":
+                            link_code = message["data"].decode()
+                            for handler in handlers:
+                                handler(link_code)
+            except (redis.RedisError, OSError):
+                await asyncio.sleep(_LISTEN_RETRY_SECONDS)
+    finally:
+        await client.aclose()
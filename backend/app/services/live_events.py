@@ -0,0 +1,286 @@
+"""
+Live Events - Affiliate activity pushed to dashboards over SSE
+
+Producers (click ingestion, conversion and commission services) call
+``publish_live_events`` after their commit. Events go out on the Redis
+channel ``LIVE_EVENTS_CHANNEL`` so that every API worker sees them; each
+worker runs one listener (``listen_for_live_events``) feeding its in-process
+``LiveEventBus``, which hands every event to the local streams of its
+affiliate. Delivery is best-effort: without Redis, events only reach streams
+in the publishing process. Publishing also expires the cached dashboards of
+the affiliates with conversion and commission events.
+
+Streams never slow down producers or the listener. Each buffers at most
+``LIVE_EVENTS_BURST_LIMIT`` events between flushes; past that the pending
+events are folded into a summary (counts per type, amounts per currency).
+A stream flushes at most once per ``LIVE_EVENTS_FLUSH_INTERVAL``, so a burst
+reaches the browser as one ``summary`` message, and a client that reads
+slowly just gets summaries covering longer periods.
+"""
+import asyncio
+from collections import defaultdict
+from decimal import Decimal
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Set, Tuple
+
+import orjson
+import redis
+import redis.asyncio
+
+from app.core.config import settings
+from app.core.metrics import LIVE_EVENT_STREAMS, LIVE_EVENTS_SENT
+from app.core.redis import get_redis
+from app.core.serialization import dumps
+from app.services.dashboard_service import invalidate_dashboards
+
+_LISTEN_RETRY_SECONDS = 1.0
+
+
+def live_event(event_type: str, affiliate_id, data: Dict[str, Any]) -> dict:
+    """
+    Build a live event for an affiliate
+    """
+    return {"type": event_type, "affiliate_id": str(affiliate_id), "data": data}
+
+
+def clicks_event(affiliate_id, referral_link_id, count: int = 1) -> dict:
+    """
+    Clicks recorded on one of the affiliate's links
+    """
+    return live_event("clicks", affiliate_id, {"referral_link_id": referral_link_id, "count": count})
+
+
+def conversion_event(conversion) -> dict:
+    """
+    A conversion created or validated
+    """
+    return live_event("conversion", conversion.affiliate_id, {
+        "id": conversion.id,
+        "referral_link_id": conversion.referral_link_id,
+        "program_id": conversion.program_id,
+        "conversion_type": conversion.conversion_type,
+        "conversion_value": conversion.conversion_value,
+        "currency": conversion.currency,
+        "status": conversion.status,
+    })
+
+
+def commission_event(commission) -> dict:
+    """
+    A commission created or approved
+    """
+    return live_event("commission", commission.affiliate_id, {
+        "id": commission.id,
+        "conversion_id": commission.conversion_id,
+        "program_id": commission.program_id,
+        "final_amount": commission.final_amount,
+        "currency": commission.currency,
+        "status": commission.status,
+    })
+
+
+def publish_live_events(events: List[dict]) -> None:
+    """
+    Publish events to every API worker's streams with one PUBLISH
+    Call after the commit that made them true. Never raises.
+    """
+    if not events:
+        return
+    message = dumps(events)
+    try:
+        pipeline = get_redis().pipeline(transaction=False)
+        pipeline.publish(settings.LIVE_EVENTS_CHANNEL, message)
+        invalidate_dashboards(
+            [event["affiliate_id"] for event in events if event["type"] != "clicks"], client=pipeline
+        )
+        pipeline.execute()
+    except redis.RedisError:
+        get_live_event_bus().dispatch_threadsafe(orjson.loads(message))
+
+
+class LiveSummary:
+    """Events folded together: counts per type, amounts per currency"""
+
+    def __init__(self):
+        self.events = 0
+        self.clicks = 0
+        self.conversions = 0
+        self.commissions = 0
+        self.conversion_value: Dict[str, Decimal] = defaultdict(Decimal)
+        self.commission_amount: Dict[str, Decimal] = defaultdict(Decimal)
+
+    def add(self, event: dict) -> None:
+        data = event["data"]
+        self.events += 1
+        if event["type"] == "clicks":
+            self.clicks += data["count"]
+        elif event["type"] == "conversion":
+            self.conversions += 1
+            self.conversion_value[data["currency"]] += Decimal(data["conversion_value"])
+        elif event["type"] == "commission":
+            self.commissions += 1
+            self.commission_amount[data["currency"]] += Decimal(data["final_amount"])
+
+    def as_dict(self) -> dict:
+        return {
+            "events": self.events,
+            "clicks": self.clicks,
+            "conversions": self.conversions,
+            "commissions": self.commissions,
+            "conversion_value": {currency: str(value) for currency, value in self.conversion_value.items()},
+            "commission_amount": {currency: str(amount) for currency, amount in self.commission_amount.items()},
+        }
+
+
+class LiveSubscriber:
+    """One open stream's bounded buffer of pending events"""
+
+    def __init__(self, affiliate_id: str, burst_limit: int):
+        self.affiliate_id = affiliate_id
+        self.burst_limit = burst_limit
+        self.pending: List[dict] = []
+        self.summary: Optional[LiveSummary] = None
+        self.ready = asyncio.Event()
+
+    def push(self, event: dict) -> None:
+        if self.summary is None and len(self.pending) < self.burst_limit:
+            self.pending.append(event)
+        else:
+            if self.summary is None:
+                self.summary = LiveSummary()
+                for pending in self.pending:
+                    self.summary.add(pending)
+                self.pending = []
+            self.summary.add(event)
+        self.ready.set()
+
+    def drain(self) -> List[Tuple[str, dict]]:
+        """Take the buffered (message name, data) pairs"""
+        if self.summary is not None:
+            messages = [("summary", self.summary.as_dict())]
+        else:
+            messages = [(event["type"], event["data"]) for event in self.pending]
+        self.pending, self.summary = [], None
+        self.ready.clear()
+        return messages
+
+
+class LiveEventBus:
+    """In-process fan-out of live events to the streams of their affiliate"""
+
+    def __init__(self, max_connections: int, burst_limit: int):
+        self.max_connections = max_connections
+        self.burst_limit = burst_limit
+        self.loop: Optional[asyncio.AbstractEventLoop] = None
+        self._subscribers: Dict[str, Set[LiveSubscriber]] = defaultdict(set)
+        self._count = 0
+
+    @property
+    def full(self) -> bool:
+        return self._count >= self.max_connections
+
+    def subscribe(self, affiliate_id) -> Optional[LiveSubscriber]:
+        """A new stream for an affiliate, or None at the connection cap"""
+        if self.full:
+            return None
+        subscriber = LiveSubscriber(str(affiliate_id), self.burst_limit)
+        self._subscribers[subscriber.affiliate_id].add(subscriber)
+        self._count += 1
+        LIVE_EVENT_STREAMS.inc()
+        return subscriber
+
+    def unsubscribe(self, subscriber: LiveSubscriber) -> None:
+        subscribers = self._subscribers.get(subscriber.affiliate_id)
+        if subscribers is None or subscriber not in subscribers:
+            return
+        subscribers.discard(subscriber)
+        if not subscribers:
+            del self._subscribers[subscriber.affiliate_id]
+        self._count -= 1
+        LIVE_EVENT_STREAMS.dec()
+
+    def dispatch(self, events: List[dict]) -> None:
+        """Hand events to their affiliates' streams (on the bus's event loop)"""
+        for event in events:
+            for subscriber in self._subscribers.get(event["affiliate_id"], ()):
+                subscriber.push(event)
+
+    def dispatch_threadsafe(self, events: List[dict]) -> None:
+        """Dispatch from any thread; dropped when the bus has no running loop"""
+        if self.loop is not None and not self.loop.is_closed():
+            self.loop.call_soon_threadsafe(self.dispatch, events)
+
+
+_bus: Optional[LiveEventBus] = None
+
+
+def get_live_event_bus() -> LiveEventBus:
+    """Get the process-wide live event bus"""
+    global _bus
+    if _bus is None:
+        _bus = LiveEventBus(settings.LIVE_EVENTS_MAX_CONNECTIONS, settings.LIVE_EVENTS_BURST_LIMIT)
+    return _bus
+
+
+def format_sse(name: str, data: Any) -> bytes:
+    """
+    Encode one Server-Sent Events message
+    """
+    return b"event: " + name.encode() + b"\ndata: " + dumps(data) + b"\n\n"
+
+
+async def stream_live_events(
+    bus: LiveEventBus,
+    affiliate_id,
+    is_disconnected: Callable[[], Awaitable[bool]],
+):
+    """
+    Yield an affiliate's live events as SSE messages until the client leaves
+    """
+    subscriber = bus.subscribe(affiliate_id)
+    if subscriber is None:
+        return
+    try:
+        yield b"retry: 5000\n\n"
+        while True:
+            try:
+                await asyncio.wait_for(subscriber.ready.wait(), settings.LIVE_EVENTS_HEARTBEAT_SECONDS)
+            except asyncio.TimeoutError:
+                pass
+            if await is_disconnected():
+                return
+
+            messages = subscriber.drain()
+            if not messages:
+                yield b": keepalive\n\n"
+                continue
+            for name, data in messages:
+                LIVE_EVENTS_SENT.labels("summary" if name == "summary" else "event").inc()
+                yield format_sse(name, data)
+
+            # Events arriving meanwhile are buffered, and coalesced past the burst limit
+            await asyncio.sleep(settings.LIVE_EVENTS_FLUSH_INTERVAL)
+    finally:
+        bus.unsubscribe(subscriber)
+
+
+async def listen_for_live_events(bus: LiveEventBus) -> None:
+    """
+    Feed events published by any process into the bus, until cancelled
+    """
+    bus.loop = asyncio.get_running_loop()
+    # A dedicated client: the shared ones time out idle reads
+    client = redis.asyncio.Redis.from_url(
+        settings.REDIS_URL, socket_connect_timeout=settings.REDIS_SOCKET_TIMEOUT
+    )
+    try:
+        while True:
+            try:
+                async with client.pubsub() as pubsub:
+                    await pubsub.subscribe(settings.LIVE_EVENTS_CHANNEL)
+                    async for message in pubsub.listen():
+                        if message["type"] == "message":
+                            bus.dispatch(orjson.loads(message["data"]))
+            except (redis.RedisError, OSError):
+                await asyncio.sleep(_LISTEN_RETRY_SECONDS)
+    finally:
+        await client.aclose()
@@ -0,0 +1,319 @@
+"""
+Multi-Touch Attribution Service - Fractional conversion credit across touchpoints
+
+Every click from a conversion's visitor session on a link of the same program,
+inside the attribution window, is a touchpoint. A model assigns each touchpoint
+a weight and weights are normalised per conversion, so credits sum to 1.
+
+Models work on whole chunks at once: touchpoints of many conversions are laid
+out in flat numpy arrays (sorted by conversion, then click time) with a
+segment index per touchpoint, so no Python loop runs per conversion.
+
+The batch job partitions conversions by a hash of ``visitor_session_id`` and
+runs partitions in a process pool.
+"""
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from decimal import Decimal
+from typing import Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+from sqlalchemy import Text, cast, delete, func, insert
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.models.attribution import AttributionCredit
+from app.models.affiliate import AffiliateProfile, AffiliateTier
+from app.models.conversion import Conversion, ConversionStatus
+from app.models.program import AffiliateProgram
+from app.models.referral import ReferralLink, ReferralClick
+from app.services.attribution_service import get_attribution_window
+from app.services.commission_service import calculate_base_commission, get_tier_multiplier
+
+# A model maps (segment index, position in segment, segment size per touchpoint,
+# touchpoint age in seconds before the conversion) to unnormalised weights
+AttributionModelFn = Callable[[np.ndarray, np.ndarray, np.ndarray, np.ndarray], np.ndarray]
+
+ATTRIBUTION_MODELS: Dict[str, AttributionModelFn] = {}
+
+
+def register_attribution_model(name: str):
+    """
+    Decorator registering an attribution model under a name
+    """
+    def decorator(func: AttributionModelFn) -> AttributionModelFn:
+        ATTRIBUTION_MODELS[name] = func
+        return func
+    return decorator
+
+
+@register_attribution_model("linear")
+def linear_weights(segment, position, size, age_seconds) -> np.ndarray:
+    """Equal credit to every touchpoint"""
+    return np.ones(len(segment), dtype=np.float64)
+
+
+@register_attribution_model("time_decay")
+def time_decay_weights(segment, position, size, age_seconds) -> np.ndarray:
+    """Credit halves every ATTRIBUTION_TIME_DECAY_HALF_LIFE_DAYS before the conversion"""
+    half_life = settings.ATTRIBUTION_TIME_DECAY_HALF_LIFE_DAYS * 86400.0
+    return np.exp2(-np.maximum(age_seconds, 0.0) / half_life)
+
+
+@register_attribution_model("position_based")
+def position_based_weights(segment, position, size, age_seconds) -> np.ndarray:
+    """40% to the first and last touchpoints, 20% spread over the middle ones"""
+    weights = np.full(len(segment), 0.2, dtype=np.float64) / np.maximum(size - 2, 1)
+    is_edge = (position == 0) | (position == size - 1)
+    weights[is_edge] = 0.4
+    # One or two touchpoints split the credit evenly
+    weights[size <= 2] = 1.0
+    return weights
+
+
+def compute_credits(
+    model: str,
+    segment: np.ndarray,
+    age_seconds: np.ndarray,
+) -> np.ndarray:
+    """
+    Compute normalised credit per touchpoint for a chunk
+
+    ``segment`` must be sorted (touchpoints of a conversion are contiguous and
+    ordered by click time). Returns credits that sum to 1 within each segment.
+    """
+    if model not in ATTRIBUTION_MODELS:
+        raise ValueError(f"Unknown attribution model '{model}'")
+    if len(segment) == 0:
+        return np.zeros(0, dtype=np.float64)
+
+    counts = np.bincount(segment)
+    starts = np.cumsum(counts) - counts
+    size = counts[segment]
+    position = np.arange(len(segment)) - starts[segment]
+
+    weights = ATTRIBUTION_MODELS[model](segment, position, size, age_seconds)
+    totals = np.bincount(segment, weights=weights)
+    return weights / totals[segment]
+
+
+def _load_touchpoints(db: Session, conversion_ids: List, window_days: Optional[int] = None) -> list:
+    """
+    Load all qualifying touchpoints for a chunk of conversions, path-ordered
+    """
+    window = get_attribution_window(window_days)
+
+    query = db.query(
+        Conversion.id,
+        Conversion.converted_at,
+        ReferralClick.clicked_at,
+        ReferralLink.id,
+        ReferralLink.affiliate_id,
+        ReferralLink.program_id,
+    ).join(
+        ReferralClick, ReferralClick.visitor_session_id == Conversion.visitor_session_id
+    ).join(
+        ReferralLink, ReferralLink.id == ReferralClick.referral_link_id
+    ).filter(
+        Conversion.id.in_(conversion_ids),
+        ReferralLink.program_id == Conversion.program_id,
+        ReferralClick.clicked_at <= Conversion.converted_at,
+    )
+    if db.get_bind().dialect.name == "postgresql":
+        # Bound the click range in SQL where interval arithmetic is native
+        query = query.filter(ReferralClick.clicked_at >= Conversion.converted_at - window)
+
+    rows = query.order_by(Conversion.id, ReferralClick.clicked_at).all()
+    return [row for row in rows if row[1] - row[2] <= window]
+
+
+def attribute_chunk(
+    db: Session,
+    conversion_ids: List,
+    model: str,
+    window_days: Optional[int] = None,
+) -> int:
+    """
+    Compute and store credit shares for a chunk of conversions
+    Replaces any credits previously written for the same model.
+    Returns the number of credit rows written.
+    """
+    touchpoints = _load_touchpoints(db, conversion_ids, window_days)
+
+    db.execute(
+        delete(AttributionCredit).where(
+            AttributionCredit.conversion_id.in_(conversion_ids),
+            AttributionCredit.model == model,
+        )
+    )
+
+    if not touchpoints:
+        return 0
+
+    # Flatten the chunk into arrays: one segment per conversion
+    conversion_keys = np.array([row[0] for row in touchpoints], dtype=object)
+    segment = np.concatenate(([0], np.cumsum(conversion_keys[1:] != conversion_keys[:-1])))
+    age_seconds = np.array(
+        [(row[1] - row[2]).total_seconds() for row in touchpoints], dtype=np.float64
+    )
+    credits = compute_credits(model, segment, age_seconds)
+
+    # Several clicks on the same link collapse into one credit row
+    shares: Dict[Tuple, dict] = {}
+    for row, credit in zip(touchpoints, credits):
+        key = (row[0], row[3])
+        share = shares.get(key)
+        if share is None:
+            shares[key] = {
+                "conversion_id": row[0],
+                "referral_link_id": row[3],
+                "affiliate_id": row[4],
+                "program_id": row[5],
+                "model": model,
+                "credit": float(credit),
+                "touchpoints": 1,
+                "last_touch_at": row[2],
+            }
+        else:
+            share["credit"] += float(credit)
+            share["touchpoints"] += 1
+            share["last_touch_at"] = row[2]
+
+    rows = list(shares.values())
+    for row in rows:
+        row["credit"] = Decimal(str(round(row["credit"], 6)))
+
+    db.execute(insert(AttributionCredit), rows)
+    return len(rows)
+
+
+def attribute_partition(
+    db: Session,
+    model: str,
+    since: datetime,
+    until: datetime,
+    partition: int = 0,
+    partitions: int = 1,
+    chunk_size: int = 1000,
+    window_days: Optional[int] = None,
+) -> Tuple[int, int]:
+    """
+    Attribute all validated conversions of one session-hash partition
+    Returns (conversions processed, credit rows written).
+    """
+    processed = 0
+    written = 0
+    last_id = None
+
+    while True:
+        query = db.query(Conversion.id).filter(
+            Conversion.converted_at >= since,
+            Conversion.converted_at <= until,
+            Conversion.status == ConversionStatus.VALIDATED,
+        )
+        if partitions > 1:
+            query = query.filter(
+                func.abs(func.hashtext(cast(Conversion.visitor_session_id, Text))) % partitions == partition
+            )
+        if last_id is not None:
+            query = query.filter(Conversion.id > last_id)
+
+        conversion_ids = [row[0] for row in query.order_by(Conversion.id).limit(chunk_size).all()]
+        if not conversion_ids:
+            break
+
+        written += attribute_chunk(db, conversion_ids, model, window_days)
+        processed += len(conversion_ids)
+        last_id = conversion_ids[-1]
+        db.commit()
+
+    return processed, written
+
+
+def _attribute_partition_in_worker(args: tuple) -> Tuple[int, int]:
+    """
+    Process pool entry point: run one partition with a fresh session
+    """
+    from app.database import SessionLocal, engine
+
+    # Never reuse connections inherited from the parent process
+    engine.dispose(close=False)
+
+    db = SessionLocal()
+    try:
+        return attribute_partition(db, *args)
+    finally:
+        db.close()
+
+
+def run_multitouch_attribution(
+    model: str,
+    since: datetime,
+    until: Optional[datetime] = None,
+    partitions: Optional[int] = None,
+    chunk_size: int = 1000,
+) -> Tuple[int, int]:
+    """
+    Run a multi-touch attribution model over a time range in a process pool
+    Returns (conversions processed, credit rows written) across all partitions.
+    """
+    if model not in ATTRIBUTION_MODELS:
+        raise ValueError(f"Unknown attribution model '{model}'")
+
+    until = until or datetime.utcnow()
+    partitions = partitions or settings.ATTRIBUTION_PARTITIONS
+    jobs = [
+        (model, since, until, partition, partitions, chunk_size)
+        for partition in range(partitions)
+    ]
+
+    with ProcessPoolExecutor(max_workers=partitions) as pool:
+        results = list(pool.map(_attribute_partition_in_worker, jobs))
+
+    return sum(r[0] for r in results), sum(r[1] for r in results)
+
+
+def calculate_credit_commissions(
+    db: Session,
+    conversion: Conversion,
+    model: str,
+) -> List[dict]:
+    """
+    Split a conversion's commission across affiliates by their credit shares
+    Each share's amount uses the program's commission rule and the credited
+    affiliate's tier multiplier.
+    """
+    program = db.query(AffiliateProgram).filter(
+        AffiliateProgram.id == conversion.program_id
+    ).first()
+    if not program:
+        return []
+
+    base_amount = calculate_base_commission(conversion.conversion_value, program.commission_config)
+
+    rows = db.query(AttributionCredit, AffiliateTier).join(
+        AffiliateProfile, AffiliateProfile.id == AttributionCredit.affiliate_id
+    ).outerjoin(
+        AffiliateTier, AffiliateTier.id == AffiliateProfile.tier_id
+    ).filter(
+        AttributionCredit.conversion_id == conversion.id,
+        AttributionCredit.model == model,
+    ).order_by(AttributionCredit.credit.desc()).all()
+
+    shares = []
+    for credit, tier in rows:
+        share_base = base_amount * Decimal(str(credit.credit))
+        tier_multiplier = get_tier_multiplier(tier)
+        shares.append({
+            "affiliate_id": credit.affiliate_id,
+            "referral_link_id": credit.referral_link_id,
+            "model": model,
+            "credit": credit.credit,
+            "touchpoints": credit.touchpoints,
+            "base_amount": share_base.quantize(Decimal("0.01")),
+            "tier_multiplier": tier_multiplier,
+            "final_amount": (share_base * tier_multiplier).quantize(Decimal("0.01")),
+            "currency": conversion.currency,
+        })
+
+    return shares
@@ -0,0 +1,170 @@
+"""
+Overview Service - Program KPIs from a materialized view
+
+``program_overview_stats`` (migration 014) holds one row per program: active
+affiliates, links, clicks, validated conversions and revenue, and commission
+liability (pending + approved), unpaid balance (approved) and paid totals.
+The worker refreshes it CONCURRENTLY every few minutes, so readers are never
+blocked, and records the time in ``materialized_view_refreshes``.
+
+Reads use the view while its last refresh is younger than
+``OVERVIEW_MAX_STALENESS_SECONDS``, and otherwise run the same aggregation
+live against the base tables.
+"""
+import time
+from datetime import datetime, timedelta
+from typing import List, Optional, Tuple
+
+from sqlalchemy import case, column, func, select, table, text
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.core.metrics import OVERVIEW_READS, VIEW_REFRESH_DURATION
+from app.database import dialect_insert
+from app.models.conversion import Commission, CommissionStatus, Conversion, ConversionStatus
+from app.models.program import AffiliateProgram, EnrollmentStatus, ProgramEnrollment
+from app.models.referral import ReferralLink
+from app.models.reporting import MaterializedViewRefresh
+
+PROGRAM_OVERVIEW_VIEW = "program_overview_stats"
+
+OVERVIEW_COLUMNS = (
+    "program_id",
+    "program_name",
+    "active_affiliates",
+    "links",
+    "clicks",
+    "conversions",
+    "revenue",
+    "commission_liability",
+    "unpaid_balance",
+    "paid_commission",
+)
+
+# Session-independent key for pg_try_advisory_xact_lock: one refresh at a time
+_REFRESH_LOCK_KEY = 0x6F766572
+
+program_overview_view = table(PROGRAM_OVERVIEW_VIEW, *(column(name) for name in OVERVIEW_COLUMNS))
+
+
+def _amount(status_condition):
+    return func.sum(case((status_condition, Commission.final_amount), else_=0))
+
+
+def program_overview_select():
+    """
+    The view's aggregation as a live query (keep in step with migration 014)
+    """
+    enrollments = select(
+        ProgramEnrollment.program_id,
+        func.count().label("active_affiliates"),
+    ).where(ProgramEnrollment.status == EnrollmentStatus.ACTIVE).group_by(ProgramEnrollment.program_id).subquery()
+
+    links = select(
+        ReferralLink.program_id,
+        func.count().label("links"),
+        func.sum(ReferralLink.clicks_count).label("clicks"),
+    ).group_by(ReferralLink.program_id).subquery()
+
+    conversions = select(
+        Conversion.program_id,
+        func.count().label("conversions"),
+        func.sum(Conversion.conversion_value).label("revenue"),
+    ).where(Conversion.status == ConversionStatus.VALIDATED).group_by(Conversion.program_id).subquery()
+
+    commissions = select(
+        Commission.program_id,
+        _amount(Commission.status.in_([CommissionStatus.PENDING, CommissionStatus.APPROVED])).label("commission_liability"),
+        _amount(Commission.status == CommissionStatus.APPROVED).label("unpaid_balance"),
+        _amount(Commission.status == CommissionStatus.PAID).label("paid_commission"),
+    ).group_by(Commission.program_id).subquery()
+
+    return select(
+        AffiliateProgram.id.label("program_id"),
+        AffiliateProgram.name.label("program_name"),
+        func.coalesce(enrollments.c.active_affiliates, 0).label("active_affiliates"),
+        func.coalesce(links.c.links, 0).label("links"),
+        func.coalesce(links.c.clicks, 0).label("clicks"),
+        func.coalesce(conversions.c.conversions, 0).label("conversions"),
+        func.coalesce(conversions.c.revenue, 0).label("revenue"),
+        func.coalesce(commissions.c.commission_liability, 0).label("commission_liability"),
+        func.coalesce(commissions.c.unpaid_balance, 0).label("unpaid_balance"),
+        func.coalesce(commissions.c.paid_commission, 0).label("paid_commission"),
+    ).select_from(AffiliateProgram).outerjoin(
+        enrollments, enrollments.c.program_id == AffiliateProgram.id
+    ).outerjoin(
+        links, links.c.program_id == AffiliateProgram.id
+    ).outerjoin(
+        conversions, conversions.c.program_id == AffiliateProgram.id
+    ).outerjoin(
+        commissions, commissions.c.program_id == AffiliateProgram.id
+    )
+
+
+def get_view_refreshed_at(db: Session, view_name: str = PROGRAM_OVERVIEW_VIEW) -> Optional[datetime]:
+    return db.query(MaterializedViewRefresh.refreshed_at).filter(
+        MaterializedViewRefresh.view_name == view_name
+    ).scalar()
+
+
+def get_program_overview(db: Session, program_id=None) -> Tuple[List[dict], str, datetime, Optional[datetime]]:
+    """
+    Program KPI rows, by revenue
+
+    Returns the rows, their source ("view" or "live"), the time they describe
+    and the view's last refresh.
+    """
+    refreshed_at = get_view_refreshed_at(db)
+    fresh = refreshed_at is not None and (
+        datetime.utcnow() - refreshed_at <= timedelta(seconds=settings.OVERVIEW_MAX_STALENESS_SECONDS)
+    )
+    source = program_overview_view if fresh else program_overview_select().subquery()
+
+    query = select(*(source.c[name] for name in OVERVIEW_COLUMNS))
+    if program_id is not None:
+        query = query.where(source.c.program_id == program_id)
+    rows = [dict(row._mapping) for row in db.execute(query.order_by(source.c.revenue.desc()))]
+
+    kind = "view" if fresh else "live"
+    OVERVIEW_READS.labels(kind).inc()
+    return rows, kind, (refreshed_at if fresh else datetime.utcnow()), refreshed_at
+
+
+def refresh_overview_views(db: Session) -> Optional[float]:
+    """
+    Refresh the overview views CONCURRENTLY (readers keep the old rows meanwhile)
+    Returns the seconds taken, or None when skipped: not Postgres, or another
+    refresh holds the lock.
+    """
+    if db.get_bind().dialect.name != "postgresql":
+        return None
+
+    if not db.execute(select(func.pg_try_advisory_xact_lock(_REFRESH_LOCK_KEY))).scalar():
+        db.rollback()
+        return None
+
+    db.execute(text(f"SET LOCAL statement_timeout = {int(settings.OVERVIEW_REFRESH_TIMEOUT_MS)}"))
+    # The refresh sees the data committed when it starts
+    started_at = datetime.utcnow()
+    started = time.perf_counter()
+    db.execute(text(f"REFRESH MATERIALIZED VIEW CONCURRENTLY {PROGRAM_OVERVIEW_VIEW}"))
+    elapsed = time.perf_counter() - started
+
+    insert = dialect_insert(db, MaterializedViewRefresh).values(
+        view_name=PROGRAM_OVERVIEW_VIEW,
+        refreshed_at=started_at,
+        duration_ms=int(elapsed * 1000),
+        updated_at=datetime.utcnow(),
+    )
+    db.execute(insert.on_conflict_do_update(
+        index_elements=[MaterializedViewRefresh.view_name],
+        set_={
+            "refreshed_at": insert.excluded.refreshed_at,
+            "duration_ms": insert.excluded.duration_ms,
+            "updated_at": insert.excluded.updated_at,
+        },
+    ))
+    db.commit()
+
+    VIEW_REFRESH_DURATION.labels(PROGRAM_OVERVIEW_VIEW).observe(elapsed)
+    return elapsed
@@ -3,11 +3,15 @@ Payout Service - Business logic for payout management
 """
 from decimal import Decimal
 from typing import List, Optional
+from sqlalchemy import update
 from sqlalchemy.orm import Session
 from datetime import datetime, timedelta
 
 from app.models.conversion import Commission, CommissionStatus, Payout, PayoutStatus
 from app.models.affiliate import AffiliateProfile
+from app.models.webhook import WebhookEventType
+from app.services.dashboard_service import invalidate_dashboards
+from app.services.webhook_service import record_event
 
 
 def generate_payout(
@@ -55,6 +59,7 @@ def generate_payout(
 
     db.commit()
     db.refresh(payout)
+    invalidate_dashboards([payout.affiliate_id])
 
     return payout
 
@@ -101,16 +106,15 @@ def generate_monthly_payouts(
     return payouts
 
 
-def process_payout(
-    db: Session,
+def _record_payment(
     payout: Payout,
     admin_user_id: str,
-    payment_method: str,
+    payment_method: Optional[str],
     payment_reference: str,
     notes: Optional[str] = None,
-) -> Payout:
+) -> None:
     """
-    Process a payout (mark as processing/completed)
+    Set a payout's payment fields and move it to PROCESSING, without committing
     """
     payout.status = PayoutStatus.PROCESSING
     payout.payment_method = payment_method
@@ -120,8 +124,74 @@ def process_payout(
     if notes:
         payout.notes = notes
 
+
+def process_payout(
+    db: Session,
+    payout: Payout,
+    admin_user_id: str,
+    payment_method: Optional[str],
+    payment_reference: str,
+    notes: Optional[str] = None,
+) -> Payout:
+    """
+    Record that payment of a payout has been sent (PROCESSING)
+    """
+    if payout.status not in (PayoutStatus.PENDING, PayoutStatus.PROCESSING):
+        raise ValueError(f"Payout {payout.id} is {payout.status.value}")
+
+    _record_payment(payout, admin_user_id, payment_method, payment_reference, notes)
+
     db.commit()
     db.refresh(payout)
+    invalidate_dashboards([payout.affiliate_id])
+
+    return payout
+
+
+def _update_payout_commissions(db: Session, payout: Payout, values: dict) -> None:
+    """
+    Update every approved commission of a payout with one UPDATE
+    Completing pays exactly the commissions the payout was generated from; any
+    other count means the payout changed underneath us (a reversal rejected one
+    of them, say), so the transaction is rolled back.
+    """
+    result = db.execute(
+        update(Commission)
+        .where(Commission.payout_id == payout.id, Commission.status == CommissionStatus.APPROVED)
+        .values(updated_at=datetime.utcnow(), **values)
+        .execution_options(synchronize_session=False)
+    )
+    expected = int(payout.commission_count)
+    if result.rowcount != expected:
+        db.rollback()
+        raise ValueError(
+            f"Payout {payout.id} has {result.rowcount} approved commissions, expected {expected}"
+        )
+
+
+def _close_payout(db: Session, payout: Payout, status: PayoutStatus, notes: Optional[str]) -> Payout:
+    """
+    Fail or cancel an open payout, releasing its commissions for the next one
+    """
+    if payout.status not in (PayoutStatus.PENDING, PayoutStatus.PROCESSING):
+        raise ValueError(f"Payout {payout.id} is {payout.status.value}")
+
+    # Every commission, whatever its status: one rejected by a reversal since
+    # the payout was generated must not keep it from being closed
+    db.execute(
+        update(Commission)
+        .where(Commission.payout_id == payout.id)
+        .values(payout_id=None, updated_at=datetime.utcnow())
+        .execution_options(synchronize_session=False)
+    )
+
+    payout.status = status
+    if notes:
+        payout.notes = notes
+
+    db.commit()
+    db.refresh(payout)
+    invalidate_dashboards([payout.affiliate_id])
 
     return payout
 
@@ -129,19 +199,28 @@ def process_payout(
 def complete_payout(
     db: Session,
     payout: Payout,
+    admin_user_id: Optional[str] = None,
+    payment_method: Optional[str] = None,
+    payment_reference: Optional[str] = None,
 ) -> Payout:
     """
     Mark a payout as completed
-    Updates all associated commissions to PAID status
+    Marks all of its commissions PAID in one UPDATE. Given a payment reference,
+    the payment is recorded in the same transaction, so a failed commission
+    check leaves the payout untouched.
     """
-    payout.status = PayoutStatus.COMPLETED
+    if payout.status not in (PayoutStatus.PENDING, PayoutStatus.PROCESSING):
+        raise ValueError(f"Payout {payout.id} is {payout.status.value}")
 
-    # Mark all commissions as paid
-    for commission in payout.commissions:
-        commission.status = CommissionStatus.PAID
+    if payment_reference is not None:
+        _record_payment(payout, admin_user_id, payment_method, payment_reference)
+    _update_payout_commissions(db, payout, {"status": CommissionStatus.PAID})
 
+    payout.status = PayoutStatus.COMPLETED
+    record_event(db, WebhookEventType.PAYOUT_COMPLETED, payout)
     db.commit()
     db.refresh(payout)
+    invalidate_dashboards([payout.affiliate_id])
 
     return payout
 
@@ -153,17 +232,19 @@ def fail_payout(
 ) -> Payout:
     """
     Mark a payout as failed
-    Removes payout link from commissions so they can be included in next payout
+    Unlinks its commissions in one UPDATE so the next payout includes them
     """
-    payout.status = PayoutStatus.FAILED
-    if notes:
-        payout.notes = notes
-
-    # Unlink commissions from failed payout
-    for commission in payout.commissions:
-        commission.payout_id = None
+    return _close_payout(db, payout, PayoutStatus.FAILED, notes)
 
-    db.commit()
-    db.refresh(payout)
 
-    return payout
+def cancel_payout(
+    db: Session,
+    payout: Payout,
+    notes: Optional[str] = None,
+) -> Payout:
+    """
+    Cancel an open payout before payment
+    There is no separate cancelled state: the payout ends FAILED with a note,
+    and its commissions are released like a failed payout's.
+    """
+    return _close_payout(db, payout, PayoutStatus.FAILED, notes or "Cancelled before payment")
@@ -0,0 +1,380 @@
+"""
+Postback Service - Server-to-server conversion postbacks
+
+Merchants that report conversions from their own servers call
+``GET /api/v1/conversions/postback/{program_id}?secret=...&<params>``. The
+endpoint checks the program's shared secret, maps the query parameters onto
+the SDK conversion fields with the program's template and appends the event
+to a Redis stream, answering without a database round trip: each process
+caches a program's secret and template for ``POSTBACK_CONFIG_TTL`` seconds.
+
+The ``ingest_postbacks_job`` worker job reads the stream through a consumer
+group and writes each batch with one link query, one attribution query, one
+multi-row conversion INSERT (ON CONFLICT DO NOTHING on the idempotency key),
+one counter UPDATE per link and one commission INSERT. Entries are
+acknowledged and deleted only after the commit; entries read by a drain that
+died first are taken over once idle for ``POSTBACK_CLAIM_IDLE_SECONDS``
+(at-least-once, deduped by the idempotency key when the merchant sends one).
+
+A batch rejected for its data (an unparsable field, a constraint violation)
+is retried one event at a time; events that still fail are moved to the
+``<stream>:dead`` stream and acknowledged, so one bad postback cannot stall
+ingestion. Other errors (database unavailable) leave the batch pending.
+"""
+import hmac
+import logging
+import os
+import secrets
+import socket
+import time
+from collections import Counter
+from datetime import datetime
+from decimal import Decimal
+from typing import Dict, List, Mapping, NamedTuple, Optional, Tuple
+from uuid import UUID
+
+import orjson
+import redis
+from sqlalchemy import bindparam, select, update
+from sqlalchemy.exc import DataError, IntegrityError
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.core.metrics import CONVERSIONS_INGESTED, POSTBACKS
+from app.core.redis import get_redis
+from app.core.serialization import dumps
+from app.database import dialect_insert
+from app.models.conversion import Conversion, ConversionStatus, ConversionType
+from app.models.program import AffiliateProgram
+from app.models.referral import ReferralLink, ReferralLinkStatus
+from app.models.webhook import WebhookEventType
+from app.services.attribution_service import resolve_last_click_links
+from app.services.commission_service import create_commissions_for_conversions
+from app.services.conversion_service import resolve_idempotency_key
+from app.services.leaderboard_service import record_conversion_scores
+from app.services.live_events import commission_event, conversion_event, publish_live_events
+from app.services.referral_service import is_link_expired
+from app.services.webhook_service import record_event
+
+logger = logging.getLogger(__name__)
+
+# Template used by programs without their own; a program's template replaces
+# whole sections ("params", "defaults", "metadata") of it
+DEFAULT_POSTBACK_TEMPLATE = {
+    # Conversion field -> query parameter
+    "params": {
+        "referral_link_code": "ref",
+        "visitor_session_id": "session_id",
+        "conversion_type": "type",
+        "conversion_value": "amount",
+        "currency": "currency",
+        "idempotency_key": "transaction_id",
+    },
+    # Conversion field -> value used when the parameter is missing
+    "defaults": {"conversion_type": ConversionType.SALE.value},
+    # conversion_metadata key -> query parameter; the merchant's customer ID
+    # is not one of our users, so it is kept as metadata
+    "metadata": {"order_id": "order_id", "customer_id": "customer_id"},
+}
+
+_MAX_CACHED_CONFIGS = 10000
+_EVENT_FIELD = b"event"
+
+# Failures caused by an event's content, as opposed to the database being unavailable
+_BAD_EVENT_ERRORS = (KeyError, TypeError, ValueError, ArithmeticError, IntegrityError, DataError)
+
+
+class PostbackConfig(NamedTuple):
+    """A program's postback secret and effective template"""
+    secret: str
+    template: dict
+
+
+_configs: Dict[UUID, Tuple[float, Optional[PostbackConfig]]] = {}
+
+
+def generate_postback_secret() -> str:
+    """
+    Generate a program's shared postback secret
+    """
+    return secrets.token_urlsafe(32)
+
+
+def postback_template(template: Optional[dict]) -> dict:
+    """
+    Get the effective template of a program's (possibly partial or unset) template
+    """
+    sections = {section: value for section, value in (template or {}).items() if value is not None}
+    return {**DEFAULT_POSTBACK_TEMPLATE, **sections}
+
+
+def get_postback_config(db: Session, program_id: UUID) -> Optional[PostbackConfig]:
+    """
+    Get a program's postback configuration, cached per process
+    None when the program does not exist or has no postback secret.
+    """
+    entry = _configs.get(program_id)
+    if entry is not None and entry[0] > time.monotonic():
+        return entry[1]
+
+    row = db.execute(
+        select(AffiliateProgram.postback_secret, AffiliateProgram.postback_template)
+        .where(AffiliateProgram.id == program_id)
+    ).first()
+    config = None
+    if row is not None and row.postback_secret:
+        config = PostbackConfig(row.postback_secret, postback_template(row.postback_template))
+
+    if len(_configs) >= _MAX_CACHED_CONFIGS:
+        _configs.clear()
+    _configs[program_id] = (time.monotonic() + settings.POSTBACK_CONFIG_TTL, config)
+    return config
+
+
+def invalidate_postback_config(program_id: Optional[UUID] = None) -> None:
+    """
+    Drop a program's cached configuration (all programs when None)
+    Other processes pick up the change within POSTBACK_CONFIG_TTL.
+    """
+    if program_id is None:
+        _configs.clear()
+    else:
+        _configs.pop(program_id, None)
+
+
+def verify_postback_secret(config: Optional[PostbackConfig], secret: Optional[str]) -> bool:
+    """
+    Check a postback's secret against the program's, in constant time
+    """
+    if config is None or not secret:
+        return False
+    return hmac.compare_digest(config.secret.encode(), secret.encode())
+
+
+def map_postback_params(template: dict, params: Mapping[str, str]) -> dict:
+    """
+    Map postback query parameters onto SDK conversion fields
+    Empty parameters count as missing.
+    """
+    fields = dict(template.get("defaults", {}))
+    for field, param in template.get("params", {}).items():
+        value = params.get(param)
+        if value not in (None, ""):
+            fields[field] = value
+
+    metadata = {
+        key: params[param]
+        for key, param in template.get("metadata", {}).items()
+        if params.get(param) not in (None, "")
+    }
+    fields["conversion_metadata"] = {**metadata, "source": "postback"}
+    return fields
+
+
+def postback_event(program_id: UUID, conversion: dict, received_at: Optional[datetime] = None) -> dict:
+    """
+    Build a queued postback event from JSON-ready conversion fields
+    """
+    return {
+        **conversion,
+        "program_id": str(program_id),
+        "received_at": (received_at or datetime.utcnow()).isoformat(),
+    }
+
+
+def enqueue_postback(event: dict) -> None:
+    """
+    Append a postback event to the ingestion stream
+    """
+    get_redis().xadd(settings.POSTBACK_STREAM_KEY, {_EVENT_FIELD: dumps(event)})
+    POSTBACKS.labels("queued").inc()
+
+
+def record_postbacks(db: Session, events: List[dict]) -> Dict[str, int]:
+    """
+    Write postback events as conversions in one transaction and commit
+
+    Each event is credited like an SDK conversion: to the session's last
+    qualifying click on the program, else to its link, which must be an
+    active, unexpired link of the posting program. Events carrying a value
+    are validated and get their commission. Returns the number of events
+    created, duplicate (idempotent replays) and unmatched (no usable link).
+    """
+    outcomes = {"created": 0, "duplicate": 0, "unmatched": 0}
+    if not events:
+        return outcomes
+
+    links = {
+        link.link_code: link
+        for link in db.query(ReferralLink).filter(
+            ReferralLink.link_code.in_({event["referral_link_code"] for event in events}),
+            ReferralLink.status == ReferralLinkStatus.ACTIVE,
+        )
+    }
+
+    matched = []
+    for event in events:
+        link = links.get(event["referral_link_code"])
+        program_id = UUID(event["program_id"])
+        received_at = datetime.fromisoformat(event["received_at"])
+        if link is None or link.program_id != program_id or is_link_expired(link.expires_at, received_at):
+            outcomes["unmatched"] += 1
+            continue
+        matched.append((event, link, UUID(event["visitor_session_id"]), received_at))
+
+    attributed = resolve_last_click_links(
+        db, [(session_id, link.program_id, received_at) for _, link, session_id, received_at in matched]
+    )
+
+    now = datetime.utcnow()
+    rows, keys = [], set()
+    for (event, link, session_id, received_at), attributed_link in zip(matched, attributed):
+        link = attributed_link or link
+        value = Decimal(event["conversion_value"]) if event.get("conversion_value") is not None else Decimal("0")
+        idempotency_key = resolve_idempotency_key(event.get("idempotency_key"), event.get("conversion_metadata"))
+        if idempotency_key is not None:
+            if (link.program_id, idempotency_key) in keys:
+                outcomes["duplicate"] += 1
+                continue
+            keys.add((link.program_id, idempotency_key))
+
+        validated = value > 0
+        rows.append({
+            "referral_link_id": link.id,
+            "affiliate_id": link.affiliate_id,
+            "program_id": link.program_id,
+            "conversion_type": ConversionType(event["conversion_type"]),
+            "visitor_session_id": session_id,
+            "conversion_value": value,
+            "currency": event.get("currency") or "USD",
+            "conversion_metadata": event.get("conversion_metadata") or {},
+            "idempotency_key": idempotency_key,
+            "status": ConversionStatus.VALIDATED if validated else ConversionStatus.PENDING,
+            "converted_at": received_at,
+            "validated_at": now if validated else None,
+        })
+
+    conversions, validated, commissions = [], [], []
+    if rows:
+        conversions = db.scalars(
+            dialect_insert(db, Conversion).on_conflict_do_nothing(
+                index_elements=[Conversion.program_id, Conversion.idempotency_key],
+                index_where=Conversion.idempotency_key.isnot(None),
+            ).returning(Conversion),
+            rows,
+        ).all()
+    outcomes["duplicate"] += len(rows) - len(conversions)
+    outcomes["created"] = len(conversions)
+
+    if conversions:
+        per_link = Counter(conversion.referral_link_id for conversion in conversions)
+        link_table = ReferralLink.__table__
+        db.execute(
+            update(link_table).where(link_table.c.id == bindparam("link_id")).values(
+                conversions_count=link_table.c.conversions_count + bindparam("conversions")
+            ),
+            [{"link_id": link_id, "conversions": count} for link_id, count in per_link.items()],
+        )
+
+        validated = [c for c in conversions if c.status == ConversionStatus.VALIDATED]
+        commissions = create_commissions_for_conversions(db, validated)
+        for conversion in validated:
+            record_event(db, WebhookEventType.CONVERSION_VALIDATED, conversion)
+
+    db.commit()
+    publish_live_events(
+        [conversion_event(conversion) for conversion in conversions]
+        + [commission_event(commission) for commission in commissions]
+    )
+    record_conversion_scores(validated, commissions)
+
+    CONVERSIONS_INGESTED.labels("created").inc(outcomes["created"])
+    CONVERSIONS_INGESTED.labels("duplicate").inc(outcomes["duplicate"])
+    POSTBACKS.labels("unmatched").inc(outcomes["unmatched"])
+    return outcomes
+
+
+def _ensure_consumer_group(client: redis.Redis) -> None:
+    try:
+        client.xgroup_create(settings.POSTBACK_STREAM_KEY, settings.POSTBACK_CONSUMER_GROUP, id="0", mkstream=True)
+    except redis.ResponseError as exc:
+        if "BUSYGROUP" not in str(exc):
+            raise
+
+
+def _record_individually(db: Session, client: redis.Redis, entries: list) -> Dict[str, int]:
+    """
+    Record a rejected batch one entry at a time, dead-lettering the entries that fail
+    """
+    totals = {"created": 0, "duplicate": 0, "unmatched": 0, "dead": 0}
+    dead_letters = client.pipeline(transaction=False)
+    for entry_id, fields in entries:
+        if not fields:
+            continue
+        try:
+            outcomes = record_postbacks(db, [orjson.loads(fields[_EVENT_FIELD])])
+        except _BAD_EVENT_ERRORS as exc:
+            db.rollback()
+            logger.warning("Moving postback %s to the dead-letter stream: %r", entry_id, exc)
+            dead_letters.xadd(f"{settings.POSTBACK_STREAM_KEY}:dead", {**fields, b"error": type(exc).__name__})
+            totals["dead"] += 1
+            continue
+        for outcome, count in outcomes.items():
+            totals[outcome] += count
+
+    # Before the batch is acknowledged
+    dead_letters.execute()
+    POSTBACKS.labels("dead").inc(totals["dead"])
+    return totals
+
+
+def drain_postbacks(
+    db: Session,
+    batch_size: Optional[int] = None,
+    max_batches: int = 100,
+    consumer: Optional[str] = None,
+) -> Dict[str, int]:
+    """
+    Move queued postbacks into the database, a batch at a time
+    Returns the number of events per outcome.
+    """
+    batch_size = batch_size or settings.POSTBACK_INGEST_BATCH_SIZE
+    consumer = consumer or f"{socket.gethostname()}-{os.getpid()}"
+    key, group = settings.POSTBACK_STREAM_KEY, settings.POSTBACK_CONSUMER_GROUP
+    client = get_redis()
+    _ensure_consumer_group(client)
+
+    totals = {"created": 0, "duplicate": 0, "unmatched": 0, "dead": 0}
+    reclaiming = True
+    for _ in range(max_batches):
+        entries = []
+        if reclaiming:
+            # Entries read but never acknowledged by a drain that died
+            entries = client.xautoclaim(
+                key, group, consumer,
+                min_idle_time=settings.POSTBACK_CLAIM_IDLE_SECONDS * 1000,
+                start_id="0-0",
+                count=batch_size,
+            )[1]
+            reclaiming = len(entries) == batch_size
+        if not entries:
+            response = client.xreadgroup(group, consumer, {key: ">"}, count=batch_size)
+            entries = response[0][1] if response else []
+            if not entries:
+                break
+
+        try:
+            outcomes = record_postbacks(db, [orjson.loads(fields[_EVENT_FIELD]) for _, fields in entries if fields])
+        except _BAD_EVENT_ERRORS:
+            db.rollback()
+            outcomes = _record_individually(db, client, entries)
+        for outcome, count in outcomes.items():
+            totals[outcome] += count
+
+        entry_ids = [entry_id for entry_id, _ in entries]
+        pipeline = client.pipeline(transaction=False)
+        pipeline.xack(key, group, *entry_ids)
+        pipeline.xdel(key, *entry_ids)
+        pipeline.execute()
+
+    return totals
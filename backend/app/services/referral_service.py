@@ -1,37 +1,16 @@
 """
 Referral Service - Business logic for referral link operations
 """
-import secrets
-import string
-from typing import Optional
+from datetime import datetime, timezone
+from typing import Callable, List, NamedTuple, Optional
+from urllib.parse import urlparse, parse_qs, urlencode, urlunparse
+from uuid import UUID
+from sqlalchemy import func, select, update
 from sqlalchemy.orm import Session
 
-from app.models.referral import ReferralLink
+from app.models.referral import ReferralLink, ReferralClick, ReferralLinkStatus
 from app.models.program import ProgramEnrollment
-
-
-def generate_link_code(length: int = 8) -> str:
-    """
-    Generate a random link code
-    """
-    characters = string.ascii_lowercase + string.digits
-    return ''.join(secrets.choice(characters) for _ in range(length))
-
-
-def ensure_unique_link_code(db: Session, max_attempts: int = 10) -> str:
-    """
-    Generate a unique link code that doesn't exist in the database
-    """
-    for _ in range(max_attempts):
-        code = generate_link_code()
-        existing = db.query(ReferralLink).filter(
-            ReferralLink.link_code == code
-        ).first()
-        if not existing:
-            return code
-
-    # Fallback to a longer code if all attempts failed
-    return generate_link_code(length=12)
+from app.services.code_service import LINK_CODES, insert_with_codes
 
 
 def create_referral_link(
@@ -40,31 +19,147 @@ def create_referral_link(
     target_url: str,
     utm_params: Optional[dict] = None,
     link_metadata: Optional[dict] = None,
-    expires_at: Optional[str] = None,
+    expires_at: Optional[datetime] = None,
 ) -> ReferralLink:
     """
     Create a referral link for an enrollment
     """
-    link_code = ensure_unique_link_code(db)
-
-    link = ReferralLink(
-        enrollment_id=enrollment.id,
-        affiliate_id=enrollment.affiliate_id,
-        program_id=enrollment.program_id,
-        link_code=link_code,
-        target_url=target_url,
-        utm_params=utm_params or {},
-        link_metadata=link_metadata or {},
-        expires_at=expires_at,
-    )
-
-    db.add(link)
+    link = create_referral_links(db, enrollment, [{
+        "target_url": target_url,
+        "utm_params": utm_params,
+        "link_metadata": link_metadata,
+        "expires_at": expires_at,
+    }])[0]
     db.commit()
-    db.refresh(link)
 
     return link
 
 
+def create_referral_links(
+    db: Session,
+    enrollment: ProgramEnrollment,
+    links: List[dict],
+) -> List[ReferralLink]:
+    """
+    Create many referral links for one enrollment with bulk code allocation
+    Each item has ``target_url`` and optionally ``utm_params``,
+    ``link_metadata`` and ``expires_at``. Does not commit: the caller owns the
+    transaction.
+    """
+    rows = [
+        {
+            "enrollment_id": enrollment.id,
+            "affiliate_id": enrollment.affiliate_id,
+            "program_id": enrollment.program_id,
+            "target_url": link["target_url"],
+            "utm_params": link.get("utm_params") or {},
+            "link_metadata": link.get("link_metadata") or {},
+            "expires_at": to_utc_naive(link.get("expires_at")),
+        }
+        for link in links
+    ]
+    return insert_with_codes(db, ReferralLink, "link_code", rows, LINK_CODES)
+
+
+class LinkTarget(NamedTuple):
+    """What a redirect needs to know about an active link"""
+    id: UUID
+    link_code: str
+    target_url: str
+    utm_params: Optional[dict]
+    program_id: UUID
+    affiliate_id: UUID
+    expires_at: Optional[datetime]
+
+
+def get_link_target(db: Session, link_code: str) -> Optional[LinkTarget]:
+    """
+    Resolve an active link's redirect data by code, without loading the ORM object
+    Expiry is left to the caller (see ``is_link_expired``).
+    """
+    row = db.execute(
+        select(
+            ReferralLink.id,
+            ReferralLink.link_code,
+            ReferralLink.target_url,
+            ReferralLink.utm_params,
+            ReferralLink.program_id,
+            ReferralLink.affiliate_id,
+            ReferralLink.expires_at,
+        ).where(
+            ReferralLink.link_code == link_code,
+            ReferralLink.status == ReferralLinkStatus.ACTIVE,
+        )
+    ).first()
+    return LinkTarget(*row) if row else None
+
+
+def to_utc_naive(value: Optional[datetime]) -> Optional[datetime]:
+    """
+    Express a datetime as naive UTC, the way the models declare link expiry
+    referral_links.expires_at is timestamptz in PostgreSQL, so psycopg2 reads
+    it back timezone-aware; normalise through here before comparing or doing
+    arithmetic. Naive values are taken to be UTC already.
+    """
+    if value is None or value.tzinfo is None:
+        return value
+    return value.astimezone(timezone.utc).replace(tzinfo=None)
+
+
+def is_link_expired(expires_at: Optional[datetime], now: Optional[datetime] = None) -> bool:
+    """
+    Whether a link's expiry has passed
+    Naive and timezone-aware values may be mixed (see ``to_utc_naive``).
+    """
+    if expires_at is None:
+        return False
+    return to_utc_naive(expires_at) <= to_utc_naive(now or datetime.utcnow())
+
+
+def expired_links_query(now: datetime, limit: int):
+    """
+    Select a batch of links that are still active past their expiry
+    """
+    return select(ReferralLink.id).where(
+        ReferralLink.status == ReferralLinkStatus.ACTIVE,
+        ReferralLink.expires_at.is_not(None),
+        ReferralLink.expires_at <= now,
+    ).limit(limit)
+
+
+def deactivate_expired_links(
+    db: Session,
+    batch_size: int = 1000,
+    now: Optional[datetime] = None,
+    on_batch: Optional[Callable[[List[str]], None]] = None,
+) -> int:
+    """
+    Mark active links past their expiry INACTIVE, one committed UPDATE per batch
+    ``on_batch`` gets each batch's link codes after its commit. Returns the
+    number of links deactivated.
+    """
+    now = to_utc_naive(now or datetime.utcnow())
+    deactivated = 0
+
+    while True:
+        # SKIP LOCKED: rows being edited are left for the next run
+        batch = expired_links_query(now, batch_size).with_for_update(skip_locked=True)
+        codes = db.scalars(
+            update(ReferralLink)
+            .where(ReferralLink.id.in_(batch.scalar_subquery()))
+            .values(status=ReferralLinkStatus.INACTIVE, updated_at=datetime.utcnow())
+            .returning(ReferralLink.link_code)
+            .execution_options(synchronize_session=False)
+        ).all()
+        db.commit()
+
+        if codes and on_batch is not None:
+            on_batch(codes)
+        deactivated += len(codes)
+        if len(codes) < batch_size:
+            return deactivated
+
+
 def build_tracking_url(base_url: str, link_code: str) -> str:
     """
     Build the full tracking URL for a referral link
@@ -74,17 +169,78 @@ def build_tracking_url(base_url: str, link_code: str) -> str:
     return f"{base_url}/track/{link_code}"
 
 
-def increment_click_count(db: Session, referral_link: ReferralLink) -> None:
+def build_redirect_url(
+    target_url: str,
+    link_code: str,
+    utm_params: Optional[dict] = None,
+    visitor_session_id=None,
+) -> str:
     """
-    Increment the click count for a referral link
+    Build the redirect target for a click
+    Appends the link's UTM parameters plus the ``ref`` code and ``aff_sid``
+    visitor session so the SDK can tie later conversions to this click
     """
-    referral_link.clicks_count += 1
+    parsed = urlparse(target_url)
+    query_params = parse_qs(parsed.query)
+
+    # Add UTM parameters
+    for key, value in (utm_params or {}).items():
+        query_params[key] = [value]
+
+    # Add tracking parameters
+    query_params["ref"] = [link_code]
+    if visitor_session_id:
+        query_params["aff_sid"] = [str(visitor_session_id)]
+
+    # Rebuild URL
+    new_query = urlencode(query_params, doseq=True)
+    return urlunparse((
+        parsed.scheme,
+        parsed.netloc,
+        parsed.path,
+        parsed.params,
+        new_query,
+        parsed.fragment,
+    ))
+
+
+def increment_click_count(db: Session, referral_link) -> None:
+    """
+    Atomically increment the click count for a referral link and commit
+    Accepts a ReferralLink or a LinkTarget.
+    """
+    db.execute(
+        update(ReferralLink).where(
+            ReferralLink.id == referral_link.id
+        ).values(
+            clicks_count=ReferralLink.clicks_count + 1
+        ).execution_options(synchronize_session=False)
+    )
     db.commit()
 
 
 def increment_conversion_count(db: Session, referral_link: ReferralLink) -> None:
     """
-    Increment the conversion count for a referral link
+    Atomically increment the conversion count for a referral link
+    Does not commit: the caller owns the transaction.
     """
-    referral_link.conversions_count += 1
-    db.commit()
+    db.execute(
+        update(ReferralLink).where(
+            ReferralLink.id == referral_link.id
+        ).values(
+            conversions_count=ReferralLink.conversions_count + 1
+        ).execution_options(synchronize_session="evaluate")
+    )
+
+
+def get_click_country_breakdown(db: Session, referral_link_id) -> List[dict]:
+    """
+    Count clicks per resolved country for a referral link, busiest first
+    """
+    country = ReferralClick.geo_location["country"].astext
+
+    rows = db.query(country, func.count(ReferralClick.id)).filter(
+        ReferralClick.referral_link_id == referral_link_id
+    ).group_by(country).order_by(func.count(ReferralClick.id).desc()).all()
+
+    return [{"country": code, "clicks": clicks} for code, clicks in rows]
@@ -0,0 +1,170 @@
+"""
+Tier Service - Automatic tier promotion and demotion
+
+Each approved affiliate is placed on the highest tier whose ``requirements``
+(``min_monthly_conversions`` and ``min_monthly_revenue``) their validated
+conversions in the evaluated calendar month satisfy.
+
+Metrics for every affiliate come from one grouped aggregate, and all tier
+changes are applied with one bulk UPDATE and one bulk INSERT into
+``affiliate_tier_history``, in a single transaction.
+"""
+from datetime import datetime
+from decimal import Decimal
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+from sqlalchemy import and_, func, insert, update
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.models.affiliate import AffiliateProfile, AffiliateTier, AffiliateTierHistory, ApprovalStatus
+from app.models.conversion import Conversion, ConversionStatus
+
+
+class TierRung(NamedTuple):
+    """One tier of the ladder with its monthly requirements"""
+    tier_id: object
+    level: int
+    min_conversions: int
+    min_revenue: Decimal
+
+
+def get_tier_ladder(db: Session) -> List[TierRung]:
+    """
+    Get all tiers ordered by level with their parsed requirements
+    """
+    ladder = []
+    for tier in db.query(AffiliateTier).order_by(AffiliateTier.level).all():
+        requirements = tier.requirements or {}
+        ladder.append(TierRung(
+            tier_id=tier.id,
+            level=tier.level,
+            min_conversions=int(requirements.get("min_monthly_conversions", 0) or 0),
+            min_revenue=Decimal(str(requirements.get("min_monthly_revenue", 0) or 0)),
+        ))
+    return ladder
+
+
+def match_tier(ladder: List[TierRung], conversions: int, revenue: Decimal) -> Optional[TierRung]:
+    """
+    Get the highest tier whose requirements are all met
+    Falls back to the lowest tier when none is met.
+    """
+    matched = ladder[0] if ladder else None
+    for rung in ladder:
+        if conversions >= rung.min_conversions and revenue >= rung.min_revenue:
+            matched = rung
+    return matched
+
+
+def get_month_bounds(month: Optional[datetime] = None) -> Tuple[datetime, datetime]:
+    """
+    Get [start, end) of the calendar month before ``month`` (default: now)
+    """
+    month = month or datetime.utcnow()
+    end = datetime(month.year, month.month, 1)
+    start = datetime(end.year - 1, 12, 1) if end.month == 1 else datetime(end.year, end.month - 1, 1)
+    return start, end
+
+
+def get_monthly_metrics(
+    db: Session,
+    period_start: datetime,
+    period_end: datetime,
+) -> List[tuple]:
+    """
+    Aggregate validated conversions per approved affiliate in one query
+
+    Returns (affiliate_id, tier_id, conversions, revenue) rows; affiliates with
+    no conversions in the period are included with zeros.
+    """
+    return db.query(
+        AffiliateProfile.id,
+        AffiliateProfile.tier_id,
+        func.count(Conversion.id),
+        func.coalesce(func.sum(Conversion.conversion_value), 0),
+    ).outerjoin(
+        Conversion,
+        and_(
+            Conversion.affiliate_id == AffiliateProfile.id,
+            Conversion.status == ConversionStatus.VALIDATED,
+            Conversion.converted_at >= period_start,
+            Conversion.converted_at < period_end,
+        ),
+    ).filter(
+        AffiliateProfile.approval_status == ApprovalStatus.APPROVED,
+    ).group_by(
+        AffiliateProfile.id, AffiliateProfile.tier_id,
+    ).all()
+
+
+def evaluate_affiliate_tiers(
+    db: Session,
+    month: Optional[datetime] = None,
+    allow_demotion: Optional[bool] = None,
+) -> Dict[str, int]:
+    """
+    Re-evaluate every approved affiliate's tier against last month's metrics
+
+    Returns counts of affiliates evaluated, promoted and demoted.
+    """
+    if allow_demotion is None:
+        allow_demotion = settings.TIER_ALLOW_DEMOTION
+
+    ladder = get_tier_ladder(db)
+    if not ladder:
+        return {"evaluated": 0, "promoted": 0, "demoted": 0}
+
+    level_by_tier = {rung.tier_id: rung.level for rung in ladder}
+    period_start, period_end = get_month_bounds(month)
+    now = datetime.utcnow()
+
+    profile_updates = []
+    history_rows = []
+    promoted = demoted = 0
+    metrics = get_monthly_metrics(db, period_start, period_end)
+
+    for affiliate_id, tier_id, conversions, revenue in metrics:
+        revenue = Decimal(str(revenue))
+        target = match_tier(ladder, conversions, revenue)
+        if target.tier_id == tier_id:
+            continue
+
+        current_level = level_by_tier.get(tier_id)
+        if current_level is not None and target.level < current_level:
+            if not allow_demotion:
+                continue
+            reason = "DEMOTION"
+            demoted += 1
+        else:
+            reason = "PROMOTION"
+            promoted += 1
+
+        profile_updates.append({"id": affiliate_id, "tier_id": target.tier_id, "updated_at": now})
+        history_rows.append({
+            "affiliate_id": affiliate_id,
+            "from_tier_id": tier_id,
+            "to_tier_id": target.tier_id,
+            "reason": reason,
+            "period_start": period_start,
+            "period_end": period_end,
+            "monthly_conversions": conversions,
+            "monthly_revenue": revenue,
+            "changed_at": now,
+        })
+
+    if profile_updates:
+        db.execute(update(AffiliateProfile), profile_updates)
+        db.execute(insert(AffiliateTierHistory), history_rows)
+    db.commit()
+
+    return {"evaluated": len(metrics), "promoted": promoted, "demoted": demoted}
+
+
+def get_tier_history(db: Session, affiliate_id, limit: int = 50) -> List[AffiliateTierHistory]:
+    """
+    Get an affiliate's tier changes, most recent first
+    """
+    return db.query(AffiliateTierHistory).filter(
+        AffiliateTierHistory.affiliate_id == affiliate_id
+    ).order_by(AffiliateTierHistory.changed_at.desc()).limit(limit).all()
@@ -0,0 +1,194 @@
+"""
+Webhook Dispatcher - Async HTTP delivery of outbox events
+
+Run by the ``deliver_webhooks_job`` worker job with one long-lived
+``httpx.AsyncClient``, so connections to busy endpoints are pooled and kept
+alive across runs. Each run fans out new events, then claims due deliveries
+and sends them:
+
+- batched: up to ``WEBHOOK_BATCH_SIZE`` events per request to an endpoint,
+  as ``{"events": [{"id", "type", "created_at", "data"}, ...]}``
+- concurrently, at most ``max_concurrency`` requests in flight per endpoint
+  (one slow endpoint cannot starve the others)
+- signed: ``X-Webhook-Signature: t=<unix time>,v1=<hex HMAC-SHA256 of
+  "<t>.<body>" keyed with the endpoint secret>``
+
+Any 2xx answer delivers the whole batch; anything else (other status,
+timeout, connection error) schedules every delivery in it for a retry. Only
+the status code or error type is kept in ``last_error``: endpoint owners can
+read it, so response bodies must not leak through it.
+
+The client's transport resolves each host itself, refuses non-public
+addresses and connects to the address it checked, so a DNS answer changed
+after registration (or between check and connect) cannot reach internal hosts.
+"""
+import asyncio
+import hashlib
+import hmac
+import time
+from collections import defaultdict
+from typing import Callable, Dict, List
+
+import httpx
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.core.metrics import WEBHOOK_DELIVERIES, WEBHOOK_REQUEST_DURATION
+from app.core.serialization import dumps
+from app.database import SessionLocal
+from app.services.webhook_service import (
+    ClaimedDelivery,
+    DeliveryResult,
+    claim_deliveries,
+    fan_out_events,
+    record_results,
+    resolve_webhook_target,
+)
+
+SIGNATURE_HEADER = "X-Webhook-Signature"
+
+
+class WebhookTargetError(httpx.ConnectError):
+    """The endpoint host did not resolve to addresses deliveries may reach"""
+
+
+class PublicAddressTransport(httpx.AsyncHTTPTransport):
+    """HTTP transport connecting only to the checked, public address of each host"""
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        host = request.url.host
+        port = request.url.port or (443 if request.url.scheme == "https" else 80)
+        try:
+            addresses = await asyncio.to_thread(resolve_webhook_target, host, port)
+        except ValueError as exc:
+            raise WebhookTargetError(str(exc), request=request) from exc
+
+        # Pin the connection to the checked address; Host and TLS SNI keep the name
+        request.url = request.url.copy_with(host=addresses[0])
+        request.extensions = {**request.extensions, "sni_hostname": host}
+        return await super().handle_async_request(request)
+
+
+def sign_payload(secret: str, timestamp: int, body: bytes) -> str:
+    """
+    Build the signature header value for a request body
+    """
+    digest = hmac.new(secret.encode(), f"{timestamp}.".encode() + body, hashlib.sha256).hexdigest()
+    return f"t={timestamp},v1={digest}"
+
+
+def create_http_client() -> httpx.AsyncClient:
+    """
+    Create the dispatcher's pooled HTTP client
+    """
+    return httpx.AsyncClient(
+        timeout=settings.WEBHOOK_TIMEOUT,
+        transport=PublicAddressTransport(
+            limits=httpx.Limits(
+                max_connections=settings.WEBHOOK_MAX_CONNECTIONS,
+                max_keepalive_connections=settings.WEBHOOK_MAX_CONNECTIONS,
+            ),
+        ),
+        headers={"User-Agent": f"{settings.PROJECT_NAME} webhooks"},
+        follow_redirects=False,
+    )
+
+
+async def send_batch(client: httpx.AsyncClient, deliveries: List[ClaimedDelivery]) -> List[DeliveryResult]:
+    """
+    POST a batch of events to their (shared) endpoint
+    """
+    endpoint = deliveries[0]
+    body = dumps({
+        "events": [
+            {
+                "id": delivery.event_id,
+                "type": delivery.event_type,
+                "created_at": delivery.event_created_at,
+                "data": delivery.payload,
+            }
+            for delivery in deliveries
+        ]
+    })
+    headers = {
+        "Content-Type": "application/json",
+        SIGNATURE_HEADER: sign_payload(endpoint.secret, int(time.time()), body),
+    }
+
+    status_code, error = None, None
+    started = time.perf_counter()
+    try:
+        response = await client.post(endpoint.url, content=body, headers=headers)
+        status_code = response.status_code
+        if not response.is_success:
+            error = f"HTTP {status_code}"
+    except httpx.HTTPError as exc:
+        error = type(exc).__name__
+    WEBHOOK_REQUEST_DURATION.observe(time.perf_counter() - started)
+
+    return [
+        DeliveryResult(delivery.id, delivery.attempts + 1, error is None, status_code, error)
+        for delivery in deliveries
+    ]
+
+
+async def deliver(client: httpx.AsyncClient, claimed: List[ClaimedDelivery]) -> List[DeliveryResult]:
+    """
+    Send claimed deliveries in per-endpoint batches under per-endpoint concurrency limits
+    """
+    by_endpoint: Dict[object, List[ClaimedDelivery]] = defaultdict(list)
+    for delivery in claimed:
+        by_endpoint[delivery.endpoint_id].append(delivery)
+
+    async def send_limited(limit: asyncio.Semaphore, batch: List[ClaimedDelivery]) -> List[DeliveryResult]:
+        async with limit:
+            return await send_batch(client, batch)
+
+    sends = []
+    for deliveries in by_endpoint.values():
+        limit = asyncio.Semaphore(max(deliveries[0].max_concurrency, 1))
+        for start in range(0, len(deliveries), settings.WEBHOOK_BATCH_SIZE):
+            sends.append(send_limited(limit, deliveries[start:start + settings.WEBHOOK_BATCH_SIZE]))
+
+    return [result for batch in await asyncio.gather(*sends) for result in batch]
+
+
+def _run_with_session(session_factory: Callable[[], Session], func, *args):
+    db = session_factory()
+    try:
+        return func(db, *args)
+    finally:
+        db.close()
+
+
+async def dispatch_webhooks(
+    client: httpx.AsyncClient,
+    session_factory: Callable[[], Session] = SessionLocal,
+    max_rounds: int = 10,
+) -> Dict[str, int]:
+    """
+    Fan out new events and deliver due deliveries, a batch of each per round
+    Returns counts of events fanned out and deliveries per outcome.
+    """
+    totals = {"events": 0, "delivered": 0, "retry": 0, "dead": 0}
+
+    for _ in range(max_rounds):
+        events = await asyncio.to_thread(
+            _run_with_session, session_factory, fan_out_events, settings.WEBHOOK_CLAIM_SIZE
+        )
+        claimed = await asyncio.to_thread(
+            _run_with_session, session_factory, claim_deliveries, settings.WEBHOOK_CLAIM_SIZE
+        )
+        totals["events"] += events
+
+        if claimed:
+            results = await deliver(client, claimed)
+            outcomes = await asyncio.to_thread(_run_with_session, session_factory, record_results, results)
+            for outcome, count in outcomes.items():
+                totals[outcome] += count
+                WEBHOOK_DELIVERIES.labels(outcome).inc(count)
+
+        if events < settings.WEBHOOK_CLAIM_SIZE and len(claimed) < settings.WEBHOOK_CLAIM_SIZE:
+            break
+
+    return totals
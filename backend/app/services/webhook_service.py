@@ -0,0 +1,330 @@
+"""
+Webhook Service - Transactional outbox and delivery bookkeeping
+
+Services record events with ``record_event`` inside the transaction that makes
+the change, so an event exists exactly when its change committed. The
+dispatcher (``app.services.webhook_dispatcher``) then, in its own short
+transactions:
+
+1. fans undispatched events out into one delivery per subscribed endpoint,
+2. claims due deliveries, pushing their next attempt out by a lease so that
+   the claims of a crashed dispatcher are retried later rather than lost,
+3. records each outcome: delivered, rescheduled with exponential backoff and
+   jitter, or dead-lettered after ``WEBHOOK_MAX_ATTEMPTS``.
+
+Delivery is at-least-once and unordered: receivers dedupe on the event ID.
+
+Endpoint URLs must resolve to public addresses only, both when registered
+(``check_webhook_url``) and on every send, so webhooks cannot be pointed at
+internal services.
+"""
+import ipaddress
+import random
+import secrets
+import socket
+from collections import defaultdict
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, NamedTuple, Optional, Sequence
+from urllib.parse import urlsplit
+from uuid import UUID
+
+import orjson
+from sqlalchemy import bindparam, insert, or_, select, update
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.core.serialization import dumps
+from app.models.webhook import (
+    OutboxEvent,
+    WebhookDelivery,
+    WebhookDeliveryStatus,
+    WebhookEndpoint,
+    WebhookEventType,
+)
+
+# Longer than a dispatch job may run, so live claims are never taken twice
+CLAIM_LEASE_SECONDS = 600
+
+# Fields of the changed row sent as each event's ``data``
+EVENT_FIELDS: Dict[WebhookEventType, Sequence[str]] = {
+    WebhookEventType.CONVERSION_VALIDATED: (
+        "id", "referral_link_id", "affiliate_id", "program_id", "conversion_type",
+        "conversion_value", "currency", "status", "conversion_metadata",
+        "converted_at", "validated_at",
+    ),
+    WebhookEventType.COMMISSION_APPROVED: (
+        "id", "conversion_id", "affiliate_id", "program_id", "base_amount",
+        "tier_multiplier", "final_amount", "currency", "status", "approved_at",
+    ),
+    WebhookEventType.PAYOUT_COMPLETED: (
+        "id", "affiliate_id", "payout_period_start", "payout_period_end",
+        "total_amount", "currency", "commission_count", "payment_method",
+        "payment_reference", "status", "processed_at",
+    ),
+}
+
+
+def generate_webhook_secret() -> str:
+    """
+    Generate a signing secret for a new endpoint
+    """
+    return f"whsec_{secrets.token_urlsafe(32)}"
+
+
+def resolve_host(host: str, port: int) -> List[str]:
+    """
+    Resolve a host name to its IP addresses (an IP literal resolves to itself)
+    """
+    infos = socket.getaddrinfo(host, port, type=socket.SOCK_STREAM)
+    return list(dict.fromkeys(info[4][0] for info in infos))
+
+
+def is_public_address(address: str) -> bool:
+    """
+    Whether an IP address is publicly routable
+
+    Private, loopback, link-local (cloud metadata), shared, reserved and
+    multicast ranges are not, including their IPv4-mapped IPv6 forms.
+    """
+    ip = ipaddress.ip_address(address.split("%", 1)[0])
+    if ip.version == 6 and ip.ipv4_mapped:
+        ip = ip.ipv4_mapped
+    return ip.is_global and not ip.is_multicast
+
+
+def resolve_webhook_target(host: str, port: int) -> List[str]:
+    """
+    Resolve a webhook host, refusing it unless every address is public
+    WEBHOOK_ALLOW_PRIVATE_TARGETS lifts the check for local development.
+    Raises ValueError for hosts that do not resolve or are not public.
+    """
+    try:
+        addresses = resolve_host(host, port)
+    except (OSError, UnicodeError) as exc:
+        raise ValueError(f"Cannot resolve {host}") from exc
+    if not addresses:
+        raise ValueError(f"Cannot resolve {host}")
+    if not settings.WEBHOOK_ALLOW_PRIVATE_TARGETS and not all(map(is_public_address, addresses)):
+        raise ValueError(f"{host} resolves to a non-public address")
+    return addresses
+
+
+def check_webhook_url(url: str) -> None:
+    """
+    Check an endpoint URL before it is stored
+    Raises ValueError unless it is http(s) and its host resolves to public addresses only.
+    """
+    parts = urlsplit(url)
+    if parts.scheme not in ("http", "https") or not parts.hostname:
+        raise ValueError("Webhook URLs must be absolute http(s) URLs")
+    resolve_webhook_target(parts.hostname, parts.port or (443 if parts.scheme == "https" else 80))
+
+
+def record_event(db: Session, event_type: WebhookEventType, obj: Any) -> OutboxEvent:
+    """
+    Add an outbox event describing a conversion, commission or payout
+    Does not commit: the event is written with the caller's transaction.
+    """
+    data = {field: getattr(obj, field) for field in EVENT_FIELDS[event_type]}
+    event = OutboxEvent(
+        event_type=event_type.value,
+        # JSON-ready (UUIDs, Decimals and datetimes as strings) for the JSONB column
+        payload=orjson.loads(dumps(data)),
+        affiliate_id=getattr(obj, "affiliate_id", None),
+        program_id=getattr(obj, "program_id", None),
+    )
+    db.add(event)
+    return event
+
+
+def fan_out_events(db: Session, limit: int = 1000) -> int:
+    """
+    Create the deliveries of undispatched events and commit
+    Each event goes to the active endpoints of its affiliate and of its
+    program that subscribe to its type. Returns the number of events handled.
+    """
+    now = datetime.utcnow()
+    events = db.execute(
+        select(OutboxEvent.id, OutboxEvent.event_type, OutboxEvent.affiliate_id, OutboxEvent.program_id)
+        .where(OutboxEvent.dispatched_at.is_(None))
+        .order_by(OutboxEvent.created_at)
+        .limit(limit)
+        .with_for_update(skip_locked=True)
+    ).all()
+    if not events:
+        return 0
+
+    affiliate_ids = {event.affiliate_id for event in events if event.affiliate_id}
+    program_ids = {event.program_id for event in events if event.program_id}
+    endpoints = db.execute(
+        select(WebhookEndpoint.id, WebhookEndpoint.affiliate_id, WebhookEndpoint.program_id, WebhookEndpoint.event_types)
+        .where(
+            WebhookEndpoint.is_active.is_(True),
+            or_(WebhookEndpoint.affiliate_id.in_(affiliate_ids), WebhookEndpoint.program_id.in_(program_ids)),
+        )
+    ).all()
+
+    by_affiliate, by_program = defaultdict(list), defaultdict(list)
+    for endpoint in endpoints:
+        if endpoint.affiliate_id:
+            by_affiliate[endpoint.affiliate_id].append(endpoint)
+        else:
+            by_program[endpoint.program_id].append(endpoint)
+
+    deliveries = [
+        {"event_id": event.id, "endpoint_id": endpoint.id, "next_attempt_at": now}
+        for event in events
+        for endpoint in by_affiliate.get(event.affiliate_id, []) + by_program.get(event.program_id, [])
+        if event.event_type in endpoint.event_types
+    ]
+    if deliveries:
+        db.execute(insert(WebhookDelivery), deliveries)
+    db.execute(
+        update(OutboxEvent)
+        .where(OutboxEvent.id.in_([event.id for event in events]))
+        .values(dispatched_at=now)
+        .execution_options(synchronize_session=False)
+    )
+    db.commit()
+    return len(events)
+
+
+class ClaimedDelivery(NamedTuple):
+    """A delivery taken by the dispatcher, with what it needs to send it"""
+    id: UUID
+    attempts: int
+    endpoint_id: UUID
+    url: str
+    secret: str
+    max_concurrency: int
+    event_id: UUID
+    event_type: str
+    payload: dict
+    event_created_at: datetime
+
+
+def claim_deliveries(db: Session, limit: int, lease_seconds: float = CLAIM_LEASE_SECONDS) -> List[ClaimedDelivery]:
+    """
+    Claim up to ``limit`` due deliveries to active endpoints and commit
+    """
+    now = datetime.utcnow()
+    due = (
+        select(WebhookDelivery.id)
+        .join(WebhookEndpoint, WebhookEndpoint.id == WebhookDelivery.endpoint_id)
+        .where(
+            WebhookDelivery.status == WebhookDeliveryStatus.PENDING,
+            WebhookDelivery.next_attempt_at <= now,
+            WebhookEndpoint.is_active.is_(True),
+        )
+        .order_by(WebhookDelivery.next_attempt_at)
+        .limit(limit)
+        .with_for_update(of=WebhookDelivery, skip_locked=True)
+    )
+    claimed_ids = db.scalars(
+        update(WebhookDelivery)
+        .where(WebhookDelivery.id.in_(due.scalar_subquery()))
+        .values(next_attempt_at=now + timedelta(seconds=lease_seconds))
+        .returning(WebhookDelivery.id)
+        .execution_options(synchronize_session=False)
+    ).all()
+
+    claimed = []
+    if claimed_ids:
+        claimed = [
+            ClaimedDelivery(*row)
+            for row in db.execute(
+                select(
+                    WebhookDelivery.id,
+                    WebhookDelivery.attempts,
+                    WebhookEndpoint.id,
+                    WebhookEndpoint.url,
+                    WebhookEndpoint.secret,
+                    WebhookEndpoint.max_concurrency,
+                    OutboxEvent.id,
+                    OutboxEvent.event_type,
+                    OutboxEvent.payload,
+                    OutboxEvent.created_at,
+                )
+                .join(WebhookEndpoint, WebhookEndpoint.id == WebhookDelivery.endpoint_id)
+                .join(OutboxEvent, OutboxEvent.id == WebhookDelivery.event_id)
+                .where(WebhookDelivery.id.in_(claimed_ids))
+                .order_by(OutboxEvent.created_at)
+            )
+        ]
+    db.commit()
+    return claimed
+
+
+class DeliveryResult(NamedTuple):
+    """Outcome of one attempt at a delivery"""
+    delivery_id: UUID
+    attempts: int  # Including this one
+    delivered: bool
+    status_code: Optional[int] = None
+    error: Optional[str] = None
+
+
+def retry_delay(attempts: int) -> float:
+    """
+    Seconds before the next attempt: exponential backoff with jitter
+    """
+    delay = min(
+        settings.WEBHOOK_RETRY_BASE_SECONDS * 2 ** (attempts - 1),
+        settings.WEBHOOK_RETRY_MAX_SECONDS,
+    )
+    return delay / 2 + random.uniform(0, delay / 2)
+
+
+def record_results(db: Session, results: List[DeliveryResult]) -> Dict[str, int]:
+    """
+    Store delivery outcomes with one UPDATE round trip and commit
+    Returns the number of deliveries per outcome (delivered, retry, dead).
+    """
+    now = datetime.utcnow()
+    outcomes = {"delivered": 0, "retry": 0, "dead": 0}
+    params = []
+    for result in results:
+        if result.delivered:
+            outcome, status, next_attempt_at = "delivered", WebhookDeliveryStatus.DELIVERED, now
+        elif result.attempts >= settings.WEBHOOK_MAX_ATTEMPTS:
+            outcome, status, next_attempt_at = "dead", WebhookDeliveryStatus.DEAD, now
+        else:
+            outcome, status = "retry", WebhookDeliveryStatus.PENDING
+            next_attempt_at = now + timedelta(seconds=retry_delay(result.attempts))
+        outcomes[outcome] += 1
+        params.append({
+            "delivery_id": result.delivery_id,
+            "new_status": status,
+            "new_attempts": result.attempts,
+            "retry_at": next_attempt_at,
+            "status_code": result.status_code,
+            "error": result.error,
+            "delivered": now if result.delivered else None,
+        })
+
+    if params:
+        deliveries = WebhookDelivery.__table__
+        db.execute(
+            update(deliveries).where(deliveries.c.id == bindparam("delivery_id")).values(
+                status=bindparam("new_status"),
+                attempts=bindparam("new_attempts"),
+                next_attempt_at=bindparam("retry_at"),
+                last_status_code=bindparam("status_code"),
+                last_error=bindparam("error"),
+                delivered_at=bindparam("delivered"),
+            ),
+            params,
+        )
+    db.commit()
+    return outcomes
+
+
+def redeliver(db: Session, delivery: WebhookDelivery) -> WebhookDelivery:
+    """
+    Put a dead-lettered delivery back in the queue with fresh attempts
+    """
+    delivery.status = WebhookDeliveryStatus.PENDING
+    delivery.attempts = 0
+    delivery.next_attempt_at = datetime.utcnow()
+    db.commit()
+    return delivery
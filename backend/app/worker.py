@@ -0,0 +1,180 @@
+"""
+Background Job Worker (arq)
+
+Run with:
+    arq app.worker.WorkerSettings
+"""
+import asyncio
+from datetime import datetime, timedelta
+
+from arq import cron
+from arq.connections import RedisSettings
+from arq.worker import func
+
+from app.core.config import settings
+from app.database import SessionLocal
+from app.services.attribution_service import reattribute_conversions
+from app.services.click_queue import drain_clicks
+from app.services.leaderboard_service import reconcile_leaderboards
+from app.services.link_snapshot import build_link_snapshot, notify_links_changed
+from app.services.multitouch_attribution_service import (
+    ATTRIBUTION_MODELS,
+    run_multitouch_attribution,
+)
+from app.services.overview_service import refresh_overview_views
+from app.services.postback_service import drain_postbacks
+from app.services.referral_service import deactivate_expired_links
+from app.services.tier_service import evaluate_affiliate_tiers
+from app.services.webhook_dispatcher import create_http_client, dispatch_webhooks
+
+
+def _run_with_session(func, *args, **kwargs):
+    """
+    Run a synchronous service function with its own database session
+    """
+    db = SessionLocal()
+    try:
+        return func(db, *args, **kwargs)
+    finally:
+        db.close()
+
+
+async def reattribute_conversions_job(ctx, days: int = 7, chunk_size: int = 1000) -> dict:
+    """
+    Re-run last-click attribution over the last ``days`` of pending conversions
+    """
+    since = datetime.utcnow() - timedelta(days=days)
+    scanned, changed = await asyncio.to_thread(
+        _run_with_session, reattribute_conversions, since, chunk_size=chunk_size
+    )
+    return {"scanned": scanned, "reattributed": changed}
+
+
+async def multitouch_attribution_job(ctx, models: list = None, days: int = 1) -> dict:
+    """
+    Recompute multi-touch credit shares for the last ``days`` of validated conversions
+    Partitions run in a process pool sized by ATTRIBUTION_PARTITIONS
+    """
+    since = datetime.utcnow() - timedelta(days=days)
+    results = {}
+    for model in models or sorted(ATTRIBUTION_MODELS):
+        processed, written = await asyncio.to_thread(run_multitouch_attribution, model, since)
+        results[model] = {"conversions": processed, "credits": written}
+    return results
+
+
+async def evaluate_tiers_job(ctx) -> dict:
+    """
+    Promote and demote affiliates based on last month's metrics
+    """
+    return await asyncio.to_thread(_run_with_session, evaluate_affiliate_tiers)
+
+
+async def ingest_clicks_job(ctx) -> dict:
+    """
+    Write clicks queued by the redirect service to the database
+    """
+    return {"clicks": await asyncio.to_thread(_run_with_session, drain_clicks)}
+
+
+async def ingest_postbacks_job(ctx) -> dict:
+    """
+    Write conversions queued by the postback endpoint to the database
+    """
+    return await asyncio.to_thread(_run_with_session, drain_postbacks)
+
+
+async def expire_links_job(ctx) -> dict:
+    """
+    Deactivate links past their expiry and evict them from the link caches
+    """
+    deactivated = await asyncio.to_thread(
+        _run_with_session,
+        deactivate_expired_links,
+        batch_size=settings.LINK_EXPIRY_SWEEP_BATCH_SIZE,
+        on_batch=notify_links_changed,
+    )
+    return {"links": deactivated}
+
+
+async def build_link_snapshot_job(ctx) -> dict:
+    """
+    Rebuild the shared active-link snapshot read by the API and redirect processes
+    """
+    if not settings.LINK_SNAPSHOT_PATH:
+        return {"links": None}
+    links = await asyncio.to_thread(_run_with_session, build_link_snapshot, settings.LINK_SNAPSHOT_PATH)
+    return {"links": links}
+
+
+async def deliver_webhooks_job(ctx) -> dict:
+    """
+    Fan out outbox events and deliver due webhooks
+    """
+    return await dispatch_webhooks(ctx["http"])
+
+
+async def reconcile_leaderboards_job(ctx) -> dict:
+    """
+    Rebuild this and last month's leaderboards from the database
+    """
+    return {"keys": await asyncio.to_thread(_run_with_session, reconcile_leaderboards)}
+
+
+async def refresh_overview_views_job(ctx) -> dict:
+    """
+    Refresh the admin overview materialized views concurrently
+    """
+    seconds = await asyncio.to_thread(_run_with_session, refresh_overview_views)
+    return {"seconds": seconds}
+
+
+async def startup(ctx) -> None:
+    # One pooled client per worker, so webhook connections are kept alive across runs
+    ctx["http"] = create_http_client()
+
+
+async def shutdown(ctx) -> None:
+    await ctx["http"].aclose()
+
+
+class WorkerSettings:
+    """arq worker configuration"""
+
+    redis_settings = RedisSettings.from_dsn(settings.REDIS_URL)
+    functions = [
+        reattribute_conversions_job,
+        multitouch_attribution_job,
+        evaluate_tiers_job,
+        ingest_clicks_job,
+        ingest_postbacks_job,
+        expire_links_job,
+        build_link_snapshot_job,
+        deliver_webhooks_job,
+        reconcile_leaderboards_job,
+        # Queued by the admin refresh endpoint under a fixed job ID; without a
+        # kept result that ID frees up as soon as the run finishes
+        func(refresh_overview_views_job, keep_result=0, timeout=900),
+    ]
+    cron_jobs = [
+        cron(reattribute_conversions_job, hour=3, minute=0),
+        cron(multitouch_attribution_job, hour=4, minute=0),
+        cron(evaluate_tiers_job, day=1, hour=2, minute=0),
+        # Every 5 seconds; arq can start a run while the previous one is still
+        # going, so the click drain takes a Redis lock and the postback drain
+        # reads through a consumer group
+        cron(ingest_clicks_job, second=set(range(0, 60, 5)), timeout=60),
+        cron(ingest_postbacks_job, second=set(range(0, 60, 5)), timeout=60),
+        # Every minute, ahead of the snapshot rebuild
+        cron(expire_links_job, second=15, timeout=300),
+        # Every minute, and when the worker starts
+        cron(build_link_snapshot_job, second=30, run_at_startup=True, timeout=300),
+        # Every 5 seconds; well under the delivery claim lease
+        cron(deliver_webhooks_job, second=set(range(0, 60, 5)), timeout=300),
+        # Hourly; corrects increments lost while Redis was down and reversals
+        cron(reconcile_leaderboards_job, minute=20, timeout=900),
+        # Every 5 minutes, well inside OVERVIEW_MAX_STALENESS_SECONDS
+        cron(refresh_overview_views_job, minute=set(range(0, 60, 5)), second=45, timeout=900),
+    ]
+    on_startup = startup
+    on_shutdown = shutdown
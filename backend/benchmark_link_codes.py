@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+"""
+Benchmark referral link creation: random codes with probes vs sequence-derived codes
+
+The "before" path is the previous one: draw a random code, SELECT to check it
+is free, INSERT the link, one link at a time. The "after" path allocates all
+codes from the sequence pool and inserts them with multi-row INSERTs
+(``create_referral_links``).
+
+Runs against DATABASE_URL inside a transaction that is rolled back, so no rows
+are kept (sequence values are still consumed). ``--sqlite`` uses an in-memory
+SQLite database instead, with the test suite's schema shims.
+
+Usage:
+    python benchmark_link_codes.py [links] [--sqlite]
+"""
+import secrets
+import string
+import sys
+import time
+
+from sqlalchemy.orm import Session
+
+from app.models.referral import ReferralLink
+from app.services.referral_service import create_referral_links
+
+
+def random_code(length: int = 8) -> str:
+    characters = string.ascii_lowercase + string.digits
+    return "".join(secrets.choice(characters) for _ in range(length))
+
+
+def create_with_probes(db: Session, enrollment, count: int) -> None:
+    """The previous path: probe for a free random code, then insert, per link"""
+    for i in range(count):
+        for _ in range(10):
+            code = random_code()
+            if not db.query(ReferralLink).filter(ReferralLink.link_code == code).first():
+                break
+        db.add(ReferralLink(
+            enrollment_id=enrollment.id,
+            affiliate_id=enrollment.affiliate_id,
+            program_id=enrollment.program_id,
+            link_code=code,
+            target_url=f"https://example.com/probe/{i}",
+        ))
+        db.flush()
+
+
+def create_in_bulk(db: Session, enrollment, count: int) -> None:
+    create_referral_links(
+        db, enrollment, [{"target_url": f"https://example.com/bulk/{i}"} for i in range(count)]
+    )
+
+
+def open_session(use_sqlite: bool):
+    """Get a session plus an enrollment to attach links to"""
+    if use_sqlite:
+        from tests.db_utils import create_referral_link, create_sqlite_engine, create_sqlite_session
+
+        db = create_sqlite_session(create_sqlite_engine())
+        return db, create_referral_link(db, link_code="benchmark").enrollment
+
+    from app.database import SessionLocal
+    from app.models.program import ProgramEnrollment
+
+    db = SessionLocal()
+    enrollment = db.query(ProgramEnrollment).first()
+    if enrollment is None:
+        raise SystemExit("No program enrollment found: create one first, or use --sqlite")
+    return db, enrollment
+
+
+def timed(db: Session, func, enrollment, count: int) -> float:
+    started = time.perf_counter()
+    func(db, enrollment, count)
+    elapsed = time.perf_counter() - started
+    db.rollback()
+    return elapsed
+
+
+def main():
+    """Main function to run the benchmark"""
+    args = [arg for arg in sys.argv[1:] if not arg.startswith("--")]
+    count = int(args[0]) if args else 100000
+    use_sqlite = "--sqlite" in sys.argv
+
+    db, enrollment = open_session(use_sqlite)
+    try:
+        before = timed(db, create_with_probes, enrollment, count)
+        after = timed(db, create_in_bulk, enrollment, count)
+    finally:
+        db.rollback()
+        db.close()
+
+    print(f"Creating {count} referral links ({'sqlite' if use_sqlite else 'DATABASE_URL'})")
+    print(f"  random code + probe, per link: {count / before:>10,.0f} links/s ({before:.2f}s)")
+    print(f"  sequence codes, bulk insert:   {count / after:>10,.0f} links/s ({after:.2f}s)")
+    print(f"  speedup: {before / after:.1f}x")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
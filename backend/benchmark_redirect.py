@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+"""
+Benchmark the tracking redirect: API route vs standalone redirect service
+
+Calls both ASGI apps in-process on one core, with no HTTP server or network in
+between, so the numbers are the per-core cost of the application itself:
+
+- API route: ``GET /api/v1/referrals/track/{code}`` through the full FastAPI
+  stack, with a session per request and the click written synchronously
+  (in-memory SQLite stands in for Postgres).
+- Redirect service: ``app.redirect`` with a warm link cache and clicks handed
+  to an in-memory queue (in production, one Redis RPUSH).
+- Redirect service reading the shared memory-mapped link snapshot instead of
+  its own cache (binary search per request, nothing to warm per process).
+
+Usage:
+    python benchmark_redirect.py [requests]
+"""
+import asyncio
+import os
+import sys
+import tempfile
+import time
+
+from app.database import get_db
+from app.main import app as api_app
+from app.redirect import RedirectApp
+from app.services.link_snapshot import LinkSource, build_link_snapshot
+from app.services.referral_service import get_link_target
+from tests.db_utils import create_referral_link, create_sqlite_engine, create_sqlite_session
+
+
+def make_scope(path: str) -> dict:
+    return {
+        "type": "http",
+        "asgi": {"version": "3.0"},
+        "http_version": "1.1",
+        "method": "GET",
+        "scheme": "http",
+        "path": path,
+        "raw_path": path.encode(),
+        "root_path": "",
+        "query_string": b"",
+        "headers": [(b"host", b"bench"), (b"user-agent", b"benchmark")],
+        "client": ("127.0.0.1", 50000),
+        "server": ("bench", 80),
+    }
+
+
+async def run(app, path: str, count: int) -> float:
+    """Serve ``count`` requests one after another; returns requests per second"""
+    statuses = []
+
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        if message["type"] == "http.response.start":
+            statuses.append(message["status"])
+
+    started = time.perf_counter()
+    for _ in range(count):
+        await app(make_scope(path), receive, send)
+    elapsed = time.perf_counter() - started
+
+    assert set(statuses) == {302}, f"unexpected statuses {set(statuses)}"
+    return count / elapsed
+
+
+def main():
+    """Main function to run the benchmark"""
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+
+    engine = create_sqlite_engine()
+    db = create_sqlite_session(engine)
+    create_referral_link(db, link_code="bench123")
+
+    api_app.dependency_overrides[get_db] = lambda: db
+    queued = []
+
+    async def record_click(event):
+        queued.append(event)
+
+    redirect_app = RedirectApp(resolve=lambda code: get_link_target(db, code), record_click=record_click)
+
+    snapshot_path = os.path.join(tempfile.mkdtemp(), "links.snapshot")
+    build_link_snapshot(db, snapshot_path)
+    snapshot_app = RedirectApp(
+        resolve=lambda code: get_link_target(db, code),
+        record_click=record_click,
+        source=LinkSource(snapshot_path),
+    )
+
+    api_rps = asyncio.run(run(api_app, "/api/v1/referrals/track/bench123", count))
+    redirect_rps = asyncio.run(run(redirect_app, "/track/bench123", count))
+    snapshot_rps = asyncio.run(run(snapshot_app, "/track/bench123", count))
+    os.unlink(snapshot_path)
+
+    print(f"Tracking redirect, {count} requests on one core (in-process, no network)")
+    print(f"  API route (FastAPI + session + click INSERT): {api_rps:>10,.0f} req/s")
+    print(f"  redirect service (cache + queued click):      {redirect_rps:>10,.0f} req/s")
+    print(f"  redirect service (snapshot + queued click):   {snapshot_rps:>10,.0f} req/s")
+    print(f"  speedup: {redirect_rps / api_rps:.1f}x")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
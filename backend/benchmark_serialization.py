@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+"""
+Benchmark list endpoint serialization: response_model path vs orjson fast path
+
+The "before" path mirrors what FastAPI does for ``response_model=List[Commission]``:
+validate each ORM object with pydantic ``from_attributes``, encode it to
+JSON-compatible data and dump it with the stdlib json module. The "after"
+path serializes projected row tuples with orjson.
+
+Usage:
+    python benchmark_serialization.py [rows] [repeats]
+"""
+import json
+import sys
+import time
+import uuid
+from datetime import datetime, timedelta
+from decimal import Decimal
+from typing import List
+
+from fastapi.encoders import jsonable_encoder
+from pydantic import TypeAdapter
+
+from app.core.serialization import rows_to_json
+from app.models.conversion import Commission as CommissionModel, CommissionStatus
+from app.schemas.conversion import Commission
+
+
+def build_commissions(count: int) -> List[CommissionModel]:
+    """Build transient commission objects with realistic values"""
+    now = datetime.utcnow()
+    affiliate_id, program_id = uuid.uuid4(), uuid.uuid4()
+    return [
+        CommissionModel(
+            id=uuid.uuid4(),
+            conversion_id=uuid.uuid4(),
+            affiliate_id=affiliate_id,
+            program_id=program_id,
+            tier_id=None,
+            commission_rule={"type": "percentage", "value": 20},
+            base_amount=Decimal("29.98"),
+            tier_multiplier=Decimal("1.20"),
+            final_amount=Decimal("35.98"),
+            currency="USD",
+            status=CommissionStatus.PENDING,
+            approved_by=None,
+            approved_at=None,
+            payout_id=None,
+            created_at=now - timedelta(minutes=i),
+            updated_at=now,
+        )
+        for i in range(count)
+    ]
+
+
+def best_of(repeats: int, func) -> float:
+    """Best wall time of several runs"""
+    timings = []
+    for _ in range(repeats):
+        started = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - started)
+    return min(timings)
+
+
+def main():
+    """Main function to run the benchmark"""
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 10000
+    repeats = int(sys.argv[2]) if len(sys.argv) > 2 else 5
+
+    objects = build_commissions(count)
+    fields = list(Commission.model_fields)
+    rows = [tuple(getattr(obj, name) for name in fields) for obj in objects]
+    adapter = TypeAdapter(List[Commission])
+
+    def response_model_path():
+        validated = adapter.validate_python(objects, from_attributes=True)
+        return json.dumps(jsonable_encoder(validated)).encode("utf-8")
+
+    def fast_path():
+        return rows_to_json(rows, fields)
+
+    assert json.loads(response_model_path()) == json.loads(fast_path())
+
+    before = best_of(repeats, response_model_path)
+    after = best_of(repeats, fast_path)
+
+    print(f"Serializing {count} commissions (best of {repeats})")
+    print(f"  response_model + json:   {count / before:>10,.0f} rows/s")
+    print(f"  projected rows + orjson: {count / after:>10,.0f} rows/s")
+    print(f"  speedup: {before / after:.1f}x")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,40 @@
+#!/usr/bin/env python3
+"""
+Compile an IP-range CSV into the binary geo database used for click enrichment
+
+Accepts the DB-IP / IP2Location "country lite" CSV layout:
+    start_ip,end_ip,country_code
+
+Usage:
+    python build_geo_db.py dbip-country-lite.csv geoip.bin
+
+Then point GEOIP_DATABASE_PATH at the output file.
+"""
+import sys
+import time
+
+from app.services.geo_service import build_geo_database
+
+
+def main():
+    """Main function to build the geo database"""
+    if len(sys.argv) != 3:
+        print(__doc__)
+        return 1
+
+    source_csv, output_path = sys.argv[1], sys.argv[2]
+    try:
+        started = time.perf_counter()
+        v4_count, v6_count = build_geo_database(source_csv, output_path)
+        elapsed = time.perf_counter() - started
+        print(f"✅ Wrote {v4_count} IPv4 and {v6_count} IPv6 ranges to {output_path} in {elapsed:.1f}s")
+        return 0
+    except Exception as e:
+        print(f"\n❌ Error building geo database: {e}")
+        import traceback
+        traceback.print_exc()
+        return 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
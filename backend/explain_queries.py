@@ -0,0 +1,335 @@
+#!/usr/bin/env python3
+"""
+EXPLAIN the hot list, payout and link queries and report plan regressions
+
+Runs ``EXPLAIN (ANALYZE, BUFFERS, FORMAT JSON)`` for the queries behind the
+list endpoints and payout generation, for the affiliate with the most
+commissions, and prints execution time, shared buffers touched and the scan
+nodes of each plan.
+
+With ``--baseline`` the results are compared against a previous run saved
+with ``--save``; a query regresses when it starts sequentially scanning a
+table, or its buffers or execution time grow beyond ``--tolerance``. The
+exit status is 1 when anything regressed, so the script can gate CI.
+
+``--seed`` first bulk-inserts a synthetic dataset (affiliates, links,
+conversions, commissions and payouts) and runs ANALYZE. Only use it against a
+scratch database.
+
+Usage:
+    python explain_queries.py [--seed AFFILIATES] [--per-affiliate N]
+                              [--save plans.json] [--baseline plans.json]
+                              [--tolerance 0.5]
+"""
+import argparse
+import json
+import random
+import sys
+import uuid
+from datetime import datetime, timedelta
+from decimal import Decimal
+from typing import Dict, List
+
+from sqlalchemy import func, insert, select, text
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.orm import Session
+from sqlalchemy.sql.base import Executable
+from sqlalchemy.sql.expression import ClauseElement
+
+from app.core.serialization import schema_columns
+from app.database import SessionLocal
+from app.models.affiliate import AffiliateProfile
+from app.models.conversion import (
+    Commission,
+    CommissionStatus,
+    Conversion,
+    ConversionStatus,
+    ConversionType,
+    Payout,
+    PayoutStatus,
+)
+from app.models.program import AffiliateProgram, EnrollmentStatus, ProgramEnrollment, ProgramType
+from app.models.referral import ReferralLink, ReferralLinkStatus
+from app.models.user import User, UserRole
+from app.schemas.conversion import Commission as CommissionSchema
+from app.schemas.conversion import Conversion as ConversionSchema
+from app.schemas.conversion import Payout as PayoutSchema
+from app.services.link_snapshot import active_links_query
+from app.services.referral_service import expired_links_query
+
+SEEDED_TABLES = [
+    "users", "affiliate_profiles", "affiliate_programs", "program_enrollments",
+    "referral_links", "conversions", "commissions", "payouts",
+]
+BATCH_SIZE = 5000
+# Execution times below this are noise, not regressions
+MIN_REGRESSION_MS = 1.0
+
+
+# ===== Seeding =====
+
+def _insert_batches(db: Session, model, rows: List[dict]) -> None:
+    for start in range(0, len(rows), BATCH_SIZE):
+        db.execute(insert(model), rows[start:start + BATCH_SIZE])
+
+
+def seed(db: Session, affiliates: int, per_affiliate: int) -> None:
+    """
+    Bulk-insert a synthetic dataset with a skewed status mix and a year of history
+    """
+    rng = random.Random(42)
+    now = datetime.utcnow()
+    run = uuid.uuid4().hex[:8]
+
+    admin_id = uuid.uuid4()
+    program_id = uuid.uuid4()
+    db.execute(insert(User), [{
+        "id": admin_id, "email": f"explain-admin-{run}@example.com", "hashed_password": "-",
+        "first_name": "Explain", "last_name": "Admin", "role": UserRole.ADMIN,
+    }])
+    db.execute(insert(AffiliateProgram), [{
+        "id": program_id, "name": f"Explain {run}", "slug": f"explain-{run}",
+        "program_type": ProgramType.SAAS, "commission_config": {"type": "percentage", "value": 20},
+        "created_by": admin_id,
+    }])
+
+    users, profiles, enrollments, links = [], [], [], []
+    conversions, commissions, payouts = [], [], []
+    for i in range(affiliates):
+        user_id, affiliate_id, enrollment_id, link_id = (uuid.uuid4() for _ in range(4))
+        users.append({
+            "id": user_id, "email": f"explain-{run}-{i}@example.com", "hashed_password": "-",
+            "first_name": "Explain", "last_name": str(i), "role": UserRole.AFFILIATE,
+        })
+        profiles.append({"id": affiliate_id, "user_id": user_id, "affiliate_code": f"EXP-{run}-{i}"})
+        enrollments.append({
+            "id": enrollment_id, "affiliate_id": affiliate_id, "program_id": program_id,
+            "status": EnrollmentStatus.ACTIVE,
+        })
+        expires_at = None
+        if i % 10 == 8:
+            # Expiring links, half of them already past expiry and awaiting the sweeper
+            expires_at = now + timedelta(days=30) if i % 20 == 18 else now - timedelta(days=1)
+        links.append({
+            "id": link_id, "enrollment_id": enrollment_id, "affiliate_id": affiliate_id,
+            "program_id": program_id, "link_code": f"exp{run}{i}", "target_url": "https://example.com",
+            "status": ReferralLinkStatus.INACTIVE if i % 10 == 9 else ReferralLinkStatus.ACTIVE,
+            "expires_at": expires_at,
+        })
+
+        # A few heavy affiliates, many light ones
+        count = per_affiliate * 20 if i < max(affiliates // 100, 1) else rng.randint(1, per_affiliate)
+        paid_payout_id = uuid.uuid4()
+        paid = Decimal("0")
+        for _ in range(count):
+            conversion_id = uuid.uuid4()
+            created_at = now - timedelta(minutes=rng.randint(0, 525600))
+            value = Decimal(rng.randint(500, 50000)) / 100
+            commission_status = rng.choices(
+                [CommissionStatus.PAID, CommissionStatus.APPROVED, CommissionStatus.PENDING, CommissionStatus.REJECTED],
+                weights=[70, 15, 10, 5],
+            )[0]
+            amount = (value * Decimal("0.2")).quantize(Decimal("0.01"))
+            conversions.append({
+                "id": conversion_id, "referral_link_id": link_id, "affiliate_id": affiliate_id,
+                "program_id": program_id, "conversion_type": ConversionType.SALE,
+                "visitor_session_id": uuid.uuid4(), "conversion_value": value,
+                "status": ConversionStatus.REJECTED if commission_status == CommissionStatus.REJECTED
+                else ConversionStatus.VALIDATED,
+                "converted_at": created_at, "created_at": created_at,
+            })
+            commissions.append({
+                "conversion_id": conversion_id, "affiliate_id": affiliate_id, "program_id": program_id,
+                "base_amount": amount, "final_amount": amount, "status": commission_status,
+                "payout_id": paid_payout_id if commission_status == CommissionStatus.PAID else None,
+                "created_at": created_at,
+            })
+            if commission_status == CommissionStatus.PAID:
+                paid += amount
+
+        if paid:
+            payouts.append({
+                "id": paid_payout_id, "affiliate_id": affiliate_id,
+                "payout_period_start": now - timedelta(days=365), "payout_period_end": now,
+                "total_amount": paid, "status": PayoutStatus.COMPLETED,
+            })
+
+    for model, rows in [
+        (User, users), (AffiliateProfile, profiles), (ProgramEnrollment, enrollments),
+        (ReferralLink, links), (Conversion, conversions), (Payout, payouts), (Commission, commissions),
+    ]:
+        _insert_batches(db, model, rows)
+    db.commit()
+
+    for table in SEEDED_TABLES:
+        db.execute(text(f"ANALYZE {table}"))
+    db.commit()
+    print(f"Seeded {affiliates} affiliates, {len(conversions)} conversions and commissions, {len(payouts)} payouts")
+
+
+# ===== Queries =====
+
+def build_queries(db: Session) -> Dict[str, object]:
+    """
+    Build the endpoint and service queries for the busiest affiliate
+    """
+    affiliate_id = db.execute(
+        select(Commission.affiliate_id).group_by(Commission.affiliate_id)
+        .order_by(func.count().desc()).limit(1)
+    ).scalar()
+    if affiliate_id is None:
+        raise SystemExit("No commissions found: seed the database first (--seed)")
+
+    now = datetime.utcnow()
+    month_start = datetime(now.year, now.month, 1)
+    page = {"offset": 0, "limit": 50}
+
+    def list_page(model, schema, status=None):
+        query = select(*schema_columns(model, schema)).where(model.affiliate_id == affiliate_id)
+        if status is not None:
+            query = query.where(model.status == status)
+        return query.order_by(model.created_at.desc()).offset(page["offset"]).limit(page["limit"])
+
+    return {
+        "commissions.list": list_page(Commission, CommissionSchema),
+        "commissions.list_by_status": list_page(Commission, CommissionSchema, CommissionStatus.APPROVED),
+        "conversions.list_by_status": list_page(Conversion, ConversionSchema, ConversionStatus.VALIDATED),
+        "payouts.list": list_page(Payout, PayoutSchema),
+        "referral_links.list_by_status": select(ReferralLink.id).where(
+            ReferralLink.affiliate_id == affiliate_id,
+            ReferralLink.status == ReferralLinkStatus.ACTIVE,
+        ).limit(page["limit"]),
+        "payouts.unpaid_commissions": select(Commission.id, Commission.final_amount).where(
+            Commission.affiliate_id == affiliate_id,
+            Commission.status == CommissionStatus.APPROVED,
+            Commission.payout_id.is_(None),
+            Commission.created_at.between(month_start - timedelta(days=31), month_start),
+        ),
+        "payouts.monthly_affiliates": select(Commission.affiliate_id).where(
+            Commission.status == CommissionStatus.APPROVED,
+            Commission.payout_id.is_(None),
+            Commission.created_at.between(month_start - timedelta(days=31), month_start),
+        ).distinct(),
+        "referral_links.expired_batch": expired_links_query(now, 1000),
+        "referral_links.snapshot_scan": active_links_query(db),
+    }
+
+
+# ===== EXPLAIN =====
+
+def _walk(node: dict) -> List[str]:
+    """Scan and join nodes of a plan, e.g. "Index Scan idx_x on commissions" """
+    described = []
+    if "Relation Name" in node or "Index Name" in node:
+        parts = [node["Node Type"]]
+        if "Index Name" in node:
+            parts.append(node["Index Name"])
+        if "Relation Name" in node:
+            parts.append(f"on {node['Relation Name']}")
+        described.append(" ".join(parts))
+    for child in node.get("Plans", []):
+        described.extend(_walk(child))
+    return described
+
+
+class Explain(Executable, ClauseElement):
+    """``EXPLAIN (ANALYZE, BUFFERS, FORMAT JSON)`` wrapped around a statement"""
+
+    inherit_cache = False
+
+    def __init__(self, statement):
+        self.statement = statement
+
+
+@compiles(Explain, "postgresql")
+def _compile_explain(element, compiler, **kw):
+    # Compiling through the same compiler keeps the statement's bind
+    # parameters and types, so enums and UUIDs are sent as the app sends them
+    return "EXPLAIN (ANALYZE, BUFFERS, FORMAT JSON) " + compiler.process(element.statement, **kw)
+
+
+def explain(db: Session, statement) -> dict:
+    """
+    Run EXPLAIN (ANALYZE, BUFFERS) for a statement and summarize the plan
+    """
+    plan = db.execute(Explain(statement)).scalar()
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    root = plan[0]
+    top = root["Plan"]
+    return {
+        "execution_ms": round(root["Execution Time"], 3),
+        "buffers": top.get("Shared Hit Blocks", 0) + top.get("Shared Read Blocks", 0),
+        "nodes": _walk(top),
+    }
+
+
+def find_regressions(current: dict, baseline: dict, tolerance: float) -> List[str]:
+    """
+    Compare one query's plan summary with its baseline
+    """
+    problems = []
+    new_seq_scans = {
+        node for node in current["nodes"] if node.startswith("Seq Scan")
+    } - set(baseline["nodes"])
+    for node in sorted(new_seq_scans):
+        problems.append(f"new {node}")
+
+    if current["buffers"] > baseline["buffers"] * (1 + tolerance):
+        problems.append(f"buffers {baseline['buffers']} -> {current['buffers']}")
+    if (
+        current["execution_ms"] > baseline["execution_ms"] * (1 + tolerance)
+        and current["execution_ms"] - baseline["execution_ms"] > MIN_REGRESSION_MS
+    ):
+        problems.append(f"time {baseline['execution_ms']}ms -> {current['execution_ms']}ms")
+    return problems
+
+
+def main():
+    """Main function to explain the queries"""
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--seed", type=int, metavar="AFFILIATES", help="seed a synthetic dataset first")
+    parser.add_argument("--per-affiliate", type=int, default=200, help="max conversions per seeded affiliate")
+    parser.add_argument("--save", help="write plan summaries to this JSON file")
+    parser.add_argument("--baseline", help="compare against plan summaries from this JSON file")
+    parser.add_argument("--tolerance", type=float, default=0.5, help="allowed relative growth before flagging")
+    args = parser.parse_args()
+
+    db = SessionLocal()
+    try:
+        if args.seed:
+            seed(db, args.seed, args.per_affiliate)
+
+        results = {name: explain(db, query) for name, query in build_queries(db).items()}
+        db.rollback()
+    finally:
+        db.close()
+
+    baseline = {}
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+
+    regressed = 0
+    for name, result in results.items():
+        print(f"{name}: {result['execution_ms']:.3f} ms, {result['buffers']} buffers")
+        for node in result["nodes"]:
+            print(f"    {node}")
+        if name in baseline:
+            for problem in find_regressions(result, baseline[name], args.tolerance):
+                regressed += 1
+                print(f"  REGRESSION: {problem}")
+
+    if args.save:
+        with open(args.save, "w") as f:
+            json.dump(results, f, indent=2, sort_keys=True)
+        print(f"Saved plan summaries to {args.save}")
+
+    if regressed:
+        print(f"\n{regressed} plan regression(s)")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
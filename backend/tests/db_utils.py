@@ -0,0 +1,96 @@
+"""
+SQLite helpers for service-level tests.
+
+The models use PostgreSQL column types (UUID, JSONB); these compile hooks
+let the same metadata be created on an in-memory SQLite database.
+"""
+
+from sqlalchemy import create_engine
+from sqlalchemy.dialects.postgresql import JSONB, UUID
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.orm import Session, sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from app.database import Base
+from app.models import (
+    User,
+    AffiliateProfile,
+    AffiliateProgram,
+    ProgramEnrollment,
+    ReferralLink,
+)
+from app.models.user import UserRole
+from app.models.program import ProgramType, EnrollmentStatus
+
+
+@compiles(JSONB, "sqlite")
+def _compile_jsonb_sqlite(type_, compiler, **kw):
+    return "JSON"
+
+
+@compiles(UUID, "sqlite")
+def _compile_uuid_sqlite(type_, compiler, **kw):
+    return "CHAR(32)"
+
+
+def create_sqlite_engine():
+    """Create an in-memory SQLite engine with all tables."""
+    engine = create_engine(
+        "sqlite://",
+        connect_args={"check_same_thread": False},
+        poolclass=StaticPool,
+    )
+    Base.metadata.create_all(bind=engine)
+    return engine
+
+
+def create_sqlite_session(engine) -> Session:
+    """Open a session bound to the SQLite engine."""
+    return sessionmaker(autocommit=False, autoflush=False, bind=engine)()
+
+
+def create_referral_link(
+    db: Session,
+    commission_config: dict = None,
+    link_code: str = "testlink",
+) -> ReferralLink:
+    """Create a user, affiliate, program, enrollment and referral link."""
+    user = User(
+        email=f"{link_code}@test.com",
+        hashed_password="not-a-real-hash",
+        first_name="Test",
+        last_name="Affiliate",
+        role=UserRole.AFFILIATE,
+    )
+    db.add(user)
+    db.flush()
+
+    affiliate = AffiliateProfile(user_id=user.id, affiliate_code=f"AFF-{link_code.upper()}")
+    program = AffiliateProgram(
+        name=f"Program {link_code}",
+        slug=f"program-{link_code}",
+        program_type=ProgramType.SAAS,
+        commission_config=commission_config or {"type": "percentage", "value": 20},
+        created_by=user.id,
+    )
+    db.add_all([affiliate, program])
+    db.flush()
+
+    enrollment = ProgramEnrollment(
+        affiliate_id=affiliate.id,
+        program_id=program.id,
+        status=EnrollmentStatus.ACTIVE,
+    )
+    db.add(enrollment)
+    db.flush()
+
+    link = ReferralLink(
+        enrollment_id=enrollment.id,
+        affiliate_id=affiliate.id,
+        program_id=program.id,
+        link_code=link_code,
+        target_url="https://example.com/landing",
+    )
+    db.add(link)
+    db.commit()
+    return link
@@ -0,0 +1,43 @@
+"""
+Pytest plugin providing the ``query_budget`` fixture.
+
+Registered in pytest.ini so it is available to every test module:
+
+    def test_list_links(client, query_budget):
+        with query_budget(3):
+            client.get("/api/v1/referrals/links")
+
+The block fails the test when it executes more statements than the budget,
+listing the statements (repeated ones first) to make N+1 patterns obvious.
+Statements are counted on the ``engine`` fixture, including those run inside
+requests, since the budget's collector encloses the middleware's.
+"""
+
+from contextlib import contextmanager
+
+import pytest
+
+from app.core.query_stats import install_query_stats, track_queries
+
+
+@pytest.fixture
+def query_budget(engine):
+    """Fail the test if a block runs more SQL statements than allowed."""
+    install_query_stats(engine)
+
+    @contextmanager
+    def budget(max_queries: int):
+        with track_queries() as stats:
+            yield stats
+
+        if stats.count > max_queries:
+            listing = "\n".join(
+                f"  {n}x {sql}" for sql, n in stats.statements.most_common()
+            )
+            pytest.fail(
+                f"Query budget exceeded: {stats.count} statements (budget {max_queries}), "
+                f"{stats.duplicate_count} repeated\n{listing}",
+                pytrace=False,
+            )
+
+    return budget
@@ -0,0 +1,63 @@
+"""
+Pytest plugin providing the SQLite ``engine`` and ``db_session`` fixtures.
+
+Registered in pytest.ini so every test module shares one definition:
+
+    def test_create_link(db_session):
+        link = create_referral_link(db_session)
+
+Modules that need the per-request statement listeners parametrise the
+engine indirectly:
+
+    pytestmark = pytest.mark.parametrize("engine", [QUERY_STATS], indirect=True)
+
+API tests get a client acting as a given user on the test session:
+
+    def test_admin_only(self, db_session, client_for):
+        response = client_for(affiliate).get("/api/v1/admin/overview")
+"""
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.api.deps import get_current_active_user
+from app.core.query_stats import install_query_stats
+from app.database import get_db, get_read_db
+from app.main import app
+from tests.db_utils import create_sqlite_engine, create_sqlite_session
+
+QUERY_STATS = pytest.param({"query_stats": True}, id="query_stats")
+
+
+@pytest.fixture
+def engine(request):
+    """In-memory SQLite engine with all tables"""
+    options = getattr(request, "param", None) or {}
+    engine = create_sqlite_engine()
+    if options.get("query_stats"):
+        install_query_stats(engine)
+    yield engine
+    engine.dispose()
+
+
+@pytest.fixture
+def db_session(engine):
+    """Session bound to the test engine"""
+    db = create_sqlite_session(engine)
+    try:
+        yield db
+    finally:
+        db.close()
+
+
+@pytest.fixture
+def client_for(db_session):
+    """Build a TestClient acting as a user, with reads and writes on the test session"""
+    def make_client(user):
+        app.dependency_overrides[get_db] = lambda: db_session
+        app.dependency_overrides[get_read_db] = lambda: db_session
+        app.dependency_overrides[get_current_active_user] = lambda: user
+        return TestClient(app)
+
+    yield make_client
+    app.dependency_overrides.clear()
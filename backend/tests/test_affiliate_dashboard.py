@@ -0,0 +1,131 @@
+"""
+Tests for the consolidated affiliate dashboard endpoint and its cache.
+"""
+
+from decimal import Decimal
+from uuid import uuid4
+
+import pytest
+
+from app.database import get_read_db
+from app.main import app
+from app.models.affiliate import AffiliateProfile
+from app.models.conversion import ConversionType
+from app.models.user import User, UserRole
+from app.services import conversion_service, dashboard_service, live_events
+from app.services.dashboard_service import dashboard_key
+from tests.db_utils import create_referral_link, create_sqlite_engine, create_sqlite_session
+
+
+class FakeCacheRedis:
+    def __init__(self):
+        self.values = {}
+        self.published = []
+
+    def get(self, key):
+        return self.values.get(key)
+
+    def set(self, key, value, ex=None):
+        self.values[key] = value
+
+    def delete(self, *keys):
+        for key in keys:
+            self.values.pop(key, None)
+
+    def pipeline(self, transaction=True):
+        return self
+
+    def publish(self, channel, message):
+        self.published.append(message)
+
+    def execute(self):
+        pass
+
+
+@pytest.fixture
+def fake_redis(monkeypatch):
+    fake = FakeCacheRedis()
+    monkeypatch.setattr(dashboard_service, "get_redis", lambda: fake)
+    monkeypatch.setattr(live_events, "get_redis", lambda: fake)
+    return fake
+
+
+def affiliate_user(db, link):
+    return db.get(User, db.get(AffiliateProfile, link.affiliate_id).user_id)
+
+
+def convert(db, link, value):
+    return conversion_service.create_conversion(
+        db=db,
+        referral_link=link,
+        conversion_type=ConversionType.SALE,
+        visitor_session_id=uuid4(),
+        conversion_value=Decimal(value),
+        auto_validate=True,
+    )
+
+
+@pytest.mark.api
+class TestAffiliateDashboard:
+    """Test the dashboard summary, its query count and its cache."""
+
+    def test_summary_in_one_response(self, db_session, fake_redis, client_for, query_budget):
+        link = create_referral_link(db_session)
+        link.clicks_count = 7
+        db_session.commit()
+        convert(db_session, link, "50.00")
+        client = client_for(affiliate_user(db_session, link))
+
+        with query_budget(8):
+            response = client.get("/api/v1/affiliates/me/dashboard")
+
+        assert response.status_code == 200
+        body = response.json()
+        assert body["profile"]["id"] == str(link.affiliate_id)
+        assert body["links"] == {"total_links": 1, "active_links": 1, "clicks": 7, "conversions": 1}
+        assert [row["id"] for row in body["top_links"]] == [str(link.id)]
+        assert len(body["enrollments"]) == 1
+        assert Decimal(body["commissions"]["total_pending"]) == Decimal("10.00")
+        assert body["commissions"]["count_pending"] == 1
+        assert len(body["recent_commissions"]) == 1
+        assert body["payouts"]["count_paid"] == 0
+
+    def test_cached_until_a_conversion_expires_it(self, db_session, fake_redis, client_for, query_budget):
+        link = create_referral_link(db_session)
+        client = client_for(affiliate_user(db_session, link))
+
+        first = client.get("/api/v1/affiliates/me/dashboard").json()
+        assert dashboard_key(link.affiliate_id) in fake_redis.values
+
+        with query_budget(1):
+            assert client.get("/api/v1/affiliates/me/dashboard").json() == first
+
+        convert(db_session, link, "20.00")
+        assert dashboard_key(link.affiliate_id) not in fake_redis.values
+
+        assert client.get("/api/v1/affiliates/me/dashboard").json()["commissions"]["count_pending"] == 1
+
+    def test_cache_filled_from_primary(self, db_session, fake_redis, client_for):
+        link = create_referral_link(db_session)
+        client = client_for(affiliate_user(db_session, link))
+        # A replica that has not caught up with the conversion yet
+        replica_engine = create_sqlite_engine()
+        replica = create_sqlite_session(replica_engine)
+        app.dependency_overrides[get_read_db] = lambda: replica
+        convert(db_session, link, "20.00")
+
+        try:
+            response = client.get("/api/v1/affiliates/me/dashboard")
+        finally:
+            replica.close()
+            replica_engine.dispose()
+
+        assert response.status_code == 200
+        assert response.json()["commissions"]["count_pending"] == 1
+
+    def test_requires_affiliate_profile(self, db_session, fake_redis, client_for):
+        admin = User(email="admin@test.com", hashed_password="x", role=UserRole.ADMIN, first_name="A", last_name="B")
+        db_session.add(admin)
+        db_session.commit()
+
+        assert client_for(admin).get("/api/v1/affiliates/me/dashboard").status_code == 404
@@ -0,0 +1,108 @@
+"""
+Tests for bulk referral link creation.
+"""
+
+import json
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.api.deps import get_current_active_user
+from app.core.config import settings
+from app.database import get_db
+from app.main import app
+from app.models.affiliate import AffiliateProfile, ApprovalStatus
+from app.models.referral import ReferralLink
+from app.models.user import User
+from app.schemas.referral import ReferralLinkTemplate
+from tests.db_utils import create_referral_link
+from tests.sqlite_fixtures import QUERY_STATS
+
+pytestmark = pytest.mark.parametrize("engine", [QUERY_STATS], indirect=True)
+
+
+@pytest.fixture
+def link(db_session):
+    link = create_referral_link(db_session)
+    affiliate = db_session.get(AffiliateProfile, link.affiliate_id)
+    affiliate.approval_status = ApprovalStatus.APPROVED
+    db_session.commit()
+    return link
+
+
+@pytest.fixture
+def client(db_session, link):
+    affiliate = db_session.get(AffiliateProfile, link.affiliate_id)
+    user = db_session.get(User, affiliate.user_id)
+    db_session.refresh(user)
+    db_session.expunge(user)
+
+    app.dependency_overrides[get_db] = lambda: db_session
+    app.dependency_overrides[get_current_active_user] = lambda: user
+    try:
+        yield TestClient(app)
+    finally:
+        app.dependency_overrides.clear()
+
+
+def read_ndjson(response):
+    return [json.loads(line) for line in response.text.splitlines() if line]
+
+
+@pytest.mark.api
+class TestBulkLinks:
+    """Test POST /referrals/links/bulk."""
+
+    def test_template_and_links(self, client, link, db_session, monkeypatch):
+        monkeypatch.setattr(settings, "DEBUG", True)
+        response = client.post("/api/v1/referrals/links/bulk", json={
+            "program_id": str(link.program_id),
+            "links": [{"target_url": "https://example.com/hero", "link_metadata": {"placement": "hero"}}],
+            "template": {
+                "target_urls": ["https://example.com/a", "https://example.com/b"],
+                "utm_sets": [{"utm_source": "x"}, {"utm_source": "y"}, {"utm_source": "z"}],
+            },
+        })
+
+        assert response.status_code == 200
+        assert response.headers["content-type"] == "application/x-ndjson"
+        results = read_ndjson(response)
+        assert len(results) == 7
+        assert len({result["link_code"] for result in results}) == 7
+        assert all(result["full_url"].endswith(f"/track/{result['link_code']}") for result in results)
+        hero = next(result for result in results if result["link_metadata"] == {"placement": "hero"})
+        assert hero["target_url"] == "https://example.com/hero"
+        assert db_session.query(ReferralLink).count() == 8
+
+        # Profile and enrollment lookups, then one INSERT for all links
+        assert response.headers["x-db-query-count"] == "3"
+
+    def test_requires_links(self, client, link):
+        response = client.post("/api/v1/referrals/links/bulk", json={"program_id": str(link.program_id)})
+        assert response.status_code == 400
+
+    def test_limit(self, client, link, monkeypatch):
+        monkeypatch.setattr(settings, "REFERRAL_BULK_MAX_LINKS", 2)
+        response = client.post("/api/v1/referrals/links/bulk", json={
+            "program_id": str(link.program_id),
+            "template": {"target_urls": ["https://example.com/a", "https://example.com/b", "https://example.com/c"]},
+        })
+        assert response.status_code == 400
+
+    def test_limit_checked_before_expanding(self, client, link, monkeypatch):
+        monkeypatch.setattr(ReferralLinkTemplate, "expand", lambda self: pytest.fail("template expanded"))
+        response = client.post("/api/v1/referrals/links/bulk", json={
+            "program_id": str(link.program_id),
+            "template": {
+                "target_urls": [f"https://example.com/{i}" for i in range(1000)],
+                "utm_sets": [{"utm_content": str(i)} for i in range(1000)],
+            },
+        })
+        assert response.status_code == 400
+
+    def test_requires_enrollment(self, client):
+        response = client.post("/api/v1/referrals/links/bulk", json={
+            "program_id": "00000000-0000-0000-0000-000000000000",
+            "links": [{"target_url": "https://example.com"}],
+        })
+        assert response.status_code == 400
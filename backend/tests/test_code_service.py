@@ -0,0 +1,109 @@
+"""
+Tests for sequence-derived link and affiliate codes.
+"""
+
+import pytest
+
+from app.core.config import settings
+from app.core.query_stats import track_queries
+from app.models.referral import ReferralLink
+from app.models.user import User, UserRole
+from app.services import code_service
+from app.services.affiliate_service import create_affiliate_profile
+from app.services.code_service import AFFILIATE_CODES, LINK_CODES, CodePool
+from app.services.referral_service import create_referral_links
+from tests.db_utils import create_referral_link
+from tests.sqlite_fixtures import QUERY_STATS
+
+
+@pytest.mark.unit
+class TestCodeDerivation:
+    """Test the permutation and encoding."""
+
+    def test_permutation_is_a_bijection(self):
+        key = b"k" * 32
+        values = {code_service.permute(value, 12, key) for value in range(4096)}
+        assert values == set(range(4096))
+
+    def test_neighbouring_values_are_not_neighbouring_codes(self):
+        codes = [code_service.code_for(value, LINK_CODES) for value in range(1, 4)]
+        assert len(set(codes)) == 3
+        assert codes != sorted(codes)
+
+    @pytest.mark.parametrize("space", [LINK_CODES, AFFILIATE_CODES])
+    def test_format(self, space):
+        assert len(space.alphabet) ** space.length >= 2 ** space.bits
+        code = code_service.code_for(2 ** space.bits - 1, space)
+        assert code.startswith(space.prefix)
+        assert len(code) == len(space.prefix) + space.length
+        assert set(code[len(space.prefix):]) <= set(space.alphabet)
+
+
+@pytest.mark.unit
+class TestCodePool:
+    """Test batched sequence reservations."""
+
+    def test_refills_once_per_batch(self, monkeypatch):
+        fetches = []
+        counter = iter(range(1, 1000))
+
+        def fetch(db, space, count):
+            fetches.append(count)
+            return [next(counter) for _ in range(count)]
+
+        monkeypatch.setattr(code_service, "_fetch_values", fetch)
+        monkeypatch.setattr(settings, "CODE_POOL_SIZE", 10)
+        pool = CodePool(LINK_CODES)
+
+        first = pool.take(None, 4)
+        second = pool.take(None, 6)
+        third = pool.take(None, 8)
+
+        assert fetches == [14, 14]
+        assert first + second + third == list(range(1, 19))
+
+
+@pytest.mark.integration
+class TestInsertWithCodes:
+    """Test inserts without read probes."""
+
+    @pytest.mark.parametrize("engine", [QUERY_STATS], indirect=True)
+    def test_bulk_links(self, db_session):
+        enrollment = create_referral_link(db_session).enrollment
+
+        with track_queries() as stats:
+            links = create_referral_links(
+                db_session, enrollment, [{"target_url": f"https://example.com/{i}"} for i in range(300)]
+            )
+        db_session.commit()
+
+        assert len({created.link_code for created in links}) == 300
+        assert all(len(created.link_code) == 8 for created in links)
+        assert stats.count
+        assert all(sql.lstrip().upper().startswith("INSERT") for sql in stats.statements)
+        assert db_session.query(ReferralLink).count() == 301
+
+    def test_conflicting_code_is_retried(self, db_session, monkeypatch):
+        link = create_referral_link(db_session, link_code="taken123")
+        batches = iter([["taken123", "fresh001"], ["fresh002"]])
+        monkeypatch.setattr(code_service, "allocate_codes", lambda db, space, count: next(batches))
+
+        links = create_referral_links(
+            db_session, link.enrollment, [{"target_url": "https://example.com/a"}, {"target_url": "https://example.com/b"}]
+        )
+        db_session.commit()
+
+        assert sorted(created.link_code for created in links) == ["fresh001", "fresh002"]
+
+    def test_affiliate_profile_code(self, db_session):
+        user = User(
+            email="new@test.com", hashed_password="x", first_name="New", last_name="Affiliate", role=UserRole.AFFILIATE
+        )
+        db_session.add(user)
+        db_session.commit()
+
+        profile = create_affiliate_profile(db_session, user, company_name="Acme")
+
+        assert profile.affiliate_code.startswith("AFF-")
+        assert len(profile.affiliate_code) == 14
+        assert profile.company_name == "Acme"
@@ -0,0 +1,70 @@
+"""
+Tests for idempotent conversion ingestion.
+
+SDK and webhook retries carrying the same idempotency key must return the
+original conversion without counting it or paying a commission twice.
+"""
+
+import pytest
+from decimal import Decimal
+from uuid import uuid4
+
+from app.models.conversion import Commission, Conversion, ConversionType
+from app.services import conversion_service
+from tests.db_utils import create_referral_link
+
+
+@pytest.mark.unit
+class TestResolveIdempotencyKey:
+    """Test which key is used to dedupe a conversion."""
+
+    def test_explicit_key_wins(self):
+        key = conversion_service.resolve_idempotency_key("retry-1", {"order_id": "ORD-1"})
+        assert key == "retry-1"
+
+    def test_falls_back_to_order_id(self):
+        assert conversion_service.resolve_idempotency_key(None, {"order_id": 42}) == "order:42"
+
+    def test_no_key(self):
+        assert conversion_service.resolve_idempotency_key(None, {"plan": "pro"}) is None
+        assert conversion_service.resolve_idempotency_key(None, None) is None
+
+
+@pytest.mark.integration
+class TestIdempotentCreateConversion:
+    """Test replays of create_conversion."""
+
+    def test_replay_returns_original(self, db_session):
+        link = create_referral_link(db_session)
+        session_id = uuid4()
+
+        kwargs = dict(
+            db=db_session,
+            referral_link=link,
+            conversion_type=ConversionType.SALE,
+            visitor_session_id=session_id,
+            conversion_value=Decimal("100.00"),
+            conversion_metadata={"order_id": "ORD-1"},
+            auto_validate=True,
+            idempotency_key="order:ORD-1",
+        )
+        first = conversion_service.create_conversion(**kwargs)
+        replay = conversion_service.create_conversion(**kwargs)
+
+        assert replay.id == first.id
+        assert db_session.query(Conversion).count() == 1
+        assert db_session.query(Commission).count() == 1
+        assert link.conversions_count == 1
+
+    def test_conversions_without_key_are_not_deduped(self, db_session):
+        link = create_referral_link(db_session)
+
+        for _ in range(2):
+            conversion_service.create_conversion(
+                db=db_session,
+                referral_link=link,
+                conversion_type=ConversionType.SIGNUP,
+                visitor_session_id=uuid4(),
+            )
+
+        assert db_session.query(Conversion).count() == 2
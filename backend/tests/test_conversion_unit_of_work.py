@@ -0,0 +1,117 @@
+"""
+Tests for the single-transaction conversion -> commission flow.
+
+Tracking a conversion must cost a fixed, small number of statements and a
+single commit, with no refresh() reloads or lazy loads.
+"""
+
+import pytest
+from decimal import Decimal
+from uuid import uuid4
+
+from sqlalchemy import event
+
+from app.database import get_returning_db
+from app.models.affiliate import AffiliateProfile, AffiliateTier
+from app.models.conversion import Commission, ConversionStatus, ConversionType
+from app.models.webhook import OutboxEvent
+from app.services import conversion_service
+from tests.db_utils import create_referral_link
+
+
+@pytest.fixture(autouse=True)
+def returning_session(db_session):
+    # The session as the tracking endpoints get it
+    return get_returning_db(db_session)
+
+
+@pytest.fixture
+def tiered_link(db_session):
+    link = create_referral_link(db_session, commission_config={"type": "percentage", "value": 10})
+    tier = AffiliateTier(name="Silver", level=2, commission_multiplier=Decimal("1.5"), requirements={})
+    db_session.add(tier)
+    db_session.flush()
+    db_session.get(AffiliateProfile, link.affiliate_id).tier_id = tier.id
+    db_session.commit()
+    return link
+
+
+class StatementLog:
+    """Record statements and commits issued on an engine"""
+
+    def __init__(self, engine):
+        self.statements = []
+        self.commits = 0
+        event.listen(engine, "before_cursor_execute", self._on_execute)
+        event.listen(engine, "commit", self._on_commit)
+
+    def _on_execute(self, conn, cursor, statement, parameters, context, executemany):
+        self.statements.append(statement.split(None, 1)[0].upper())
+
+    def _on_commit(self, conn):
+        self.commits += 1
+
+
+@pytest.mark.integration
+class TestConversionUnitOfWork:
+    """Test statement counts per business operation."""
+
+    def test_auto_validated_conversion(self, db_session, engine, tiered_link):
+        log = StatementLog(engine)
+
+        conversion = conversion_service.create_conversion(
+            db=db_session,
+            referral_link=tiered_link,
+            conversion_type=ConversionType.SALE,
+            visitor_session_id=uuid4(),
+            conversion_value=Decimal("200.00"),
+            auto_validate=True,
+        )
+
+        # INSERT conversion RETURNING, UPDATE link count, joined context SELECT,
+        # INSERT commission RETURNING, INSERT outbox event - then one commit
+        assert log.statements == ["INSERT", "UPDATE", "SELECT", "INSERT", "INSERT"]
+        assert log.commits == 1
+
+        # The returned objects are usable without reloading
+        assert conversion.status == ConversionStatus.VALIDATED
+        assert tiered_link.conversions_count == 1
+        assert len(log.statements) == 5
+
+        event = db_session.query(OutboxEvent).one()
+        assert event.event_type == "conversion.validated"
+        assert event.payload["id"] == str(conversion.id)
+
+        commission = db_session.query(Commission).one()
+        assert commission.base_amount == Decimal("20.00")
+        assert commission.tier_multiplier == Decimal("1.50")
+        assert commission.final_amount == Decimal("30.00")
+
+    def test_pending_conversion(self, db_session, engine, tiered_link):
+        log = StatementLog(engine)
+
+        conversion_service.create_conversion(
+            db=db_session,
+            referral_link=tiered_link,
+            conversion_type=ConversionType.LEAD,
+            visitor_session_id=uuid4(),
+        )
+
+        assert log.statements == ["INSERT", "UPDATE"]
+        assert log.commits == 1
+
+    def test_validate_conversion(self, db_session, engine, tiered_link):
+        conversion = conversion_service.create_conversion(
+            db=db_session,
+            referral_link=tiered_link,
+            conversion_type=ConversionType.SALE,
+            visitor_session_id=uuid4(),
+            conversion_value=Decimal("100.00"),
+        )
+        log = StatementLog(engine)
+
+        conversion_service.validate_conversion(db_session, conversion)
+
+        assert sorted(log.statements) == ["INSERT", "INSERT", "SELECT", "UPDATE"]
+        assert log.commits == 1
+        assert db_session.query(Commission).one().final_amount == Decimal("15.00")
@@ -0,0 +1,118 @@
+"""
+Tests for connection pool configuration, warm-up and PgBouncer mode.
+"""
+
+import pytest
+from prometheus_client import REGISTRY
+from sqlalchemy import create_engine, text
+
+from app import database
+from app.core.config import settings
+from app.core.metrics import InstrumentedNullPool, InstrumentedQueuePool, instrument_pool
+
+
+def sample(name):
+    return REGISTRY.get_sample_value(name, {"engine": "primary"}) or 0
+
+
+@pytest.mark.unit
+class TestEngineOptions:
+    """Test engine options built from settings."""
+
+    def test_queue_pool(self, monkeypatch):
+        monkeypatch.setattr(settings, "DB_PGBOUNCER", False)
+        monkeypatch.setattr(settings, "DB_POOL_SIZE", 3)
+        monkeypatch.setattr(settings, "DB_MAX_OVERFLOW", 4)
+        monkeypatch.setattr(settings, "DB_POOL_PRE_PING", False)
+        monkeypatch.setattr(settings, "DB_STATEMENT_TIMEOUT_MS", 5000)
+
+        options = database.engine_options()
+
+        assert options["poolclass"] is InstrumentedQueuePool
+        assert options["pool_size"] == 3
+        assert options["max_overflow"] == 4
+        assert options["pool_pre_ping"] is False
+        assert options["connect_args"] == {"options": "-c statement_timeout=5000"}
+
+    def test_statement_timeout_disabled(self, monkeypatch):
+        monkeypatch.setattr(settings, "DB_PGBOUNCER", False)
+        monkeypatch.setattr(settings, "DB_STATEMENT_TIMEOUT_MS", 0)
+
+        assert "connect_args" not in database.engine_options()
+
+    def test_pgbouncer_mode(self, monkeypatch):
+        monkeypatch.setattr(settings, "DB_PGBOUNCER", True)
+        monkeypatch.setattr(settings, "DB_STATEMENT_TIMEOUT_MS", 5000)
+
+        # No app-side pool and no startup options, which PgBouncer rejects
+        assert database.engine_options() == {"poolclass": InstrumentedNullPool}
+
+    def test_pgbouncer_sets_timeout_per_transaction(self, monkeypatch, tmp_path):
+        monkeypatch.setattr(settings, "DB_PGBOUNCER", True)
+        monkeypatch.setattr(settings, "DB_STATEMENT_TIMEOUT_MS", 5000)
+        executed = []
+
+        engine = create_engine(f"sqlite:///{tmp_path / 'bouncer.db'}", poolclass=InstrumentedNullPool)
+        monkeypatch.setattr(database, "_set_local_statement_timeout", lambda conn: executed.append(conn))
+        database.install_statement_timeout(engine)
+
+        with engine.begin() as conn:
+            conn.execute(text("SELECT 1"))
+        with engine.begin() as conn:
+            conn.execute(text("SELECT 1"))
+
+        assert len(executed) == 2
+        engine.dispose()
+
+
+@pytest.mark.unit
+class TestWarmUp:
+    """Test eager connection opening at startup."""
+
+    def test_opens_connections(self, tmp_path):
+        engine = create_engine(
+            f"sqlite:///{tmp_path / 'warm.db'}", poolclass=InstrumentedQueuePool, pool_size=3, max_overflow=0
+        )
+
+        assert database.warm_up_pool(engine, 2) == 2
+        assert engine.pool.checkedin() == 2
+        engine.dispose()
+
+    def test_capped_at_pool_size(self, tmp_path):
+        engine = create_engine(
+            f"sqlite:///{tmp_path / 'warm.db'}", poolclass=InstrumentedQueuePool, pool_size=2, max_overflow=5
+        )
+
+        assert database.warm_up_pool(engine, 10) == 2
+        assert engine.pool.checkedin() == 2
+        engine.dispose()
+
+    def test_unreachable_database(self, tmp_path):
+        engine = create_engine(
+            f"sqlite:///{tmp_path / 'missing' / 'warm.db'}", poolclass=InstrumentedQueuePool, pool_size=2
+        )
+
+        assert database.warm_up_pool(engine, 2) == 0
+        engine.dispose()
+
+
+@pytest.mark.unit
+class TestNullPoolInstrumentation:
+    """Test metrics without an app-side pool."""
+
+    def test_counts_checkouts_and_connections(self, tmp_path):
+        engine = create_engine(f"sqlite:///{tmp_path / 'null.db'}", poolclass=InstrumentedNullPool)
+        instrument_pool(engine)
+        checkouts = sample("db_pool_checkouts_total")
+        opened = sample("db_connections_opened_total")
+        checked_out = sample("db_pool_checked_out_connections")
+
+        for _ in range(2):
+            with engine.connect() as conn:
+                conn.execute(text("SELECT 1"))
+                assert sample("db_pool_checked_out_connections") == checked_out + 1
+
+        assert sample("db_pool_checkouts_total") == checkouts + 2
+        assert sample("db_connections_opened_total") == opened + 2
+        assert sample("db_pool_checked_out_connections") == checked_out
+        engine.dispose()
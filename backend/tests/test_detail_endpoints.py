@@ -0,0 +1,119 @@
+"""
+Tests for the commission and payout detail-list endpoints.
+
+Each page must be served by one joined query, with no lazy loads.
+"""
+
+import pytest
+from datetime import datetime
+from decimal import Decimal
+from uuid import uuid4
+
+from fastapi.testclient import TestClient
+from sqlalchemy import event
+
+from app.api.deps import get_current_active_user
+from app.database import get_db
+from app.main import app
+from app.models.conversion import (
+    Commission,
+    CommissionStatus,
+    Conversion,
+    ConversionStatus,
+    ConversionType,
+    Payout,
+)
+from app.models.user import User, UserRole
+from tests.db_utils import create_referral_link
+
+
+@pytest.fixture
+def client(db_session):
+    admin = User(email="admin@test.com", hashed_password="x", role=UserRole.ADMIN, first_name="A", last_name="B")
+    db_session.add(admin)
+    db_session.commit()
+    # Detach so later commits don't expire it and trigger reloads
+    db_session.refresh(admin)
+    db_session.expunge(admin)
+
+    app.dependency_overrides[get_db] = lambda: db_session
+    app.dependency_overrides[get_current_active_user] = lambda: admin
+    try:
+        yield TestClient(app)
+    finally:
+        app.dependency_overrides.clear()
+
+
+@pytest.fixture
+def seeded(db_session):
+    links = [create_referral_link(db_session, link_code=f"link{i}") for i in range(3)]
+    for link in links:
+        conversion = Conversion(
+            referral_link_id=link.id,
+            affiliate_id=link.affiliate_id,
+            program_id=link.program_id,
+            conversion_type=ConversionType.SALE,
+            visitor_session_id=uuid4(),
+            conversion_value=Decimal("100.00"),
+            status=ConversionStatus.VALIDATED,
+        )
+        db_session.add(conversion)
+        db_session.flush()
+        db_session.add_all([
+            Commission(
+                conversion_id=conversion.id,
+                affiliate_id=link.affiliate_id,
+                program_id=link.program_id,
+                commission_rule={"type": "percentage", "value": 20},
+                base_amount=Decimal("20.00"),
+                tier_multiplier=Decimal("1.00"),
+                final_amount=Decimal("20.00"),
+                status=CommissionStatus.APPROVED,
+            ),
+            Payout(
+                affiliate_id=link.affiliate_id,
+                payout_period_start=datetime(2026, 9, 1),
+                payout_period_end=datetime(2026, 10, 1),
+                total_amount=Decimal("20.00"),
+                commission_count=1,
+            ),
+        ])
+    db_session.commit()
+    return links
+
+
+def count_selects(engine):
+    statements = []
+
+    def before_execute(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith("SELECT"):
+            statements.append(statement)
+
+    event.listen(engine, "before_cursor_execute", before_execute)
+    return statements
+
+
+@pytest.mark.integration
+class TestDetailEndpoints:
+    """Test joined detail lists."""
+
+    def test_commission_details(self, client, engine, seeded):
+        statements = count_selects(engine)
+        response = client.get("/api/v1/commissions/details")
+
+        assert response.status_code == 200
+        body = response.json()
+        assert len(body) == 3
+        assert {row["program_name"] for row in body} == {"Program link0", "Program link1", "Program link2"}
+        assert all(row["conversion_value"] == "100.00" and row["conversion_type"] == "SALE" for row in body)
+        assert len(statements) == 1
+
+    def test_payout_details(self, client, engine, seeded):
+        statements = count_selects(engine)
+        response = client.get("/api/v1/payouts/details")
+
+        assert response.status_code == 200
+        body = response.json()
+        assert {row["affiliate_code"] for row in body} == {"AFF-LINK0", "AFF-LINK1", "AFF-LINK2"}
+        assert all(row["affiliate_company"] is None for row in body)
+        assert len(statements) == 1
@@ -0,0 +1,70 @@
+"""
+Tests for the offline IP-to-country resolver.
+
+Run with: pytest backend/tests/test_geo_service.py -v
+"""
+
+import pytest
+
+from app.services.geo_service import GeoResolver, build_geo_database
+
+
+GEO_CSV = """\
+start_ip,end_ip,country_code
+8.8.8.0,8.8.8.255,US
+1.0.0.0,1.0.0.255,AU
+81.2.69.0,81.2.69.255,GB
+2001:4860::,2001:4860:ffff:ffff:ffff:ffff:ffff:ffff,US
+2a02:c7f::,2a02:c7f:ffff:ffff:ffff:ffff:ffff:ffff,GB
+"""
+
+
+@pytest.fixture
+def geo_resolver(tmp_path):
+    """Compile a small geo database and open it."""
+    source = tmp_path / "ranges.csv"
+    source.write_text(GEO_CSV)
+    output = tmp_path / "geoip.bin"
+
+    assert build_geo_database(str(source), str(output)) == (3, 2)
+
+    resolver = GeoResolver(str(output), cache_size=16)
+    yield resolver
+    resolver.close()
+
+
+@pytest.mark.unit
+class TestGeoResolver:
+    """Test range lookups against the memory-mapped database."""
+
+    def test_ipv4_lookup(self, geo_resolver):
+        assert geo_resolver.country_for("8.8.8.8") == "US"
+        assert geo_resolver.country_for("1.0.0.0") == "AU"
+        assert geo_resolver.country_for("81.2.69.255") == "GB"
+
+    def test_ipv4_outside_ranges(self, geo_resolver):
+        assert geo_resolver.country_for("0.0.0.1") is None
+        assert geo_resolver.country_for("8.8.9.0") is None
+        assert geo_resolver.country_for("255.255.255.255") is None
+
+    def test_ipv6_lookup(self, geo_resolver):
+        assert geo_resolver.country_for("2001:4860:4860::8888") == "US"
+        assert geo_resolver.country_for("2a02:c7f:1::1") == "GB"
+        assert geo_resolver.country_for("2001:db8::1") is None
+
+    def test_ipv4_mapped_ipv6(self, geo_resolver):
+        assert geo_resolver.country_for("::ffff:8.8.8.8") == "US"
+
+    def test_invalid_address(self, geo_resolver):
+        assert geo_resolver.country_for("not-an-ip") is None
+
+    def test_lookups_are_cached(self, geo_resolver):
+        geo_resolver.country_for("8.8.8.8")
+        geo_resolver.country_for("8.8.8.8")
+        assert geo_resolver.country_for.cache_info().hits >= 1
+
+    def test_rejects_foreign_file(self, tmp_path):
+        bogus = tmp_path / "bogus.bin"
+        bogus.write_bytes(b"\0" * 64)
+        with pytest.raises(ValueError):
+            GeoResolver(str(bogus))
@@ -0,0 +1,159 @@
+"""
+Tests for last-click attribution: single lookups, chunk lookups and re-attribution.
+
+The single-conversion and chunk paths must agree, so the qualifying-click
+rules are checked against both.
+"""
+
+from datetime import datetime, timedelta, timezone
+from decimal import Decimal
+from uuid import uuid4
+
+import pytest
+
+from app.models.conversion import Conversion, ConversionStatus, ConversionType
+from app.models.referral import ReferralClick, ReferralLink, ReferralLinkStatus
+from app.services.attribution_service import (
+    load_session_click_map,
+    reattribute_conversions,
+    resolve_last_click_link,
+)
+from tests.db_utils import create_referral_link
+
+NOW = datetime(2030, 1, 15, 12, 0)
+
+
+def add_link(db, template, link_code, **kwargs):
+    link = ReferralLink(
+        enrollment_id=template.enrollment_id,
+        affiliate_id=template.affiliate_id,
+        program_id=template.program_id,
+        link_code=link_code,
+        target_url="https://example.com",
+        **kwargs,
+    )
+    db.add(link)
+    db.commit()
+    return link
+
+
+def add_click(db, link, session_id, clicked_at):
+    db.add(ReferralClick(referral_link_id=link.id, visitor_session_id=session_id, clicked_at=clicked_at))
+    db.commit()
+
+
+def add_conversion(db, link, session_id, converted_at=NOW, status=ConversionStatus.PENDING):
+    conversion = Conversion(
+        referral_link_id=link.id,
+        affiliate_id=link.affiliate_id,
+        program_id=link.program_id,
+        conversion_type=ConversionType.SALE,
+        visitor_session_id=session_id,
+        conversion_value=Decimal("10.00"),
+        status=status,
+        converted_at=converted_at,
+    )
+    db.add(conversion)
+    db.commit()
+    return conversion
+
+
+def single(db, conversion, window_days=None):
+    link = resolve_last_click_link(
+        db, conversion.visitor_session_id, conversion.program_id, conversion.converted_at, window_days
+    )
+    return link.id if link else None
+
+
+def chunk(db, conversion, window_days=None):
+    attributed = load_session_click_map(db, [conversion], window_days)
+    return attributed[conversion.id][0] if conversion.id in attributed else None
+
+
+@pytest.fixture
+def link(db_session):
+    return create_referral_link(db_session)
+
+
+@pytest.mark.integration
+@pytest.mark.parametrize("resolve", [single, chunk])
+class TestLastClickRules:
+    """Test which clicks qualify, on the single and chunk lookups."""
+
+    def test_most_recent_click_wins(self, db_session, link, resolve):
+        later = add_link(db_session, link, "later")
+        session_id = uuid4()
+        add_click(db_session, link, session_id, NOW - timedelta(days=2))
+        add_click(db_session, later, session_id, NOW - timedelta(hours=1))
+        # After the conversion: never credited
+        add_click(db_session, link, session_id, NOW + timedelta(minutes=5))
+
+        assert resolve(db_session, add_conversion(db_session, link, session_id)) == later.id
+
+    def test_window(self, db_session, link, resolve):
+        session_id = uuid4()
+        add_click(db_session, link, session_id, NOW - timedelta(days=10))
+        conversion = add_conversion(db_session, link, session_id)
+
+        assert resolve(db_session, conversion, window_days=30) == link.id
+        assert resolve(db_session, conversion, window_days=7) is None
+
+    def test_other_program_ignored(self, db_session, link, resolve):
+        other = create_referral_link(db_session, link_code="other")
+        session_id = uuid4()
+        add_click(db_session, link, session_id, NOW - timedelta(days=1))
+        add_click(db_session, other, session_id, NOW - timedelta(hours=1))
+
+        assert resolve(db_session, add_conversion(db_session, link, session_id)) == link.id
+
+    def test_inactive_and_expired_links_ignored(self, db_session, link, resolve):
+        inactive = add_link(db_session, link, "inactive", status=ReferralLinkStatus.INACTIVE)
+        expired = add_link(db_session, link, "expired", expires_at=NOW - timedelta(minutes=30))
+        session_id = uuid4()
+        add_click(db_session, link, session_id, NOW - timedelta(days=1))
+        add_click(db_session, inactive, session_id, NOW - timedelta(hours=2))
+        add_click(db_session, expired, session_id, NOW - timedelta(hours=1))
+
+        assert resolve(db_session, add_conversion(db_session, link, session_id)) == link.id
+
+    def test_aware_expiry(self, db_session, link, resolve):
+        session_id = uuid4()
+        add_click(db_session, link, session_id, NOW - timedelta(hours=1))
+        conversion = add_conversion(db_session, link, session_id)
+        # timestamptz in PostgreSQL: psycopg2 loads it timezone-aware
+        link.expires_at = (NOW + timedelta(days=1)).replace(tzinfo=timezone.utc)
+
+        assert resolve(db_session, conversion) == link.id
+
+    def test_no_clicks(self, db_session, link, resolve):
+        assert resolve(db_session, add_conversion(db_session, link, uuid4())) is None
+
+
+@pytest.mark.integration
+class TestReattributeConversions:
+    """Test the chunked re-attribution job."""
+
+    def test_moves_pending_conversions_and_counts(self, db_session, link):
+        later = add_link(db_session, link, "later")
+        moved_session, kept_session, validated_session = uuid4(), uuid4(), uuid4()
+        for session_id in (moved_session, validated_session):
+            add_click(db_session, later, session_id, NOW - timedelta(hours=1))
+        add_click(db_session, link, kept_session, NOW - timedelta(hours=1))
+
+        moved = add_conversion(db_session, link, moved_session).id
+        kept = add_conversion(db_session, link, kept_session).id
+        # Already has a commission: left alone
+        validated = add_conversion(db_session, link, validated_session, status=ConversionStatus.VALIDATED).id
+        # No click at all: keeps its asserted link
+        orphan = add_conversion(db_session, link, uuid4()).id
+        link_id, later_id = link.id, later.id
+        db_session.query(ReferralLink).filter(ReferralLink.id == link_id).update({"conversions_count": 4})
+        db_session.commit()
+
+        scanned, changed = reattribute_conversions(db_session, since=NOW - timedelta(days=1), until=NOW, chunk_size=2)
+
+        assert (scanned, changed) == (3, 1)
+        links = {c.id: c.referral_link_id for c in db_session.query(Conversion)}
+        assert links == {moved: later_id, kept: link_id, validated: link_id, orphan: link_id}
+        counts = {l.link_code: l.conversions_count for l in db_session.query(ReferralLink)}
+        assert counts == {"testlink": 3, "later": 1}
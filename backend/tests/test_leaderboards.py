@@ -0,0 +1,219 @@
+"""
+Tests for leaderboard buckets, incremental scores, window merges and reconciliation.
+"""
+
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+from uuid import uuid4
+
+import pytest
+import redis
+
+from app.core.config import settings
+from app.models.affiliate import AffiliateProfile
+from app.models.conversion import Conversion, ConversionStatus, ConversionType
+from app.models.user import User, UserRole
+from app.services import conversion_service, leaderboard_service
+from app.services.leaderboard_service import (
+    LeaderboardMetric,
+    LeaderboardPeriod,
+    MemoryLeaderboardStore,
+    affiliate_rank,
+    leaderboard_key,
+    period_bucket,
+    reconcile_leaderboards,
+    top_affiliates,
+    trailing_buckets,
+)
+from tests.db_utils import create_referral_link
+
+
+@pytest.fixture
+def store(monkeypatch):
+    store = MemoryLeaderboardStore()
+    monkeypatch.setattr(settings, "LEADERBOARD_BACKEND", "memory")
+    monkeypatch.setattr(leaderboard_service, "_memory_store", store)
+    monkeypatch.setattr(conversion_service, "publish_live_events", lambda events: None)
+    return store
+
+
+def convert(db, link, value, converted_at=None):
+    conversion = conversion_service.create_conversion(
+        db=db,
+        referral_link=link,
+        conversion_type=ConversionType.SALE,
+        visitor_session_id=uuid4(),
+        conversion_value=Decimal(value),
+        auto_validate=True,
+    )
+    if converted_at is not None:
+        conversion.converted_at = converted_at
+        db.commit()
+    return conversion
+
+
+@pytest.mark.unit
+class TestBuckets:
+    """Test period bucket names."""
+
+    def test_bucket_names(self):
+        day = date(2024, 12, 30)
+        assert period_bucket(LeaderboardPeriod.DAY, day) == "2024-12-30"
+        assert period_bucket(LeaderboardPeriod.WEEK, day) == "2025-W01"
+        assert period_bucket(LeaderboardPeriod.MONTH, day) == "2024-12"
+
+    def test_trailing_months_cross_year(self):
+        assert trailing_buckets(LeaderboardPeriod.MONTH, 3, date(2024, 2, 29)) == ["2024-02", "2024-01", "2023-12"]
+        assert trailing_buckets(LeaderboardPeriod.WEEK, 2, date(2024, 1, 3)) == ["2024-W01", "2023-W52"]
+
+
+@pytest.mark.integration
+class TestIncrementalScores:
+    """Test scores recorded after commit."""
+
+    def test_validated_conversion_updates_program_and_global_boards(self, db_session, store):
+        first = create_referral_link(db_session, link_code="first")
+        second = create_referral_link(db_session, link_code="second")
+        convert(db_session, first, "40.00")
+        convert(db_session, first, "10.00")
+        convert(db_session, second, "30.00")
+
+        _, ranked = top_affiliates(LeaderboardMetric.REVENUE, LeaderboardPeriod.DAY)
+        assert ranked == [
+            (1, str(first.affiliate_id), Decimal("50.00")),
+            (2, str(second.affiliate_id), Decimal("30.00")),
+        ]
+
+        _, ranked = top_affiliates(LeaderboardMetric.CONVERSIONS, LeaderboardPeriod.MONTH, program_id=second.program_id)
+        assert ranked == [(1, str(second.affiliate_id), Decimal(1))]
+
+        assert affiliate_rank(second.affiliate_id, LeaderboardMetric.REVENUE, LeaderboardPeriod.WEEK) == (2, Decimal("30.00"))
+        assert affiliate_rank(uuid4(), LeaderboardMetric.REVENUE, LeaderboardPeriod.WEEK) == (None, Decimal("0.00"))
+
+    def test_commission_scores_follow_commission_amount(self, db_session, store):
+        link = create_referral_link(db_session, commission_config={"type": "percentage", "value": 10})
+        convert(db_session, link, "80.00")
+
+        _, [(_, _, score)] = top_affiliates(LeaderboardMetric.COMMISSION, LeaderboardPeriod.DAY)
+        assert score == Decimal("8.00")
+
+    def test_falls_back_to_memory_without_redis(self, db_session, monkeypatch):
+        class DownRedis:
+            def pipeline(self, transaction=True):
+                raise redis.ConnectionError("down")
+
+        store = MemoryLeaderboardStore()
+        monkeypatch.setattr(leaderboard_service, "_memory_store", store)
+        monkeypatch.setattr(leaderboard_service, "get_redis", lambda: DownRedis())
+        monkeypatch.setattr(conversion_service, "publish_live_events", lambda events: None)
+        link = create_referral_link(db_session)
+
+        convert(db_session, link, "12.00")
+
+        assert store.zscore(
+            leaderboard_key(None, LeaderboardMetric.REVENUE, LeaderboardPeriod.DAY, trailing_buckets(LeaderboardPeriod.DAY, 1)[0]),
+            str(link.affiliate_id),
+        ) == 12.0
+
+
+@pytest.mark.unit
+class TestWindows:
+    """Test trailing windows merged with ZUNIONSTORE."""
+
+    def test_window_merges_trailing_buckets(self, store):
+        today, yesterday, old = trailing_buckets(LeaderboardPeriod.DAY, 3)
+        key = lambda bucket: leaderboard_key(None, LeaderboardMetric.REVENUE, LeaderboardPeriod.DAY, bucket)
+        store.zadd(key(today), {"a": 5, "b": 1})
+        store.zadd(key(yesterday), {"b": 10})
+        store.zadd(key(old), {"c": 100})
+
+        buckets, ranked = top_affiliates(LeaderboardMetric.REVENUE, LeaderboardPeriod.DAY, window=2)
+
+        assert buckets == [today, yesterday]
+        assert [(affiliate, score) for _, affiliate, score in ranked] == [("b", Decimal("11.00")), ("a", Decimal("5.00"))]
+        assert affiliate_rank("a", LeaderboardMetric.REVENUE, LeaderboardPeriod.DAY, window=2) == (2, Decimal("5.00"))
+
+
+@pytest.mark.integration
+class TestReconciliation:
+    """Test rebuilding buckets from SQL."""
+
+    def test_rebuild_drops_reversed_and_restores_missing(self, db_session, store):
+        link = create_referral_link(db_session)
+        now = datetime.utcnow()
+        kept = convert(db_session, link, "25.00")
+        reversed_conversion = convert(db_session, link, "75.00")
+        conversion_service.reverse_conversion(db_session, reversed_conversion)
+        convert(db_session, link, "5.00", converted_at=now - timedelta(days=400))
+
+        store._sets.clear()
+        written = reconcile_leaderboards(db_session, today=now.date())
+
+        assert written == 18  # 3 metrics x 3 periods x (program, all)
+        _, ranked = top_affiliates(LeaderboardMetric.REVENUE, LeaderboardPeriod.MONTH, program_id=link.program_id)
+        assert ranked == [(1, str(kept.affiliate_id), Decimal("25.00"))]
+        assert affiliate_rank(link.affiliate_id, LeaderboardMetric.CONVERSIONS, LeaderboardPeriod.DAY) == (1, Decimal(1))
+
+    def test_rebuild_clears_buckets_left_empty(self, db_session, store):
+        link = create_referral_link(db_session)
+        now = datetime.utcnow()
+        conversion_service.reverse_conversion(db_session, convert(db_session, link, "40.00"))
+        keys = [
+            leaderboard_key(scope, metric, period, period_bucket(period, now.date()))
+            for scope in (link.program_id, None)
+            for metric in LeaderboardMetric
+            for period in LeaderboardPeriod
+        ]
+        assert all(store.exists(key) for key in keys)
+
+        assert reconcile_leaderboards(db_session, today=now.date()) == 0
+
+        assert not any(store.exists(key) for key in keys)
+        assert affiliate_rank(link.affiliate_id, LeaderboardMetric.REVENUE, LeaderboardPeriod.MONTH)[0] is None
+
+    def test_rebuild_ignores_pending(self, db_session, store):
+        link = create_referral_link(db_session)
+        db_session.add(Conversion(
+            referral_link_id=link.id,
+            affiliate_id=link.affiliate_id,
+            program_id=link.program_id,
+            conversion_type=ConversionType.SALE,
+            conversion_value=Decimal("9.00"),
+            visitor_session_id=uuid4(),
+            status=ConversionStatus.PENDING,
+        ))
+        db_session.commit()
+
+        assert reconcile_leaderboards(db_session) == 0
+
+
+@pytest.mark.api
+class TestLeaderboardEndpoints:
+    """Test leaderboard access and affiliate details."""
+
+    def test_admin_sees_affiliate_codes(self, db_session, store, client_for):
+        link = create_referral_link(db_session)
+        convert(db_session, link, "20.00")
+        admin = User(email="admin@test.com", hashed_password="x", role=UserRole.ADMIN, first_name="A", last_name="B")
+        db_session.add(admin)
+        db_session.commit()
+
+        response = client_for(admin).get("/api/v1/leaderboards/", params={"metric": "revenue", "period": "day"})
+
+        assert response.status_code == 200
+        [entry] = response.json()["entries"]
+        assert entry["rank"] == 1
+        assert entry["affiliate_id"] == str(link.affiliate_id)
+        assert entry["affiliate_code"]
+        assert Decimal(entry["score"]) == Decimal("20.00")
+
+    def test_affiliate_sees_own_rank_only(self, db_session, store, client_for):
+        link = create_referral_link(db_session)
+        convert(db_session, link, "20.00")
+        user = db_session.get(User, db_session.get(AffiliateProfile, link.affiliate_id).user_id)
+        client = client_for(user)
+
+        assert client.get("/api/v1/leaderboards/").status_code == 403
+        response = client.get("/api/v1/leaderboards/me", params={"period": "month"})
+        assert response.status_code == 200
+        assert response.json()["rank"] == 1
@@ -0,0 +1,108 @@
+"""
+Tests for link expiry checks and the expired-link sweeper.
+"""
+
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.database import get_db
+from app.main import app
+from app.models.referral import ReferralLink, ReferralLinkStatus
+from app.services.referral_service import deactivate_expired_links, is_link_expired, to_utc_naive
+from tests.db_utils import create_referral_link
+
+
+def add_links(db, template, expiries):
+    links = [
+        ReferralLink(
+            enrollment_id=template.enrollment_id,
+            affiliate_id=template.affiliate_id,
+            program_id=template.program_id,
+            link_code=f"exp{i:05d}",
+            target_url="https://example.com",
+            expires_at=expires_at,
+        )
+        for i, expires_at in enumerate(expiries)
+    ]
+    db.add_all(links)
+    db.commit()
+    return links
+
+
+@pytest.mark.unit
+class TestIsLinkExpired:
+    """Test expiry checks across naive and aware datetimes."""
+
+    def test_to_utc_naive(self):
+        aware = datetime(2030, 1, 1, 14, 0, tzinfo=timezone(timedelta(hours=2)))
+        assert to_utc_naive(aware) == datetime(2030, 1, 1, 12, 0)
+        assert to_utc_naive(datetime(2030, 1, 1, 12, 0)) == datetime(2030, 1, 1, 12, 0)
+        assert to_utc_naive(None) is None
+
+    def test_mixed_naive_and_aware(self):
+        now = datetime(2030, 1, 1, 12, 0, tzinfo=timezone.utc)
+        assert is_link_expired(datetime(2030, 1, 1, 11, 59), now)
+        assert not is_link_expired(datetime(2030, 1, 1, 12, 1), now)
+        assert is_link_expired(datetime(2030, 1, 1, 13, 0, tzinfo=timezone(timedelta(hours=2))), datetime(2030, 1, 1, 12, 0))
+        assert not is_link_expired(None, now)
+
+
+@pytest.mark.integration
+class TestDeactivateExpiredLinks:
+    """Test the batched expiry sweep."""
+
+    def test_deactivates_in_batches(self, db_session):
+        template = create_referral_link(db_session)
+        now = datetime.utcnow()
+        expired = add_links(db_session, template, [now - timedelta(minutes=m) for m in range(1, 6)])
+        future = ReferralLink(
+            enrollment_id=template.enrollment_id,
+            affiliate_id=template.affiliate_id,
+            program_id=template.program_id,
+            link_code="future01",
+            target_url="https://example.com",
+            expires_at=now + timedelta(days=1),
+        )
+        db_session.add(future)
+        db_session.commit()
+        batches = []
+
+        assert deactivate_expired_links(db_session, batch_size=2, now=now, on_batch=batches.append) == 5
+
+        assert [len(batch) for batch in batches] == [2, 2, 1]
+        assert sorted(code for batch in batches for code in batch) == [link.link_code for link in expired]
+        db_session.expire_all()
+        statuses = {link.link_code: link.status for link in db_session.query(ReferralLink)}
+        assert statuses == {
+            **{link.link_code: ReferralLinkStatus.INACTIVE for link in expired},
+            "testlink": ReferralLinkStatus.ACTIVE,
+            "future01": ReferralLinkStatus.ACTIVE,
+        }
+
+    def test_nothing_to_do(self, db_session):
+        create_referral_link(db_session)
+        assert deactivate_expired_links(db_session) == 0
+
+
+@pytest.mark.api
+class TestSDKConversionExpiry:
+    """Test that the SDK endpoint compares expiry without tz errors."""
+
+    def test_expired_link_is_rejected(self, db_session):
+        link = create_referral_link(db_session)
+        link.expires_at = datetime.utcnow() - timedelta(hours=1)
+        db_session.commit()
+        app.dependency_overrides[get_db] = lambda: db_session
+        try:
+            response = TestClient(app).post("/api/v1/conversions/track", json={
+                "referral_link_code": "testlink",
+                "visitor_session_id": "00000000-0000-0000-0000-000000000001",
+                "conversion_type": "SALE",
+            })
+        finally:
+            app.dependency_overrides.clear()
+
+        assert response.status_code == 400
+        assert "expired" in response.json()["detail"].lower()
@@ -0,0 +1,222 @@
+"""
+Tests for the shared memory-mapped link snapshot.
+"""
+
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.core.config import settings
+from app.models.referral import ReferralLink, ReferralLinkStatus
+from app.redirect import LinkCache, RedirectApp
+from app.services import link_snapshot
+from app.services.link_snapshot import (
+    LinkSnapshot,
+    LinkSource,
+    build_link_snapshot,
+    find_link_target,
+    notify_link_changed,
+)
+from tests.db_utils import create_referral_link
+
+
+class FakePublishRedis:
+    def __init__(self):
+        self.published = []
+
+    def pipeline(self, transaction=True):
+        return self
+
+    def publish(self, channel, message):
+        self.published.append((channel, message))
+
+    def execute(self):
+        pass
+
+
+@pytest.fixture
+def links(db_session):
+    first = create_referral_link(db_session, link_code="zz999999")
+    expiring = ReferralLink(
+        enrollment_id=first.enrollment_id,
+        affiliate_id=first.affiliate_id,
+        program_id=first.program_id,
+        link_code="aa000001",
+        target_url="https://example.com/ünïcode?x=1",
+        utm_params={"utm_source": "newsletter"},
+        expires_at=datetime(2030, 5, 1, 12, 30, 15, 250),
+    )
+    inactive = ReferralLink(
+        enrollment_id=first.enrollment_id,
+        affiliate_id=first.affiliate_id,
+        program_id=first.program_id,
+        link_code="mm555555",
+        target_url="https://example.com/gone",
+        status=ReferralLinkStatus.INACTIVE,
+    )
+    db_session.add_all([expiring, inactive])
+    db_session.commit()
+    return first, expiring
+
+
+@pytest.mark.integration
+class TestLinkSnapshot:
+    """Test building and reading snapshot files."""
+
+    def test_round_trip(self, db_session, links, tmp_path):
+        first, expiring = links
+        path = str(tmp_path / "links.snapshot")
+
+        assert build_link_snapshot(db_session, path) == 2
+
+        snapshot = LinkSnapshot(path)
+        target = snapshot.lookup("aa000001")
+        assert target.id == expiring.id
+        assert target.program_id == expiring.program_id
+        assert target.affiliate_id == expiring.affiliate_id
+        assert target.target_url == "https://example.com/ünïcode?x=1"
+        assert target.utm_params == {"utm_source": "newsletter"}
+        assert target.expires_at == datetime(2030, 5, 1, 12, 30, 15, 250)
+        assert snapshot.lookup("zz999999").expires_at is None
+        assert snapshot.lookup("mm555555") is None
+        assert snapshot.lookup("bb") is None
+        snapshot.close()
+
+    def test_aware_expiry(self, db_session, links, tmp_path, monkeypatch):
+        # psycopg2 returns the timestamptz expires_at column timezone-aware
+        execute = db_session.execute
+        plus_two = timezone(timedelta(hours=2))
+
+        def execute_aware(statement, *args, **kwargs):
+            return [
+                (*row[:-1], row[-1].replace(tzinfo=timezone.utc).astimezone(plus_two) if row[-1] else None)
+                for row in execute(statement, *args, **kwargs)
+            ]
+
+        monkeypatch.setattr(db_session, "execute", execute_aware)
+        path = str(tmp_path / "links.snapshot")
+
+        assert build_link_snapshot(db_session, path) == 2
+
+        snapshot = LinkSnapshot(path)
+        assert snapshot.lookup("aa000001").expires_at == datetime(2030, 5, 1, 12, 30, 15, 250)
+        assert snapshot.lookup("zz999999").expires_at is None
+        snapshot.close()
+
+    def test_empty_snapshot(self, db_session, tmp_path):
+        path = str(tmp_path / "links.snapshot")
+        assert build_link_snapshot(db_session, path) == 0
+        assert LinkSnapshot(path).lookup("anything") is None
+
+    def test_rejects_other_files(self, tmp_path):
+        path = tmp_path / "links.snapshot"
+        path.write_bytes(b"not a snapshot" * 4)
+        with pytest.raises(ValueError):
+            LinkSnapshot(str(path))
+
+    def test_source_follows_rebuilds(self, db_session, links, tmp_path):
+        path = str(tmp_path / "links.snapshot")
+        source = LinkSource(path, check_interval=0)
+        assert source.get("zz999999") is None
+
+        build_link_snapshot(db_session, path)
+        assert source.get("zz999999") is not None
+        old = source.snapshot
+
+        links[0].target_url = "https://example.com/moved"
+        db_session.commit()
+        build_link_snapshot(db_session, path)
+
+        assert source.get("zz999999").target_url == "https://example.com/moved"
+        # Lookups already holding the previous mapping still work
+        assert old.lookup("zz999999").target_url == "https://example.com/landing"
+        assert list(tmp_path.iterdir()) == [tmp_path / "links.snapshot"]
+
+    def test_stale_codes_until_next_rebuild(self, db_session, links, tmp_path):
+        path = str(tmp_path / "links.snapshot")
+        build_link_snapshot(db_session, path)
+        source = LinkSource(path, check_interval=0)
+
+        source.invalidate("zz999999")
+        assert source.get("zz999999") is None
+        assert source.get("aa000001") is not None
+
+        source.invalidate(None)
+        assert source.get("aa000001") is None
+
+        build_link_snapshot(db_session, path)
+        assert source.get("zz999999") is not None
+        assert source.get("aa000001") is not None
+
+    def test_find_link_target_falls_back_to_database(self, db_session, links, tmp_path, monkeypatch):
+        path = str(tmp_path / "links.snapshot")
+        build_link_snapshot(db_session, path)
+        source = LinkSource(path, check_interval=0)
+        monkeypatch.setattr(link_snapshot, "get_link_source", lambda: source)
+
+        late = create_referral_link(db_session, link_code="late0001")
+
+        assert find_link_target(db_session, "zz999999").id == links[0].id
+        assert find_link_target(db_session, "late0001").id == late.id
+        assert find_link_target(db_session, "mm555555") is None
+
+    def test_notify_link_changed(self, db_session, links, tmp_path, monkeypatch):
+        path = str(tmp_path / "links.snapshot")
+        build_link_snapshot(db_session, path)
+        source = LinkSource(path, check_interval=0)
+        fake = FakePublishRedis()
+        monkeypatch.setattr(link_snapshot, "get_link_source", lambda: source)
+        monkeypatch.setattr(link_snapshot, "get_redis", lambda: fake)
+
+        notify_link_changed("zz999999")
+
+        assert fake.published == [(settings.LINK_CHANGES_CHANNEL, "zz999999")]
+        assert source.get("zz999999") is None
+
+
+@pytest.mark.api
+class TestRedirectWithSnapshot:
+    """Test the redirect service reading the snapshot."""
+
+    def test_snapshot_hits_skip_the_database(self, db_session, links, tmp_path):
+        path = str(tmp_path / "links.snapshot")
+        build_link_snapshot(db_session, path)
+        lookups = []
+
+        def resolve(code):
+            lookups.append(code)
+            return None
+
+        async def record_click(event):
+            pass
+
+        app = RedirectApp(
+            resolve=resolve,
+            record_click=record_click,
+            cache=LinkCache(100, 60, 60),
+            source=LinkSource(path, check_interval=0),
+        )
+        client = TestClient(app)
+
+        assert client.get("/track/zz999999", follow_redirects=False).status_code == 302
+        assert client.get("/track/mm555555").status_code == 404
+        assert lookups == ["mm555555"]
+
+        app.link_changed("zz999999")
+        assert client.get("/track/zz999999").status_code == 404
+        assert lookups == ["mm555555", "zz999999"]
+
+    def test_expired_from_snapshot(self, db_session, links, tmp_path):
+        links[1].expires_at = datetime.utcnow() - timedelta(hours=1)
+        db_session.commit()
+        path = str(tmp_path / "links.snapshot")
+        build_link_snapshot(db_session, path)
+
+        async def record_click(event):
+            pass
+
+        app = RedirectApp(resolve=lambda code: None, record_click=record_click, source=LinkSource(path, 0))
+        response = TestClient(app).get("/track/aa000001")
+        assert response.status_code == 404
+        assert response.json() == {"detail": "Referral link has expired"}
@@ -0,0 +1,216 @@
+"""
+Tests for the live event bus, burst coalescing and the SSE stream.
+"""
+
+import asyncio
+from decimal import Decimal
+from uuid import uuid4
+
+import pytest
+import redis
+
+from app.core.config import settings
+from app.models.affiliate import AffiliateProfile
+from app.models.conversion import ConversionType
+from app.models.user import User, UserRole
+from app.api.v1.endpoints import referrals
+from app.services import click_queue, conversion_service, live_events
+from app.services.click_queue import click_event, record_clicks
+from app.services.live_events import (
+    LiveEventBus,
+    clicks_event,
+    live_event,
+    publish_live_events,
+    stream_live_events,
+)
+from tests.db_utils import create_referral_link
+
+
+def conversion(affiliate_id, value="10.00", currency="USD"):
+    return live_event("conversion", affiliate_id, {"id": str(uuid4()), "conversion_value": value, "currency": currency})
+
+
+@pytest.fixture
+def published(monkeypatch):
+    events = []
+    monkeypatch.setattr(conversion_service, "publish_live_events", events.extend)
+    monkeypatch.setattr(click_queue, "publish_live_events", events.extend)
+    return events
+
+
+@pytest.mark.unit
+class TestLiveEventBus:
+    """Test fan-out, coalescing and the connection cap."""
+
+    def test_dispatch_is_scoped_to_affiliate(self):
+        bus = LiveEventBus(max_connections=10, burst_limit=5)
+        mine, other = uuid4(), uuid4()
+        subscriber = bus.subscribe(mine)
+        bus.subscribe(other)
+
+        bus.dispatch([clicks_event(mine, "link-1", 3), conversion(other)])
+
+        assert subscriber.drain() == [("clicks", {"referral_link_id": "link-1", "count": 3})]
+        assert subscriber.drain() == []
+
+    def test_burst_is_coalesced_into_summary(self):
+        bus = LiveEventBus(max_connections=10, burst_limit=2)
+        affiliate_id = uuid4()
+        subscriber = bus.subscribe(affiliate_id)
+
+        bus.dispatch([
+            clicks_event(affiliate_id, "link-1", 4),
+            conversion(affiliate_id, "10.00"),
+            conversion(affiliate_id, "2.50"),
+            conversion(affiliate_id, "7.00", "EUR"),
+            live_event("commission", affiliate_id, {"final_amount": "1.25", "currency": "USD"}),
+        ])
+
+        [(name, summary)] = subscriber.drain()
+        assert name == "summary"
+        assert summary == {
+            "events": 5,
+            "clicks": 4,
+            "conversions": 3,
+            "commissions": 1,
+            "conversion_value": {"USD": "12.50", "EUR": "7.00"},
+            "commission_amount": {"USD": "1.25"},
+        }
+        assert subscriber.pending == [] and subscriber.summary is None
+
+    def test_connection_cap(self):
+        bus = LiveEventBus(max_connections=2, burst_limit=5)
+        first = bus.subscribe(uuid4())
+        bus.subscribe(uuid4())
+
+        assert bus.full
+        assert bus.subscribe(uuid4()) is None
+        bus.unsubscribe(first)
+        bus.unsubscribe(first)
+        assert not bus.full
+
+    def test_falls_back_to_local_bus_without_redis(self, monkeypatch):
+        def unavailable():
+            raise redis.ConnectionError("down")
+
+        bus = LiveEventBus(max_connections=10, burst_limit=5)
+        monkeypatch.setattr(live_events, "get_live_event_bus", lambda: bus)
+        monkeypatch.setattr(live_events, "get_redis", unavailable)
+        affiliate_id = uuid4()
+
+        async def run():
+            bus.loop = asyncio.get_running_loop()
+            subscriber = bus.subscribe(affiliate_id)
+            await asyncio.to_thread(publish_live_events, [conversion(affiliate_id, Decimal("5.00"))])
+            await asyncio.wait_for(subscriber.ready.wait(), 1)
+            return subscriber.drain()
+
+        [(name, data)] = asyncio.run(run())
+        assert name == "conversion"
+        assert data["conversion_value"] == "5.00"
+
+
+@pytest.mark.unit
+class TestLiveEventStream:
+    """Test the SSE generator."""
+
+    def test_stream_flushes_events_and_unsubscribes(self, monkeypatch):
+        monkeypatch.setattr(settings, "LIVE_EVENTS_FLUSH_INTERVAL", 0.01)
+        monkeypatch.setattr(settings, "LIVE_EVENTS_HEARTBEAT_SECONDS", 0.05)
+        bus = LiveEventBus(max_connections=10, burst_limit=1)
+        affiliate_id = uuid4()
+
+        async def run():
+            disconnected = False
+
+            async def is_disconnected():
+                return disconnected
+
+            stream = stream_live_events(bus, affiliate_id, is_disconnected)
+            chunks = [await stream.__anext__()]
+            bus.dispatch([clicks_event(affiliate_id, "link-1")])
+            chunks.append(await stream.__anext__())
+            bus.dispatch([clicks_event(affiliate_id, "link-1"), clicks_event(affiliate_id, "link-2")])
+            chunks.append(await stream.__anext__())
+            chunks.append(await stream.__anext__())
+            disconnected = True
+            with pytest.raises(StopAsyncIteration):
+                await stream.__anext__()
+            return chunks
+
+        chunks = asyncio.run(run())
+
+        assert chunks[0] == b"retry: 5000\n\n"
+        assert chunks[1] == b'event: clicks\ndata: {"referral_link_id":"link-1","count":1}\n\n'
+        assert chunks[2].startswith(b'event: summary\ndata: {"events":2,"clicks":2,')
+        assert chunks[3] == b": keepalive\n\n"
+        assert not bus.full and bus._count == 0
+
+
+@pytest.mark.integration
+class TestLiveEventProducers:
+    """Test services publish after their commit."""
+
+    def test_auto_validated_conversion_publishes_conversion_and_commission(self, db_session, published):
+        link = create_referral_link(db_session)
+        conversion_service.create_conversion(
+            db=db_session,
+            referral_link=link,
+            conversion_type=ConversionType.SALE,
+            visitor_session_id=uuid4(),
+            conversion_value=Decimal("50.00"),
+            auto_validate=True,
+        )
+
+        assert [event["type"] for event in published] == ["conversion", "commission"]
+        assert {event["affiliate_id"] for event in published} == {str(link.affiliate_id)}
+
+    def test_click_batch_publishes_count_per_link(self, db_session, published):
+        first = create_referral_link(db_session, link_code="first")
+        second = create_referral_link(db_session, link_code="second")
+
+        record_clicks(db_session, [click_event(first.id, uuid4()) for _ in range(3)] + [click_event(second.id, uuid4())])
+
+        counts = {event["data"]["referral_link_id"]: (event["affiliate_id"], event["data"]["count"]) for event in published}
+        assert counts == {first.id: (str(first.affiliate_id), 3), second.id: (str(second.affiliate_id), 1)}
+
+
+@pytest.mark.api
+class TestStreamEndpoint:
+    """Test stream admission."""
+
+    def test_click_route_publishes_off_the_event_loop(self, db_session, client_for, monkeypatch):
+        link = create_referral_link(db_session)
+        loops = []
+
+        def publish(events):
+            # Redis calls block: they must run in the threadpool, not on the loop
+            try:
+                loops.append(asyncio.get_running_loop())
+            except RuntimeError:
+                loops.append(None)
+
+        monkeypatch.setattr(referrals, "publish_live_events", publish)
+
+        response = client_for(None).get(f"/api/v1/referrals/track/{link.link_code}", follow_redirects=False)
+
+        assert response.status_code == 302
+        assert loops == [None]
+
+    def test_requires_affiliate_profile(self, db_session, client_for):
+        admin = User(email="admin@test.com", hashed_password="x", role=UserRole.ADMIN, first_name="A", last_name="B")
+        db_session.add(admin)
+        db_session.commit()
+
+        assert client_for(admin).get("/api/v1/events/stream").status_code == 403
+
+    def test_rejects_streams_over_cap(self, db_session, client_for, monkeypatch):
+        link = create_referral_link(db_session)
+        user = db_session.get(User, db_session.get(AffiliateProfile, link.affiliate_id).user_id)
+        bus = LiveEventBus(max_connections=0, burst_limit=5)
+        monkeypatch.setattr("app.api.v1.endpoints.events.get_live_event_bus", lambda: bus)
+
+        response = client_for(user).get("/api/v1/events/stream")
+
+        assert response.status_code == 503
+        assert response.headers["retry-after"] == "5"
@@ -0,0 +1,112 @@
+"""
+Tests for the Prometheus metrics subsystem.
+"""
+
+import pytest
+from decimal import Decimal
+from uuid import uuid4
+
+from fastapi.testclient import TestClient
+from prometheus_client import REGISTRY
+from sqlalchemy import create_engine, text
+
+from app.core.metrics import InstrumentedQueuePool, instrument_pool
+from app.main import app
+from app.models.conversion import ConversionType
+from app.services import conversion_service
+from tests.db_utils import create_referral_link, create_sqlite_engine, create_sqlite_session
+
+
+def sample(name, labels=None):
+    return REGISTRY.get_sample_value(name, labels or {}) or 0
+
+
+@pytest.mark.api
+class TestMetricsEndpoint:
+    """Test the /metrics exposition."""
+
+    def test_exposes_route_latency(self):
+        client = TestClient(app)
+        before = sample("http_request_duration_seconds_count", {"method": "GET", "route": "/health", "status": "200"})
+
+        client.get("/health")
+        response = client.get("/metrics")
+
+        assert response.status_code == 200
+        assert response.headers["content-type"].startswith("text/plain")
+        assert "http_request_duration_seconds_bucket" in response.text
+        assert "http_requests_in_progress" in response.text
+        after = sample("http_request_duration_seconds_count", {"method": "GET", "route": "/health", "status": "200"})
+        assert after == before + 1
+
+
+@pytest.mark.unit
+class TestPoolInstrumentation:
+    """Test pool gauges and checkout wait time."""
+
+    def test_checkout_gauges(self, tmp_path):
+        engine = create_engine(
+            f"sqlite:///{tmp_path / 'pool.db'}",
+            poolclass=InstrumentedQueuePool,
+            pool_size=1,
+            max_overflow=1,
+        )
+        instrument_pool(engine)
+        primary = {"engine": "primary"}
+        waits_before = sample("db_pool_checkout_wait_seconds_count", primary)
+
+        with engine.connect() as first, engine.connect() as second:
+            first.execute(text("SELECT 1"))
+            second.execute(text("SELECT 1"))
+            assert sample("db_pool_checked_out_connections", primary) == 2
+            assert sample("db_pool_overflow_connections", primary) == 1
+
+        assert sample("db_pool_checked_out_connections", primary) == 0
+        assert sample("db_pool_checkout_wait_seconds_count", primary) == waits_before + 2
+        engine.dispose()
+
+    def test_engines_reported_apart(self, tmp_path):
+        primary = create_engine(f"sqlite:///{tmp_path / 'primary.db'}", poolclass=InstrumentedQueuePool, pool_size=2)
+        replica = create_engine(f"sqlite:///{tmp_path / 'replica.db'}", poolclass=InstrumentedQueuePool, pool_size=2)
+        instrument_pool(primary, "primary")
+        instrument_pool(replica, "replica")
+        waits = {
+            name: sample("db_pool_checkout_wait_seconds_count", {"engine": name}) for name in ("primary", "replica")
+        }
+
+        with replica.connect() as conn:
+            conn.execute(text("SELECT 1"))
+            assert sample("db_pool_checked_out_connections", {"engine": "replica"}) == 1
+            assert sample("db_pool_checked_out_connections", {"engine": "primary"}) == 0
+
+        assert sample("db_pool_checkout_wait_seconds_count", {"engine": "replica"}) == waits["replica"] + 1
+        assert sample("db_pool_checkout_wait_seconds_count", {"engine": "primary"}) == waits["primary"]
+        primary.dispose()
+        replica.dispose()
+
+
+@pytest.mark.integration
+class TestIngestionCounters:
+    """Test conversion ingestion counters."""
+
+    def test_created_and_duplicate(self):
+        engine = create_sqlite_engine()
+        db = create_sqlite_session(engine)
+        link = create_referral_link(db)
+        created = sample("conversions_ingested_total", {"result": "created"})
+        duplicate = sample("conversions_ingested_total", {"result": "duplicate"})
+
+        for _ in range(2):
+            conversion_service.create_conversion(
+                db=db,
+                referral_link=link,
+                conversion_type=ConversionType.SALE,
+                visitor_session_id=uuid4(),
+                conversion_value=Decimal("10.00"),
+                idempotency_key="order:1",
+            )
+
+        assert sample("conversions_ingested_total", {"result": "created"}) == created + 1
+        assert sample("conversions_ingested_total", {"result": "duplicate"}) == duplicate + 1
+        db.close()
+        engine.dispose()
@@ -0,0 +1,235 @@
+"""
+Tests for the multi-touch attribution models.
+
+Credits are computed for whole chunks at once; each conversion's touchpoints
+form one segment and must sum to 1.
+"""
+
+from datetime import datetime, timedelta
+from decimal import Decimal
+from uuid import uuid4
+
+import numpy as np
+import pytest
+
+from app.models.affiliate import AffiliateProfile, AffiliateTier
+from app.models.attribution import AttributionCredit
+from app.models.conversion import Conversion, ConversionStatus, ConversionType
+from app.models.program import EnrollmentStatus, ProgramEnrollment
+from app.models.referral import ReferralClick, ReferralLink
+from app.services.multitouch_attribution_service import (
+    ATTRIBUTION_MODELS,
+    attribute_chunk,
+    attribute_partition,
+    calculate_credit_commissions,
+    compute_credits,
+    register_attribution_model,
+)
+from tests.db_utils import create_referral_link
+
+DAY = 86400.0
+NOW = datetime(2030, 1, 15, 12, 0)
+
+
+@pytest.mark.unit
+class TestAttributionModels:
+    """Test credit splits across a chunk of conversions."""
+
+    # Conversion 0 has one touchpoint, conversion 1 has two, conversion 2 has four
+    segment = np.array([0, 1, 1, 2, 2, 2, 2])
+    age = np.array([1.0, 2.0, 1.0, 30.0, 14.0, 7.0, 0.0]) * DAY
+
+    @pytest.mark.parametrize("model", sorted(ATTRIBUTION_MODELS))
+    def test_credits_sum_to_one_per_conversion(self, model):
+        credits = compute_credits(model, self.segment, self.age)
+        assert np.allclose(np.bincount(self.segment, weights=credits), 1.0)
+
+    def test_linear(self):
+        credits = compute_credits("linear", self.segment, self.age)
+        assert np.allclose(credits, [1.0, 0.5, 0.5, 0.25, 0.25, 0.25, 0.25])
+
+    def test_position_based(self):
+        credits = compute_credits("position_based", self.segment, self.age)
+        assert np.allclose(credits, [1.0, 0.5, 0.5, 0.4, 0.1, 0.1, 0.4])
+
+    def test_time_decay_favours_recent_touchpoints(self):
+        credits = compute_credits("time_decay", self.segment, self.age)
+        path = credits[3:]
+        assert np.all(np.diff(path) > 0)
+        # Default half-life is 7 days: the click 7 days out gets half the last click's weight
+        assert path[2] == pytest.approx(path[3] / 2)
+
+    def test_unknown_model(self):
+        with pytest.raises(ValueError):
+            compute_credits("first_click_only", self.segment, self.age)
+
+    def test_custom_model_registration(self):
+        @register_attribution_model("first_touch_test")
+        def first_touch(segment, position, size, age_seconds):
+            return (position == 0).astype(np.float64)
+
+        try:
+            credits = compute_credits("first_touch_test", self.segment, self.age)
+            assert np.allclose(credits, [1.0, 1.0, 0.0, 1.0, 0.0, 0.0, 0.0])
+        finally:
+            ATTRIBUTION_MODELS.pop("first_touch_test")
+
+
+def enroll_second_affiliate(db, link):
+    """Link of another affiliate on the same program"""
+    other = create_referral_link(db, link_code="second")
+    enrollment = ProgramEnrollment(
+        affiliate_id=other.affiliate_id,
+        program_id=link.program_id,
+        status=EnrollmentStatus.ACTIVE,
+    )
+    db.add(enrollment)
+    db.flush()
+    second = ReferralLink(
+        enrollment_id=enrollment.id,
+        affiliate_id=other.affiliate_id,
+        program_id=link.program_id,
+        link_code="second-shared",
+        target_url="https://example.com",
+    )
+    db.add(second)
+    db.commit()
+    return other, second
+
+
+def add_conversion(db, link, session_id, status=ConversionStatus.VALIDATED):
+    conversion = Conversion(
+        referral_link_id=link.id,
+        affiliate_id=link.affiliate_id,
+        program_id=link.program_id,
+        conversion_type=ConversionType.SALE,
+        visitor_session_id=session_id,
+        conversion_value=Decimal("100.00"),
+        status=status,
+        converted_at=NOW,
+    )
+    db.add(conversion)
+    db.commit()
+    return conversion
+
+
+def add_path(db, session_id, path):
+    db.add_all([
+        ReferralClick(referral_link_id=link.id, visitor_session_id=session_id, clicked_at=NOW - age)
+        for link, age in path
+    ])
+    db.commit()
+
+
+def credits_by_link(db, conversion, model="linear"):
+    return {
+        credit.referral_link_id: (credit.credit, credit.touchpoints)
+        for credit in db.query(AttributionCredit).filter(
+            AttributionCredit.conversion_id == conversion.id,
+            AttributionCredit.model == model,
+        )
+    }
+
+
+@pytest.fixture
+def paths(db_session):
+    """A conversion whose session clicked the first link twice and the second link once"""
+    link = create_referral_link(db_session)
+    other, second = enroll_second_affiliate(db_session, link)
+    session_id = uuid4()
+    add_path(db_session, session_id, [
+        # Outside the 30 day window
+        (second, timedelta(days=40)),
+        (link, timedelta(days=3)),
+        (second, timedelta(days=2)),
+        (link, timedelta(days=1)),
+        # Another program's link in the same session
+        (other, timedelta(hours=12)),
+        # After the conversion
+        (second, timedelta(hours=-1)),
+    ])
+    conversion = add_conversion(db_session, link, session_id)
+    return link, second, conversion
+
+
+@pytest.mark.integration
+class TestAttributeChunk:
+    """Test stored credit shares for a chunk of conversions."""
+
+    def test_linear_shares_per_link(self, db_session, paths):
+        link, second, conversion = paths
+
+        assert attribute_chunk(db_session, [conversion.id], "linear", window_days=30) == 2
+        db_session.commit()
+
+        assert credits_by_link(db_session, conversion) == {
+            link.id: (Decimal("0.666667"), 2),
+            second.id: (Decimal("0.333333"), 1),
+        }
+
+    def test_rerun_replaces_model_credits(self, db_session, paths):
+        _, _, conversion = paths
+        attribute_chunk(db_session, [conversion.id], "linear", window_days=30)
+        attribute_chunk(db_session, [conversion.id], "position_based", window_days=30)
+        attribute_chunk(db_session, [conversion.id], "linear", window_days=30)
+        db_session.commit()
+
+        assert db_session.query(AttributionCredit).filter(AttributionCredit.model == "linear").count() == 2
+        assert db_session.query(AttributionCredit).count() == 4
+
+    def test_window_excludes_old_touchpoints(self, db_session, paths):
+        link, _, conversion = paths
+
+        attribute_chunk(db_session, [conversion.id], "linear", window_days=1)
+        db_session.commit()
+
+        assert credits_by_link(db_session, conversion) == {link.id: (Decimal("1.000000"), 1)}
+
+    def test_no_touchpoints(self, db_session):
+        link = create_referral_link(db_session)
+        conversion = add_conversion(db_session, link, uuid4())
+
+        assert attribute_chunk(db_session, [conversion.id], "linear") == 0
+
+
+@pytest.mark.integration
+class TestAttributePartition:
+    """Test the keyset-paginated partition run."""
+
+    def test_validated_conversions_only(self, db_session, paths):
+        link, _, conversion = paths
+        add_conversion(db_session, link, uuid4())
+        add_conversion(db_session, link, conversion.visitor_session_id, status=ConversionStatus.PENDING)
+
+        processed, written = attribute_partition(
+            db_session, "linear", since=NOW - timedelta(days=1), until=NOW, chunk_size=1,
+        )
+
+        assert (processed, written) == (2, 2)
+        assert {c.conversion_id for c in db_session.query(AttributionCredit)} == {conversion.id}
+
+
+@pytest.mark.integration
+class TestCalculateCreditCommissions:
+    """Test commission splits by credit share and tier."""
+
+    def test_split_by_credit_and_tier(self, db_session, paths):
+        link, second, conversion = paths
+        gold = AffiliateTier(name="Gold", level=3, commission_multiplier=Decimal("1.50"))
+        db_session.add(gold)
+        db_session.flush()
+        db_session.get(AffiliateProfile, link.affiliate_id).tier_id = gold.id
+        attribute_chunk(db_session, [conversion.id], "linear", window_days=30)
+        db_session.commit()
+
+        shares = calculate_credit_commissions(db_session, conversion, "linear")
+
+        # 20% of 100.00, split 2/3 and 1/3
+        assert [(s["referral_link_id"], s["base_amount"], s["tier_multiplier"], s["final_amount"]) for s in shares] == [
+            (link.id, Decimal("13.33"), Decimal("1.5"), Decimal("20.00")),
+            (second.id, Decimal("6.67"), Decimal("1.0"), Decimal("6.67")),
+        ]
+
+    def test_no_credits(self, db_session, paths):
+        _, _, conversion = paths
+        assert calculate_credit_commissions(db_session, conversion, "linear") == []
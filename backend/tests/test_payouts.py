@@ -0,0 +1,149 @@
+"""
+Tests for set-based payout transitions and the payout endpoints.
+"""
+
+from datetime import datetime, timedelta
+from decimal import Decimal
+from uuid import uuid4
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.api.deps import get_current_active_user
+from app.database import get_db
+from app.main import app
+from app.models.affiliate import AffiliateProfile
+from app.models.conversion import Commission, CommissionStatus, ConversionType, PayoutStatus
+from app.models.user import User, UserRole
+from app.models.webhook import OutboxEvent, WebhookEventType
+from app.services import conversion_service
+from app.services.payout_service import cancel_payout, complete_payout, fail_payout, generate_payout
+from tests.db_utils import create_referral_link
+
+
+@pytest.fixture(autouse=True)
+def no_side_channels(monkeypatch):
+    monkeypatch.setattr(conversion_service, "publish_live_events", lambda events: None)
+    monkeypatch.setattr(conversion_service, "record_conversion_scores", lambda *args: None)
+
+
+@pytest.fixture
+def payout(db_session):
+    """A pending payout of five approved commissions"""
+    link = create_referral_link(db_session)
+    for _ in range(5):
+        conversion_service.create_conversion(
+            db=db_session,
+            referral_link=link,
+            conversion_type=ConversionType.SALE,
+            visitor_session_id=uuid4(),
+            conversion_value=Decimal("10.00"),
+            auto_validate=True,
+        )
+    db_session.query(Commission).update({"status": CommissionStatus.APPROVED})
+    db_session.commit()
+
+    now = datetime.utcnow()
+    affiliate = db_session.get(AffiliateProfile, link.affiliate_id)
+    return generate_payout(db_session, affiliate, now - timedelta(days=1), now + timedelta(days=1))
+
+
+def commission_states(db):
+    return {(c.status, c.payout_id is not None) for c in db.query(Commission).populate_existing()}
+
+
+@pytest.mark.integration
+class TestPayoutTransitions:
+    """Test each transition is one UPDATE over the payout's commissions."""
+
+    def test_complete_marks_commissions_paid(self, db_session, payout, query_budget):
+        with query_budget(6):
+            complete_payout(db_session, payout)
+
+        assert payout.status == PayoutStatus.COMPLETED
+        assert commission_states(db_session) == {(CommissionStatus.PAID, True)}
+        assert db_session.query(OutboxEvent).filter(
+            OutboxEvent.event_type == WebhookEventType.PAYOUT_COMPLETED.value
+        ).count() == 1
+
+    def test_fail_releases_commissions(self, db_session, payout, query_budget):
+        with query_budget(5):
+            fail_payout(db_session, payout, notes="Bank rejected the transfer")
+
+        assert payout.status == PayoutStatus.FAILED
+        assert payout.notes == "Bank rejected the transfer"
+        assert commission_states(db_session) == {(CommissionStatus.APPROVED, False)}
+
+    @pytest.mark.parametrize("close", [fail_payout, cancel_payout])
+    def test_close_releases_commissions_rejected_since(self, db_session, payout, close):
+        reversed_commission = db_session.query(Commission).filter(Commission.payout_id == payout.id).first()
+        conversion_service.reverse_conversion(db_session, reversed_commission.conversion)
+
+        close(db_session, payout)
+
+        assert payout.status == PayoutStatus.FAILED
+        assert commission_states(db_session) == {(CommissionStatus.APPROVED, False), (CommissionStatus.REJECTED, False)}
+
+    def test_row_count_mismatch_rolls_back(self, db_session, payout):
+        db_session.query(Commission).filter(Commission.payout_id == payout.id).limit(1).first().status = CommissionStatus.REJECTED
+        db_session.commit()
+
+        with pytest.raises(ValueError, match="4 approved commissions, expected 5"):
+            complete_payout(db_session, payout)
+
+        assert db_session.get(type(payout), payout.id).status == PayoutStatus.PENDING
+        assert db_session.query(Commission).filter(Commission.status == CommissionStatus.PAID).count() == 0
+
+    def test_closed_payout_cannot_transition(self, db_session, payout):
+        cancel_payout(db_session, payout)
+
+        assert payout.status == PayoutStatus.FAILED
+        with pytest.raises(ValueError):
+            complete_payout(db_session, payout)
+
+
+@pytest.mark.api
+class TestPayoutEndpoints:
+    """Test process and cancel go through the service transitions."""
+
+    @pytest.fixture
+    def admin_client(self, db_session):
+        admin = User(email="admin@test.com", hashed_password="x", role=UserRole.ADMIN, first_name="A", last_name="B")
+        db_session.add(admin)
+        db_session.commit()
+        app.dependency_overrides[get_db] = lambda: db_session
+        app.dependency_overrides[get_current_active_user] = lambda: admin
+        yield TestClient(app)
+        app.dependency_overrides.clear()
+
+    def test_process_completes_payout(self, db_session, payout, admin_client):
+        response = admin_client.post(f"/api/v1/payouts/{payout.id}/process", params={"payment_reference": "TX-1"})
+
+        assert response.status_code == 200
+        body = response.json()
+        assert body["status"] == PayoutStatus.COMPLETED.value
+        assert body["payment_reference"] == "TX-1"
+        assert commission_states(db_session) == {(CommissionStatus.PAID, True)}
+
+        again = admin_client.post(f"/api/v1/payouts/{payout.id}/process", params={"payment_reference": "TX-2"})
+        assert again.status_code == 400
+
+    def test_failed_check_leaves_payout_unpaid(self, db_session, payout, admin_client):
+        reversed_commission = db_session.query(Commission).filter(Commission.payout_id == payout.id).first()
+        conversion_service.reverse_conversion(db_session, reversed_commission.conversion)
+
+        response = admin_client.post(f"/api/v1/payouts/{payout.id}/process", params={"payment_reference": "TX-1"})
+
+        assert response.status_code == 400
+        db_session.refresh(payout)
+        assert payout.status == PayoutStatus.PENDING
+        assert (payout.payment_reference, payout.processed_by, payout.processed_at) == (None, None, None)
+        assert db_session.query(Commission).filter(Commission.status == CommissionStatus.PAID).count() == 0
+
+    def test_cancel_releases_commissions(self, db_session, payout, admin_client):
+        response = admin_client.post(f"/api/v1/payouts/{payout.id}/cancel")
+
+        assert response.status_code == 200
+        assert response.json()["status"] == PayoutStatus.FAILED.value
+        assert commission_states(db_session) == {(CommissionStatus.APPROVED, False)}
+        assert admin_client.post(f"/api/v1/payouts/{payout.id}/cancel").status_code == 400
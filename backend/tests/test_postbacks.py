@@ -0,0 +1,309 @@
+"""
+Tests for server-to-server postbacks: the endpoint, the stream drain and
+batched conversion ingestion.
+"""
+
+from datetime import datetime, timedelta
+from decimal import Decimal
+from uuid import uuid4
+
+import orjson
+import pytest
+import redis
+from fastapi.testclient import TestClient
+from sqlalchemy.exc import OperationalError
+
+from app.core.config import settings
+from app.database import get_db
+from app.main import app
+from app.models.conversion import Commission, Conversion, ConversionStatus
+from app.models.program import AffiliateProgram
+from app.models.referral import ReferralClick, ReferralLink
+from app.models.webhook import OutboxEvent
+from app.services import postback_service
+from app.services.postback_service import (
+    drain_postbacks,
+    invalidate_postback_config,
+    map_postback_params,
+    postback_event,
+    postback_template,
+    record_postbacks,
+)
+from tests.db_utils import create_referral_link
+
+
+class FakeStreamRedis:
+    """Single-stream, single-group stand-in for the Redis stream commands"""
+
+    def __init__(self):
+        self.entries = []
+        self.pending = {}
+        self.last_delivered = 0
+        self.groups = set()
+        self.dead_letters = []
+
+    def xadd(self, key, fields):
+        if key == f"{settings.POSTBACK_STREAM_KEY}:dead":
+            self.dead_letters.append(fields)
+            return
+        entry_id = f"{len(self.entries) + 1}-0"
+        self.entries.append((entry_id, fields))
+        return entry_id
+
+    def xgroup_create(self, key, group, id="$", mkstream=False):
+        if group in self.groups:
+            raise redis.ResponseError("BUSYGROUP Consumer Group name already exists")
+        self.groups.add(group)
+
+    def xreadgroup(self, group, consumer, streams, count=None):
+        new = [(entry_id, fields) for entry_id, fields in self.entries if int(entry_id.split("-")[0]) > self.last_delivered]
+        new = new[:count]
+        if not new:
+            return []
+        self.last_delivered = int(new[-1][0].split("-")[0])
+        for entry_id, _ in new:
+            self.pending[entry_id] = consumer
+        return [[streams and next(iter(streams)), new]]
+
+    def xautoclaim(self, key, group, consumer, min_idle_time, start_id="0-0", count=None):
+        stale = [(entry_id, fields) for entry_id, fields in self.entries if self.pending.get(entry_id) == "dead"]
+        for entry_id, _ in stale[:count]:
+            self.pending[entry_id] = consumer
+        return ["0-0", stale[:count], []]
+
+    def pipeline(self, transaction=True):
+        return self
+
+    def xack(self, key, group, *entry_ids):
+        for entry_id in entry_ids:
+            self.pending.pop(entry_id, None)
+
+    def xdel(self, key, *entry_ids):
+        self.entries = [entry for entry in self.entries if entry[0] not in entry_ids]
+
+    def execute(self):
+        pass
+
+
+@pytest.fixture
+def link(db_session):
+    link = create_referral_link(db_session, commission_config={"type": "percentage", "value": 10})
+    db_session.get(AffiliateProgram, link.program_id).postback_secret = "pb-secret"
+    db_session.commit()
+    invalidate_postback_config()
+    yield link
+    invalidate_postback_config()
+
+
+@pytest.fixture
+def stream(monkeypatch):
+    fake = FakeStreamRedis()
+    monkeypatch.setattr(postback_service, "get_redis", lambda: fake)
+    return fake
+
+
+def make_event(link, **fields):
+    conversion = {
+        "referral_link_code": link.link_code,
+        "visitor_session_id": str(uuid4()),
+        "conversion_type": "SALE",
+        "conversion_value": "100.00",
+        "currency": "USD",
+        "customer_id": None,
+        "conversion_metadata": {"source": "postback"},
+        "idempotency_key": None,
+        **fields,
+    }
+    return postback_event(link.program_id, conversion)
+
+
+@pytest.mark.unit
+class TestPostbackTemplate:
+    """Test query parameter mapping."""
+
+    def test_default_template(self):
+        fields = map_postback_params(postback_template(None), {
+            "ref": "abc", "session_id": "s", "amount": "12.50", "transaction_id": "t-1", "order_id": "o-9", "extra": "x",
+        })
+        assert fields == {
+            "referral_link_code": "abc",
+            "visitor_session_id": "s",
+            "conversion_type": "SALE",
+            "conversion_value": "12.50",
+            "idempotency_key": "t-1",
+            "conversion_metadata": {"order_id": "o-9", "source": "postback"},
+        }
+
+    def test_program_template_replaces_sections(self):
+        template = postback_template({"params": {"referral_link_code": "aff_sub", "conversion_value": "payout"}, "defaults": None})
+        fields = map_postback_params(template, {"aff_sub": "abc", "payout": "", "ref": "ignored"})
+        assert fields["referral_link_code"] == "abc"
+        assert "conversion_value" not in fields
+        assert fields["conversion_type"] == "SALE"
+
+
+@pytest.mark.integration
+class TestRecordPostbacks:
+    """Test batched conversion ingestion."""
+
+    def test_batch_creates_conversions_and_commissions(self, db_session, link):
+        events = [make_event(link) for _ in range(3)] + [make_event(link, conversion_value=None)]
+
+        outcomes = record_postbacks(db_session, events)
+
+        assert outcomes == {"created": 4, "duplicate": 0, "unmatched": 0}
+        conversions = db_session.query(Conversion).all()
+        assert sorted(c.status for c in conversions) == sorted(
+            [ConversionStatus.VALIDATED] * 3 + [ConversionStatus.PENDING]
+        )
+        commissions = db_session.query(Commission).all()
+        assert len(commissions) == 3
+        assert all(c.final_amount == Decimal("10.00") for c in commissions)
+        assert db_session.query(OutboxEvent).count() == 3
+        db_session.expire_all()
+        assert db_session.get(ReferralLink, link.id).conversions_count == 4
+
+    def test_duplicates_and_unmatched(self, db_session, link):
+        other = create_referral_link(db_session, link_code="otherlink")
+        record_postbacks(db_session, [make_event(link, idempotency_key="txn-1")])
+
+        outcomes = record_postbacks(db_session, [
+            make_event(link, idempotency_key="txn-1"),
+            make_event(link, idempotency_key="txn-2"),
+            make_event(link, idempotency_key="txn-2"),
+            make_event(link, referral_link_code="missing"),
+            # A program's secret only covers its own links
+            make_event(link, referral_link_code=other.link_code),
+        ])
+
+        assert outcomes == {"created": 1, "duplicate": 2, "unmatched": 2}
+        assert db_session.query(Conversion).count() == 2
+
+    def test_merchant_customer_id_kept_as_metadata(self, db_session, link):
+        fields = map_postback_params(postback_template(None), {
+            "ref": link.link_code, "session_id": str(uuid4()), "customer_id": "cus_123",
+        })
+        event = postback_event(link.program_id, {**fields, "customer_id": str(uuid4())})
+
+        assert record_postbacks(db_session, [event])["created"] == 1
+        conversion = db_session.query(Conversion).one()
+        assert conversion.customer_id is None
+        assert conversion.conversion_metadata["customer_id"] == "cus_123"
+
+    def test_last_click_attribution(self, db_session, link):
+        clicked = ReferralLink(
+            enrollment_id=link.enrollment_id,
+            affiliate_id=link.affiliate_id,
+            program_id=link.program_id,
+            link_code="clicked1",
+            target_url="https://example.com",
+        )
+        db_session.add(clicked)
+        db_session.flush()
+        session_id = uuid4()
+        db_session.add(ReferralClick(
+            referral_link_id=clicked.id,
+            visitor_session_id=session_id,
+            clicked_at=datetime.utcnow() - timedelta(hours=1),
+        ))
+        db_session.commit()
+
+        record_postbacks(db_session, [
+            make_event(link, visitor_session_id=str(session_id)),
+            make_event(link),
+        ])
+
+        by_session = {c.visitor_session_id: c.referral_link_id for c in db_session.query(Conversion)}
+        assert by_session.pop(session_id) == clicked.id
+        assert list(by_session.values()) == [link.id]
+
+
+@pytest.mark.integration
+class TestDrainPostbacks:
+    """Test the stream drain."""
+
+    def test_drains_and_acknowledges(self, db_session, link, stream):
+        for _ in range(5):
+            postback_service.enqueue_postback(make_event(link))
+
+        assert drain_postbacks(db_session, batch_size=2)["created"] == 5
+        assert stream.entries == [] and stream.pending == {}
+        assert db_session.query(Conversion).count() == 5
+
+    def test_reclaims_entries_of_dead_consumer(self, db_session, link, stream):
+        postback_service.enqueue_postback(make_event(link))
+        stream.xgroup_create("postbacks", "group")
+        stream.xreadgroup("group", "dead", {"postbacks": ">"}, count=10)
+
+        assert drain_postbacks(db_session)["created"] == 1
+        assert stream.entries == []
+
+    def test_bad_entries_dead_lettered(self, db_session, link, stream):
+        postback_service.enqueue_postback(make_event(link))
+        postback_service.enqueue_postback(make_event(link, conversion_value="12,50"))
+        postback_service.enqueue_postback(make_event(link, conversion_type="REFUND"))
+        postback_service.enqueue_postback(make_event(link))
+
+        totals = drain_postbacks(db_session)
+
+        assert totals == {"created": 2, "duplicate": 0, "unmatched": 0, "dead": 2}
+        assert stream.entries == [] and stream.pending == {}
+        assert [fields[b"error"] for fields in stream.dead_letters] == ["InvalidOperation", "ValueError"]
+        assert db_session.query(Conversion).count() == 2
+
+    def test_database_errors_leave_batch_pending(self, db_session, link, stream, monkeypatch):
+        def unavailable(db, events):
+            raise OperationalError("INSERT", {}, Exception("server closed the connection"))
+
+        postback_service.enqueue_postback(make_event(link))
+        monkeypatch.setattr(postback_service, "record_postbacks", unavailable)
+
+        with pytest.raises(OperationalError):
+            drain_postbacks(db_session)
+        assert len(stream.entries) == 1 and len(stream.pending) == 1
+        assert stream.dead_letters == []
+
+
+@pytest.mark.api
+class TestPostbackEndpoint:
+    """Test the public postback endpoint."""
+
+    @pytest.fixture
+    def client(self, db_session):
+        app.dependency_overrides[get_db] = lambda: db_session
+        try:
+            yield TestClient(app)
+        finally:
+            app.dependency_overrides.clear()
+
+    def test_queues_mapped_conversion(self, client, link, stream):
+        session_id = uuid4()
+        response = client.get(f"/api/v1/conversions/postback/{link.program_id}", params={
+            "secret": "pb-secret", "ref": link.link_code, "session_id": str(session_id), "amount": "42.00",
+        })
+
+        assert response.status_code == 200
+        [(_, fields)] = stream.entries
+        event = orjson.loads(fields[b"event"])
+        assert event["program_id"] == str(link.program_id)
+        assert event["visitor_session_id"] == str(session_id)
+        assert event["conversion_value"] == "42.00"
+
+    def test_rejects_bad_secret_and_params(self, client, link, stream):
+        url = f"/api/v1/conversions/postback/{link.program_id}"
+        assert client.get(url, params={"secret": "wrong", "ref": link.link_code}).status_code == 401
+        assert client.get(f"/api/v1/conversions/postback/{uuid4()}", params={"secret": "pb-secret"}).status_code == 401
+        assert client.get(url, params={"secret": "pb-secret", "ref": link.link_code}).status_code == 422
+        assert stream.entries == []
+
+    def test_stores_directly_without_redis(self, client, db_session, link, monkeypatch):
+        def unavailable():
+            raise redis.ConnectionError("down")
+
+        monkeypatch.setattr(postback_service, "get_redis", unavailable)
+        response = client.get(f"/api/v1/conversions/postback/{link.program_id}", headers={"X-Postback-Secret": "pb-secret"}, params={
+            "ref": link.link_code, "session_id": str(uuid4()), "amount": "5",
+        })
+
+        assert response.status_code == 200
+        assert db_session.query(Conversion).count() == 1
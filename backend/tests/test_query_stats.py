@@ -0,0 +1,102 @@
+"""
+Tests for per-request SQL statistics and the query budget fixture.
+"""
+
+import pytest
+
+from fastapi.testclient import TestClient
+from sqlalchemy import text
+from sqlalchemy.exc import OperationalError
+
+from app.api.deps import get_current_active_user
+from app.core.config import settings
+from app.core.query_stats import DB_QUERIES_PER_REQUEST, QueryStats, install_query_stats, track_queries
+from app.database import get_db
+from app.main import app
+from app.models.user import User, UserRole
+from tests.db_utils import create_referral_link
+from tests.sqlite_fixtures import QUERY_STATS
+
+
+@pytest.fixture
+def link(db_session):
+    return create_referral_link(db_session)
+
+
+@pytest.fixture
+def client(db_session, link, monkeypatch):
+    # The affiliate who owns the link
+    owner = db_session.query(User).filter(User.email == "testlink@test.com").one()
+    db_session.expunge(owner)
+
+    monkeypatch.setattr(settings, "DEBUG", True)
+    app.dependency_overrides[get_db] = lambda: db_session
+    app.dependency_overrides[get_current_active_user] = lambda: owner
+    try:
+        yield TestClient(app)
+    finally:
+        app.dependency_overrides.clear()
+
+
+@pytest.mark.unit
+class TestQueryStats:
+    """Test duplicate detection."""
+
+    def test_duplicates(self):
+        stats = QueryStats()
+        for _ in range(3):
+            stats.record("SELECT * FROM t WHERE id = ?", 0.001)
+        stats.record("SELECT * FROM u", 0.002)
+
+        assert stats.count == 4
+        assert stats.duplicates == {"SELECT * FROM t WHERE id = ?": 3}
+        assert stats.duplicate_count == 2
+        assert stats.duration == pytest.approx(0.005)
+
+    def test_nested_collectors(self, engine):
+        install_query_stats(engine)
+        with track_queries() as outer:
+            with engine.connect() as conn:
+                conn.execute(text("SELECT 1"))
+                with track_queries() as inner:
+                    conn.execute(text("SELECT 2"))
+
+        assert (outer.count, inner.count) == (2, 1)
+
+    def test_failed_statement_releases_start_time(self, engine):
+        install_query_stats(engine)
+        with engine.connect() as conn:
+            with pytest.raises(OperationalError):
+                conn.execute(text("SELECT * FROM missing_table"))
+            conn.execute(text("SELECT 1"))
+
+            assert conn.info["query_start_time"] == []
+
+
+@pytest.mark.api
+@pytest.mark.parametrize("engine", [QUERY_STATS], indirect=True)
+class TestQueryStatsMiddleware:
+    """Test per-request headers."""
+
+    def test_headers_report_statements(self, client, link):
+        response = client.get(f"/api/v1/referrals/links/{link.id}")
+
+        assert response.status_code == 200
+        # Link lookup and owner check
+        assert response.headers["x-db-query-count"] == "2"
+        assert response.headers["x-db-duplicate-queries"] == "0"
+        assert float(response.headers["x-db-query-time-ms"]) >= 0
+
+    def test_query_budget(self, client, link, query_budget):
+        url = f"/api/v1/referrals/links/{link.id}"
+        with query_budget(2) as stats:
+            client.get(url)
+        assert stats.count == 2
+
+    def test_histogram_labels_route_template(self, client, link):
+        client.get(f"/api/v1/referrals/links/{link.id}")
+
+        samples = DB_QUERIES_PER_REQUEST.collect()[0].samples
+        assert any(
+            s.labels.get("route") == "/api/v1/referrals/links/{link_id}" for s in samples
+        )
@@ -0,0 +1,102 @@
+"""
+Tests for read-replica routing of list and stats endpoints.
+"""
+
+import pytest
+
+from app import database
+from app.core import read_routing
+from app.core.config import settings
+from app.core.security import create_access_token
+from tests.db_utils import create_sqlite_engine, create_sqlite_session
+
+
+class FakeRequest:
+    def __init__(self, authorization=None):
+        self.headers = {"authorization": authorization} if authorization else {}
+
+
+class FakeRedis:
+    def __init__(self, keys=()):
+        self.keys = set(keys)
+
+    def exists(self, key):
+        return int(key in self.keys)
+
+
+def resolve(request, primary):
+    """Run the get_read_db generator and return the session it yields."""
+    dependency = database.get_read_db(request, primary)
+    session = next(dependency)
+    dependency.close()
+    return session
+
+
+@pytest.fixture
+def primary():
+    engine = create_sqlite_engine()
+    db = create_sqlite_session(engine)
+    yield db
+    db.close()
+    engine.dispose()
+
+
+@pytest.fixture
+def replica(monkeypatch):
+    engine = create_sqlite_engine()
+    monkeypatch.setattr(database, "replica_engine", engine)
+    monkeypatch.setattr(database, "ReplicaSessionLocal", lambda: create_sqlite_session(engine))
+    monkeypatch.setattr(read_routing, "_lag_checked_at", float("-inf"))
+    yield engine
+    engine.dispose()
+
+
+@pytest.mark.unit
+class TestGetReadDb:
+    """Test when reads go to the replica."""
+
+    def test_no_replica_uses_primary(self, primary):
+        assert resolve(FakeRequest(), primary) is primary
+
+    def test_fresh_replica(self, primary, replica, monkeypatch):
+        monkeypatch.setattr(read_routing, "probe_replica_lag", lambda engine: 0.5)
+
+        session = resolve(FakeRequest(), primary)
+        assert session is not primary
+        assert session.get_bind() is replica
+
+    def test_lagging_replica_falls_back(self, primary, replica, monkeypatch):
+        monkeypatch.setattr(read_routing, "probe_replica_lag", lambda engine: settings.REPLICA_MAX_LAG_SECONDS + 1)
+        assert resolve(FakeRequest(), primary) is primary
+
+    def test_unreachable_replica_falls_back(self, primary, replica, monkeypatch):
+        monkeypatch.setattr(read_routing, "probe_replica_lag", lambda engine: None)
+        assert resolve(FakeRequest(), primary) is primary
+
+    def test_lag_probe_is_cached(self, primary, replica, monkeypatch):
+        probes = []
+        monkeypatch.setattr(read_routing, "probe_replica_lag", lambda engine: probes.append(1) or 0.0)
+
+        for _ in range(3):
+            resolve(FakeRequest(), primary)
+        assert len(probes) == 1
+
+    def test_concurrent_probe_serves_previous_verdict(self, primary, replica, monkeypatch):
+        probes = []
+        monkeypatch.setattr(read_routing, "probe_replica_lag", lambda engine: probes.append(1) or 0.0)
+        monkeypatch.setattr(read_routing, "_replica_fresh", True)
+
+        # Another thread is mid-probe
+        with read_routing._lag_lock:
+            assert resolve(FakeRequest(), primary) is not primary
+        assert probes == []
+
+    def test_read_your_writes(self, primary, replica, monkeypatch):
+        monkeypatch.setattr(read_routing, "probe_replica_lag", lambda engine: 0.0)
+        token = create_access_token("user-1")
+        monkeypatch.setattr(read_routing, "get_redis", lambda: FakeRedis({"ryw:user-1"}))
+
+        assert resolve(FakeRequest(f"Bearer {token}"), primary) is primary
+
+        other = create_access_token("user-2")
+        assert resolve(FakeRequest(f"Bearer {other}"), primary) is not primary
@@ -0,0 +1,228 @@
+"""
+Tests for the standalone redirect service and the click queue.
+"""
+
+from datetime import datetime, timedelta
+from urllib.parse import parse_qs, urlparse
+from uuid import uuid4
+
+import orjson
+import pytest
+from fastapi.testclient import TestClient
+
+from app.core.config import settings
+from app.models.referral import ReferralClick, ReferralLink
+from app.redirect import LinkCache, RedirectApp
+from app.services import click_queue
+from app.services.click_queue import click_event, drain_clicks, record_clicks
+from app.services.referral_service import LinkTarget, get_link_target
+from tests.db_utils import create_referral_link
+
+
+def make_target(expires_at=None):
+    return LinkTarget(
+        id=uuid4(),
+        link_code="abc12345",
+        target_url="https://shop.example.com/landing?x=1",
+        utm_params={"utm_source": "aff"},
+        program_id=uuid4(),
+        affiliate_id=uuid4(),
+        expires_at=expires_at,
+    )
+
+
+class FakeLock:
+    def __init__(self, held):
+        self.held = held
+
+    def acquire(self, blocking=True):
+        if self.held:
+            return False
+        self.held = True
+        return True
+
+    def reacquire(self):
+        pass
+
+    def release(self):
+        self.held = False
+
+
+class FakeListRedis:
+    def __init__(self):
+        self.lists = {}
+        self.counters = {}
+        self.locked = False
+
+    def rpush(self, key, *values):
+        self.lists.setdefault(key, []).extend(values)
+
+    def lrange(self, key, start, end):
+        return self.lists.get(key, [])[start:end + 1]
+
+    def ltrim(self, key, start, end):
+        self.lists[key] = self.lists.get(key, [])[start:]
+
+    def incr(self, key):
+        self.counters[key] = self.counters.get(key, 0) + 1
+        return self.counters[key]
+
+    def delete(self, key):
+        self.counters.pop(key, None)
+
+    def lock(self, name, timeout=None):
+        return FakeLock(self.locked)
+
+    def pipeline(self):
+        return FakePipeline(self)
+
+
+class FakePipeline:
+    def __init__(self, client):
+        self.client = client
+        self.calls = []
+
+    def __getattr__(self, name):
+        return lambda *args: self.calls.append((name, args))
+
+    def execute(self):
+        return [getattr(self.client, name)(*args) for name, args in self.calls]
+
+
+@pytest.fixture
+def redirect():
+    targets = {"abc12345": make_target(), "old00000": make_target(datetime.utcnow() - timedelta(days=1))}
+    lookups, clicks = [], []
+
+    def resolve(code):
+        lookups.append(code)
+        return targets.get(code)
+
+    async def record_click(event):
+        clicks.append(event)
+
+    app = RedirectApp(resolve=resolve, record_click=record_click, cache=LinkCache(100, 60, 60))
+    return TestClient(app), targets, lookups, clicks
+
+
+@pytest.mark.api
+class TestRedirectApp:
+    """Test the redirect and verify routes."""
+
+    def test_redirect_queues_click(self, redirect):
+        client, targets, lookups, clicks = redirect
+        sid = uuid4()
+
+        response = client.get(f"/track/abc12345?sid={sid}", headers={"user-agent": "UA"}, follow_redirects=False)
+
+        assert response.status_code == 302
+        location = urlparse(response.headers["location"])
+        params = parse_qs(location.query)
+        assert location.netloc == "shop.example.com"
+        assert params["ref"] == ["abc12345"]
+        assert params["aff_sid"] == [str(sid)]
+        assert params["utm_source"] == ["aff"]
+        assert clicks[0]["referral_link_id"] == str(targets["abc12345"].id)
+        assert clicks[0]["visitor_session_id"] == str(sid)
+        assert clicks[0]["user_agent"] == "UA"
+
+    def test_links_are_cached(self, redirect):
+        client, _, lookups, _ = redirect
+
+        for _ in range(3):
+            client.get("/track/abc12345", follow_redirects=False)
+        for _ in range(2):
+            assert client.get("/track/missing").status_code == 404
+
+        assert lookups == ["abc12345", "missing"]
+
+    def test_api_prefix(self, redirect):
+        client, _, _, _ = redirect
+        response = client.get(f"{settings.API_V1_STR}/referrals/track/abc12345", follow_redirects=False)
+        assert response.status_code == 302
+
+    def test_expired(self, redirect):
+        client, _, _, clicks = redirect
+        response = client.get("/track/old00000")
+        assert response.status_code == 404
+        assert response.json() == {"detail": "Referral link has expired"}
+        assert clicks == []
+
+    def test_verify(self, redirect):
+        client, targets, _, _ = redirect
+        assert client.get("/verify/abc12345").json() == {
+            "valid": True,
+            "program_id": str(targets["abc12345"].program_id),
+            "affiliate_id": str(targets["abc12345"].affiliate_id),
+        }
+        assert client.get("/verify/old00000").json()["valid"] is False
+        assert client.get("/verify/missing").json()["valid"] is False
+
+
+@pytest.mark.integration
+class TestClickQueue:
+    """Test click ingestion from the queue."""
+
+    def test_get_link_target(self, db_session):
+        link = create_referral_link(db_session)
+        target = get_link_target(db_session, "testlink")
+        assert target.id == link.id
+        assert target.target_url == link.target_url
+        assert get_link_target(db_session, "nope") is None
+
+    def test_record_clicks(self, db_session):
+        link = create_referral_link(db_session)
+        events = [click_event(link.id, uuid4(), ip_address="10.0.0.1") for _ in range(3)]
+
+        assert record_clicks(db_session, events) == 3
+
+        db_session.expire_all()
+        assert db_session.query(ReferralClick).count() == 3
+        assert db_session.get(ReferralLink, link.id).clicks_count == 3
+
+    def test_drain_in_batches(self, db_session, monkeypatch):
+        link = create_referral_link(db_session)
+        fake = FakeListRedis()
+        monkeypatch.setattr(click_queue, "get_redis", lambda: fake)
+        for _ in range(5):
+            fake.rpush(settings.CLICK_QUEUE_KEY, orjson.dumps(click_event(link.id, uuid4())))
+
+        assert drain_clicks(db_session, batch_size=2) == 5
+
+        assert fake.lists[settings.CLICK_QUEUE_KEY] == []
+        db_session.expire_all()
+        assert db_session.get(ReferralLink, link.id).clicks_count == 5
+
+    def test_drain_skipped_while_locked(self, db_session, monkeypatch):
+        link = create_referral_link(db_session)
+        fake = FakeListRedis()
+        fake.locked = True
+        monkeypatch.setattr(click_queue, "get_redis", lambda: fake)
+        fake.rpush(settings.CLICK_QUEUE_KEY, orjson.dumps(click_event(link.id, uuid4())))
+
+        assert drain_clicks(db_session) == 0
+        assert len(fake.lists[settings.CLICK_QUEUE_KEY]) == 1
+
+    def test_clicks_on_deleted_links_dropped(self, db_session):
+        link = create_referral_link(db_session)
+        events = [click_event(link.id, uuid4()), click_event(uuid4(), uuid4())]
+
+        assert record_clicks(db_session, events) == 1
+        assert db_session.query(ReferralClick).count() == 1
+
+    def test_failing_batch_quarantined(self, db_session, monkeypatch):
+        link = create_referral_link(db_session)
+        fake = FakeListRedis()
+        monkeypatch.setattr(click_queue, "get_redis", lambda: fake)
+        monkeypatch.setattr(settings, "CLICK_INGEST_MAX_ATTEMPTS", 3)
+        fake.rpush(settings.CLICK_QUEUE_KEY, b"not json")
+        fake.rpush(settings.CLICK_QUEUE_KEY, orjson.dumps(click_event(link.id, uuid4())))
+
+        for _ in range(2):
+            with pytest.raises(orjson.JSONDecodeError):
+                drain_clicks(db_session, batch_size=1)
+        assert drain_clicks(db_session, batch_size=1) == 1
+
+        assert fake.lists[f"{settings.CLICK_QUEUE_KEY}:dead"] == [b"not json"]
+        assert fake.lists[settings.CLICK_QUEUE_KEY] == []
+        assert fake.counters == {}
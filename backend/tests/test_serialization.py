@@ -0,0 +1,86 @@
+"""
+Tests for the orjson fast path of list endpoints.
+
+The projected rows must serialize to exactly what FastAPI produces from the
+route's response_model.
+"""
+
+import json
+import pytest
+from datetime import datetime, timedelta, timezone
+from decimal import Decimal
+from typing import List
+from uuid import uuid4
+
+from pydantic import BaseModel, TypeAdapter
+from sqlalchemy import select
+
+from app.core.serialization import rows_to_json, schema_columns
+from app.models.conversion import (
+    Commission as CommissionModel,
+    CommissionStatus,
+    Conversion as ConversionModel,
+    ConversionStatus,
+    ConversionType,
+)
+from app.schemas.conversion import Commission, Conversion
+from tests.db_utils import create_referral_link
+
+
+def pydantic_json(schema, objects) -> list:
+    adapter = TypeAdapter(List[schema])
+    return json.loads(adapter.dump_json(adapter.validate_python(objects, from_attributes=True)))
+
+
+@pytest.mark.integration
+class TestProjectedSerialization:
+    """Test the fast path against the response_model output."""
+
+    def test_matches_response_model(self, db_session):
+        link = create_referral_link(db_session)
+        conversion = ConversionModel(
+            referral_link_id=link.id,
+            affiliate_id=link.affiliate_id,
+            program_id=link.program_id,
+            conversion_type=ConversionType.SALE,
+            visitor_session_id=uuid4(),
+            conversion_value=Decimal("149.90"),
+            status=ConversionStatus.VALIDATED,
+            conversion_metadata={"order_id": "ORD-1"},
+            validated_at=datetime(2026, 10, 19, 12, 30, 15, 123456),
+        )
+        db_session.add(conversion)
+        db_session.flush()
+        db_session.add(CommissionModel(
+            conversion_id=conversion.id,
+            affiliate_id=link.affiliate_id,
+            program_id=link.program_id,
+            commission_rule={"type": "percentage", "value": 20},
+            base_amount=Decimal("29.98"),
+            tier_multiplier=Decimal("1.20"),
+            final_amount=Decimal("35.98"),
+            status=CommissionStatus.PENDING,
+        ))
+        db_session.commit()
+
+        for model, schema in ((ConversionModel, Conversion), (CommissionModel, Commission)):
+            rows = db_session.execute(select(*schema_columns(model, schema))).all()
+            fast = json.loads(rows_to_json(rows, list(schema.model_fields)))
+            assert fast == pydantic_json(schema, db_session.query(model).all())
+
+    def test_decimal_is_string(self):
+        assert json.loads(rows_to_json([(Decimal("10.50"),)], ["amount"])) == [{"amount": "10.50"}]
+
+    def test_aware_datetimes_match_pydantic(self):
+        class Event(BaseModel):
+            at: datetime
+
+        values = [
+            datetime(2026, 10, 19, 12, 30, tzinfo=timezone.utc),
+            datetime(2026, 10, 19, 14, 30, 0, 500, tzinfo=timezone(timedelta(hours=2))),
+            datetime(2026, 10, 19, 12, 30),
+        ]
+        fast = json.loads(rows_to_json([(value,) for value in values], ["at"]))
+
+        assert fast == pydantic_json(Event, [{"at": value} for value in values])
+        assert fast[0] == {"at": "2026-10-19T12:30:00Z"}
@@ -0,0 +1,131 @@
+"""
+Tests for the monthly tier promotion/demotion engine.
+"""
+
+import pytest
+from datetime import datetime
+from decimal import Decimal
+from uuid import uuid4
+
+from app.models.affiliate import AffiliateProfile, AffiliateTier, AffiliateTierHistory, ApprovalStatus
+from app.models.conversion import Conversion, ConversionStatus, ConversionType
+from app.services.tier_service import (
+    evaluate_affiliate_tiers,
+    get_month_bounds,
+    get_tier_ladder,
+    match_tier,
+)
+from tests.db_utils import create_referral_link
+
+LAST_MONTH = datetime(2026, 9, 15)
+EVALUATED_AT = datetime(2026, 10, 1, 2, 0)
+
+
+@pytest.fixture
+def tiers(db_session):
+    ladder = [
+        ("Bronze", 1, 0, 0),
+        ("Silver", 2, 10, 1000),
+        ("Gold", 3, 50, 5000),
+    ]
+    tiers = {}
+    for name, level, conversions, revenue in ladder:
+        tier = AffiliateTier(
+            name=name,
+            level=level,
+            commission_multiplier=1.0,
+            requirements={"min_monthly_conversions": conversions, "min_monthly_revenue": revenue},
+        )
+        db_session.add(tier)
+        tiers[name] = tier
+    db_session.commit()
+    return tiers
+
+
+def add_conversions(db, link, count, value, status=ConversionStatus.VALIDATED, converted_at=LAST_MONTH):
+    db.add_all([
+        Conversion(
+            referral_link_id=link.id,
+            affiliate_id=link.affiliate_id,
+            program_id=link.program_id,
+            conversion_type=ConversionType.SALE,
+            visitor_session_id=uuid4(),
+            conversion_value=Decimal(value),
+            status=status,
+            converted_at=converted_at,
+        )
+        for _ in range(count)
+    ])
+    db.commit()
+
+
+def approved_affiliate(db, link_code, tier):
+    link = create_referral_link(db, link_code=link_code)
+    affiliate = db.get(AffiliateProfile, link.affiliate_id)
+    affiliate.approval_status = ApprovalStatus.APPROVED
+    affiliate.tier_id = tier.id
+    db.commit()
+    return link, affiliate
+
+
+@pytest.mark.unit
+class TestTierMatching:
+    """Test ladder matching and evaluation periods."""
+
+    def test_month_bounds(self):
+        assert get_month_bounds(datetime(2026, 10, 19)) == (datetime(2026, 9, 1), datetime(2026, 10, 1))
+        assert get_month_bounds(datetime(2026, 1, 3)) == (datetime(2025, 12, 1), datetime(2026, 1, 1))
+
+    def test_all_requirements_must_be_met(self, db_session, tiers):
+        ladder = get_tier_ladder(db_session)
+        assert match_tier(ladder, 60, Decimal("6000")).tier_id == tiers["Gold"].id
+        # Enough conversions for Gold but only Silver revenue
+        assert match_tier(ladder, 60, Decimal("2000")).tier_id == tiers["Silver"].id
+        assert match_tier(ladder, 0, Decimal("0")).tier_id == tiers["Bronze"].id
+
+
+@pytest.mark.integration
+class TestEvaluateAffiliateTiers:
+    """Test bulk tier changes and history."""
+
+    def test_promotes_and_demotes(self, db_session, tiers):
+        rising_link, rising = approved_affiliate(db_session, "rising", tiers["Bronze"])
+        _, falling = approved_affiliate(db_session, "falling", tiers["Gold"])
+        steady_link, steady = approved_affiliate(db_session, "steady", tiers["Silver"])
+
+        add_conversions(db_session, rising_link, 12, "100.00")
+        add_conversions(db_session, steady_link, 10, "150.00")
+        # Outside the period or not validated: ignored
+        add_conversions(db_session, steady_link, 50, "150.00", converted_at=datetime(2026, 8, 15))
+        add_conversions(db_session, steady_link, 50, "150.00", status=ConversionStatus.PENDING)
+
+        result = evaluate_affiliate_tiers(db_session, month=EVALUATED_AT)
+        assert result == {"evaluated": 3, "promoted": 1, "demoted": 1}
+
+        db_session.expire_all()
+        assert rising.tier_id == tiers["Silver"].id
+        assert falling.tier_id == tiers["Bronze"].id
+        assert steady.tier_id == tiers["Silver"].id
+
+        history = {h.affiliate_id: h for h in db_session.query(AffiliateTierHistory).all()}
+        assert set(history) == {rising.id, falling.id}
+        assert history[rising.id].reason == "PROMOTION"
+        assert history[rising.id].monthly_conversions == 12
+        assert history[rising.id].monthly_revenue == Decimal("1200.00")
+        assert history[falling.id].reason == "DEMOTION"
+        assert history[falling.id].from_tier_id == tiers["Gold"].id
+
+    def test_demotion_can_be_disabled(self, db_session, tiers):
+        _, falling = approved_affiliate(db_session, "falling", tiers["Gold"])
+
+        result = evaluate_affiliate_tiers(db_session, month=EVALUATED_AT, allow_demotion=False)
+        assert result["demoted"] == 0
+
+        db_session.expire_all()
+        assert falling.tier_id == tiers["Gold"].id
+        assert db_session.query(AffiliateTierHistory).count() == 0
+
+    def test_pending_affiliates_are_skipped(self, db_session, tiers):
+        create_referral_link(db_session, link_code="pending")
+
+        assert evaluate_affiliate_tiers(db_session, month=EVALUATED_AT)["evaluated"] == 0
@@ -0,0 +1,403 @@
+"""
+Tests for the event outbox and the webhook dispatcher.
+
+Deliveries go to a stub HTTP server on localhost that records each request
+and answers with a configurable status.
+"""
+
+import asyncio
+import hashlib
+import hmac
+import ipaddress
+import json
+import socket
+import threading
+import time
+from datetime import datetime, timedelta
+from decimal import Decimal
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from uuid import uuid4
+
+import httpx
+import pytest
+from sqlalchemy.orm import sessionmaker
+
+from app.core.config import settings
+from app.models.affiliate import AffiliateProfile
+from app.models.conversion import ConversionType
+from app.models.user import User
+from app.models.webhook import (
+    OutboxEvent,
+    WebhookDelivery,
+    WebhookDeliveryStatus,
+    WebhookEndpoint,
+    WebhookEventType,
+)
+from app.services import conversion_service
+from app.services import webhook_service
+from app.services.webhook_dispatcher import SIGNATURE_HEADER, create_http_client, dispatch_webhooks
+from app.services.webhook_service import (
+    check_webhook_url,
+    fan_out_events,
+    is_public_address,
+    redeliver,
+    retry_delay,
+)
+from tests.db_utils import create_referral_link
+
+
+class StubReceiver:
+    """Local HTTP server recording webhook requests"""
+
+    def __init__(self, status: int = 200, delay: float = 0.0):
+        self.status = status
+        self.delay = delay
+        self.requests = []
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self._lock = threading.Lock()
+        receiver = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                body = self.rfile.read(int(self.headers["Content-Length"]))
+                with receiver._lock:
+                    receiver.in_flight += 1
+                    receiver.max_in_flight = max(receiver.max_in_flight, receiver.in_flight)
+                time.sleep(receiver.delay)
+                with receiver._lock:
+                    receiver.in_flight -= 1
+                    receiver.requests.append((dict(self.headers), body))
+                self.send_response(receiver.status)
+                self.send_header("Content-Length", "0")
+                self.end_headers()
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.url = f"http://127.0.0.1:{self.server.server_address[1]}/hook"
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self.thread.start()
+
+    def events(self):
+        return [event for _, body in self.requests for event in json.loads(body)["events"]]
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+@pytest.fixture
+def session_factory(engine):
+    return sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+
+@pytest.fixture
+def receiver():
+    receiver = StubReceiver()
+    yield receiver
+    receiver.close()
+
+
+@pytest.fixture
+def fake_dns(monkeypatch):
+    """Resolve hosts from a dict instead of DNS"""
+    records = {
+        "hooks.example.com": ["93.184.215.14"],
+        "internal.example.com": ["93.184.215.14", "10.0.0.5"],
+    }
+
+    def resolve_host(host, port):
+        if host in records:
+            return records[host]
+        try:
+            return [str(ipaddress.ip_address(host))]
+        except ValueError:
+            raise socket.gaierror(f"Unknown host {host}")
+
+    monkeypatch.setattr(webhook_service, "resolve_host", resolve_host)
+    return records
+
+
+@pytest.fixture
+def link(db_session):
+    return create_referral_link(db_session)
+
+
+def add_endpoint(db, link, url, affiliate=True, event_types=None, max_concurrency=4):
+    endpoint = WebhookEndpoint(
+        affiliate_id=link.affiliate_id if affiliate else None,
+        program_id=None if affiliate else link.program_id,
+        url=url,
+        secret="whsec_test",
+        event_types=event_types or [WebhookEventType.CONVERSION_VALIDATED.value],
+        max_concurrency=max_concurrency,
+        created_by=db.get(AffiliateProfile, link.affiliate_id).user_id,
+    )
+    db.add(endpoint)
+    db.commit()
+    return endpoint
+
+
+def convert(db, link, count=1):
+    return [
+        conversion_service.create_conversion(
+            db=db,
+            referral_link=link,
+            conversion_type=ConversionType.SALE,
+            visitor_session_id=uuid4(),
+            conversion_value=Decimal("50.00"),
+            auto_validate=True,
+        )
+        for _ in range(count)
+    ]
+
+
+def dispatch(session_factory, make_client=lambda: httpx.AsyncClient(timeout=5)):
+    async def run():
+        async with make_client() as client:
+            return await dispatch_webhooks(client, session_factory)
+
+    return asyncio.run(run())
+
+
+@pytest.mark.integration
+class TestOutboxFanOut:
+    """Test events are recorded with their change and routed to subscribers."""
+
+    def test_event_recorded_with_conversion(self, db_session, link):
+        conversion = convert(db_session, link)[0]
+
+        event = db_session.query(OutboxEvent).one()
+        assert event.event_type == WebhookEventType.CONVERSION_VALIDATED.value
+        assert event.affiliate_id == link.affiliate_id
+        assert event.program_id == link.program_id
+        assert event.payload["id"] == str(conversion.id)
+        assert event.payload["conversion_value"] == "50.00"
+        assert event.dispatched_at is None
+
+    def test_fan_out_routes_by_owner_and_type(self, db_session, link):
+        other = create_referral_link(db_session, link_code="otherlink")
+        affiliate_endpoint = add_endpoint(db_session, link, "http://a.test/hook")
+        program_endpoint = add_endpoint(db_session, link, "http://p.test/hook", affiliate=False)
+        add_endpoint(db_session, link, "http://c.test/hook", event_types=[WebhookEventType.PAYOUT_COMPLETED.value])
+        add_endpoint(db_session, other, "http://o.test/hook")
+        inactive = add_endpoint(db_session, link, "http://i.test/hook")
+        inactive.is_active = False
+        db_session.commit()
+
+        convert(db_session, link)
+
+        assert fan_out_events(db_session) == 1
+        endpoint_ids = {delivery.endpoint_id for delivery in db_session.query(WebhookDelivery)}
+        assert endpoint_ids == {affiliate_endpoint.id, program_endpoint.id}
+        assert db_session.query(OutboxEvent).one().dispatched_at is not None
+        assert fan_out_events(db_session) == 0
+
+
+@pytest.mark.integration
+class TestWebhookDispatch:
+    """Test delivery, signing, batching, retries and dead-lettering."""
+
+    def test_delivers_signed_batches(self, db_session, session_factory, link, receiver, monkeypatch):
+        monkeypatch.setattr(settings, "WEBHOOK_BATCH_SIZE", 2)
+        add_endpoint(db_session, link, receiver.url)
+        conversions = convert(db_session, link, count=3)
+
+        totals = dispatch(session_factory)
+
+        assert totals == {"events": 3, "delivered": 3, "retry": 0, "dead": 0}
+        assert len(receiver.requests) == 2
+        assert sorted(event["data"]["id"] for event in receiver.events()) == sorted(str(c.id) for c in conversions)
+
+        headers, body = receiver.requests[0]
+        timestamp, signature = (part.split("=", 1)[1] for part in headers[SIGNATURE_HEADER].split(","))
+        expected = hmac.new(b"whsec_test", f"{timestamp}.".encode() + body, hashlib.sha256).hexdigest()
+        assert hmac.compare_digest(signature, expected)
+
+        db_session.expire_all()
+        deliveries = db_session.query(WebhookDelivery).all()
+        assert all(delivery.status == WebhookDeliveryStatus.DELIVERED for delivery in deliveries)
+        assert all(delivery.attempts == 1 and delivery.delivered_at for delivery in deliveries)
+
+    def test_failure_retries_then_dead_letters(self, db_session, session_factory, link, monkeypatch):
+        monkeypatch.setattr(settings, "WEBHOOK_MAX_ATTEMPTS", 2)
+        receiver = StubReceiver(status=500)
+        try:
+            add_endpoint(db_session, link, receiver.url)
+            convert(db_session, link)
+
+            assert dispatch(session_factory)["retry"] == 1
+            delivery = db_session.query(WebhookDelivery).one()
+            assert delivery.status == WebhookDeliveryStatus.PENDING
+            assert delivery.attempts == 1
+            assert delivery.last_status_code == 500
+            assert delivery.last_error == "HTTP 500"
+            assert delivery.next_attempt_at > datetime.utcnow()
+
+            # Not due yet: nothing is sent
+            assert dispatch(session_factory)["retry"] == 0
+            assert len(receiver.requests) == 1
+
+            delivery.next_attempt_at = datetime.utcnow() - timedelta(seconds=1)
+            db_session.commit()
+            assert dispatch(session_factory)["dead"] == 1
+            db_session.expire_all()
+            assert delivery.status == WebhookDeliveryStatus.DEAD
+            assert delivery.attempts == 2
+
+            receiver.status = 200
+            redeliver(db_session, delivery)
+            assert dispatch(session_factory)["delivered"] == 1
+        finally:
+            receiver.close()
+
+    def test_connection_error_is_retried(self, db_session, session_factory, link):
+        add_endpoint(db_session, link, "http://127.0.0.1:9/unreachable")
+        convert(db_session, link)
+
+        assert dispatch(session_factory)["retry"] == 1
+        delivery = db_session.query(WebhookDelivery).one()
+        assert delivery.last_status_code is None
+        assert delivery.last_error
+
+    def test_per_endpoint_concurrency_limit(self, db_session, session_factory, link, monkeypatch):
+        monkeypatch.setattr(settings, "WEBHOOK_BATCH_SIZE", 1)
+        receiver = StubReceiver(delay=0.05)
+        try:
+            add_endpoint(db_session, link, receiver.url, max_concurrency=2)
+            convert(db_session, link, count=6)
+
+            assert dispatch(session_factory)["delivered"] == 6
+            assert len(receiver.requests) == 6
+            assert receiver.max_in_flight <= 2
+        finally:
+            receiver.close()
+
+    def test_dispatcher_refuses_private_addresses(self, db_session, session_factory, link, receiver, fake_dns):
+        add_endpoint(db_session, link, receiver.url)
+        convert(db_session, link)
+
+        assert dispatch(session_factory, create_http_client)["retry"] == 1
+        assert receiver.requests == []
+        delivery = db_session.query(WebhookDelivery).one()
+        assert delivery.last_error == "WebhookTargetError"
+
+    def test_dispatcher_connects_to_checked_address(
+        self, db_session, session_factory, link, receiver, fake_dns, monkeypatch
+    ):
+        monkeypatch.setattr(settings, "WEBHOOK_ALLOW_PRIVATE_TARGETS", True)
+        fake_dns["hooks.example.com"] = ["127.0.0.1"]
+        port = receiver.server.server_address[1]
+        add_endpoint(db_session, link, f"http://hooks.example.com:{port}/hook")
+        convert(db_session, link)
+
+        assert dispatch(session_factory, create_http_client)["delivered"] == 1
+        headers, _ = receiver.requests[0]
+        assert headers["Host"] == f"hooks.example.com:{port}"
+
+    def test_retry_delay_backs_off(self, monkeypatch):
+        monkeypatch.setattr(settings, "WEBHOOK_RETRY_BASE_SECONDS", 10)
+        monkeypatch.setattr(settings, "WEBHOOK_RETRY_MAX_SECONDS", 100)
+        assert 5 <= retry_delay(1) <= 10
+        assert 20 <= retry_delay(3) <= 40
+        assert 50 <= retry_delay(10) <= 100
+
+
+@pytest.mark.unit
+class TestWebhookTargets:
+    """Test which endpoint URLs are accepted."""
+
+    @pytest.mark.parametrize("address, public", [
+        ("93.184.215.14", True),
+        ("2606:2800:220:1::1", True),
+        ("10.1.2.3", False),
+        ("172.16.0.1", False),
+        ("192.168.1.1", False),
+        ("127.0.0.1", False),
+        ("169.254.169.254", False),
+        ("100.64.0.1", False),
+        ("0.0.0.0", False),
+        ("::1", False),
+        ("fe80::1%eth0", False),
+        ("fd00::1", False),
+        ("::ffff:127.0.0.1", False),
+        ("224.0.0.1", False),
+    ])
+    def test_is_public_address(self, address, public):
+        assert is_public_address(address) is public
+
+    @pytest.mark.parametrize("url", [
+        "http://127.0.0.1:8000/hook",
+        "http://169.254.169.254/latest/meta-data/",
+        "http://[::1]/hook",
+        "https://internal.example.com/hook",
+        "https://unknown.example.com/hook",
+        "ftp://hooks.example.com/hook",
+    ])
+    def test_rejected_urls(self, fake_dns, url):
+        with pytest.raises(ValueError):
+            check_webhook_url(url)
+
+    def test_public_url(self, fake_dns):
+        check_webhook_url("https://hooks.example.com/hook")
+
+
+@pytest.mark.api
+class TestWebhookEndpointsApi:
+    """Test endpoint registration and ownership checks."""
+
+    @pytest.fixture(autouse=True)
+    def dns(self, fake_dns):
+        return fake_dns
+
+    def test_affiliate_registers_own_endpoint(self, db_session, link, client_for):
+        user = db_session.get(User, db_session.get(AffiliateProfile, link.affiliate_id).user_id)
+        client = client_for(user)
+
+        response = client.post("/api/v1/webhooks/endpoints", json={
+            "url": "https://hooks.example.com/affiliate",
+            "event_types": ["conversion.validated", "payout.completed"],
+        })
+        assert response.status_code == 200
+        data = response.json()
+        assert data["affiliate_id"] == str(link.affiliate_id)
+        assert data["secret"].startswith("whsec_")
+
+        listed = client.get("/api/v1/webhooks/endpoints").json()
+        assert [endpoint["id"] for endpoint in listed] == [data["id"]]
+        assert "secret" not in listed[0]
+
+        response = client.post("/api/v1/webhooks/endpoints", json={
+            "url": "https://hooks.example.com/program",
+            "event_types": ["conversion.validated"],
+            "program_id": str(link.program_id),
+        })
+        assert response.status_code == 403
+
+    def test_cannot_manage_other_affiliates_endpoint(self, db_session, link, client_for):
+        other = create_referral_link(db_session, link_code="otherlink")
+        endpoint = add_endpoint(db_session, other, "https://hooks.example.com/other")
+        user = db_session.get(User, db_session.get(AffiliateProfile, link.affiliate_id).user_id)
+        client = client_for(user)
+
+        response = client.patch(f"/api/v1/webhooks/endpoints/{endpoint.id}", json={"is_active": False})
+        assert response.status_code == 403
+        response = client.delete(f"/api/v1/webhooks/endpoints/{endpoint.id}")
+        assert response.status_code == 403
+
+    def test_private_targets_rejected(self, db_session, link, client_for):
+        user = db_session.get(User, db_session.get(AffiliateProfile, link.affiliate_id).user_id)
+        client = client_for(user)
+
+        for url in ("http://169.254.169.254/latest/meta-data/", "https://internal.example.com/hook"):
+            response = client.post("/api/v1/webhooks/endpoints", json={
+                "url": url,
+                "event_types": ["conversion.validated"],
+            })
+            assert response.status_code == 400
+
+        endpoint = add_endpoint(db_session, link, "https://hooks.example.com/affiliate")
+        response = client.patch(f"/api/v1/webhooks/endpoints/{endpoint.id}", json={"url": "http://10.0.0.5/hook"})
+        assert response.status_code == 400
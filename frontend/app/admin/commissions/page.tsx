@@ -3,7 +3,7 @@
 import { useEffect, useState } from "react";
 import { apiClient, getErrorMessage } from "@/lib/api";
 import {
-  Commission,
+  CommissionWithDetails,
   CommissionStatus,
   CommissionStats,
 } from "@/types";
@@ -13,11 +13,11 @@ import { Button } from "@/components/ui/Button";
 import { Modal } from "@/components/ui/Modal";
 
 export default function AdminCommissionsPage() {
-  const [commissions, setCommissions] = useState<Commission[]>([]);
+  const [commissions, setCommissions] = useState<CommissionWithDetails[]>([]);
   const [stats, setStats] = useState<CommissionStats | null>(null);
   const [isLoading, setIsLoading] = useState(true);
   const [error, setError] = useState("");
-  const [selectedCommission, setSelectedCommission] = useState<Commission | null>(null);
+  const [selectedCommission, setSelectedCommission] = useState<CommissionWithDetails | null>(null);
   const [showDetailsModal, setShowDetailsModal] = useState(false);
   const [actionLoading, setActionLoading] = useState(false);
   const [filterStatus, setFilterStatus] = useState<CommissionStatus | "all">("all");
@@ -26,7 +26,7 @@ export default function AdminCommissionsPage() {
     try {
       const params = filterStatus !== "all" ? { status: filterStatus } : {};
       const [commissionsData, statsData] = await Promise.all([
-        apiClient.listCommissions(params),
+        apiClient.listCommissionDetails(params),
         apiClient.getCommissionStats(),
       ]);
       setCommissions(commissionsData);
@@ -224,6 +224,7 @@ export default function AdminCommissionsPage() {
                     <tr key={commission.id} className="hover:bg-gray-50">
                       <td className="px-6 py-4 whitespace-nowrap text-sm font-mono text-gray-900">
                         {commission.affiliate_id.substring(0, 8)}...
+                        <div className="text-xs font-sans text-gray-500">{commission.program_name}</div>
                       </td>
                       <td className="px-6 py-4 whitespace-nowrap text-sm text-gray-900">
                         {formatCurrency(commission.base_amount)}
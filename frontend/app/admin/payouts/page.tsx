@@ -3,7 +3,7 @@
 import { useEffect, useState } from "react";
 import { apiClient, getErrorMessage } from "@/lib/api";
 import {
-  Payout,
+  PayoutWithDetails,
   PayoutStatus,
   PayoutStats,
   AffiliateProfile,
@@ -16,12 +16,12 @@ import { Modal } from "@/components/ui/Modal";
 import { Input } from "@/components/ui/Input";
 
 export default function AdminPayoutsPage() {
-  const [payouts, setPayouts] = useState<Payout[]>([]);
+  const [payouts, setPayouts] = useState<PayoutWithDetails[]>([]);
   const [stats, setStats] = useState<PayoutStats | null>(null);
   const [affiliates, setAffiliates] = useState<AffiliateProfile[]>([]);
   const [isLoading, setIsLoading] = useState(true);
   const [error, setError] = useState("");
-  const [selectedPayout, setSelectedPayout] = useState<Payout | null>(null);
+  const [selectedPayout, setSelectedPayout] = useState<PayoutWithDetails | null>(null);
   const [showDetailsModal, setShowDetailsModal] = useState(false);
   const [showGenerateModal, setShowGenerateModal] = useState(false);
   const [showProcessModal, setShowProcessModal] = useState(false);
@@ -38,7 +38,7 @@ export default function AdminPayoutsPage() {
     try {
       const params = filterStatus !== "all" ? { status: filterStatus } : {};
       const [payoutsData, statsData] = await Promise.all([
-        apiClient.listPayouts(params),
+        apiClient.listPayoutDetails(params),
         apiClient.getPayoutStats(),
       ]);
       setPayouts(payoutsData);
@@ -124,10 +124,10 @@ export default function AdminPayoutsPage() {
 
   const getStatusBadge = (status: PayoutStatus) => {
     const variants: Record<PayoutStatus, "success" | "warning" | "default" | "danger"> = {
-      pending: "warning",
-      processing: "default",
-      paid: "success",
-      cancelled: "danger",
+      [PayoutStatus.PENDING]: "warning",
+      [PayoutStatus.PROCESSING]: "default",
+      [PayoutStatus.COMPLETED]: "success",
+      [PayoutStatus.FAILED]: "danger",
     };
     return <Badge variant={variants[status]}>{status.toUpperCase()}</Badge>;
   };
@@ -231,8 +231,8 @@ export default function AdminPayoutsPage() {
         </Button>
         <Button
           size="sm"
-          variant={filterStatus === PayoutStatus.PAID ? "primary" : "ghost"}
-          onClick={() => setFilterStatus(PayoutStatus.PAID)}
+          variant={filterStatus === PayoutStatus.COMPLETED ? "primary" : "ghost"}
+          onClick={() => setFilterStatus(PayoutStatus.COMPLETED)}
         >
           Paid
         </Button>
@@ -254,7 +254,7 @@ export default function AdminPayoutsPage() {
                 <thead className="bg-gray-50">
                   <tr>
                     <th className="px-6 py-3 text-left text-xs font-medium text-gray-500 uppercase tracking-wider">
-                      Affiliate ID
+                      Affiliate
                     </th>
                     <th className="px-6 py-3 text-left text-xs font-medium text-gray-500 uppercase tracking-wider">
                       Amount
@@ -277,7 +277,10 @@ export default function AdminPayoutsPage() {
                   {payouts.map((payout) => (
                     <tr key={payout.id} className="hover:bg-gray-50">
                       <td className="px-6 py-4 whitespace-nowrap text-sm font-mono text-gray-900">
-                        {payout.affiliate_id.substring(0, 8)}...
+                        {payout.affiliate_code}
+                        {payout.affiliate_company && (
+                          <div className="text-xs font-sans text-gray-500">{payout.affiliate_company}</div>
+                        )}
                       </td>
                       <td className="px-6 py-4 whitespace-nowrap text-sm font-bold text-green-600">
                         {formatCurrency(payout.total_amount)}
@@ -6,10 +6,8 @@ import { apiClient, getErrorMessage } from "@/lib/api";
 import {
   ReferralLink,
   Commission,
-  CommissionStats,
   CommissionStatus,
   AffiliateProfile,
-  ReferralLinkStatus,
 } from "@/types";
 import { Card, CardContent } from "@/components/ui/Card";
 import { Button } from "@/components/ui/Button";
@@ -45,51 +43,32 @@ export default function AffiliateDashboard() {
 
   const fetchDashboardData = async () => {
     try {
-      // Fetch all required data in parallel
-      const [
-        links,
-        commissions,
-        commissionStats,
-        affiliateProfile,
-      ] = await Promise.all([
-        apiClient.listMyReferralLinks({ limit: 100 }),
-        apiClient.listCommissions({ limit: 10 }),
-        apiClient.getCommissionStats(),
-        apiClient.getMyAffiliateProfile(),
-      ]);
-
-      // Calculate stats
-      const totalClicks = links.reduce((sum, link) => sum + link.clicks_count, 0);
-      const totalConversions = links.reduce((sum, link) => sum + link.conversions_count, 0);
-      const conversionRate = totalClicks > 0 ? (totalConversions / totalClicks) * 100 : 0;
-      const activeLinks = links.filter(link => link.status === ReferralLinkStatus.ACTIVE).length;
+      // One request: profile, link totals, top links and commission totals
+      const dashboard = await apiClient.getMyDashboard();
+      const { links, commissions: commissionStats } = dashboard;
 
+      const conversionRate = links.clicks > 0 ? (links.conversions / links.clicks) * 100 : 0;
       const totalEarnings =
-        commissionStats.total_paid +
-        commissionStats.total_approved +
-        commissionStats.total_pending;
+        Number(commissionStats.total_paid) +
+        Number(commissionStats.total_approved) +
+        Number(commissionStats.total_pending);
 
       setStats({
-        totalClicks,
-        totalConversions,
+        totalClicks: links.clicks,
+        totalConversions: links.conversions,
         totalEarnings,
         conversionRate,
         pendingCommissions: commissionStats.total_pending,
         approvedCommissions: commissionStats.total_approved,
         paidCommissions: commissionStats.total_paid,
-        activeLinks,
+        activeLinks: links.active_links,
       });
 
       // Set recent data
-      setRecentCommissions(commissions.slice(0, 5));
-
-      // Sort links by clicks and get top 3
-      const sortedLinks = [...links]
-        .sort((a, b) => b.clicks_count - a.clicks_count)
-        .slice(0, 3);
-      setTopLinks(sortedLinks);
+      setRecentCommissions(dashboard.recent_commissions);
+      setTopLinks(dashboard.top_links.slice(0, 3));
 
-      setProfile(affiliateProfile);
+      setProfile(dashboard.profile);
     } catch (err) {
       setError(getErrorMessage(err));
     } finally {
@@ -8,19 +8,24 @@ import {
   TokenResponse,
   User,
   AffiliateProfile,
+  AffiliateDashboard,
   AffiliateProgram,
   ProgramEnrollment,
   ReferralLink,
   ReferralLinkWithUrl,
+  ReferralLinkBulkCreate,
+  ReferralLinkBulkResult,
   ReferralLinkStats,
   Conversion,
   ConversionStatus,
   Commission,
   CommissionStatus,
   CommissionStats,
+  CommissionWithDetails,
   Payout,
   PayoutStatus,
   PayoutStats,
+  PayoutWithDetails,
 } from "@/types";
 
 const API_URL = process.env.NEXT_PUBLIC_API_URL || "http://localhost:8000";
@@ -161,6 +166,11 @@ class ApiClient {
     return response.data;
   }
 
+  async getMyDashboard(): Promise<AffiliateDashboard> {
+    const response = await this.client.get<AffiliateDashboard>("/affiliates/me/dashboard");
+    return response.data;
+  }
+
   async updateMyAffiliateProfile(data: Partial<AffiliateProfile>): Promise<AffiliateProfile> {
     const response = await this.client.patch<AffiliateProfile>("/affiliates/me", data);
     return response.data;
@@ -235,6 +245,15 @@ class ApiClient {
     return response.data;
   }
 
+  async createReferralLinksBulk(data: ReferralLinkBulkCreate): Promise<ReferralLinkBulkResult[]> {
+    // The response is NDJSON: one link per line
+    const response = await this.client.post<string>("/referrals/links/bulk", data, { responseType: "text" });
+    return response.data
+      .split("\n")
+      .filter((line) => line.length > 0)
+      .map((line) => JSON.parse(line) as ReferralLinkBulkResult);
+  }
+
   async listMyReferralLinks(params?: { skip?: number; limit?: number; status?: string }): Promise<ReferralLink[]> {
     const response = await this.client.get<ReferralLink[]>("/referrals/links", { params });
     return response.data;
@@ -287,6 +306,11 @@ class ApiClient {
     return response.data;
   }
 
+  async listCommissionDetails(params?: { skip?: number; limit?: number; status?: CommissionStatus }): Promise<CommissionWithDetails[]> {
+    const response = await this.client.get<CommissionWithDetails[]>("/commissions/details", { params });
+    return response.data;
+  }
+
   async getCommission(id: string): Promise<Commission> {
     const response = await this.client.get<Commission>(`/commissions/${id}`);
     return response.data;
@@ -318,6 +342,11 @@ class ApiClient {
     return response.data;
   }
 
+  async listPayoutDetails(params?: { skip?: number; limit?: number; status?: PayoutStatus }): Promise<PayoutWithDetails[]> {
+    const response = await this.client.get<PayoutWithDetails[]>("/payouts/details", { params });
+    return response.data;
+  }
+
   async getPayout(id: string): Promise<Payout> {
     const response = await this.client.get<Payout>(`/payouts/${id}`);
     return response.data;
@@ -90,6 +90,7 @@ export interface AffiliateProgram {
   end_date?: string;
   terms_and_conditions?: string;
   commission_config: Record<string, any>;
+  postback_template?: Record<string, Record<string, string>>;
   created_by: string;
   created_at: string;
   updated_at: string;
@@ -140,6 +141,33 @@ export interface ReferralLinkWithUrl extends ReferralLink {
   full_url: string;
 }
 
+export interface ReferralLinkBulkItem {
+  target_url: string;
+  utm_params?: Record<string, string>;
+  link_metadata?: Record<string, any>;
+}
+
+export interface ReferralLinkBulkCreate {
+  program_id: string;
+  links?: ReferralLinkBulkItem[];
+  // One link per (target URL, UTM set) pair
+  template?: {
+    target_urls: string[];
+    utm_sets?: Record<string, string>[];
+    link_metadata?: Record<string, any>;
+  };
+  expires_at?: string;
+}
+
+export interface ReferralLinkBulkResult {
+  id: string;
+  link_code: string;
+  target_url: string;
+  utm_params?: Record<string, string>;
+  link_metadata?: Record<string, any>;
+  full_url: string;
+}
+
 export interface ReferralLinkStats {
   link_code: string;
   total_clicks: number;
@@ -217,6 +245,12 @@ export interface Commission {
   updated_at: string;
 }
 
+export interface CommissionWithDetails extends Commission {
+  conversion_value: number;
+  conversion_type: ConversionType;
+  program_name: string;
+}
+
 export interface Payout {
   id: string;
   affiliate_id: string;
@@ -233,6 +267,11 @@ export interface Payout {
   updated_at: string;
 }
 
+export interface PayoutWithDetails extends Payout {
+  affiliate_code: string;
+  affiliate_company?: string;
+}
+
 export interface CommissionStats {
   total_pending: number;
   total_approved: number;
@@ -250,3 +289,21 @@ export interface PayoutStats {
   count_processing: number;
   count_paid: number;
 }
+
+export interface LinkTotals {
+  total_links: number;
+  active_links: number;
+  clicks: number;
+  conversions: number;
+}
+
+export interface AffiliateDashboard {
+  profile: AffiliateProfile;
+  links: LinkTotals;
+  top_links: ReferralLink[];
+  enrollments: ProgramEnrollment[];
+  commissions: CommissionStats;
+  recent_commissions: Commission[];
+  payouts: PayoutStats;
+  generated_at: string;
+}
@@ -10,6 +10,7 @@ export interface ConversionPayload {
   currency?: string;
   customer_id?: string;
   conversion_metadata?: Record<string, any>;
+  idempotency_key?: string;
 }
 
 export interface ConversionResponse {
@@ -52,6 +52,7 @@ export const STORAGE_KEYS = {
  */
 export const URL_PARAMS = {
   REFERRAL: 'ref',
+  SESSION: 'aff_sid',
   UTM_SOURCE: 'utm_source',
   UTM_MEDIUM: 'utm_medium',
   UTM_CAMPAIGN: 'utm_campaign',
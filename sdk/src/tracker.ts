@@ -21,6 +21,9 @@ export interface TrackConversionOptions {
 
   /** Custom metadata */
   metadata?: Record<string, any>;
+
+  /** Dedupe key (e.g., order ID); retries with the same key are recorded once */
+  idempotencyKey?: string;
 }
 
 export class ConversionTracker {
@@ -73,6 +76,14 @@ export class ConversionTracker {
     const now = new Date().toISOString();
     let sessionId = this.storage.get(STORAGE_KEYS.SESSION_ID);
 
+    // Adopt the click's session from the tracking redirect for attribution
+    const clickSessionId = getUrlParam(URL_PARAMS.SESSION);
+    if (clickSessionId && clickSessionId !== sessionId) {
+      sessionId = clickSessionId;
+      this.storage.set(STORAGE_KEYS.SESSION_ID, sessionId);
+      this.log('Session adopted from referral click:', sessionId);
+    }
+
     if (!sessionId) {
       sessionId = generateUUID();
       this.storage.set(STORAGE_KEYS.SESSION_ID, sessionId);
@@ -133,6 +144,7 @@ export class ConversionTracker {
       currency: options.currency || 'USD',
       customer_id: options.customerId,
       conversion_metadata: options.metadata,
+      idempotency_key: options.idempotencyKey,
     };
 
     try {